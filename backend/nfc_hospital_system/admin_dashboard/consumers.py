@@ -7,9 +7,11 @@ from django.db.models import Count, Avg, Q
 from django.utils import timezone
 from datetime import timedelta
 
+from p_queue.consumers import EventReplayMixin
+
 logger = logging.getLogger(__name__)
 
-class DashboardConsumer(AsyncWebsocketConsumer):
+class DashboardConsumer(EventReplayMixin, AsyncWebsocketConsumer):
     """
     관리자 대시보드 실시간 업데이트 WebSocket Consumer
     """
@@ -36,8 +38,12 @@ class DashboardConsumer(AsyncWebsocketConsumer):
             await self.accept()
             print("✅ WebSocket connection accepted")
             
-            # 연결 시 현재 상태 즉시 전송
-            await self.send_dashboard_update()
+            # 재연결(?last_seq=N)이면 놓친 알림만, 아니면 현재 상태 전체 전송
+            last_seq = self.query_last_seq()
+            if last_seq is not None:
+                await self.resume_group(self.room_group_name, last_seq)
+            else:
+                await self.send_dashboard_update()
             
             # 주기적 업데이트 시작
             self.update_task = asyncio.create_task(self.periodic_update())
@@ -76,6 +82,11 @@ class DashboardConsumer(AsyncWebsocketConsumer):
                 # 특정 메트릭 구독
                 metrics = text_data_json.get('metrics', [])
                 await self.send_specific_metrics(metrics)
+            elif message_type == 'resume':
+                # 놓친 알림 요청 (버퍼 범위를 벗어나면 전체 데이터)
+                last_seq = self.parse_seq(text_data_json.get('last_seq'))
+                if last_seq is not None:
+                    await self.resume_group(self.room_group_name, last_seq)
                 
         except json.JSONDecodeError:
             logger.error("Invalid JSON received in dashboard WebSocket")
@@ -299,11 +310,14 @@ class DashboardConsumer(AsyncWebsocketConsumer):
     # 그룹 메시지 핸들러
     async def dashboard_notification(self, event):
         """그룹으로부터 알림 메시지 수신"""
-        await self.send(text_data=json.dumps({
+        await self.send(text_data=json.dumps(self.with_seq({
             'type': 'notification',
             'data': event['data'],
             'timestamp': timezone.now().isoformat()
-        }))
+        }, event)))
+    
+    async def group_snapshot(self, group):
+        return await self.get_dashboard_data()
 
 
 class NFCMonitoringConsumer(AsyncWebsocketConsumer):
@@ -405,9 +419,10 @@ class NFCMonitoringConsumer(AsyncWebsocketConsumer):
     
     # 그룹 메시지 핸들러
     async def nfc_scan_notification(self, event):
-        """새로운 NFC 스캔 알림"""
-        await self.send(text_data=json.dumps({
-            'type': 'new_scan',
-            'data': event['data'],
-            'timestamp': timezone.now().isoformat()
-        }))
\ No newline at end of file
+        """새로운 NFC 스캔 알림 (스캔 플러셔는 배치 단위로 'scans' 목록을 보냄)"""
+        for data in event.get('scans') or [event['data']]:
+            await self.send(text_data=json.dumps({
+                'type': 'new_scan',
+                'data': data,
+                'timestamp': timezone.now().isoformat()
+            }))
\ No newline at end of file
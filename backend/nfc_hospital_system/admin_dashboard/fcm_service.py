@@ -11,6 +11,19 @@ from django.conf import settings
 logger = logging.getLogger(__name__)
 
 
+def _error_code(exception) -> str:
+    """FCM 예외를 send_notification 과 같은 오류 코드로 변환"""
+    if exception is None:
+        return 'unknown'
+    if isinstance(exception, messaging.UnregisteredError):
+        return 'unregistered_token'
+    if isinstance(exception, messaging.SenderIdMismatchError):
+        return 'sender_id_mismatch'
+    if isinstance(exception, messaging.QuotaExceededError):
+        return 'quota_exceeded'
+    return str(getattr(exception, 'code', 'unknown')).lower()
+
+
 class FCMService:
     """FCM 푸시 알림 발송 서비스"""
     
@@ -137,19 +150,21 @@ class FCMService:
         tokens: List[str],
         title: str,
         body: str,
-        data: Optional[Dict[str, str]] = None
+        data: Optional[Dict[str, str]] = None,
+        priority: str = 'high'
     ) -> Dict[str, Any]:
         """
-        여러 디바이스에 동시 발송 (최대 500개)
+        여러 디바이스에 동시 발송 (500개씩 나누어 발송)
         
         Args:
             tokens: FCM 디바이스 토큰 리스트
             title: 알림 제목
             body: 알림 내용
             data: 추가 데이터
+            priority: 알림 우선순위 (high, normal)
             
         Returns:
-            발송 결과 정보
+            발송 결과 정보 (failed_tokens 의 error 는 _error_code 기준)
         """
         if not tokens:
             return {
@@ -175,9 +190,12 @@ class FCMService:
                     ),
                     data=data if data else {},
                     tokens=batch_tokens,
+                    android=messaging.AndroidConfig(priority=priority),
                 )
                 
-                response = messaging.send_multicast(message)
+                # firebase-admin 6.2+ 는 send_each_for_multicast (send_multicast 는 제거 예정)
+                send = getattr(messaging, 'send_each_for_multicast', None) or messaging.send_multicast
+                response = send(message)
                 
                 total_success += response.success_count
                 total_failure += response.failure_count
@@ -187,7 +205,7 @@ class FCMService:
                     if not resp.success:
                         failed_tokens.append({
                             'token': batch_tokens[idx],
-                            'error': resp.exception.code if resp.exception else 'unknown'
+                            'error': _error_code(resp.exception)
                         })
             
             logger.info(f"멀티캐스트 발송 완료 - 성공: {total_success}, 실패: {total_failure}")
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-19 00:18
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("admin_dashboard", "0002_notificationsettings"),
+        ("authentication", "0003_remove_user_users_phonenu_e84f73_idx_and_more"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(
+                fields=["user", "created_at", "notification_id"],
+                name="notificatio_user_id_16dfb8_idx",
+            ),
+        ),
+    ]
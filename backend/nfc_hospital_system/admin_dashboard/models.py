@@ -374,36 +374,27 @@ class NotificationSettings(models.Model):
         return f"{self.user.name}의 알림 설정"
     
     def is_notification_allowed(self, notification_type: str) -> bool:
-        """특정 알림 타입이 허용되는지 확인"""
-        # 긴급 알림은 항상 허용
-        if notification_type == 'emergency':
-            return True
-        
-        # 방해금지 시간 확인
-        if self.do_not_disturb_enabled and self.do_not_disturb_start and self.do_not_disturb_end:
-            from datetime import datetime
-            now = datetime.now().time()
-            
-            # 방해금지 시간이 자정을 넘는 경우 처리
-            if self.do_not_disturb_start > self.do_not_disturb_end:
-                if now >= self.do_not_disturb_start or now <= self.do_not_disturb_end:
-                    return False
-            else:
-                if self.do_not_disturb_start <= now <= self.do_not_disturb_end:
-                    return False
-        
-        # 알림 타입별 설정 확인
-        notification_settings = {
-            'queue_update': self.queue_update,
-            'patient_call': self.patient_call,
-            'exam_ready': self.exam_ready,
-            'exam_complete': self.exam_complete,
-            'appointment_reminder': self.appointment_reminder,
-            'system': self.system,
-            'emergency': self.emergency,
-        }
-        
-        return notification_settings.get(notification_type, True)
+        """특정 알림 타입이 허용되는지 확인 (긴급 알림은 항상 허용, 방해금지 시간에는 차단)"""
+        from .notification_preferences import build_entry, is_allowed, now_seconds
+
+        values = {field: getattr(self, field) for field in (
+            'queue_update', 'patient_call', 'exam_ready', 'exam_complete', 'appointment_reminder',
+            'system', 'emergency', 'do_not_disturb_enabled', 'do_not_disturb_start', 'do_not_disturb_end',
+        )}
+        return is_allowed(build_entry(values), notification_type, now_seconds())
+
+
+# 알림 타입별 푸시 아이콘/색상 (Notification.send, notification_dispatch 공용)
+PUSH_STYLES = {
+    'queue_update': {'icon': '⏰', 'color': '#4CAF50'},
+    'patient_call': {'icon': '📢', 'color': '#FF5722'},
+    'exam_ready': {'icon': '🏥', 'color': '#2196F3'},
+    'exam_complete': {'icon': '✅', 'color': '#4CAF50'},
+    'appointment_reminder': {'icon': '📅', 'color': '#FFC107'},
+    'system': {'icon': 'ℹ️', 'color': '#9E9E9E'},
+    'emergency': {'icon': '🚨', 'color': '#F44336'},
+}
+DEFAULT_PUSH_STYLE = {'icon': 'ℹ️', 'color': '#2196F3'}
 
 
 class Notification(models.Model):
@@ -512,6 +503,8 @@ class Notification(models.Model):
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['user', 'status']),
+            # 알림 목록 커서 페이지네이션 (created_at, notification_id)
+            models.Index(fields=['user', 'created_at', 'notification_id']),
             models.Index(fields=['type', 'created_at']),
             models.Index(fields=['status', 'created_at']),
         ]
@@ -550,17 +543,7 @@ class Notification(models.Model):
             fcm_token = self.device_token.fcm_token
             
             # 알림 타입별 아이콘/색상 설정
-            notification_config = {
-                'queue_update': {'icon': '⏰', 'color': '#4CAF50'},
-                'patient_call': {'icon': '📢', 'color': '#FF5722'},
-                'exam_ready': {'icon': '🏥', 'color': '#2196F3'},
-                'exam_complete': {'icon': '✅', 'color': '#4CAF50'},
-                'appointment_reminder': {'icon': '📅', 'color': '#FFC107'},
-                'system': {'icon': 'ℹ️', 'color': '#9E9E9E'},
-                'emergency': {'icon': '🚨', 'color': '#F44336'},
-            }
-            
-            config = notification_config.get(self.type, {'icon': 'ℹ️', 'color': '#2196F3'})
+            config = PUSH_STYLES.get(self.type, DEFAULT_PUSH_STYLE)
             
             # 추가 데이터 준비
             data = {
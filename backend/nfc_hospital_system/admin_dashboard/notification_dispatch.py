@@ -0,0 +1,305 @@
+"""
+알림 일괄 발송 파이프라인
+수신자마다 Notification INSERT → 토큰 조회 → FCM 단건 발송 → save 2~3회를 반복하던 방식 대신
+
+0. 수신 설정(유형별 on/off, 방해금지) 캐시로 수신자 필터링 (notification_preferences, 캐시 왕복 1회)
+1. Notification bulk_create
+2. 캐시에 토큰 보유 비트가 있는 수신자의 활성 디바이스 토큰만 쿼리 1회로 조회 (없으면 조회 생략)
+3. 같은 페이로드(유형/제목/내용/데이터)끼리 묶어 토큰 500개 단위 멀티캐스트 배치 구성
+4. 제한된 워커 풀에서 배치 발송 (일시적 오류는 지수 백오프로 재시도, 워커는 DB 에 접근하지 않음)
+5. 발송 결과를 bulk_update, 등록 해제된 토큰은 UPDATE 1회로 비활성화
+
+설정 예시:
+    NOTIFICATION_DISPATCH = {
+        'BACKEND': 'fcm',        # fcm | fake (로컬/테스트용 가짜 FCM)
+        'BATCH_SIZE': 500,       # FCM 멀티캐스트 최대 토큰 수
+        'WORKERS': 4,
+        'MAX_RETRIES': 3,
+        'BACKOFF': 0.5,          # 초, 재시도마다 2배
+    }
+"""
+
+import logging
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from authentication.models import DeviceToken
+from .models import DEFAULT_PUSH_STYLE, PUSH_STYLES, Notification
+from .notification_preferences import (
+    HAS_PUSH_TOKEN, get_preferences, invalidate_preferences, is_allowed, now_seconds,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DISPATCH_SETTINGS = {
+    'BACKEND': 'fcm',
+    'BATCH_SIZE': 500,
+    'WORKERS': 4,
+    'MAX_RETRIES': 3,
+    'BACKOFF': 0.5,
+}
+
+# 재시도할 오류 (배치 전체 실패 또는 토큰별 일시적 오류)
+RETRYABLE_ERRORS = {'multicast_error', 'quota_exceeded', 'unavailable', 'internal'}
+
+
+def get_dispatch_settings():
+    return {**DEFAULT_DISPATCH_SETTINGS, **getattr(settings, 'NOTIFICATION_DISPATCH', {})}
+
+
+class FakeFCMBackend:
+    """
+    로컬 가짜 FCM 백엔드 (FCMService.send_multicast_notification 과 같은 인터페이스)
+    - 'unregistered' 가 들어간 토큰은 unregistered_token 실패
+    - fail_next(n): 다음 n 번의 배치 호출을 multicast_error 로 실패 (재시도 확인용)
+    - latency: 배치 호출마다 대기할 시간 (초)
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.calls = []
+            self._failures_left = 0
+
+    def fail_next(self, count=1):
+        with self._lock:
+            self._failures_left = count
+
+    @property
+    def sent_tokens(self):
+        return [token for call in self.calls if call['delivered'] for token in call['tokens']]
+
+    def send_multicast_notification(self, tokens, title, body, data=None, priority='high'):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            failed = self._failures_left > 0
+            if failed:
+                self._failures_left -= 1
+            self.calls.append({
+                'tokens': list(tokens), 'title': title, 'body': body,
+                'data': dict(data or {}), 'priority': priority, 'delivered': not failed,
+            })
+        if failed:
+            return {'success': False, 'error': 'multicast_error', 'error_message': 'fake transient failure'}
+
+        failed_tokens = [
+            {'token': token, 'error': 'unregistered_token'}
+            for token in tokens if 'unregistered' in token
+        ]
+        return {
+            'success': True,
+            'success_count': len(tokens) - len(failed_tokens),
+            'failure_count': len(failed_tokens),
+            'failed_tokens': failed_tokens,
+        }
+
+
+fake_fcm_backend = FakeFCMBackend()
+
+
+def get_fcm_backend():
+    if get_dispatch_settings()['BACKEND'] == 'fake':
+        return fake_fcm_backend
+    # firebase_admin 이 없는 환경에서도 이 모듈은 import 가능하도록 지연 import
+    from .fcm_service import fcm_service
+    return fcm_service
+
+
+def _push_data(notification_type, data, timestamp):
+    """Notification.send 와 같은 data 페이로드 (수신자별 notification_id 제외)"""
+    style = PUSH_STYLES.get(notification_type, DEFAULT_PUSH_STYLE)
+    payload = {
+        'type': notification_type,
+        'icon': style['icon'],
+        'color': style['color'],
+        'timestamp': timestamp,
+    }
+    payload.update({k: str(v) for k, v in (data or {}).items()})
+    return payload
+
+
+def _send_batch(backend, tokens, payload, config):
+    """
+    배치 1개 발송 (워커 스레드) - 일시적 오류는 백오프 후 해당 토큰만 재시도
+    Returns: {token: None(성공) | 오류 코드}
+    """
+    results = {}
+    last_errors = {}
+    pending = list(tokens)
+    batch_error = 'retries_exhausted'
+    for attempt in range(config['MAX_RETRIES'] + 1):
+        if attempt:
+            time.sleep(config['BACKOFF'] * (2 ** (attempt - 1)))
+        try:
+            response = backend.send_multicast_notification(pending, **payload)
+        except Exception as e:
+            logger.warning(f"멀티캐스트 배치 발송 예외 (시도 {attempt + 1}): {e}")
+            response = {'success': False, 'error': 'multicast_error', 'error_message': str(e)}
+
+        if not response.get('success'):
+            batch_error = response.get('error', 'multicast_error')
+            if batch_error not in RETRYABLE_ERRORS:
+                break
+            continue
+
+        errors = {item['token']: item['error'] for item in response.get('failed_tokens', [])}
+        retry = []
+        for token in pending:
+            error = errors.get(token)
+            if error in RETRYABLE_ERRORS:
+                last_errors[token] = error
+                retry.append(token)
+            else:
+                results[token] = error
+        pending = retry
+        if not pending:
+            break
+
+    for token in pending:
+        results[token] = last_errors.get(token, batch_error)
+    return results
+
+
+def dispatch_notifications(specs, respect_preferences=True):
+    """
+    알림 일괄 생성 및 멀티캐스트 발송
+    Args:
+        specs: [{'user': user, 'type': 'emergency', 'title': '...', 'message': '...', 'data': {...}}, ...]
+        respect_preferences: 수신 설정으로 꺼져 있거나 방해금지 시간인 수신자는 알림을 만들지 않음
+    Returns:
+        {'total', 'success', 'failure', 'skipped',
+         'notifications': [Notification | None(수신 거부), ...]} (specs 와 같은 순서)
+    """
+    config = get_dispatch_settings()
+    specs = list(specs)
+    entries = get_preferences(spec['user'].pk for spec in specs) if specs else {}
+    if respect_preferences:
+        seconds = now_seconds()
+        allowed = [is_allowed(entries[spec['user'].pk], spec.get('type', 'system'), seconds) for spec in specs]
+    else:
+        allowed = [True] * len(specs)
+
+    notifications = Notification.objects.bulk_create([
+        Notification(
+            user=spec['user'],
+            type=spec.get('type', 'system'),
+            title=spec['title'],
+            message=spec['message'],
+            data=spec.get('data') or {},
+        )
+        for spec, ok in zip(specs, allowed) if ok
+    ], batch_size=config['BATCH_SIZE'])
+    created = iter(notifications)
+    ordered = [next(created) if ok else None for ok in allowed]
+    skipped = len(specs) - len(notifications)
+    if not notifications:
+        return {'total': len(specs), 'success': 0, 'failure': 0, 'skipped': skipped, 'notifications': ordered}
+
+    # 토큰이 있는 수신자만 1회 조회 (캐시 레코드의 토큰 보유 비트)
+    tokens_by_user = defaultdict(list)
+    device_by_token = {}
+    user_by_token = {}
+    push_user_ids = {n.user_id for n in notifications if entries[n.user_id][0] & HAS_PUSH_TOKEN}
+    rows = DeviceToken.objects.filter(
+        user_id__in=push_user_ids,
+        is_active=True,
+        fcm_token__isnull=False,
+    ).exclude(fcm_token='').values_list('user_id', 'device_id', 'fcm_token') if push_user_ids else []
+    for user_id, device_id, token in rows:
+        tokens_by_user[user_id].append(token)
+        device_by_token[token] = device_id
+        user_by_token[token] = user_id
+
+    # 페이로드별 토큰 묶음
+    timestamp = timezone.now().isoformat()
+    groups = {}
+    group_keys = {}
+    for notification in notifications:
+        tokens = tokens_by_user.get(notification.user_id)
+        if not tokens:
+            notification.status = 'failed'
+            notification.fcm_response = {'error': 'no_fcm_token', 'message': 'FCM 토큰이 없습니다.'}
+            continue
+        notification.device_token_id = device_by_token[tokens[0]]
+        key = (notification.type, notification.title, notification.message, repr(sorted(notification.data.items())))
+        group_keys[notification.pk] = key
+        group = groups.setdefault(key, {'notification': notification, 'tokens': []})
+        group['tokens'].extend(tokens)
+
+    batches = []
+    for key, group in groups.items():
+        sample = group['notification']
+        payload = {
+            'title': sample.title,
+            'body': sample.message,
+            'data': _push_data(sample.type, sample.data, timestamp),
+            'priority': 'high' if sample.type == 'emergency' else 'normal',
+        }
+        # 같은 사용자에게 같은 알림이 여러 건이어도 토큰당 1회만 발송
+        tokens = list(dict.fromkeys(group['tokens']))
+        for i in range(0, len(tokens), config['BATCH_SIZE']):
+            batches.append((key, tokens[i:i + config['BATCH_SIZE']], payload))
+
+    # (페이로드 키, 토큰) → 오류 코드 (None 이면 성공)
+    token_errors = {}
+    if batches:
+        backend = get_fcm_backend()
+        with ThreadPoolExecutor(max_workers=max(1, min(config['WORKERS'], len(batches)))) as pool:
+            futures = [
+                (key, pool.submit(_send_batch, backend, tokens, payload, config))
+                for key, tokens, payload in batches
+            ]
+            for key, future in futures:
+                token_errors.update({(key, token): error for token, error in future.result().items()})
+
+    # 결과 반영: 토큰 하나라도 성공하면 발송 완료
+    sent_at = timezone.now()
+    for notification in notifications:
+        if notification.status == 'failed':
+            continue
+        key = group_keys[notification.pk]
+        tokens = tokens_by_user[notification.user_id]
+        delivered = [token for token in tokens if token_errors.get((key, token), 'not_sent') is None]
+        if delivered:
+            notification.status = 'sent'
+            notification.sent_at = sent_at
+            notification.fcm_response = {'success': True, 'success_count': len(delivered),
+                                         'failure_count': len(tokens) - len(delivered)}
+        else:
+            notification.status = 'failed'
+            notification.fcm_response = {'success': False, 'error': token_errors.get((key, tokens[0]), 'not_sent')}
+
+    unregistered = {token for (_, token), error in token_errors.items() if error == 'unregistered_token'}
+    with transaction.atomic():
+        Notification.objects.bulk_update(
+            notifications, ['status', 'sent_at', 'fcm_response', 'device_token'], batch_size=config['BATCH_SIZE']
+        )
+        if unregistered:
+            DeviceToken.objects.filter(device_id__in={device_by_token[t] for t in unregistered}).update(is_active=False)
+    if unregistered:
+        # queryset.update 는 시그널이 없으므로 수신 설정 캐시(토큰 보유 여부) 직접 무효화
+        invalidate_preferences(*{user_by_token[t] for t in unregistered})
+
+    success = sum(1 for n in notifications if n.status == 'sent')
+    logger.info(
+        f"알림 일괄 발송 완료 - 대상: {len(notifications)}, 성공: {success}, "
+        f"배치: {len(batches)}, 비활성화 토큰: {len(unregistered)}"
+    )
+    return {
+        'total': len(specs),
+        'success': success,
+        'failure': len(notifications) - success,
+        'skipped': skipped,
+        'notifications': ordered,
+    }
@@ -0,0 +1,144 @@
+"""
+사용자별 알림 수신 설정 캐시
+발송할 때마다 NotificationSettings 와 DeviceToken 을 사용자별로 조회하지 않도록
+사용자당 compact 레코드 (유형별 수신 비트마스크, 방해금지 시작/종료 초) 를 공유 캐시에 보관한다.
+
+- 여러 수신자 확인은 cache.get_many 1회, 캐시에 없는 사용자만 쿼리 2회로 채움
+- NotificationSettings / DeviceToken post_save·post_delete 시그널에서 invalidate_preferences() 호출
+- 판정 규칙은 NotificationSettings.is_notification_allowed 와 동일 (긴급 알림은 항상 허용)
+"""
+
+from django.core.cache import cache
+from django.utils import timezone
+
+PREFERENCE_CACHE_PREFIX = "notification_pref"
+PREFERENCE_CACHE_TIMEOUT = 3600  # 초
+
+# 알림 유형별 수신 비트 (NotificationSettings 필드명 = Notification.type)
+TYPE_BITS = {
+    'queue_update': 1 << 0,
+    'patient_call': 1 << 1,
+    'exam_ready': 1 << 2,
+    'exam_complete': 1 << 3,
+    'appointment_reminder': 1 << 4,
+    'system': 1 << 5,
+    'emergency': 1 << 6,
+}
+ALL_TYPES = sum(TYPE_BITS.values())
+# 활성 FCM 토큰 보유 여부
+HAS_PUSH_TOKEN = 1 << 15
+
+# 설정 행이 없는 사용자: 모든 유형 수신, 방해금지 없음
+DEFAULT_ENTRY = (ALL_TYPES, -1, -1)
+
+_SETTINGS_FIELDS = ['user_id', *TYPE_BITS, 'do_not_disturb_enabled', 'do_not_disturb_start', 'do_not_disturb_end']
+
+
+def _seconds(value):
+    return value.hour * 3600 + value.minute * 60 + value.second
+
+
+def build_entry(settings_values, has_push_token=False):
+    """
+    NotificationSettings 필드값 dict (없으면 None) → (비트마스크, 방해금지 시작 초, 종료 초)
+    방해금지가 꺼져 있거나 시간이 비어 있으면 시작/종료는 -1
+    """
+    if settings_values is None:
+        mask, start, end = DEFAULT_ENTRY
+    else:
+        mask = sum(bit for name, bit in TYPE_BITS.items() if settings_values[name])
+        start = end = -1
+        if (settings_values['do_not_disturb_enabled']
+                and settings_values['do_not_disturb_start'] and settings_values['do_not_disturb_end']):
+            start = _seconds(settings_values['do_not_disturb_start'])
+            end = _seconds(settings_values['do_not_disturb_end'])
+    if has_push_token:
+        mask |= HAS_PUSH_TOKEN
+    return (mask, start, end)
+
+
+def is_allowed(entry, notification_type, seconds):
+    """캐시 레코드 기준 수신 여부 (seconds: 하루 중 현재 초)"""
+    if notification_type == 'emergency':
+        return True
+
+    mask, start, end = entry
+    if start >= 0:
+        # 방해금지 시간이 자정을 넘는 경우 처리
+        if start > end:
+            if seconds >= start or seconds <= end:
+                return False
+        elif start <= seconds <= end:
+            return False
+
+    bit = TYPE_BITS.get(notification_type)
+    return bit is None or bool(mask & bit)
+
+
+def now_seconds(now=None):
+    """현재(또는 now) 시각의 TIME_ZONE 기준 하루 중 초"""
+    return _seconds(timezone.localtime(now))
+
+
+def _cache_key(user_id):
+    return f"{PREFERENCE_CACHE_PREFIX}:{user_id}"
+
+
+def get_preferences(user_ids):
+    """
+    사용자 ID 목록 → {user_id: 레코드}
+    캐시 왕복 1회, 캐시에 없는 사용자가 있으면 NotificationSettings/DeviceToken 쿼리 각 1회
+    """
+    from authentication.models import DeviceToken
+    from .models import NotificationSettings
+
+    user_ids = list(dict.fromkeys(user_ids))
+    keys = {_cache_key(user_id): user_id for user_id in user_ids}
+    cached = cache.get_many(keys)
+    entries = {keys[key]: tuple(entry) for key, entry in cached.items()}
+
+    missing = [user_id for user_id in user_ids if user_id not in entries]
+    if missing:
+        settings_by_user = {
+            row['user_id']: row
+            for row in NotificationSettings.objects.filter(user_id__in=missing).values(*_SETTINGS_FIELDS)
+        }
+        with_token = set(
+            DeviceToken.objects.filter(user_id__in=missing, is_active=True, fcm_token__isnull=False)
+            .exclude(fcm_token='').values_list('user_id', flat=True)
+        )
+        loaded = {
+            user_id: build_entry(settings_by_user.get(user_id), user_id in with_token)
+            for user_id in missing
+        }
+        cache.set_many({_cache_key(user_id): entry for user_id, entry in loaded.items()}, PREFERENCE_CACHE_TIMEOUT)
+        entries.update(loaded)
+
+    return entries
+
+
+def filter_recipients(users, notification_type, now=None, require_push_token=False):
+    """
+    알림을 받을 사용자만 남김 (입력 순서 유지)
+    Args:
+        users: User 목록
+        require_push_token: True 면 활성 FCM 토큰이 없는 사용자도 제외
+    """
+    users = list(users)
+    entries = get_preferences(user.pk for user in users)
+    seconds = now_seconds(now)
+    return [
+        user for user in users
+        if is_allowed(entries[user.pk], notification_type, seconds)
+        and (not require_push_token or entries[user.pk][0] & HAS_PUSH_TOKEN)
+    ]
+
+
+def is_notification_allowed(user, notification_type, now=None):
+    """단일 사용자 수신 여부 (캐시 사용)"""
+    entry = get_preferences([user.pk])[user.pk]
+    return is_allowed(entry, notification_type, now_seconds(now))
+
+
+def invalidate_preferences(*user_ids):
+    cache.delete_many([_cache_key(user_id) for user_id in user_ids])
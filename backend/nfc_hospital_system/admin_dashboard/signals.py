@@ -6,12 +6,22 @@ from asgiref.sync import async_to_sync
 import json
 import logging
 
+from authentication.models import DeviceToken
 from nfc.models import TagLog
+from p_queue.event_stream import publish_event
 from p_queue.models import Queue
+from .models import NotificationSettings
+from .notification_preferences import invalidate_preferences
 
 logger = logging.getLogger(__name__)
 channel_layer = get_channel_layer()
 
+@receiver([post_save, post_delete], sender=NotificationSettings)
+@receiver([post_save, post_delete], sender=DeviceToken)
+def notification_preference_changed(sender, instance, **kwargs):
+    """알림 설정/디바이스 토큰 변경 시 수신 설정 캐시 무효화"""
+    invalidate_preferences(instance.user_id)
+
 @receiver(post_save, sender=TagLog)
 def nfc_scan_notification(sender, instance, created, **kwargs):
     """NFC 태그 스캔 시 실시간 알림"""
@@ -38,8 +48,8 @@ def queue_status_notification(sender, instance, created, **kwargs):
     """대기열 상태 변경 시 실시간 알림"""
     if channel_layer:
         try:
-            # 관리자 대시보드에 알림
-            async_to_sync(channel_layer.group_send)(
+            # 관리자 대시보드에 알림 (재연결 재전송용 seq 부여)
+            publish_event(
                 "admin_dashboard",
                 {
                     "type": "dashboard_notification",
@@ -52,11 +62,12 @@ def queue_status_notification(sender, instance, created, **kwargs):
                         "priority": instance.priority,
                         "created": created
                     }
-                }
+                },
+                channel_layer
             )
             
             # 특정 대기열 그룹에도 알림 (기존 기능)
-            async_to_sync(channel_layer.group_send)(
+            publish_event(
                 f"queue_{instance.queue_id}",
                 {
                     "type": "queue_message",
@@ -67,7 +78,8 @@ def queue_status_notification(sender, instance, created, **kwargs):
                         "estimated_wait_time": instance.estimated_wait_time,
                         "exam_name": instance.exam.title if instance.exam else "Unknown"
                     }
-                }
+                },
+                channel_layer
             )
             
         except Exception as e:
@@ -77,7 +89,7 @@ def send_alert_notification(alert_type, message, severity="info", data=None):
     """수동으로 알림을 전송하는 헬퍼 함수"""
     if channel_layer:
         try:
-            async_to_sync(channel_layer.group_send)(
+            publish_event(
                 "admin_dashboard",
                 {
                     "type": "dashboard_notification",
@@ -89,7 +101,8 @@ def send_alert_notification(alert_type, message, severity="info", data=None):
                         "timestamp": timezone.now().isoformat(),
                         "additional_data": data or {}
                     }
-                }
+                },
+                channel_layer
             )
         except Exception as e:
             logger.error(f"Failed to send alert notification: {str(e)}")
\ No newline at end of file
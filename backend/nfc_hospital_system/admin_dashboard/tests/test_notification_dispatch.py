@@ -0,0 +1,86 @@
+from django.test import TestCase, override_settings
+
+from admin_dashboard.models import Notification
+from admin_dashboard.notification_dispatch import dispatch_notifications, fake_fcm_backend
+from authentication.models import DeviceToken, User
+
+
+@override_settings(NOTIFICATION_DISPATCH={'BACKEND': 'fake', 'BACKOFF': 0})
+class NotificationDispatchTestCase(TestCase):
+    """알림 일괄 발송 - bulk_create, 토큰 1회 조회, 500개 멀티캐스트, 재시도, bulk_update"""
+
+    def setUp(self):
+        fake_fcm_backend.reset()
+
+    def _create_users(self, count, token_prefix='token'):
+        users = User.objects.bulk_create([
+            User(email=f'dispatch{i}@test.com', name=f'환자{i}', role='patient',
+                 phone_number=f'010-{i // 10000:04d}-{i % 10000:04d}', birth_date='1990-01-01')
+            for i in range(count)
+        ])
+        DeviceToken.objects.bulk_create([
+            DeviceToken(user=user, token=f'refresh-{i}', device_uuid=f'device-{i}', fcm_token=f'{token_prefix}-{i}')
+            for i, user in enumerate(users)
+        ])
+        return users
+
+    def test_emergency_broadcast_to_10k_recipients(self):
+        """1만 명 긴급 알림: 500개 단위 멀티캐스트 20회, 쿼리는 수신자 단위가 아닌 배치 단위"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from admin_dashboard.utils import send_emergency_notification
+
+        users = self._create_users(10000)
+
+        with CaptureQueriesContext(connection) as ctx:
+            result = send_emergency_notification(users, '긴급 안내', '본관 1층 출입 통제')
+        # 기존 방식은 수신자당 4~5회 (5만 회). SQLite 는 변수 개수 제한으로 bulk 쿼리가 더 잘게 나뉜다
+        self.assertLess(len(ctx.captured_queries), 200)
+
+        self.assertEqual((result['total'], result['success'], result['failure']), (10000, 10000, 0))
+        self.assertEqual(len(fake_fcm_backend.calls), 20)
+        self.assertTrue(all(len(call['tokens']) <= 500 for call in fake_fcm_backend.calls))
+        self.assertEqual(len(set(fake_fcm_backend.sent_tokens)), 10000)
+        self.assertEqual(fake_fcm_backend.calls[0]['priority'], 'high')
+        self.assertEqual(fake_fcm_backend.calls[0]['data']['is_emergency'], 'True')
+        self.assertEqual(Notification.objects.filter(type='emergency', status='sent').count(), 10000)
+
+    def test_retry_and_failed_tokens(self):
+        """일시적 배치 실패는 재시도, 등록 해제 토큰은 실패 처리 후 비활성화, 토큰 없으면 no_fcm_token"""
+        users = self._create_users(3)
+        DeviceToken.objects.filter(fcm_token='token-1').update(fcm_token='unregistered-1')
+        no_token_user = User.objects.create(
+            email='notoken@test.com', name='토큰없음', role='patient',
+            phone_number='010-9999-0000', birth_date='1990-01-01'
+        )
+        fake_fcm_backend.fail_next(2)
+
+        result = dispatch_notifications([
+            {'user': user, 'type': 'system', 'title': '안내', 'message': '점검 예정'}
+            for user in [*users, no_token_user]
+        ])
+
+        self.assertEqual((result['success'], result['failure']), (2, 2))
+        self.assertEqual(len(fake_fcm_backend.calls), 3)
+        statuses = {n.user_id: n.status for n in Notification.objects.all()}
+        self.assertEqual(statuses[users[0].pk], 'sent')
+        self.assertEqual(statuses[users[1].pk], 'failed')
+        self.assertEqual(Notification.objects.get(user=no_token_user).fcm_response['error'], 'no_fcm_token')
+        self.assertFalse(DeviceToken.objects.get(fcm_token='unregistered-1').is_active)
+        self.assertIsNotNone(Notification.objects.get(user=users[0]).device_token_id)
+
+    def test_bulk_send_groups_by_payload(self):
+        """페이로드가 다른 알림은 별도 배치, 결과는 입력 순서대로"""
+        from admin_dashboard.utils import bulk_send_notifications
+
+        users = self._create_users(4)
+        result = bulk_send_notifications([
+            {'user': users[0], 'type': 'queue_update', 'title': '대기 안내', 'message': 'A'},
+            {'user': users[1], 'type': 'queue_update', 'title': '대기 안내', 'message': 'A'},
+            {'user': users[2], 'type': 'queue_update', 'title': '대기 안내', 'message': 'B'},
+            {'user': users[3], 'title': '누락'},
+        ])
+
+        self.assertEqual((result['success'], result['failure']), (3, 1))
+        self.assertEqual([r['success'] for r in result['results']], [True, True, True, False])
+        self.assertEqual(sorted(len(call['tokens']) for call in fake_fcm_backend.calls), [1, 2])
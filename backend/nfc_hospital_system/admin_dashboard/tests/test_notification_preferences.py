@@ -0,0 +1,104 @@
+from datetime import datetime, time
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from admin_dashboard.models import Notification, NotificationSettings
+from admin_dashboard.notification_dispatch import fake_fcm_backend
+from admin_dashboard.notification_preferences import filter_recipients, get_preferences
+from authentication.models import DeviceToken, User
+
+
+@override_settings(NOTIFICATION_DISPATCH={'BACKEND': 'fake', 'BACKOFF': 0})
+class NotificationPreferenceCacheTestCase(TestCase):
+    """수신 설정 비트마스크/방해금지 캐시 - 일괄 필터링, 저장 시 무효화"""
+
+    def setUp(self):
+        cache.clear()
+        fake_fcm_backend.reset()
+        self.users = User.objects.bulk_create([
+            User(email=f'pref{i}@test.com', name=f'환자{i}', role='patient',
+                 phone_number=f'010-5000-{i:04d}', birth_date='1990-01-01')
+            for i in range(30)
+        ])
+        DeviceToken.objects.bulk_create([
+            DeviceToken(user=user, token=f'refresh-{i}', device_uuid=f'device-{i}', fcm_token=f'token-{i}')
+            for i, user in enumerate(self.users)
+        ])
+        # 0: 대기열 알림 끔, 1: 22:00~07:00 방해금지, 나머지는 설정 없음(기본값)
+        NotificationSettings.objects.create(user=self.users[0], queue_update=False)
+        NotificationSettings.objects.create(
+            user=self.users[1], do_not_disturb_enabled=True,
+            do_not_disturb_start=time(22, 0), do_not_disturb_end=time(7, 0)
+        )
+        self.night = timezone.make_aware(datetime(2026, 10, 19, 23, 30))
+        self.noon = timezone.make_aware(datetime(2026, 10, 19, 12, 0))
+
+    def test_filter_uses_single_cache_round_trip_when_warm(self):
+        """캐시가 채워진 뒤 부서 전체 필터링은 쿼리 없이 get_many 1회"""
+        filter_recipients(self.users, 'queue_update', now=self.noon)
+
+        with self.assertNumQueries(0), mock.patch.object(cache, 'get_many', wraps=cache.get_many) as get_many:
+            at_noon = filter_recipients(self.users, 'queue_update', now=self.noon)
+            at_night = filter_recipients(self.users, 'queue_update', now=self.night)
+            emergency = filter_recipients(self.users, 'emergency', now=self.night)
+
+        self.assertEqual(get_many.call_count, 3)
+        self.assertEqual(at_noon, self.users[1:])
+        self.assertEqual(at_night, self.users[2:])
+        self.assertEqual(emergency, self.users)
+
+    def test_matches_model_evaluation(self):
+        """캐시 판정은 NotificationSettings.is_notification_allowed 와 동일"""
+        for settings in NotificationSettings.objects.all():
+            for notification_type in ('queue_update', 'patient_call', 'emergency'):
+                with mock.patch('django.utils.timezone.now', return_value=self.night):
+                    expected = settings.is_notification_allowed(notification_type)
+                allowed = filter_recipients([settings.user], notification_type, now=self.night)
+                self.assertEqual(bool(allowed), expected, (settings.user_id, notification_type))
+
+    def test_settings_and_token_changes_invalidate(self):
+        """설정 저장, 토큰 등록/삭제 시 해당 사용자 캐시 무효화"""
+        user = self.users[2]
+        self.assertTrue(filter_recipients([user], 'patient_call', now=self.noon, require_push_token=True))
+
+        NotificationSettings.objects.create(user=user, patient_call=False)
+        self.assertFalse(filter_recipients([user], 'patient_call', now=self.noon))
+
+        DeviceToken.objects.filter(user=user).delete()
+        self.assertFalse(get_preferences([user.pk])[user.pk][0] & (1 << 15))
+
+    def test_queue_update_broadcast_skips_opted_out(self):
+        """부서 대기열 일괄 알림은 수신 거부자의 알림을 만들지 않음"""
+        from admin_dashboard.utils import send_queue_update_notifications
+
+        with mock.patch('django.utils.timezone.now', return_value=self.noon):
+            result = send_queue_update_notifications([
+                {'user': user, 'queue_number': i + 1, 'estimated_wait': (i + 1) * 5}
+                for i, user in enumerate(self.users)
+            ])
+
+        self.assertEqual((result['total'], result['success'], result['skipped']), (30, 29, 1))
+        self.assertFalse(Notification.objects.filter(user=self.users[0]).exists())
+        self.assertEqual(len(fake_fcm_backend.sent_tokens), 29)
+
+    def test_dispatch_skips_token_query_without_push_token_bit(self):
+        """캐시에 토큰 보유 비트가 없는 수신자뿐이면 DeviceToken 조회 없이 no_fcm_token 처리"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from admin_dashboard.notification_dispatch import dispatch_notifications
+
+        users = self.users[2:5]
+        DeviceToken.objects.filter(user__in=users).delete()
+        get_preferences(user.pk for user in users)
+
+        with CaptureQueriesContext(connection) as ctx:
+            result = dispatch_notifications([
+                {'user': user, 'type': 'system', 'title': '안내', 'message': '점검'} for user in users
+            ])
+
+        self.assertFalse(any('device_token' in q['sql'].lower() and q['sql'].lstrip().upper().startswith('SELECT')
+                             for q in ctx.captured_queries))
+        self.assertEqual((result['success'], result['failure']), (0, 3))
@@ -0,0 +1,93 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from admin_dashboard.models import Notification
+from authentication.models import User
+
+
+class NotificationKeysetPaginationTestCase(TestCase):
+    """알림 목록 커서 페이지네이션 - 페이지 일관성, 페이지별 쿼리 수, ?page= 호환"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.url = '/api/v1/dashboard/notifications/'
+        self.user = User.objects.create(
+            email='patient@test.com', name='환자', role='patient',
+            phone_number='010-2222-2222', birth_date='2002-01-30'
+        )
+        self.client.force_authenticate(user=self.user)
+
+        Notification.objects.bulk_create([
+            Notification(user=self.user, type='queue_update', title=f'알림 {i}', message='테스트')
+            for i in range(25)
+        ])
+        # 같은 시각의 알림은 notification_id 로 순서가 정해져야 한다
+        base = timezone.now() - timedelta(hours=1)
+        for i, notification_id in enumerate(Notification.objects.values_list('notification_id', flat=True)):
+            Notification.objects.filter(notification_id=notification_id).update(
+                created_at=base + timedelta(minutes=i // 3)
+            )
+
+    def _get(self, url, params=None):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response.json()
+
+    def test_pages_are_consistent_in_both_directions(self):
+        """next 를 따라가면 중복/누락 없이 전체 순회, previous 는 직전 페이지와 동일"""
+        expected = [
+            str(pk) for pk in Notification.objects.order_by('-created_at', '-notification_id')
+            .values_list('notification_id', flat=True)
+        ]
+
+        pages = []
+        url, params = self.url, {'limit': 10}
+        while url:
+            _, body = self._get(url, params)
+            pages.append(body)
+            url, params = body['next'], None
+
+        self.assertEqual([len(page['results']) for page in pages], [10, 10, 5])
+        self.assertEqual([row['notification_id'] for page in pages for row in page['results']], expected)
+        self.assertIsNone(pages[0]['previous'])
+        self.assertEqual(pages[-1]['count'], 25)
+
+        _, previous = self._get(pages[2]['previous'])
+        self.assertEqual(previous['results'], pages[1]['results'])
+        _, first = self._get(previous['previous'])
+        self.assertEqual(first['results'], pages[0]['results'])
+        self.assertIsNone(first['previous'])
+
+    def test_deep_page_costs_same_as_first(self):
+        """N 페이지도 1 페이지와 쿼리 수가 같고 COUNT 는 캐시"""
+        first_queries, body = self._get(self.url, {'limit': 5})
+        page_queries = []
+        while body['next']:
+            queries, body = self._get(body['next'])
+            page_queries.append(queries)
+
+        self.assertEqual(len(page_queries), 4)
+        # 첫 요청 이후로는 COUNT 캐시 적중
+        self.assertEqual(set(page_queries), {first_queries - 1})
+
+    def test_page_number_fallback(self):
+        """?page= 를 보내는 기존 클라이언트는 페이지 번호 방식"""
+        _, body = self._get(self.url, {'page': 2, 'limit': 10})
+
+        self.assertEqual(body['count'], 25)
+        self.assertEqual(len(body['results']), 10)
+        self.assertIn('page=3', body['next'])
+        self.assertNotIn('count_is_approximate', body)
+
+    def test_invalid_cursor(self):
+        """디코딩할 수 없는 커서는 404"""
+        response = self.client.get(self.url, {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 404)
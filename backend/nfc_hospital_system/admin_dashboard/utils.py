@@ -22,6 +22,10 @@ def send_queue_update_notification(user, queue_number: int, estimated_wait: int)
         발송 성공 여부
     """
     from .models import Notification
+    from .notification_preferences import is_notification_allowed
+    
+    if not is_notification_allowed(user, 'queue_update'):
+        return False
     
     notification = Notification.objects.create(
         user=user,
@@ -51,6 +55,10 @@ def send_patient_call_notification(user, exam_name: str, location: str, room: Op
         발송 성공 여부
     """
     from .models import Notification
+    from .notification_preferences import is_notification_allowed
+    
+    if not is_notification_allowed(user, 'patient_call'):
+        return False
     
     message = f'{exam_name} 검사를 위해 {location}'
     if room:
@@ -85,6 +93,10 @@ def send_exam_ready_notification(user, exam_name: str, preparation_info: Optiona
         발송 성공 여부
     """
     from .models import Notification
+    from .notification_preferences import is_notification_allowed
+    
+    if not is_notification_allowed(user, 'exam_ready'):
+        return False
     
     message = f'{exam_name} 검사가 곧 시작됩니다.'
     if preparation_info:
@@ -117,6 +129,10 @@ def send_exam_complete_notification(user, exam_name: str, next_steps: Optional[s
         발송 성공 여부
     """
     from .models import Notification
+    from .notification_preferences import is_notification_allowed
+    
+    if not is_notification_allowed(user, 'exam_complete'):
+        return False
     
     message = f'{exam_name} 검사가 완료되었습니다.'
     if next_steps:
@@ -150,6 +166,10 @@ def send_appointment_reminder(user, appointment_date: str, appointment_time: str
         발송 성공 여부
     """
     from .models import Notification
+    from .notification_preferences import is_notification_allowed
+    
+    if not is_notification_allowed(user, 'appointment_reminder'):
+        return False
     
     notification = Notification.objects.create(
         user=user,
@@ -169,6 +189,7 @@ def send_appointment_reminder(user, appointment_date: str, appointment_time: str
 def send_emergency_notification(users: List, title: str, message: str) -> Dict[str, Any]:
     """
     긴급 알림 일괄 발송
+    같은 페이로드이므로 토큰 500개 단위 멀티캐스트로 발송 (notification_dispatch)
     
     Args:
         users: 알림 받을 사용자 리스트
@@ -178,33 +199,25 @@ def send_emergency_notification(users: List, title: str, message: str) -> Dict[s
     Returns:
         발송 결과 (성공/실패 카운트)
     """
-    from .models import Notification
+    from .notification_dispatch import dispatch_notifications
     
-    success_count = 0
-    failure_count = 0
-    failed_users = []
-    
-    for user in users:
-        notification = Notification.objects.create(
-            user=user,
-            type='emergency',
-            title=title,
-            message=message,
-            data={'is_emergency': True}
-        )
-        
-        if notification.send():
-            success_count += 1
-        else:
-            failure_count += 1
-            failed_users.append(user.name)
+    users = list(users)
+    result = dispatch_notifications([
+        {'user': user, 'type': 'emergency', 'title': title, 'message': message, 'data': {'is_emergency': True}}
+        for user in users
+    ])
     
-    logger.info(f"긴급 알림 발송 완료 - 성공: {success_count}, 실패: {failure_count}")
+    failed_users = [
+        user.name for user, notification in zip(users, result['notifications'])
+        if notification is None or notification.status != 'sent'
+    ]
+    
+    logger.info(f"긴급 알림 발송 완료 - 성공: {result['success']}, 실패: {result['failure']}")
     
     return {
         'total': len(users),
-        'success': success_count,
-        'failure': failure_count,
+        'success': result['success'],
+        'failure': result['failure'],
         'failed_users': failed_users
     }
 
@@ -212,6 +225,7 @@ def send_emergency_notification(users: List, title: str, message: str) -> Dict[s
 def bulk_send_notifications(notification_list: List[Dict[str, Any]]) -> Dict[str, Any]:
     """
     여러 알림 일괄 발송
+    bulk_create 후 같은 페이로드끼리 멀티캐스트로 발송 (notification_dispatch)
     
     Args:
         notification_list: 알림 정보 리스트
@@ -220,52 +234,88 @@ def bulk_send_notifications(notification_list: List[Dict[str, Any]]) -> Dict[str
     Returns:
         발송 결과
     """
-    from .models import Notification
-    
-    success_count = 0
-    failure_count = 0
-    results = []
-    
-    for notif_data in notification_list:
-        try:
-            notification = Notification.objects.create(
-                user=notif_data['user'],
-                type=notif_data.get('type', 'system'),
-                title=notif_data['title'],
-                message=notif_data['message'],
-                data=notif_data.get('data', {})
-            )
-            
-            success = notification.send()
-            
-            if success:
-                success_count += 1
-            else:
-                failure_count += 1
-            
-            results.append({
-                'user': notif_data['user'].name,
-                'success': success,
-                'notification_id': str(notification.notification_id)
-            })
-            
-        except Exception as e:
-            logger.error(f"알림 생성 실패: {str(e)}")
-            failure_count += 1
-            results.append({
-                'user': notif_data.get('user', {}).get('name', 'Unknown'),
+    from .notification_dispatch import dispatch_notifications
+    
+    results = [None] * len(notification_list)
+    valid = []
+    for index, notif_data in enumerate(notification_list):
+        missing = [key for key in ('user', 'title', 'message') if not notif_data.get(key)]
+        if missing:
+            logger.error(f"알림 생성 실패: 필수 항목 누락 {missing}")
+            user = notif_data.get('user')
+            results[index] = {
+                'user': getattr(user, 'name', 'Unknown'),
                 'success': False,
-                'error': str(e)
-            })
+                'error': f"missing fields: {', '.join(missing)}"
+            }
+        else:
+            valid.append((index, notif_data))
+    
+    dispatched = dispatch_notifications([notif_data for _, notif_data in valid])
+    for (index, notif_data), notification in zip(valid, dispatched['notifications']):
+        if notification is None:
+            # 수신 설정에서 꺼져 있거나 방해금지 시간
+            results[index] = {'user': notif_data['user'].name, 'success': False, 'skipped': True}
+            continue
+        results[index] = {
+            'user': notif_data['user'].name,
+            'success': notification.status == 'sent',
+            'notification_id': str(notification.notification_id)
+        }
     
+    success_count = dispatched['success']
+    skipped_count = dispatched['skipped']
     return {
         'total': len(notification_list),
         'success': success_count,
-        'failure': failure_count,
+        'failure': len(notification_list) - success_count - skipped_count,
+        'skipped': skipped_count,
         'results': results
     }
 
 
+def send_queue_update_notifications(updates: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    여러 환자에게 대기열 업데이트 알림 일괄 발송 (부서 전체 순번 갱신 등)
+    수신 설정/방해금지/토큰 보유 여부는 캐시 왕복 1회로 걸러내고, 발송은 notification_dispatch 멀티캐스트
+    (푸시를 받을 수 없는 환자에게는 알림을 만들지 않음)
+    
+    Args:
+        updates: [{'user': user_obj, 'queue_number': 3, 'estimated_wait': 15}, ...]
+    
+    Returns:
+        발송 결과 (dispatch_notifications 와 동일, notifications 제외)
+    """
+    from .notification_dispatch import dispatch_notifications
+    from .notification_preferences import filter_recipients
+    
+    recipients = {
+        user.pk for user in filter_recipients(
+            [update['user'] for update in updates], 'queue_update', require_push_token=True
+        )
+    }
+    result = dispatch_notifications([
+        {
+            'user': update['user'],
+            'type': 'queue_update',
+            'title': '대기 순서 안내',
+            'message': f"현재 대기 순번: {update['queue_number']}번\n예상 대기시간: 약 {update['estimated_wait']}분",
+            'data': {
+                'queue_number': update['queue_number'],
+                'estimated_wait': update['estimated_wait']
+            }
+        }
+        for update in updates if update['user'].pk in recipients
+    ], respect_preferences=False)
+    
+    return {
+        'total': len(updates),
+        'success': result['success'],
+        'failure': result['failure'],
+        'skipped': len(updates) - result['total'],
+    }
+
+
 def cleanup_old_notifications(days: int = 30) -> int:
     """
     오래된 읽은 알림 정리
@@ -9,7 +9,6 @@ from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.pagination import PageNumberPagination
 from django.db.models import Count, Q
 from django.utils import timezone
 from django.shortcuts import get_object_or_404
@@ -18,6 +17,7 @@ from datetime import datetime, timedelta
 import json
 
 from authentication.models import DeviceToken
+from nfc_hospital_system.pagination import KeysetPagination
 from .models import Notification, NotificationSettings
 from .serializers import (
     NotificationSerializer, 
@@ -30,11 +30,12 @@ from .serializers import (
 )
 
 
-class NotificationPagination(PageNumberPagination):
-    """알림 페이지네이션"""
+class NotificationPagination(KeysetPagination):
+    """알림 페이지네이션 - (created_at, notification_id) 커서, ?page= 는 페이지 번호 방식"""
     page_size = 20
     page_size_query_param = 'limit'
     max_page_size = 100
+    ordering = ('-created_at', '-notification_id')
 
 
 class NotificationViewSet(ModelViewSet):
@@ -63,7 +64,7 @@ class NotificationViewSet(ModelViewSet):
         elif read_status == 'unread':
             queryset = queryset.filter(status__in=['sent', 'pending'])
         
-        return queryset.order_by('-created_at')
+        return queryset.order_by('-created_at', '-notification_id')
     
     def get_serializer_class(self):
         """액션별 시리얼라이저 선택"""
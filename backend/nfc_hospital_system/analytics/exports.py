@@ -0,0 +1,493 @@
+"""
+분석 데이터 내보내기 (CSV/Excel/PDF)
+결과 전체를 리스트로 만들지 않고 DB 커서에서 청크 단위로 읽어 바로 기록한다.
+
+- CSV  : StreamingHttpResponse 로 행 단위 전송
+- Excel: openpyxl write-only 모드, 열 너비는 데이터 종류별로 미리 지정
+- PDF  : 앞 50행만 표로 출력
+- 기간이 ASYNC_DAYS 를 넘으면 ExportJob 으로 백그라운드 스레드에서 파일을 만들고
+  진행률 조회 / 완료 파일 다운로드 API 로 제공
+- 스레드는 서버 프로세스 안에서 돌기 때문에 재시작(배포)되면 사라짐 → STALE_MINUTES 동안 끝나지 않은
+  작업은 실패로 표시, RETENTION_DAYS 지난 작업과 파일은 삭제 (cleanup_exports 명령, 새 작업 시작 시)
+
+설정 예시:
+    ANALYTICS_EXPORT = {
+        'CHUNK_SIZE': 2000,
+        'ASYNC_DAYS': 31,
+        'DIR': MEDIA_ROOT / 'exports',
+        'STALE_MINUTES': 60,       # 이 시간 안에 끝나지 않은 작업은 실패 처리
+        'RETENTION_DAYS': 7,       # 내보내기 파일 보관 기간
+    }
+"""
+
+import csv
+import logging
+import os
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Avg, Count, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from nfc.models import NFCTag, TagLog
+from nfc_hospital_system.archival import history_queryset
+from p_queue.models import Queue
+
+# Excel support
+try:
+    import openpyxl
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font, Alignment, PatternFill
+    from openpyxl.utils import get_column_letter
+    EXCEL_AVAILABLE = True
+except ImportError:
+    EXCEL_AVAILABLE = False
+
+# PDF support
+try:
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    PDF_AVAILABLE = True
+except ImportError:
+    PDF_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EXPORT_SETTINGS = {
+    'CHUNK_SIZE': 2000,
+    'ASYNC_DAYS': 31,
+    'DIR': None,  # 기본: MEDIA_ROOT/exports
+    'STALE_MINUTES': 60,
+    'RETENTION_DAYS': 7,
+}
+
+# 데이터 종류별 (헤더, Excel 열 너비) - 값 형식이 고정이라 전체 셀을 다시 훑지 않고 미리 지정
+EXPORT_COLUMNS = {
+    'queue': [
+        ('Queue ID', 38), ('Queue Number', 14), ('Patient', 20), ('Exam', 30),
+        ('State', 14), ('Priority', 12), ('Wait Time', 11), ('Joined At', 21),
+    ],
+    'nfc': [
+        ('Tag ID', 38), ('Code', 20), ('Location', 30), ('Active', 8),
+        ('Total Scans', 13), ('Last Scan', 21),
+    ],
+    'analytics': [
+        ('Date', 12), ('Total Patients', 16), ('Avg Wait Time', 15),
+        ('Completion Rate', 17), ('Total Scans', 13),
+    ],
+}
+
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'excel': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'pdf': 'application/pdf',
+}
+FILE_EXTENSIONS = {'csv': 'csv', 'excel': 'xlsx', 'pdf': 'pdf'}
+
+PDF_MAX_ROWS = 50
+DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def get_export_settings():
+    conf = {**DEFAULT_EXPORT_SETTINGS, **getattr(settings, 'ANALYTICS_EXPORT', {})}
+    if not conf['DIR']:
+        conf['DIR'] = os.path.join(settings.MEDIA_ROOT, 'exports')
+    return conf
+
+
+def is_supported(export_type):
+    """형식별 선택 의존성 확인"""
+    if export_type == 'csv':
+        return True
+    if export_type == 'excel':
+        return EXCEL_AVAILABLE
+    if export_type == 'pdf':
+        return PDF_AVAILABLE
+    return False
+
+
+def export_filename(data_type, export_type):
+    return f"{data_type}_export_{timezone.now().strftime('%Y%m%d')}.{FILE_EXTENSIONS[export_type]}"
+
+
+# ----------------------------------------------------------------------
+# 행 생성 (청크 단위 커서)
+# ----------------------------------------------------------------------
+def export_rows(data_type, start_date, end_date, chunk_size=None):
+    """
+    내보낼 행 이터레이터
+    Returns: (headers, rows) - rows 는 DB 커서에서 chunk_size 씩 읽는 제너레이터
+    """
+    if data_type not in EXPORT_COLUMNS:
+        raise ValueError(f"지원하지 않는 데이터 종류입니다: {data_type}")
+    chunk_size = chunk_size or get_export_settings()['CHUNK_SIZE']
+    headers = [header for header, _ in EXPORT_COLUMNS[data_type]]
+    builder = {
+        'queue': _queue_rows,
+        'nfc': _nfc_rows,
+        'analytics': _analytics_rows,
+    }[data_type]
+    return headers, builder(start_date, end_date, chunk_size)
+
+
+def count_export_rows(data_type, start_date, end_date):
+    """진행률 표시용 전체 행 수 (COUNT 1회)"""
+    if data_type == 'queue':
+        return Queue.objects.filter(created_at__range=[start_date, end_date]).count()
+    if data_type == 'nfc':
+        return NFCTag.objects.count()
+    return (end_date - start_date).days + 1
+
+
+def _queue_rows(start_date, end_date, chunk_size):
+    queues = Queue.objects.filter(
+        created_at__range=[start_date, end_date]
+    ).order_by('created_at').values_list(
+        'queue_id', 'queue_number', 'user__name', 'exam__title',
+        'state', 'priority', 'estimated_wait_time', 'created_at'
+    )
+    for queue_id, number, patient, exam, state, priority, wait, created_at in queues.iterator(chunk_size=chunk_size):
+        yield [
+            str(queue_id),
+            number,
+            patient or 'N/A',
+            exam or 'N/A',
+            state,
+            priority,
+            wait or 0,
+            created_at.strftime(DATETIME_FORMAT)
+        ]
+
+
+def _nfc_rows(start_date, end_date, chunk_size):
+    # 태그별 스캔 수를 조건부 집계로 한 번에 조회
+    tags = NFCTag.objects.annotate(
+        scan_count=Count(
+            'scan_logs',
+            filter=Q(scan_logs__timestamp__range=[start_date, end_date])
+        )
+    ).values_list('tag_id', 'code', 'building', 'floor', 'room', 'is_active', 'scan_count', 'last_scanned_at')
+    for tag_id, code, building, floor, room, is_active, scan_count, last_scanned_at in tags.iterator(chunk_size=chunk_size):
+        yield [
+            str(tag_id),
+            code,
+            f"{building} {floor}층 {room}",
+            'Yes' if is_active else 'No',
+            scan_count,
+            last_scanned_at.strftime(DATETIME_FORMAT) if last_scanned_at else 'Never'
+        ]
+
+
+def _analytics_rows(start_date, end_date, chunk_size):
+    """일별 통계 - 기간 전체를 날짜별 GROUP BY 2회로 조회"""
+    days = [(start_date + timedelta(days=offset)).date() for offset in range((end_date - start_date).days + 1)]
+    if not days:
+        return
+
+    queue_stats = {
+        row['day']: row
+        for row in Queue.objects.filter(
+            created_at__date__range=[days[0], days[-1]]
+        ).annotate(day=TruncDate('created_at')).order_by().values('day').annotate(
+            total=Count('queue_id'),
+            avg_wait=Avg('estimated_wait_time'),
+            completed=Count('queue_id', filter=Q(state='completed'))
+        )
+    }
+    scan_counts = dict(
+        history_queryset(TagLog, start_date).filter(
+            timestamp__date__range=[days[0], days[-1]]
+        ).annotate(day=TruncDate('timestamp')).order_by().values('day').annotate(
+            scans=Count('log_id')
+        ).values_list('day', 'scans')
+    )
+
+    for day in days:
+        stats = queue_stats.get(day, {'total': 0, 'avg_wait': None, 'completed': 0})
+        completion_rate = (stats['completed'] / stats['total'] * 100) if stats['total'] > 0 else 0
+        yield [
+            day.strftime('%Y-%m-%d'),
+            stats['total'],
+            round(stats['avg_wait'] or 0, 2),
+            round(completion_rate, 2),
+            scan_counts.get(day, 0)
+        ]
+
+
+# ----------------------------------------------------------------------
+# 형식별 기록
+# ----------------------------------------------------------------------
+class _Echo:
+    """csv.writer 가 쓴 한 줄을 그대로 반환하는 의사 버퍼"""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(headers, rows):
+    """CSV 행 단위 제너레이터 (StreamingHttpResponse 용)"""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(headers)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def write_csv(headers, rows, fileobj):
+    writer = csv.writer(fileobj)
+    writer.writerow(headers)
+    writer.writerows(rows)
+
+
+def write_excel(headers, rows, data_type, target):
+    """write-only 워크북으로 기록 (행을 메모리에 쌓지 않음), target 은 경로 또는 파일 객체"""
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet(title=f"{data_type.upper()} Export")
+
+    # write-only 시트는 행을 쓰기 전에 열 너비를 지정해야 함
+    for col, (_, width) in enumerate(EXPORT_COLUMNS[data_type], 1):
+        ws.column_dimensions[get_column_letter(col)].width = width
+
+    # 헤더 스타일 설정
+    header_font = Font(bold=True, color="FFFFFF")
+    header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+    header_alignment = Alignment(horizontal="center", vertical="center")
+
+    header_cells = []
+    for header in headers:
+        cell = WriteOnlyCell(ws, value=header)
+        cell.font = header_font
+        cell.fill = header_fill
+        cell.alignment = header_alignment
+        header_cells.append(cell)
+    ws.append(header_cells)
+
+    for row in rows:
+        ws.append(row)
+
+    wb.save(target)
+
+
+def write_pdf(headers, rows, data_type, start_date, end_date, target):
+    """PDF 기록 - 앞 PDF_MAX_ROWS 행만 표로, 나머지는 행 수만 센다"""
+    doc = SimpleDocTemplate(target, pagesize=A4)
+    elements = []
+    styles = getSampleStyleSheet()
+
+    table_rows = []
+    total_rows = 0
+    for row in rows:
+        if total_rows < PDF_MAX_ROWS:
+            table_rows.append(row)
+        total_rows += 1
+
+    # 제목 스타일
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=16,
+        spaceAfter=30,
+        alignment=1  # 중앙 정렬
+    )
+
+    # 제목 추가
+    elements.append(Paragraph(f"{data_type.upper()} Export Report", title_style))
+
+    # 기간 정보
+    period_text = f"Period: {start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}"
+    elements.append(Paragraph(period_text, styles['Normal']))
+    elements.append(Spacer(1, 20))
+
+    # 요약 통계 (analytics인 경우)
+    if data_type == 'analytics' and total_rows:
+        summary_data = [
+            ['Metric', 'Value'],
+            ['Total Records', str(total_rows)],
+            ['Date Range', f"{(end_date - start_date).days + 1} days"],
+            ['Generated At', timezone.now().strftime(DATETIME_FORMAT)]
+        ]
+
+        summary_table = Table(summary_data)
+        summary_table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 12),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black)
+        ]))
+
+        elements.append(summary_table)
+        elements.append(Spacer(1, 30))
+
+    # 메인 데이터 테이블
+    table = Table([headers] + table_rows)
+
+    # 테이블 스타일 적용
+    table.setStyle(TableStyle([
+        # 헤더 스타일
+        ('BACKGROUND', (0, 0), (-1, 0), colors.darkblue),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 10),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+
+        # 데이터 행 스타일
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 1), (-1, -1), 8),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+
+        # 교대로 배경색 적용
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.beige, colors.white])
+    ]))
+
+    elements.append(table)
+
+    # 50행 초과 시 안내문
+    if total_rows > PDF_MAX_ROWS:
+        elements.append(Spacer(1, 20))
+        elements.append(Paragraph(
+            f"Note: Only first {PDF_MAX_ROWS} records shown. Total records: {total_rows}",
+            styles['Normal']
+        ))
+
+    doc.build(elements)
+
+
+# ----------------------------------------------------------------------
+# 비동기 내보내기 작업
+# ----------------------------------------------------------------------
+def _counting(rows, job_id, every):
+    """every 행마다 ExportJob.rows_written 갱신"""
+    from .models import ExportJob
+
+    written = 0
+    for row in rows:
+        yield row
+        written += 1
+        if written % every == 0:
+            ExportJob.objects.filter(pk=job_id).update(rows_written=written)
+    ExportJob.objects.filter(pk=job_id).update(rows_written=written)
+
+
+def run_export_job(job_id):
+    """작업 1건 실행 - 파일을 DIR 에 쓰고 상태/진행률 기록"""
+    from .models import ExportJob
+
+    job = ExportJob.objects.get(pk=job_id)
+    conf = get_export_settings()
+    os.makedirs(conf['DIR'], exist_ok=True)
+    path = os.path.join(conf['DIR'], f"{job.job_id}.{FILE_EXTENSIONS[job.export_type]}")
+
+    ExportJob.objects.filter(pk=job_id).update(
+        status='running',
+        started_at=timezone.now(),
+        total_rows=count_export_rows(job.data_type, job.start_date, job.end_date),
+    )
+
+    try:
+        headers, rows = export_rows(job.data_type, job.start_date, job.end_date, conf['CHUNK_SIZE'])
+        rows = _counting(rows, job_id, conf['CHUNK_SIZE'])
+        if job.export_type == 'csv':
+            with open(path, 'w', newline='', encoding='utf-8') as f:
+                write_csv(headers, rows, f)
+        elif job.export_type == 'excel':
+            write_excel(headers, rows, job.data_type, path)
+        else:
+            write_pdf(headers, rows, job.data_type, job.start_date, job.end_date, path)
+    except Exception as e:
+        logger.error(f"Export job {job_id} failed: {str(e)}", exc_info=True)
+        if os.path.exists(path):
+            os.remove(path)
+        ExportJob.objects.filter(pk=job_id).update(status='failed', error=str(e)[:500], finished_at=timezone.now())
+        return
+
+    ExportJob.objects.filter(pk=job_id).update(
+        status='completed',
+        file_path=path,
+        file_name=export_filename(job.data_type, job.export_type),
+        finished_at=timezone.now(),
+    )
+
+
+def _job_thread(job_id):
+    from django.db import close_old_connections
+
+    close_old_connections()
+    try:
+        run_export_job(job_id)
+    finally:
+        close_old_connections()
+
+
+def fail_stale_jobs(job_ids=None):
+    """
+    STALE_MINUTES 가 지나도 끝나지 않은 작업을 실패로 표시
+    (서버 재시작으로 스레드가 사라지면 running/pending 에서 영원히 멈춰 있음)
+    Returns: 실패 처리한 작업 수
+    """
+    from .models import ExportJob
+
+    cutoff = timezone.now() - timedelta(minutes=get_export_settings()['STALE_MINUTES'])
+    jobs = ExportJob.objects.filter(
+        Q(status='running', started_at__lt=cutoff) | Q(status='pending', created_at__lt=cutoff)
+    )
+    if job_ids is not None:
+        jobs = jobs.filter(pk__in=job_ids)
+    return jobs.update(
+        status='failed',
+        error='서버가 재시작되어 내보내기 작업이 중단되었습니다. 다시 요청해주세요.',
+        finished_at=timezone.now(),
+    )
+
+
+def cleanup_export_files():
+    """
+    RETENTION_DAYS 가 지난 작업 행과 파일 삭제, 작업 행이 없는 오래된 파일도 삭제
+    Returns: (삭제한 작업 수, 삭제한 파일 수)
+    """
+    from .models import ExportJob
+
+    conf = get_export_settings()
+    cutoff = timezone.now() - timedelta(days=conf['RETENTION_DAYS'])
+    expired = ExportJob.objects.filter(created_at__lt=cutoff).exclude(status__in=['pending', 'running'])
+
+    removed_files = 0
+    for path in expired.exclude(file_path='').values_list('file_path', flat=True):
+        if os.path.exists(path):
+            os.remove(path)
+            removed_files += 1
+    removed_jobs, _ = expired.delete()
+
+    if os.path.isdir(conf['DIR']):
+        live = {os.path.basename(path) for path in ExportJob.objects.exclude(file_path='').values_list('file_path', flat=True)}
+        for entry in os.scandir(conf['DIR']):
+            if entry.is_file() and entry.name not in live and entry.stat().st_mtime < cutoff.timestamp():
+                os.remove(entry.path)
+                removed_files += 1
+    return removed_jobs, removed_files
+
+
+def start_export_job(job):
+    """작업을 데몬 스레드에서 실행 (요청은 즉시 202 응답), 멈춘 작업/보관 기간 지난 파일도 정리"""
+    try:
+        fail_stale_jobs()
+        cleanup_export_files()
+    except Exception as e:
+        logger.warning(f"Export cleanup failed: {str(e)}")
+
+    thread = threading.Thread(
+        target=_job_thread,
+        args=(job.job_id,),
+        name=f'analytics-export-{job.job_id}',
+        daemon=True
+    )
+    thread.start()
+    return thread
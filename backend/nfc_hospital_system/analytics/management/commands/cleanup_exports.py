@@ -0,0 +1,24 @@
+# analytics/management/commands/cleanup_exports.py
+"""
+분석 데이터 내보내기 정리
+서버 재시작으로 멈춘 작업을 실패로 표시하고, 보관 기간이 지난 작업과 파일을 삭제합니다.
+(analytics/exports.py, 설정: ANALYTICS_EXPORT STALE_MINUTES / RETENTION_DAYS)
+
+사용법:
+    python manage.py cleanup_exports
+"""
+
+from django.core.management.base import BaseCommand
+
+from analytics.exports import cleanup_export_files, fail_stale_jobs
+
+
+class Command(BaseCommand):
+    help = '멈춘 내보내기 작업을 실패 처리하고 보관 기간이 지난 파일을 삭제합니다.'
+
+    def handle(self, *args, **options):
+        failed = fail_stale_jobs()
+        removed_jobs, removed_files = cleanup_export_files()
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ 멈춘 작업 {failed}건 실패 처리, 만료 작업 {removed_jobs}건 / 파일 {removed_files}개 삭제'
+        ))
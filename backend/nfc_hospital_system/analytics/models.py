@@ -1,3 +1,62 @@
+import uuid
+
+from django.conf import settings
 from django.db import models
 
-# Create your models here.
+
+class ExportJob(models.Model):
+    """
+    대용량 분석 데이터 내보내기 작업
+    기간이 긴 내보내기는 요청 안에서 만들지 않고 백그라운드에서 파일로 기록한 뒤 ID 로 내려받는다.
+    """
+
+    STATUS_CHOICES = [
+        ('pending', '대기'),
+        ('running', '진행 중'),
+        ('completed', '완료'),
+        ('failed', '실패'),
+    ]
+
+    job_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='export_jobs'
+    )
+
+    export_type = models.CharField(max_length=10)   # csv, excel, pdf
+    data_type = models.CharField(max_length=20)     # queue, nfc, analytics
+    start_date = models.DateTimeField()
+    end_date = models.DateTimeField()
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    total_rows = models.IntegerField(default=0)     # 시작 시 COUNT (진행률 분모)
+    rows_written = models.IntegerField(default=0)
+    file_path = models.CharField(max_length=500, blank=True)
+    file_name = models.CharField(max_length=200, blank=True)
+    error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'analytics_export_jobs'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.data_type}.{self.export_type} ({self.get_status_display()})"
+
+    @property
+    def progress(self):
+        """진행률 (0~100)"""
+        if self.status == 'completed':
+            return 100
+        if not self.total_rows:
+            return 0
+        return min(99, round(self.rows_written / self.total_rows * 100))
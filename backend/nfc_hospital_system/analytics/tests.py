@@ -1,3 +1,262 @@
+from datetime import timedelta
+
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from authentication.models import User
+from nfc.models import NFCTag, TagLog
+
+
+class PatientFlowAnalysisTestCase(TestCase):
+    """환자 동선 분석 - 체류 시간/이동 전이 집계와 쿼리 수"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.url = '/api/v1/analytics/patient-flow/'
+        self.admin_user = User.objects.create(
+            email='admin@test.com', name='관리자', role='dept',
+            phone_number='010-1234-5678', birth_date='1990-01-01'
+        )
+        self.client.force_authenticate(user=self.admin_user)
+
+        self.tags = [
+            NFCTag.objects.create(
+                tag_uid=f'flow-uid-{i}', code=f'FLOW-{i}',
+                building='본관', floor=1, room=f'{100 + i}호', description='테스트'
+            )
+            for i in range(3)
+        ]
+        self.base_time = timezone.now() - timedelta(hours=5)
+        self.patient_count = 0
+
+    def _create_patient(self, route):
+        """route: [(태그 인덱스, 기준 시각 이후 분)]"""
+        self.patient_count += 1
+        patient = User.objects.create(
+            email=f'flow{self.patient_count}@test.com', name=f'환자{self.patient_count}', role='patient',
+            phone_number=f'010-3000-{self.patient_count:04d}', birth_date='1990-01-01'
+        )
+        TagLog.objects.bulk_create([
+            TagLog(tag=self.tags[index], user=patient, timestamp=self.base_time + timedelta(minutes=minutes))
+            for index, minutes in route
+        ])
+
+    def _get(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response.json()['data']
+
+    def test_dwell_times_and_transitions(self):
+        """연속 스캔 사이 시간이 체류 시간, (출발, 도착) 쌍이 희소 전이 행렬"""
+        self._create_patient([(0, 0), (1, 10), (2, 40)])
+        self._create_patient([(0, 0), (1, 20)])
+        self._create_patient([(2, 0)])
+
+        _, data = self._get()
+
+        self.assertEqual(data['summary']['totalScans'], 6)
+        self.assertEqual(data['summary']['uniquePatients'], 3)
+        self.assertEqual(data['locationDurations']['본관 1층 100호'], {
+            'avgDuration': 15.0, 'maxDuration': 20.0, 'minDuration': 10.0, 'sampleCount': 2,
+        })
+        self.assertEqual(data['locationDurations']['본관 1층 101호']['avgDuration'], 30.0)
+        self.assertNotIn('본관 1층 102호', data['locationDurations'])
+        self.assertEqual(data['transitions'], [
+            {'from': '본관 1층 100호', 'to': '본관 1층 101호', 'count': 2, 'avgMinutes': 15.0},
+            {'from': '본관 1층 101호', 'to': '본관 1층 102호', 'count': 1, 'avgMinutes': 30.0},
+        ])
+        self.assertEqual(
+            sorted(pattern['totalStops'] for pattern in data['flowPatterns']), [2, 3]
+        )
+        self.assertEqual(data['flowPatterns'][0]['path'][0]['tagCode'], 'FLOW-0')
+
+    def test_query_count_independent_of_patient_count(self):
+        """환자 수가 늘어나도 쿼리 수는 일정"""
+        self._create_patient([(0, 0), (1, 10)])
+        few_queries, _ = self._get()
+
+        for offset in range(30):
+            self._create_patient([(0, offset), (1, offset + 5), (2, offset + 15)])
+        many_queries, data = self._get()
+
+        self.assertEqual(few_queries, many_queries)
+        self.assertEqual(data['summary']['uniquePatients'], 31)
+
+
+class AnalyticsExportTestCase(TestCase):
+    """분석 데이터 내보내기 - 스트리밍 CSV, write-only Excel, 비동기 작업"""
+
+    def setUp(self):
+        from appointments.models import Appointment, Exam
+        from p_queue.models import Queue
+
+        self.client = APIClient()
+        self.url = '/api/v1/analytics/export/'
+        self.admin_user = User.objects.create(
+            email='admin@test.com', name='관리자', role='dept',
+            phone_number='010-1234-5678', birth_date='1990-01-01'
+        )
+        self.patient = User.objects.create(
+            email='patient@test.com', name='환자', role='patient',
+            phone_number='010-2222-2222', birth_date='2002-01-30'
+        )
+        self.client.force_authenticate(user=self.admin_user)
+
+        exam = Exam.objects.create(exam_id='EXP001', title='혈액검사', description='테스트', department='진단검사의학과')
+        now = timezone.now()
+        appointment = Appointment.objects.create(
+            appointment_id='AP-EXP', exam=exam, user=self.patient, scheduled_at=now
+        )
+        Queue.objects.bulk_create([
+            Queue(user=self.patient, exam=exam, appointment=appointment, queue_number=i + 1, state='completed' if i % 2 else 'waiting',
+                  estimated_wait_time=10, created_at=now - timedelta(days=i))
+            for i in range(5)
+        ])
+        self.range_params = {
+            'startDate': (now - timedelta(days=10)).isoformat(),
+            'endDate': (now + timedelta(minutes=1)).isoformat(),
+        }
+
+    def test_csv_is_streamed(self):
+        """CSV 는 StreamingHttpResponse 로 헤더 + 행 단위 전송"""
+        response = self.client.get(self.url, {'type': 'csv', 'dataType': 'queue', **self.range_params})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().strip().splitlines()
+        self.assertEqual(lines[0].split(',')[:3], ['Queue ID', 'Queue Number', 'Patient'])
+        self.assertEqual(len(lines), 6)
+        self.assertIn('환자', lines[1])
+
+    def test_excel_uses_preset_column_widths(self):
+        """Excel 은 write-only 로 작성하고 열 너비는 미리 지정된 값"""
+        import io
+        import openpyxl
+        from analytics.exports import EXPORT_COLUMNS
+
+        response = self.client.get(self.url, {'type': 'excel', 'dataType': 'queue', **self.range_params})
+
+        self.assertEqual(response.status_code, 200)
+        ws = openpyxl.load_workbook(io.BytesIO(b''.join(response.streaming_content))).active
+        self.assertEqual(ws.max_row, 6)
+        self.assertEqual(ws['A1'].value, 'Queue ID')
+        self.assertTrue(ws['A1'].font.bold)
+        self.assertEqual(ws.column_dimensions['A'].width, EXPORT_COLUMNS['queue'][0][1])
+
+    def test_analytics_rows_use_two_grouped_queries(self):
+        """일별 통계는 기간 길이와 관계없이 GROUP BY 2회"""
+        from analytics.exports import export_rows
+        from nfc_hospital_system.archival import archive_watermark
+
+        # 아카이브 최신 시각은 archive_logs 가 갱신해 두는 캐시 값 (캐시가 비어 있을 때만 MAX 쿼리 1회)
+        archive_watermark('nfc.TagLog')
+        end = timezone.now()
+        with self.assertNumQueries(2):
+            _, rows = export_rows('analytics', end - timedelta(days=90), end)
+            rows = list(rows)
+
+        self.assertEqual(len(rows), 91)
+        self.assertEqual(sum(row[1] for row in rows), 5)
+
+    def test_large_range_runs_as_job(self):
+        """기간이 ASYNC_DAYS 초과면 202 + 작업 ID, 완료 후 상태/다운로드 제공"""
+        import shutil
+        import tempfile
+        from unittest import mock
+        from django.test import override_settings
+        from analytics.exports import run_export_job
+
+        export_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, export_dir)
+        params = {
+            'type': 'csv', 'dataType': 'queue',
+            'startDate': (timezone.now() - timedelta(days=120)).isoformat(),
+            'endDate': (timezone.now() + timedelta(minutes=1)).isoformat(),
+        }
+
+        # 테스트 트랜잭션 안에서 실행되도록 스레드 대신 즉시 실행
+        with override_settings(ANALYTICS_EXPORT={'ASYNC_DAYS': 31, 'DIR': export_dir}), \
+                mock.patch('analytics.views.start_export_job', side_effect=lambda job: run_export_job(job.job_id)):
+            response = self.client.get(self.url, params)
+
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json()['data']['jobId']
+
+        status_data = self.client.get(f'/api/v1/analytics/export/jobs/{job_id}/').json()['data']
+        self.assertEqual(status_data['status'], 'completed')
+        self.assertEqual(status_data['progress'], 100)
+        self.assertEqual((status_data['rowsWritten'], status_data['totalRows']), (5, 5))
+
+        download = self.client.get(status_data['downloadUrl'])
+        self.assertEqual(download.status_code, 200)
+        self.assertEqual(len(b''.join(download.streaming_content).decode().strip().splitlines()), 6)
+
+        # 다른 사용자는 조회 불가
+        self.client.force_authenticate(user=self.patient)
+        self.assertEqual(self.client.get(f'/api/v1/analytics/export/jobs/{job_id}/').status_code, 404)
+
+    def test_export_jobs_require_owner(self):
+        """익명 요청, 만든 사용자가 삭제된 작업, 데모 모드 모두 본인 작업이 아니면 조회 불가"""
+        from django.core.cache import cache
+        from analytics.models import ExportJob
+
+        orphan = ExportJob.objects.create(
+            user=None, export_type='csv', data_type='queue', status='completed',
+            start_date=timezone.now() - timedelta(days=60), end_date=timezone.now(),
+        )
+        status_url = f'/api/v1/analytics/export/jobs/{orphan.job_id}/'
+
+        anonymous = APIClient()
+        self.assertIn(anonymous.get(status_url).status_code, (401, 403))
+        self.assertIn(anonymous.get(f'{status_url}download/').status_code, (401, 403))
+
+        cache.set('demo_mode_active', True)
+        self.addCleanup(cache.delete, 'demo_mode_active')
+        self.assertEqual(self.client.get(status_url).status_code, 404)
+        self.assertEqual(self.client.get(f'{status_url}download/').status_code, 404)
+
+    def test_stale_jobs_fail_and_old_exports_are_removed(self):
+        """재시작으로 멈춘 작업은 실패로 보이고, 보관 기간이 지난 작업/파일은 정리"""
+        import os
+        import shutil
+        import tempfile
+        from io import StringIO
+        from django.core.management import call_command
+        from django.test import override_settings
+        from analytics.models import ExportJob
+
+        export_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, export_dir)
+        now = timezone.now()
+        stuck = ExportJob.objects.create(
+            user=self.admin_user, export_type='csv', data_type='queue', status='running',
+            start_date=now - timedelta(days=60), end_date=now, started_at=now - timedelta(hours=2),
+        )
+        fresh = ExportJob.objects.create(
+            user=self.admin_user, export_type='csv', data_type='queue', status='running',
+            start_date=now - timedelta(days=60), end_date=now, started_at=now,
+        )
+        old_path = os.path.join(export_dir, 'old.csv')
+        with open(old_path, 'w') as f:
+            f.write('x')
+        old = ExportJob.objects.create(
+            user=self.admin_user, export_type='csv', data_type='queue', status='completed',
+            start_date=now - timedelta(days=60), end_date=now, file_path=old_path,
+        )
+        ExportJob.objects.filter(pk=old.pk).update(created_at=now - timedelta(days=30))
+
+        with override_settings(ANALYTICS_EXPORT={'DIR': export_dir, 'STALE_MINUTES': 60, 'RETENTION_DAYS': 7}):
+            status_data = self.client.get(f'/api/v1/analytics/export/jobs/{stuck.job_id}/').json()['data']
+            self.assertEqual(status_data['status'], 'failed')
+            self.assertTrue(status_data['error'])
+
+            call_command('cleanup_exports', stdout=StringIO())
 
-# Create your tests here.
+        fresh.refresh_from_db()
+        self.assertEqual(fresh.status, 'running')
+        self.assertFalse(ExportJob.objects.filter(pk=old.pk).exists())
+        self.assertFalse(os.path.exists(old_path))
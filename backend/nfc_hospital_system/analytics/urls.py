@@ -12,6 +12,8 @@ urlpatterns = [
     path('bottlenecks/', views.identify_bottlenecks, name='bottlenecks'),
     path('custom-report/', views.custom_report, name='custom-report'),
     path('export/', views.export_data, name='export'),
+    path('export/jobs/<uuid:job_id>/', views.export_job_status, name='export-job-status'),
+    path('export/jobs/<uuid:job_id>/download/', views.export_job_download, name='export-job-download'),
     path('predictions/', views.predictions, name='predictions'),  # LSTM 예측 API
     path('predictions/timeline/', views.predictions_timeline, name='predictions-timeline'),  # 시계열 예측
     path('predictions/domino/', views.predictions_domino, name='predictions-domino'),  # 도미노 효과
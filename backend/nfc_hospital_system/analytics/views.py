@@ -10,39 +10,28 @@ from django.db.models.functions import TruncHour, TruncDate, ExtractHour, Extrac
 from django.utils import timezone
 from datetime import datetime, timedelta
 from django.core.cache import cache
-import json
-import csv
 import io
-from django.http import HttpResponse
+import json
+import os
+from collections import defaultdict
+from itertools import groupby
+from operator import itemgetter
+from django.http import FileResponse, StreamingHttpResponse
 from django.template.loader import get_template
 import logging
 
-# Excel support
-try:
-    import openpyxl
-    from openpyxl.styles import Font, Alignment, PatternFill
-    from openpyxl.utils.dataframe import dataframe_to_rows
-    EXCEL_AVAILABLE = True
-except ImportError:
-    EXCEL_AVAILABLE = False
-
-# PDF support
-try:
-    from reportlab.lib import colors
-    from reportlab.lib.pagesizes import letter, A4
-    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-    from reportlab.lib.units import inch
-    PDF_AVAILABLE = True
-except ImportError:
-    PDF_AVAILABLE = False
-
+from nfc_hospital_system.archival import history_queryset
 from nfc_hospital_system.utils import APIResponse
 from authentication.models import User # 이 User는 커스텀 User 모델입니다.
 from nfc.models import NFCTag, TagLog
 from p_queue.models import Queue, QueueStatusLog
 from appointments.models import Appointment, Exam
 from admin_dashboard.models import AdminLog
+from .exports import (
+    CONTENT_TYPES, EXPORT_COLUMNS, export_filename, export_rows, fail_stale_jobs, get_export_settings,
+    is_supported, start_export_job, stream_csv, write_excel, write_pdf,
+)
+from .models import ExportJob
 
 logger = logging.getLogger(__name__)
 
@@ -68,6 +57,98 @@ def _check_analytics_permission(request):
 
     return True, None  # 임시로 모든 인증된 사용자 허용
 
+# 환자 동선 분석에서 경로를 반환할 최대 환자 수
+FLOW_PATTERN_LIMIT = 20
+
+
+def _build_patient_flow(tag_logs):
+    """
+    사용자별 시간순으로 정렬한 스캔을 1회 조회해 체류 시간, 위치 간 이동, 이동 경로 계산
+    연속한 두 스캔 = 현재 위치 → 다음 위치 이동이며 그 사이 시간을 현재 위치의 체류 시간으로 본다.
+    태그 위치 정보는 등장한 태그만 1회 추가 조회 (환자 수와 무관하게 쿼리 2회)
+    """
+    rows = tag_logs.order_by('user_id', 'timestamp', 'log_id').values_list(
+        'user_id', 'tag_id', 'timestamp'
+    ).iterator(chunk_size=2000)
+
+    dwell = defaultdict(list)        # tag_id → [체류 시간(분)]
+    transitions = defaultdict(list)  # (출발 tag_id, 도착 tag_id) → [이동 시간(분)]
+    paths = []
+    total_scans = unique_patients = 0
+
+    for user_id, group in groupby(rows, key=itemgetter(0)):
+        scans = [(tag_id, timestamp) for _, tag_id, timestamp in group]
+        unique_patients += 1
+        total_scans += len(scans)
+
+        for (tag_id, timestamp), (next_tag_id, next_timestamp) in zip(scans, scans[1:]):
+            minutes = (next_timestamp - timestamp).total_seconds() / 60
+            dwell[tag_id].append(minutes)
+            transitions[(tag_id, next_tag_id)].append(minutes)
+
+        if len(scans) >= 2 and len(paths) < FLOW_PATTERN_LIMIT:
+            paths.append((user_id, scans))
+
+    tag_ids = {tag_id for _, scans in paths for tag_id, _ in scans}
+    tag_ids.update(tag_id for pair in transitions for tag_id in pair)
+    tags = {
+        tag_id: (f"{building} {floor}층 {room}", code)
+        for tag_id, building, floor, room, code in NFCTag.objects.filter(
+            tag_id__in=tag_ids
+        ).values_list('tag_id', 'building', 'floor', 'room', 'code')
+    }
+
+    # 같은 위치에 태그가 여러 개일 수 있으므로 위치 단위로 합산
+    location_durations = defaultdict(list)
+    for tag_id, durations in dwell.items():
+        location_durations[tags[tag_id][0]].extend(durations)
+
+    location_transitions = defaultdict(list)
+    for (tag_id, next_tag_id), durations in transitions.items():
+        location_transitions[(tags[tag_id][0], tags[next_tag_id][0])].extend(durations)
+
+    return {
+        'totalScans': total_scans,
+        'uniquePatients': unique_patients,
+        'locationDurations': {
+            location: {
+                'avgDuration': round(sum(durations) / len(durations), 2),
+                'maxDuration': round(max(durations), 2),
+                'minDuration': round(min(durations), 2),
+                'sampleCount': len(durations),
+            }
+            for location, durations in location_durations.items()
+        },
+        # 희소 전이 행렬: 0 이 아닌 (출발, 도착) 칸만 이동 횟수 내림차순
+        'transitions': sorted(
+            (
+                {
+                    'from': origin,
+                    'to': destination,
+                    'count': len(durations),
+                    'avgMinutes': round(sum(durations) / len(durations), 2),
+                }
+                for (origin, destination), durations in location_transitions.items()
+            ),
+            key=lambda entry: (-entry['count'], entry['from'], entry['to'])
+        ),
+        'flowPatterns': [
+            {
+                'userId': str(user_id),
+                'path': [
+                    {
+                        'location': tags[tag_id][0],
+                        'timestamp': timestamp.isoformat(),
+                        'tagCode': tags[tag_id][1]
+                    }
+                    for tag_id, timestamp in scans
+                ],
+                'totalStops': len(scans)
+            }
+            for user_id, scans in paths
+        ],
+    }
+
 # 통계 데이터 API
 
 @api_view(['GET'])
@@ -95,11 +176,13 @@ def patient_flow_analysis(request):
         # 날짜 변환
         start_date = datetime.fromisoformat(start_date.replace('Z', '+00:00'))
         end_date = datetime.fromisoformat(end_date.replace('Z', '+00:00'))
+        # 기간이 아카이브된 구간에 걸치면 핫+아카이브 통합 조회
+        scan_logs = history_queryset(TagLog, start_date)
         
         # 태그 로그 기반 환자 동선 분석
-        tag_logs = TagLog.objects.filter(
+        tag_logs = scan_logs.filter(
             timestamp__range=[start_date, end_date]
-        ).select_related('tag', 'user')
+        )
         
         # 가장 많이 방문한 위치
         popular_locations = tag_logs.values(
@@ -118,50 +201,9 @@ def patient_flow_analysis(request):
                 'unique_visitors': loc['unique_visitors']
             })
         
-        # 위치별 평균 체류 시간 (다음 스캔까지의 시간)
-        location_durations = {}
-        users = tag_logs.values_list('user', flat=True).distinct()
-        
-        for user_id in users:
-            user_logs = tag_logs.filter(user_id=user_id).order_by('timestamp')
-            for i in range(len(user_logs) - 1):
-                current_log = user_logs[i]
-                next_log = user_logs[i + 1]
-                location = current_log.tag.get_location_display()
-                duration = (next_log.timestamp - current_log.timestamp).total_seconds() / 60
-                
-                if location not in location_durations:
-                    location_durations[location] = []
-                location_durations[location].append(duration)
-        
-        # 평균 계산
-        avg_durations = {}
-        for location, durations in location_durations.items():
-            if durations:
-                avg_durations[location] = {
-                    'avgDuration': round(sum(durations) / len(durations), 2),
-                    'maxDuration': round(max(durations), 2),
-                    'minDuration': round(min(durations), 2)
-                }
-        
-        # 이동 경로 패턴 분석
-        flow_patterns = []
-        for user_id in users[:100]:  # 최대 100명까지만 분석
-            user_logs = tag_logs.filter(user_id=user_id).order_by('timestamp')
-            if user_logs.count() >= 2:
-                path = []
-                for log in user_logs:
-                    path.append({
-                        'location': log.tag.get_location_display(),
-                        'timestamp': log.timestamp.isoformat(),
-                        'tagCode': log.tag.code
-                    })
-                flow_patterns.append({
-                    'userId': str(user_id),
-                    'path': path,
-                    'totalStops': len(path)
-                })
-        
+        # 체류 시간 / 위치 간 이동 / 이동 경로 (사용자별 시간순 1회 조회)
+        flow = _build_patient_flow(tag_logs)
+
         # 시간대별 혼잡도
         hourly_traffic = tag_logs.annotate(
             hour=ExtractHour('timestamp')
@@ -190,16 +232,17 @@ def patient_flow_analysis(request):
         return APIResponse.success(
             data={
                 'summary': {
-                    'totalScans': tag_logs.count(),
-                    'uniquePatients': tag_logs.values('user').distinct().count(),
+                    'totalScans': flow['totalScans'],
+                    'uniquePatients': flow['uniquePatients'],
                     'dateRange': {
                         'start': start_date.isoformat(),
                         'end': end_date.isoformat()
                     }
                 },
                 'popularLocations': popular_locations_formatted,
-                'locationDurations': avg_durations,
-                'flowPatterns': flow_patterns[:20],  # 최대 20개 패턴만 반환
+                'locationDurations': flow['locationDurations'],
+                'transitions': flow['transitions'],
+                'flowPatterns': flow['flowPatterns'],
                 'hourlyTraffic': list(hourly_traffic),
                 'bottlenecks': bottlenecks
             },
@@ -386,6 +429,8 @@ def congestion_heatmap(request):
         # 날짜 변환
         start_date = datetime.fromisoformat(start_date.replace('Z', '+00:00'))
         end_date = datetime.fromisoformat(end_date.replace('Z', '+00:00'))
+        # 기간이 아카이브된 구간에 걸치면 핫+아카이브 통합 조회
+        scan_logs = history_queryset(TagLog, start_date)
         
         # 시간대별, 위치별 혼잡도 데이터
         heatmap_data = []
@@ -402,7 +447,7 @@ def congestion_heatmap(request):
             
             for hour in range(24):
                 # 해당 시간대의 스캔 수 계산
-                scans = TagLog.objects.filter(
+                scans = scan_logs.filter(
                     tag__building=loc['building'],
                     tag__floor=loc['floor'],
                     tag__room=loc['room'],
@@ -433,7 +478,7 @@ def congestion_heatmap(request):
         # 요일별 패턴
         weekday_patterns = []
         for weekday in range(7):  # 0=Monday, 6=Sunday
-            day_scans = TagLog.objects.filter(
+            day_scans = scan_logs.filter(
                 timestamp__range=[start_date, end_date],
                 timestamp__week_day=weekday + 1  # Django uses 1=Sunday, 7=Saturday
             ).annotate(
@@ -448,7 +493,7 @@ def congestion_heatmap(request):
             })
         
         # 가장 혼잡한 시간대 TOP 10
-        peak_times = TagLog.objects.filter(
+        peak_times = scan_logs.filter(
             timestamp__range=[start_date, end_date]
         ).annotate(
             hour=ExtractHour('timestamp')
@@ -516,6 +561,8 @@ def nfc_usage_analytics(request):
         # 날짜 변환
         start_date = datetime.fromisoformat(start_date.replace('Z', '+00:00'))
         end_date = datetime.fromisoformat(end_date.replace('Z', '+00:00'))
+        # 기간이 아카이브된 구간에 걸치면 핫+아카이브 통합 조회
+        scan_logs = history_queryset(TagLog, start_date)
         
         # 전체 태그 통계
         total_tags = NFCTag.objects.count()
@@ -524,7 +571,7 @@ def nfc_usage_analytics(request):
         # 사용률 통계
         tag_usage = []
         for tag in NFCTag.objects.filter(is_active=True):
-            logs = TagLog.objects.filter(
+            logs = scan_logs.filter(
                 tag=tag,
                 timestamp__range=[start_date, end_date]
             )
@@ -555,7 +602,7 @@ def nfc_usage_analytics(request):
         tag_usage_sorted = sorted(tag_usage, key=lambda x: x['totalScans'], reverse=True)
         
         # 위치별 집계
-        location_stats = TagLog.objects.filter(
+        location_stats = scan_logs.filter(
             timestamp__range=[start_date, end_date]
         ).values('tag__building', 'tag__floor', 'tag__room').annotate(
             total_scans=Count('log_id'),
@@ -574,7 +621,7 @@ def nfc_usage_analytics(request):
             })
         
         # 시간대별 사용 패턴
-        hourly_usage = TagLog.objects.filter(
+        hourly_usage = scan_logs.filter(
             timestamp__range=[start_date, end_date]
         ).annotate(
             hour=ExtractHour('timestamp')
@@ -859,6 +906,8 @@ def custom_report(request):
         # 날짜 변환
         start_date = datetime.fromisoformat(start_date.replace('Z', '+00:00'))
         end_date = datetime.fromisoformat(end_date.replace('Z', '+00:00'))
+        # 기간이 아카이브된 구간에 걸치면 핫+아카이브 통합 조회
+        scan_logs = history_queryset(TagLog, start_date)
         
         report_data = {
             'metadata': {
@@ -894,7 +943,7 @@ def custom_report(request):
             }
         
         if 'patientFlow' in metrics:
-            flow_data = TagLog.objects.filter(
+            flow_data = scan_logs.filter(
                 timestamp__range=[start_date, end_date]
             )
             
@@ -967,6 +1016,8 @@ def export_data(request):
     데이터 내보내기 API - GET /analytics/export
     
     CSV/Excel/PDF 형식으로 데이터 내보내기
+    CSV 는 스트리밍 응답, 기간이 ANALYTICS_EXPORT['ASYNC_DAYS'] 를 넘거나 async=true 이면
+    백그라운드 작업으로 전환하고 202 + 작업 ID 반환
     """
     is_admin, error_msg = _check_analytics_permission(request)
     if not is_admin:
@@ -982,41 +1033,66 @@ def export_data(request):
         data_type = request.GET.get('dataType', 'queue')  # queue, nfc, analytics
         start_date = request.GET.get('startDate', (timezone.now() - timedelta(days=30)).isoformat())
         end_date = request.GET.get('endDate', timezone.now().isoformat())
+        run_async = request.GET.get('async', '').lower() in ('1', 'true')
         
         # 날짜 변환
         start_date = datetime.fromisoformat(start_date.replace('Z', '+00:00'))
         end_date = datetime.fromisoformat(end_date.replace('Z', '+00:00'))
         
-        # 데이터 수집
-        data, headers = _get_export_data(data_type, start_date, end_date)
-        
-        # 로그 저장
-        AdminLog.objects.create(
-            user=request.user,
-            action='export_data',
-            details=json.dumps({
-                'export_type': export_type,
-                'data_type': data_type,
-                'period': {
-                    'start': start_date.isoformat(),
-                    'end': end_date.isoformat()
-                }
-            })
-        )
-        
-        # 형식별 내보내기
-        if export_type == 'csv':
-            return _export_csv(data, headers, data_type)
-        elif export_type == 'excel' and EXCEL_AVAILABLE:
-            return _export_excel(data, headers, data_type)
-        elif export_type == 'pdf' and PDF_AVAILABLE:
-            return _export_pdf(data, headers, data_type, start_date, end_date)
-        else:
+        if not is_supported(export_type):
             return APIResponse.error(
                 message=f"{export_type} 형식은 지원되지 않습니다.",
                 code="UNSUPPORTED_FORMAT",
                 status_code=status.HTTP_400_BAD_REQUEST
             )
+        if data_type not in EXPORT_COLUMNS:
+            return APIResponse.error(
+                message=f"{data_type} 데이터는 내보낼 수 없습니다.",
+                code="UNSUPPORTED_DATA_TYPE",
+                status_code=status.HTTP_400_BAD_REQUEST
+            )
+        
+        user = request.user if request.user.is_authenticated else None
+        
+        # 큰 기간은 백그라운드 작업으로
+        if run_async or (end_date - start_date).days > get_export_settings()['ASYNC_DAYS']:
+            job = ExportJob.objects.create(
+                user=user,
+                export_type=export_type,
+                data_type=data_type,
+                start_date=start_date,
+                end_date=end_date
+            )
+            if user:
+                AdminLog.log_action(user, 'create', ExportJob._meta.db_table, job.job_id)
+            start_export_job(job)
+            return APIResponse.success(
+                data=_serialize_export_job(job),
+                message="내보내기 작업을 시작했습니다.",
+                status_code=status.HTTP_202_ACCEPTED
+            )
+        
+        # 로그 저장 (대상 = 내보낸 데이터 종류.형식)
+        if user:
+            AdminLog.log_action(user, 'create', 'analytics_export', f'{data_type}.{export_type}')
+        
+        headers, rows = export_rows(data_type, start_date, end_date)
+        filename = export_filename(data_type, export_type)
+        
+        # 형식별 내보내기
+        if export_type == 'csv':
+            response = StreamingHttpResponse(stream_csv(headers, rows), content_type=CONTENT_TYPES['csv'])
+        else:
+            output = io.BytesIO()
+            if export_type == 'excel':
+                write_excel(headers, rows, data_type, output)
+            else:
+                write_pdf(headers, rows, data_type, start_date, end_date, output)
+            output.seek(0)
+            response = FileResponse(output, content_type=CONTENT_TYPES[export_type])
+        
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
         
     except Exception as e:
         logger.error(f"Data export error: {str(e)}", exc_info=True)
@@ -1026,247 +1102,92 @@ def export_data(request):
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
-def _get_export_data(data_type, start_date, end_date):
-    """내보낼 데이터 수집"""
-    if data_type == 'queue':
-        headers = ['Queue ID', 'Queue Number', 'Patient', 'Exam', 'State', 'Priority', 'Wait Time', 'Joined At']
-        
-        # `joined_at` 필드 대신 `created_at` 필드를 사용
-        queues = Queue.objects.filter(
-            created_at__range=[start_date, end_date]
-        ).select_related('user', 'exam')
-        
-        data = []
-        for q in queues:
-            data.append([
-                str(q.queue_id),
-                q.queue_number,
-                q.user.username if q.user else 'N/A',
-                # `exam_name` 대신 `title` 사용
-                q.exam.title if q.exam else 'N/A', 
-                q.state,
-                q.priority,
-                q.estimated_wait_time or 0,
-                # `joined_at` 필드 대신 `created_at` 필드를 사용
-                q.created_at.strftime('%Y-%m-%d %H:%M:%S')
-            ])
-    
-    elif data_type == 'nfc':
-        headers = ['Tag ID', 'Code', 'Location', 'Active', 'Total Scans', 'Last Scan']
-        
-        tags = NFCTag.objects.all()
-        data = []
-        
-        for tag in tags:
-            scan_count = TagLog.objects.filter(
-                tag=tag,
-                timestamp__range=[start_date, end_date]
-            ).count()
-            
-            data.append([
-                str(tag.tag_id),
-                tag.code,
-                tag.get_location_display(),
-                'Yes' if tag.is_active else 'No',
-                scan_count,
-                tag.last_scanned_at.strftime('%Y-%m-%d %H:%M:%S') if tag.last_scanned_at else 'Never'
-            ])
-    
-    elif data_type == 'analytics':
-        headers = ['Date', 'Total Patients', 'Avg Wait Time', 'Completion Rate', 'Total Scans']
-        data = []
-        
-        for date in range((end_date - start_date).days + 1):
-            target_date = start_date + timedelta(days=date)
-            
-            # `joined_at` 필드 대신 `created_at` 필드를 사용
-            day_stats = Queue.objects.filter(
-                created_at__date=target_date.date()
-            ).aggregate(
-                total=Count('queue_id'),
-                avg_wait=Avg('estimated_wait_time'),
-                completed=Count('queue_id', filter=Q(state='completed'))
-            )
-            
-            scans = TagLog.objects.filter(
-                timestamp__date=target_date.date()
-            ).count()
-            
-            completion_rate = (day_stats['completed'] / day_stats['total'] * 100) if day_stats['total'] > 0 else 0
-            
-            data.append([
-                target_date.strftime('%Y-%m-%d'),
-                day_stats['total'] or 0,
-                round(day_stats['avg_wait'] or 0, 2),
-                round(completion_rate, 2),
-                scans
-            ])
-    
-    return data, headers
+def _serialize_export_job(job):
+    return {
+        'jobId': str(job.job_id),
+        'status': job.status,
+        'exportType': job.export_type,
+        'dataType': job.data_type,
+        'progress': job.progress,
+        'rowsWritten': job.rows_written,
+        'totalRows': job.total_rows,
+        'error': job.error or None,
+        'createdAt': job.created_at.isoformat(),
+        'finishedAt': job.finished_at.isoformat() if job.finished_at else None,
+        'statusUrl': f'/api/v1/analytics/export/jobs/{job.job_id}/',
+        'downloadUrl': f'/api/v1/analytics/export/jobs/{job.job_id}/download/' if job.status == 'completed' else None,
+    }
+
+def _get_export_job(request, job_id):
+    """
+    요청자 본인(또는 최고 관리자)의 작업만 조회
+    만든 사용자가 삭제된 작업(user=NULL)은 최고 관리자만 - 환자 이름이 든 파일이라 데모 모드에서도 열지 않음
+    """
+    job = ExportJob.objects.filter(job_id=job_id).first()
+    if job is None:
+        return None
+    if getattr(request.user, 'role', None) == 'super':
+        return job
+    if job.user_id is not None and job.user_id == request.user.pk:
+        return job
+    return None
 
-def _export_csv(data, headers, data_type):
-    """CSV 형식으로 내보내기"""
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = f'attachment; filename="{data_type}_export_{timezone.now().strftime("%Y%m%d")}.csv"'
-    
-    writer = csv.writer(response)
-    writer.writerow(headers)
-    
-    for row in data:
-        writer.writerow(row)
-    
-    return response
-
-def _export_excel(data, headers, data_type):
-    """Excel 형식으로 내보내기"""
-    # 새 워크북 생성
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = f"{data_type.upper()} Export"
-    
-    # 헤더 스타일 설정
-    header_font = Font(bold=True, color="FFFFFF")
-    header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-    header_alignment = Alignment(horizontal="center", vertical="center")
-    
-    # 헤더 작성
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col, value=header)
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = header_alignment
-    
-    # 데이터 작성
-    for row_idx, row_data in enumerate(data, 2):
-        for col_idx, value in enumerate(row_data, 1):
-            ws.cell(row=row_idx, column=col_idx, value=value)
-    
-    # 열 너비 자동 조정
-    for column in ws.columns:
-        max_length = 0
-        column_letter = column[0].column_letter
-        for cell in column:
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except:
-                pass
-        adjusted_width = min(max_length + 2, 50)
-        ws.column_dimensions[column_letter].width = adjusted_width
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def export_job_status(request, job_id):
+    """
+    내보내기 작업 진행률 API - GET /analytics/export/jobs/<job_id>/
+    """
+    job = _get_export_job(request, job_id)
+    if job is None:
+        return APIResponse.error(
+            message="내보내기 작업을 찾을 수 없습니다.",
+            code="NOT_FOUND",
+            status_code=status.HTTP_404_NOT_FOUND
+        )
     
-    # 메모리에서 파일 생성
-    output = io.BytesIO()
-    wb.save(output)
-    output.seek(0)
+    # 서버 재시작으로 멈춘 작업이면 실패로 보여줌
+    if job.status in ('pending', 'running') and fail_stale_jobs(job_ids=[job.pk]):
+        job.refresh_from_db()
     
-    response = HttpResponse(
-        output.getvalue(),
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    return APIResponse.success(
+        data=_serialize_export_job(job),
+        message="내보내기 작업 상태를 조회했습니다.",
+        status_code=status.HTTP_200_OK
     )
-    response['Content-Disposition'] = f'attachment; filename="{data_type}_export_{timezone.now().strftime("%Y%m%d")}.xlsx"'
-    
-    return response
 
-def _export_pdf(data, headers, data_type, start_date, end_date):
-    """PDF 형식으로 내보내기"""
-    output = io.BytesIO()
-    
-    # PDF 문서 생성
-    doc = SimpleDocTemplate(output, pagesize=A4)
-    elements = []
-    styles = getSampleStyleSheet()
-    
-    # 제목 스타일
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=16,
-        spaceAfter=30,
-        alignment=1  # 중앙 정렬
-    )
-    
-    # 제목 추가
-    title = Paragraph(f"{data_type.upper()} Export Report", title_style)
-    elements.append(title)
-    
-    # 기간 정보
-    period_text = f"Period: {start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}"
-    period = Paragraph(period_text, styles['Normal'])
-    elements.append(period)
-    elements.append(Spacer(1, 20))
-    
-    # 요약 통계 (analytics인 경우)
-    if data_type == 'analytics' and data:
-        summary_data = [
-            ['Metric', 'Value'],
-            ['Total Records', str(len(data))],
-            ['Date Range', f"{(end_date - start_date).days + 1} days"],
-            ['Generated At', timezone.now().strftime('%Y-%m-%d %H:%M:%S')]
-        ]
-        
-        summary_table = Table(summary_data)
-        summary_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        
-        elements.append(summary_table)
-        elements.append(Spacer(1, 30))
-    
-    # 메인 데이터 테이블
-    table_data = [headers] + data[:50]  # PDF는 최대 50행으로 제한
-    
-    # 테이블 생성
-    table = Table(table_data)
-    
-    # 테이블 스타일 적용
-    table.setStyle(TableStyle([
-        # 헤더 스타일
-        ('BACKGROUND', (0, 0), (-1, 0), colors.darkblue),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        
-        # 데이터 행 스타일
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -1), 8),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        
-        # 교대로 배경색 적용
-        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.beige, colors.white])
-    ]))
-    
-    elements.append(table)
-    
-    # 50행 초과 시 안내문
-    if len(data) > 50:
-        note = Paragraph(
-            f"Note: Only first 50 records shown. Total records: {len(data)}",
-            styles['Normal']
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def export_job_download(request, job_id):
+    """
+    완료된 내보내기 파일 다운로드 API - GET /analytics/export/jobs/<job_id>/download/
+    """
+    job = _get_export_job(request, job_id)
+    if job is None:
+        return APIResponse.error(
+            message="내보내기 작업을 찾을 수 없습니다.",
+            code="NOT_FOUND",
+            status_code=status.HTTP_404_NOT_FOUND
         )
-        elements.append(Spacer(1, 20))
-        elements.append(note)
     
-    # PDF 생성
-    doc.build(elements)
-    output.seek(0)
+    if job.status != 'completed' or not os.path.exists(job.file_path):
+        return APIResponse.error(
+            message="내보내기 파일이 아직 준비되지 않았습니다.",
+            code="EXPORT_NOT_READY",
+            status_code=status.HTTP_409_CONFLICT
+        )
     
-    response = HttpResponse(
-        output.getvalue(),
-        content_type='application/pdf'
+    return FileResponse(
+        open(job.file_path, 'rb'),
+        as_attachment=True,
+        filename=job.file_name,
+        content_type=CONTENT_TYPES[job.export_type]
     )
-    response['Content-Disposition'] = f'attachment; filename="{data_type}_export_{timezone.now().strftime("%Y%m%d")}.pdf"'
 
-    return response
+def _get_export_data(data_type, start_date, end_date):
+    """내보낼 데이터 수집 (전체 행 리스트 - 스트리밍이 필요 없는 호출용)"""
+    headers, rows = export_rows(data_type, start_date, end_date)
+    return list(rows), headers
 
 
 @api_view(['GET'])
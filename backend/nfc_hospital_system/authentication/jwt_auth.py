@@ -2,22 +2,24 @@
 from rest_framework.authentication import BaseAuthentication
 from rest_framework.exceptions import AuthenticationFailed
 from django.conf import settings
-from .models import User
+from .user_cache import get_cached_user, is_token_revoked, ClaimsUser
 import jwt
 
+
+def get_request_token(request):
+    """Authorization 헤더 또는 access_token 쿠키에서 토큰 추출"""
+    auth_header = request.headers.get('Authorization', '')
+    if auth_header.startswith('Bearer '):
+        return auth_header.split(' ')[1]
+    return request.COOKIES.get('access_token')
+
+
 class ManualJWTAuthentication(BaseAuthentication):
     """수동 JWT 인증 클래스 - httpOnly 쿠키와 헤더 모두 지원"""
     
     def authenticate(self, request):
-        # Authorization 헤더에서 토큰 추출
-        auth_header = request.headers.get('Authorization', '')
-        
-        # 쿠키에서 토큰 확인 (헤더에 없는 경우)
-        access_token = None
-        if auth_header.startswith('Bearer '):
-            access_token = auth_header.split(' ')[1]
-        elif 'access_token' in request.COOKIES:
-            access_token = request.COOKIES.get('access_token')
+        # Authorization 헤더 → 쿠키 순으로 토큰 추출
+        access_token = get_request_token(request)
         
         if not access_token:
             return None  # 인증 정보가 없으면 None 반환
@@ -34,14 +36,18 @@ class ManualJWTAuthentication(BaseAuthentication):
             if payload.get('token_type') != 'access':
                 raise AuthenticationFailed('Access 토큰이 아닙니다')
                 
-            # 사용자 조회
-            try:
-                user = User.objects.get(user_id=user_id, is_active=True)
-            except User.DoesNotExist:
+            # 로그아웃으로 폐기된 토큰 확인
+            if is_token_revoked(access_token):
+                raise AuthenticationFailed('로그아웃된 토큰입니다')
+                
+            user = self.get_user(payload)
+            if user is None:
                 raise AuthenticationFailed('사용자를 찾을 수 없습니다')
             
             return (user, access_token)
             
+        except AuthenticationFailed:
+            raise
         except jwt.ExpiredSignatureError:
             raise AuthenticationFailed('토큰이 만료되었습니다')
         except jwt.InvalidTokenError:
@@ -49,5 +55,20 @@ class ManualJWTAuthentication(BaseAuthentication):
         except Exception as e:
             raise AuthenticationFailed(f'인증 오류: {str(e)}')
     
+    def get_user(self, payload):
+        """사용자 조회 (프로세스 LRU → 공유 캐시 → DB)"""
+        return get_cached_user(payload['user_id'])
+    
     def authenticate_header(self, request):
-        return 'Bearer'
\ No newline at end of file
+        return 'Bearer'
+
+
+class ClaimsJWTAuthentication(ManualJWTAuthentication):
+    """
+    토큰 클레임만으로 인증 - DB/캐시 조회 없음
+    user_id, role 만 필요한 엔드포인트(큐 조회, 상태 폴링 등)용
+    비활성화는 access 토큰 만료 시점에 반영됨
+    """
+    
+    def get_user(self, payload):
+        return ClaimsUser(payload)
@@ -0,0 +1,104 @@
+# authentication/management/commands/benchmark_auth.py
+"""
+JWT 인증 오버헤드 벤치마크
+요청당 인증 비용을 캐시 적용 전(매 요청 DB 조회)과 후로 비교합니다.
+
+사용법:
+    python manage.py benchmark_auth
+    python manage.py benchmark_auth --iterations 5000
+"""
+
+import time
+from datetime import datetime, timedelta, date
+
+import jwt
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from authentication.jwt_auth import ManualJWTAuthentication, ClaimsJWTAuthentication
+from authentication.models import User
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'JWT 인증의 요청당 오버헤드를 측정합니다 (캐시 적용 전/후).'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=2000,
+            help='측정 반복 횟수 (기본: 2000)'
+        )
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+
+        # 측정용 임시 사용자는 트랜잭션 롤백으로 정리
+        try:
+            with transaction.atomic():
+                self._run(iterations)
+                raise _Rollback()
+        except _Rollback:
+            pass
+
+    def _run(self, iterations):
+        user = User.objects.create_user(
+            email='benchmark-auth@nfc-hospital.kr',
+            password='benchmark',
+            name='인증 벤치마크',
+            role='patient',
+            phone_number='01000000000',
+            birth_date=date(1990, 1, 1),
+        )
+        now = datetime.utcnow()
+        access_token = jwt.encode({
+            'user_id': str(user.user_id),
+            'email': user.email,
+            'name': user.name,
+            'role': user.role,
+            'token_type': 'access',
+            'exp': now + timedelta(hours=1),
+            'iat': now,
+        }, settings.SECRET_KEY, algorithm='HS256')
+
+        request = RequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {access_token}')
+
+        def uncached():
+            # 변경 전 동작: 토큰 디코딩 + 매 요청 사용자 조회
+            payload = jwt.decode(access_token, settings.SECRET_KEY, algorithms=['HS256'])
+            return User.objects.get(user_id=payload['user_id'], is_active=True)
+
+        cached_auth = ManualJWTAuthentication()
+        claims_auth = ClaimsJWTAuthentication()
+
+        results = [
+            ('DB 조회 (변경 전)', uncached),
+            ('사용자 캐시', lambda: cached_auth.authenticate(request)),
+            ('토큰 클레임', lambda: claims_auth.authenticate(request)),
+        ]
+
+        self.stdout.write(f'반복 횟수: {iterations}')
+        baseline = None
+        for label, func in results:
+            func()  # 캐시 워밍업
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                for _ in range(iterations):
+                    func()
+                elapsed = time.perf_counter() - started
+
+            per_request_us = elapsed / iterations * 1_000_000
+            if baseline is None:
+                baseline = per_request_us
+            self.stdout.write(
+                f'{label:<16} {per_request_us:>9.1f} µs/요청  '
+                f'쿼리 {len(queries) / iterations:.2f}회/요청  '
+                f'(x{baseline / per_request_us:.1f})'
+            )
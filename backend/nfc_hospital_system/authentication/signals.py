@@ -0,0 +1,19 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import User
+from .user_cache import invalidate_cached_user
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_cache(sender, instance, **kwargs):
+    """
+    사용자 정보 변경/비활성화/삭제 시 인증용 사용자 캐시 무효화
+    """
+    try:
+        invalidate_cached_user(instance.user_id)
+    except Exception as e:
+        logger.error(f"Failed to invalidate user cache: {str(e)}")
@@ -0,0 +1,88 @@
+from datetime import datetime, timedelta, date
+
+import jwt
+from django.conf import settings
+from django.core.cache import cache
+from django.test import TestCase, RequestFactory
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIClient
+
+from authentication.jwt_auth import ManualJWTAuthentication, ClaimsJWTAuthentication
+from authentication.models import User
+from authentication.user_cache import _local_users
+
+
+class UserCacheTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        _local_users.clear()
+        self.user = User.objects.create_user(
+            email='cache@test.com', password='testpass123', name='캐시 테스트',
+            role='patient', phone_number='01011112222', birth_date=date(1990, 1, 1)
+        )
+        now = datetime.utcnow()
+        self.token = jwt.encode({
+            'user_id': str(self.user.user_id),
+            'email': self.user.email,
+            'name': self.user.name,
+            'role': self.user.role,
+            'token_type': 'access',
+            'exp': now + timedelta(hours=1),
+            'iat': now,
+        }, settings.SECRET_KEY, algorithm='HS256')
+        self.request = RequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        self.auth = ManualJWTAuthentication()
+
+    def test_repeat_authentication_without_queries(self):
+        """첫 인증 이후에는 사용자 조회 쿼리 없음"""
+        self.auth.authenticate(self.request)
+
+        with self.assertNumQueries(0):
+            user, token = self.auth.authenticate(self.request)
+
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertEqual(user.name, '캐시 테스트')
+        self.assertEqual(token, self.token)
+
+    def test_save_and_deactivation_invalidate_cache(self):
+        """사용자 변경/비활성화 시 캐시 무효화"""
+        self.auth.authenticate(self.request)
+
+        self.user.name = '이름 변경'
+        self.user.save()
+        user, _ = self.auth.authenticate(self.request)
+        self.assertEqual(user.name, '이름 변경')
+
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate(self.request)
+
+    def test_logout_revokes_access_token(self):
+        """로그아웃한 access 토큰은 더 이상 인증 불가"""
+        self.auth.authenticate(self.request)
+
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        response = client.post('/api/v1/auth/logout/')
+        self.assertEqual(response.status_code, 200)
+
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate(self.request)
+
+        response = client.get('/api/v1/auth/profile/')
+        self.assertFalse(response.data['success'])
+
+    def test_claims_authentication_without_lookup(self):
+        """클레임 인증은 사용자 조회 없이 id/role 제공"""
+        with self.assertNumQueries(0):
+            user, _ = ClaimsJWTAuthentication().authenticate(self.request)
+
+        self.assertEqual(user.user_id, str(self.user.user_id))
+        self.assertEqual(user.role, 'patient')
+        self.assertTrue(user.is_authenticated)
+
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        response = client.get('/api/v1/queue/my-current/')
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,162 @@
+# authentication/user_cache.py
+"""
+JWT 인증용 사용자 캐시
+API 요청/WebSocket 연결마다 User.objects.get(user_id=...) 하던 것을
+프로세스 LRU → 공유 캐시(운영: Redis) → DB 순으로 조회하도록 바꾼다.
+
+- 키: user_id / 값: password 를 제외한 User 필드값 (User.from_db 로 복원)
+- 무효화: User post_save/post_delete (비활성화 포함), 로그아웃
+- 로그아웃한 access 토큰은 남은 유효기간 동안 공유 캐시에 폐기 표시
+- ClaimsUser: id/role 만 필요한 엔드포인트용, 토큰 클레임으로 만든 경량 사용자
+"""
+
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import cache
+
+from .models import User
+
+logger = logging.getLogger(__name__)
+
+LOCAL_CACHE_TTL = 30          # 초 - 프로세스 LRU (다른 워커의 변경이 반영되는 최대 지연)
+LOCAL_CACHE_MAXSIZE = 2048
+SHARED_CACHE_TTL = 300        # 초 - 공유 캐시
+USER_CACHE_KEY = "auth_user:{user_id}"
+REVOKED_TOKEN_KEY = "auth_revoked_token:{digest}"
+
+# password 는 캐시에 저장하지 않음 (필요 시 지연 로딩)
+_FIELD_NAMES = [
+    field.attname for field in User._meta.concrete_fields
+    if field.attname != 'password'
+]
+
+
+class _LocalLRU:
+    """TTL 이 있는 스레드 안전 LRU"""
+
+    def __init__(self, maxsize, ttl):
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._data = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self._ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self._maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+_local_users = _LocalLRU(LOCAL_CACHE_MAXSIZE, LOCAL_CACHE_TTL)
+
+
+def _cache_key(user_id):
+    return USER_CACHE_KEY.format(user_id=str(user_id))
+
+
+def _token_digest(token):
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+def get_cached_user(user_id):
+    """
+    활성 사용자 조회 (프로세스 LRU → 공유 캐시 → DB)
+    Returns: User 또는 None (없거나 비활성)
+    """
+    key = _cache_key(user_id)
+
+    values = _local_users.get(key)
+    if values is None:
+        values = cache.get(key)
+        if values is None:
+            try:
+                user = User.objects.get(user_id=user_id, is_active=True)
+            except (User.DoesNotExist, ValueError, TypeError):
+                return None
+            values = tuple(getattr(user, name) for name in _FIELD_NAMES)
+            cache.set(key, values, SHARED_CACHE_TTL)
+        _local_users.set(key, values)
+
+    return User.from_db('default', _FIELD_NAMES, values)
+
+
+def invalidate_cached_user(user_id):
+    """사용자 캐시 무효화 (현재 프로세스 + 공유 캐시)"""
+    key = _cache_key(user_id)
+    _local_users.delete(key)
+    cache.delete(key)
+
+
+def revoke_token(token, payload=None):
+    """
+    로그아웃한 access 토큰 폐기
+    남은 유효기간 동안만 공유 캐시에 보관하고 사용자 캐시도 무효화
+    """
+    if not token:
+        return
+    timeout = SHARED_CACHE_TTL
+    if payload and payload.get('exp'):
+        timeout = max(int(payload['exp'] - time.time()), 1)
+    cache.set(REVOKED_TOKEN_KEY.format(digest=_token_digest(token)), True, timeout)
+
+    if payload and payload.get('user_id'):
+        invalidate_cached_user(payload['user_id'])
+
+
+def is_token_revoked(token):
+    return bool(cache.get(REVOKED_TOKEN_KEY.format(digest=_token_digest(token))))
+
+
+class ClaimsUser:
+    """
+    토큰 클레임(user_id, role 등)만으로 만든 경량 사용자
+    DB 조회가 없으므로 ORM 필터에는 request.user.user_id 를 사용할 것
+    """
+
+    is_authenticated = True
+    is_anonymous = False
+    is_active = True
+
+    def __init__(self, payload):
+        self.user_id = payload['user_id']
+        self.pk = self.user_id
+        self.email = payload.get('email', '')
+        self.name = payload.get('name', '')
+        self.role = payload.get('role', 'patient')
+        self.is_staff = self.role in ['super', 'dept']
+
+    @property
+    def username(self):
+        return self.email
+
+    def __str__(self):
+        return f"{self.name} ({self.role})"
+
+    def get_full_record(self):
+        """전체 User 가 필요해지면 캐시 경유로 조회"""
+        return get_cached_user(self.user_id)
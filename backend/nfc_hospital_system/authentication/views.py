@@ -1,12 +1,14 @@
 # authentication/views.py
 from datetime import datetime, timedelta
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, authentication_classes, permission_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework import status
 from django.conf import settings
 from nfc_hospital_system.utils import APIResponse
 from .models import User
+from .jwt_auth import get_request_token
+from .user_cache import get_cached_user, is_token_revoked, revoke_token
 # 제거된 import: JsonResponse, csrf_exempt, require_http_methods, json (더 이상 사용하지 않음)
 from rest_framework.views import APIView
 from django.views.decorators.csrf import ensure_csrf_cookie
@@ -436,10 +438,19 @@ def refresh_token_view(request):
 
 
 @api_view(['POST'])
+@authentication_classes([])  # 폐기/만료된 토큰으로도 로그아웃 가능하도록 인증 생략
 @permission_classes([AllowAny])
 def logout(request):
-    """로그아웃 - 쿠키 삭제"""
+    """로그아웃 - access 토큰 폐기 및 쿠키 삭제"""
     try:
+        access_token = get_request_token(request)
+        if access_token:
+            try:
+                payload = jwt.decode(access_token, settings.SECRET_KEY, algorithms=['HS256'])
+                revoke_token(access_token, payload)
+            except jwt.InvalidTokenError:
+                pass  # 만료/위조 토큰은 이미 인증에 쓸 수 없음
+        
         response = APIResponse.success(message="로그아웃 성공")
         
         # httpOnly 쿠키 삭제
@@ -458,15 +469,8 @@ def logout(request):
 def profile(request):
     """사용자 프로필 조회 - 수동 JWT 검증"""
     try:
-        # Authorization 헤더에서 토큰 추출
-        auth_header = request.headers.get('Authorization', '')
-        
-        # 쿠키에서 토큰 확인 (헤더에 없는 경우)
-        access_token = None
-        if auth_header.startswith('Bearer '):
-            access_token = auth_header.split(' ')[1]
-        elif 'access_token' in request.COOKIES:
-            access_token = request.COOKIES.get('access_token')
+        # Authorization 헤더 → 쿠키 순으로 토큰 추출
+        access_token = get_request_token(request)
         
         if not access_token:
             return APIResponse.error("인증 토큰이 필요합니다", code="AUTH_401")
@@ -479,8 +483,13 @@ def profile(request):
             if not user_id:
                 return APIResponse.error("유효하지 않은 토큰입니다", code="AUTH_402")
                 
-            # 사용자 조회
-            user = User.objects.get(user_id=user_id, is_active=True)
+            if is_token_revoked(access_token):
+                return APIResponse.error("로그아웃된 토큰입니다", code="AUTH_404")
+                
+            # 사용자 조회 (캐시 경유)
+            user = get_cached_user(user_id)
+            if user is None:
+                raise User.DoesNotExist
             
         except jwt.ExpiredSignatureError:
             return APIResponse.error("토큰이 만료되었습니다", code="AUTH_403")
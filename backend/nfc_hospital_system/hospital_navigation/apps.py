@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class HospitalNavigationConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "hospital_navigation"
+
+    def ready(self):
+        import hospital_navigation.signals  # 시그널 등록
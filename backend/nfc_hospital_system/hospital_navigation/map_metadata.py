@@ -0,0 +1,186 @@
+"""
+지도 메타데이터 캐시
+GET /api/v1/navigation/maps/ 응답을 한 번의 노드 조회로 만들고
+지도/노드 변경 시 증가하는 버전 키로 캐싱한다.
+"""
+
+import hashlib
+import json
+import logging
+from collections import defaultdict
+
+from django.core.cache import cache
+
+from .models import HospitalMap, NavigationNode
+
+logger = logging.getLogger(__name__)
+
+MAPS_METADATA_VERSION_KEY = "hospital_navigation_maps_version"
+MAPS_METADATA_CACHE_KEY = "hospital_navigation_maps_metadata:{version}"
+MAPS_METADATA_CACHE_TIMEOUT = 3600  # 1시간 (bulk 작업 등 시그널 누락 대비)
+
+NODE_FIELDS = (
+    'node_id', 'name', 'node_type', 'x_coord', 'y_coord',
+    'is_accessible', 'has_elevator', 'has_escalator'
+)
+
+# 건물/층별 구역(Zone) 레이아웃
+MAP_ZONE_LAYOUTS = {
+    ('본관', 1): {
+        'zones': [
+            {'name': '접수/등록', 'color': '#e3f2fd', 'area': [50, 150, 350, 250]},
+            {'name': '검사', 'color': '#e8f5e9', 'area': [50, 450, 350, 250]},
+            {'name': '수납/약국', 'color': '#fff3e0', 'area': [600, 150, 350, 550]}
+        ],
+        'patient_flow': 'U자형 순환 동선'
+    },
+    ('본관', 2): {
+        'zones': [
+            {'name': '대기 구역', 'color': '#e3f2fd', 'area': [350, 100, 300, 150]},
+            {'name': '진료 구역', 'color': '#e8f5e9', 'area': [200, 200, 600, 400]}
+        ],
+        'patient_flow': '진료 존 중심'
+    },
+    ('암센터', 1): {
+        'zones': [
+            {'name': '로비/공용', 'color': '#eceff1', 'area': [400, 300, 400, 300]},
+            {'name': '치료 구역', 'color': '#f3e5f5', 'area': [850, 200, 300, 500]},
+            {'name': '상담 구역', 'color': '#e3f2fd', 'area': [50, 200, 300, 500]}
+        ],
+        'patient_flow': '로비 중심 방사형'
+    },
+    ('암센터', 2): {
+        'zones': [
+            {'name': '접수/대기', 'color': '#e3f2fd', 'area': [50, 300, 300, 300]},
+            {'name': '영상검사', 'color': '#e0f2f1', 'area': [400, 200, 700, 500]},
+            {'name': '판독/의사', 'color': '#eceff1', 'area': [400, 50, 700, 120]}
+        ],
+        'patient_flow': '영상의학과 클러스터'
+    },
+}
+
+# 전체 개선사항 요약
+MAP_IMPROVEMENTS = {
+    'version': '2.0',
+    'release_date': '2025-08-16',
+    'features': [
+        {
+            'category': '환자 동선 최적화',
+            'items': [
+                'U자형 순환 동선 도입',
+                '체크인/체크아웃 동선 분리',
+                '검사 존(Zone) 형성'
+            ]
+        },
+        {
+            'category': '접근성 개선',
+            'items': [
+                '엘리베이터 중앙 배치',
+                '복도 폭 확대 (휠체어/침대)',
+                '장애인 화장실 전층 설치',
+                '휴게실/대기실 추가'
+            ]
+        },
+        {
+            'category': '시각 디자인 강화',
+            'items': [
+                '방 번호 체계 (101호~409호)',
+                '동선 화살표 및 유도선',
+                '구역별 색상 구분',
+                '표준 픽토그램 아이콘'
+            ]
+        }
+    ]
+}
+
+
+def get_maps_metadata_version():
+    """현재 지도 메타데이터 버전 (없으면 1로 초기화)"""
+    version = cache.get(MAPS_METADATA_VERSION_KEY)
+    if version is None:
+        cache.add(MAPS_METADATA_VERSION_KEY, 1, None)
+        version = cache.get(MAPS_METADATA_VERSION_KEY, 1)
+    return version
+
+
+def bump_maps_metadata_version():
+    """지도/노드 변경 시 버전을 올려 이전 캐시를 무효화"""
+    try:
+        cache.incr(MAPS_METADATA_VERSION_KEY)
+    except ValueError:
+        cache.set(MAPS_METADATA_VERSION_KEY, 2, None)
+
+
+def build_maps_metadata():
+    """
+    지도 메타데이터 응답 생성
+    활성 지도 1회 + 전체 노드 1회 조회 후 지도별로 묶는다
+    """
+    maps = list(
+        HospitalMap.objects.filter(is_active=True)
+        .only('map_id', 'building', 'floor', 'width', 'height', 'scale', 'metadata')
+        .order_by('building', 'floor')
+    )
+
+    nodes_by_map = defaultdict(list)
+    nodes = (
+        NavigationNode.objects.filter(map__is_active=True)
+        .order_by('map_id', 'name')
+        .values('map_id', *NODE_FIELDS)
+    )
+    for node in nodes:
+        nodes_by_map[node.pop('map_id')].append(node)
+
+    maps_data = []
+    for map_obj in maps:
+        metadata = map_obj.metadata or {}
+        map_nodes = nodes_by_map.get(map_obj.map_id, [])
+
+        map_data = {
+            'map_id': str(map_obj.map_id),
+            'building': map_obj.building,
+            'floor': map_obj.floor,
+            'width': map_obj.width,
+            'height': map_obj.height,
+            'scale': map_obj.scale,
+            'svg_file_path': metadata.get('svg_file_path'),
+            'improved_layout': metadata.get('improved_layout', False),
+            'layout_version': metadata.get('layout_version', '1.0'),
+            'accessibility_features': metadata.get('accessibility_features', []),
+            'node_count': len(map_nodes),
+            'nodes': map_nodes,
+            'zones': []
+        }
+
+        layout = MAP_ZONE_LAYOUTS.get((map_obj.building, map_obj.floor))
+        if layout:
+            map_data['zones'] = layout['zones']
+            map_data['patient_flow'] = layout['patient_flow']
+
+        maps_data.append(map_data)
+
+    return {
+        'maps': maps_data,
+        'improvements': MAP_IMPROVEMENTS,
+        'total_floors': len(maps_data),
+        'svg_base_url': '/images/maps/'
+    }
+
+
+def get_cached_maps_metadata():
+    """
+    버전 키 기반 캐시 조회
+    Returns: (data, etag)
+    """
+    cache_key = MAPS_METADATA_CACHE_KEY.format(version=get_maps_metadata_version())
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    data = build_maps_metadata()
+    serialized = json.dumps(data, sort_keys=True, ensure_ascii=False, default=str)
+    etag = '"%s"' % hashlib.md5(serialized.encode('utf-8')).hexdigest()
+
+    cache.set(cache_key, (data, etag), MAPS_METADATA_CACHE_TIMEOUT)
+    logger.info(f"Maps metadata cached - key: {cache_key}")
+    return data, etag
@@ -0,0 +1,21 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import HospitalMap, NavigationNode
+from .map_metadata import bump_maps_metadata_version
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_save, sender=HospitalMap)
+@receiver(post_delete, sender=HospitalMap)
+@receiver(post_save, sender=NavigationNode)
+@receiver(post_delete, sender=NavigationNode)
+def invalidate_maps_metadata(sender, instance, **kwargs):
+    """
+    지도 또는 노드가 변경되면 지도 메타데이터 캐시 버전 증가
+    """
+    try:
+        bump_maps_metadata_version()
+    except Exception as e:
+        logger.error(f"Failed to invalidate maps metadata cache: {str(e)}")
@@ -1,3 +1,54 @@
 from django.test import TestCase
+from django.core.cache import cache
+from rest_framework.test import APIClient
+from .models import HospitalMap, NavigationNode
 
-# Create your tests here.
+
+class MapsMetadataAPITestCase(TestCase):
+    def setUp(self):
+        """지도 2개와 노드 생성"""
+        cache.clear()
+        self.client = APIClient()
+        self.url = '/api/v1/navigation/maps/'
+
+        self.map_1f = HospitalMap.objects.create(building='본관', floor=1)
+        self.map_2f = HospitalMap.objects.create(building='본관', floor=2)
+        for i in range(3):
+            NavigationNode.objects.create(
+                map=self.map_1f, node_type='junction', name=f'1층 교차점 {i}',
+                x_coord=i * 10, y_coord=0
+            )
+        NavigationNode.objects.create(
+            map=self.map_2f, node_type='elevator', name='2층 엘리베이터',
+            x_coord=0, y_coord=0
+        )
+
+    def test_metadata_built_with_constant_queries(self):
+        """지도 수와 관계없이 지도 1회 + 노드 1회 조회"""
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        maps = response.json()['data']['maps']
+        self.assertEqual([m['node_count'] for m in maps], [3, 1])
+        self.assertEqual(maps[0]['patient_flow'], 'U자형 순환 동선')
+
+        # 두 번째 요청은 캐시에서 응답
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+
+    def test_conditional_get_and_invalidation(self):
+        """ETag 일치 시 304, 노드 변경 후에는 새 ETag"""
+        etag = self.client.get(self.url)['ETag']
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        NavigationNode.objects.create(
+            map=self.map_2f, node_type='stairs', name='2층 계단',
+            x_coord=5, y_coord=5
+        )
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['data']['maps'][1]['node_count'], 2)
@@ -26,6 +26,7 @@ from .models import (
     PatientRoute, RouteProgress, DepartmentZone
 )
 from .pathfinding_optimized import calculate_optimized_route, clear_pathfinding_cache
+from .map_metadata import get_cached_maps_metadata
 from .serializers import (
     HospitalMapSerializer, NavigationNodeSerializer,
     PatientRouteSerializer, RouteProgressSerializer,
@@ -33,6 +34,7 @@ from .serializers import (
     RouteCompleteRequestSerializer, RouteSearchSerializer, DepartmentZoneSerializer
 )
 from nfc.models import NFCTag
+from nfc.tag_index import resolve_tag
 from appointments.models import Exam
 from authentication.models import User
 from nfc_hospital_system.utils import APIResponse
@@ -227,18 +229,8 @@ def nfc_scan_navigate(request):
         target_location = serializer.validated_data.get('target_location')
         action_type = serializer.validated_data.get('action_type', 'scan')
         
-        # NFC 태그 찾기
-        tag = None
-        try:
-            if len(tag_id) == 36 and '-' in tag_id:
-                tag = NFCTag.objects.get(tag_id=tag_id, is_active=True)
-            else:
-                tag = NFCTag.objects.filter(
-                    models.Q(tag_uid=tag_id) | models.Q(code=tag_id),
-                    is_active=True
-                ).first()
-        except NFCTag.DoesNotExist:
-            pass
+        # NFC 태그 찾기 (tag_id, tag_uid, code - 인메모리 인덱스)
+        tag = resolve_tag(tag_id)
         
         if not tag:
             return APIResponse.error(
@@ -657,108 +649,24 @@ def get_maps_metadata(request):
     """
     개선된 지도 메타데이터 조회 - GET /api/v1/navigation/maps/
     SVG 파일 경로와 개선사항 정보 포함
+    버전 키 캐시 + ETag(If-None-Match) 조건부 응답 지원
     """
     try:
-        maps = HospitalMap.objects.filter(is_active=True).order_by('building', 'floor')
-        
-        maps_data = []
-        for map_obj in maps:
-            # 각 층의 노드 정보 포함
-            nodes = NavigationNode.objects.filter(map=map_obj).values(
-                'node_id', 'name', 'node_type', 'x_coord', 'y_coord', 
-                'is_accessible', 'has_elevator', 'has_escalator'
-            )
-            
-            map_data = {
-                'map_id': str(map_obj.map_id),
-                'building': map_obj.building,
-                'floor': map_obj.floor,
-                'width': map_obj.width,
-                'height': map_obj.height,
-                'scale': map_obj.scale,
-                'svg_file_path': map_obj.metadata.get('svg_file_path') if map_obj.metadata else None,
-                'improved_layout': map_obj.metadata.get('improved_layout', False) if map_obj.metadata else False,
-                'layout_version': map_obj.metadata.get('layout_version', '1.0') if map_obj.metadata else '1.0',
-                'accessibility_features': map_obj.metadata.get('accessibility_features', []) if map_obj.metadata else [],
-                'node_count': nodes.count(),
-                'nodes': list(nodes),
-                'zones': []
-            }
-            
-            # 구역(Zone) 정보 추가
-            if map_obj.building == '본관' and map_obj.floor == 1:
-                map_data['zones'] = [
-                    {'name': '접수/등록', 'color': '#e3f2fd', 'area': [50, 150, 350, 250]},
-                    {'name': '검사', 'color': '#e8f5e9', 'area': [50, 450, 350, 250]},
-                    {'name': '수납/약국', 'color': '#fff3e0', 'area': [600, 150, 350, 550]}
-                ]
-                map_data['patient_flow'] = 'U자형 순환 동선'
-            elif map_obj.building == '본관' and map_obj.floor == 2:
-                map_data['zones'] = [
-                    {'name': '대기 구역', 'color': '#e3f2fd', 'area': [350, 100, 300, 150]},
-                    {'name': '진료 구역', 'color': '#e8f5e9', 'area': [200, 200, 600, 400]}
-                ]
-                map_data['patient_flow'] = '진료 존 중심'
-            elif map_obj.building == '암센터' and map_obj.floor == 1:
-                map_data['zones'] = [
-                    {'name': '로비/공용', 'color': '#eceff1', 'area': [400, 300, 400, 300]},
-                    {'name': '치료 구역', 'color': '#f3e5f5', 'area': [850, 200, 300, 500]},
-                    {'name': '상담 구역', 'color': '#e3f2fd', 'area': [50, 200, 300, 500]}
-                ]
-                map_data['patient_flow'] = '로비 중심 방사형'
-            elif map_obj.building == '암센터' and map_obj.floor == 2:
-                map_data['zones'] = [
-                    {'name': '접수/대기', 'color': '#e3f2fd', 'area': [50, 300, 300, 300]},
-                    {'name': '영상검사', 'color': '#e0f2f1', 'area': [400, 200, 700, 500]},
-                    {'name': '판독/의사', 'color': '#eceff1', 'area': [400, 50, 700, 120]}
-                ]
-                map_data['patient_flow'] = '영상의학과 클러스터'
-            
-            maps_data.append(map_data)
-        
-        # 전체 개선사항 요약
-        improvements = {
-            'version': '2.0',
-            'release_date': '2025-08-16',
-            'features': [
-                {
-                    'category': '환자 동선 최적화',
-                    'items': [
-                        'U자형 순환 동선 도입',
-                        '체크인/체크아웃 동선 분리',
-                        '검사 존(Zone) 형성'
-                    ]
-                },
-                {
-                    'category': '접근성 개선',
-                    'items': [
-                        '엘리베이터 중앙 배치',
-                        '복도 폭 확대 (휠체어/침대)',
-                        '장애인 화장실 전층 설치',
-                        '휴게실/대기실 추가'
-                    ]
-                },
-                {
-                    'category': '시각 디자인 강화',
-                    'items': [
-                        '방 번호 체계 (101호~409호)',
-                        '동선 화살표 및 유도선',
-                        '구역별 색상 구분',
-                        '표준 픽토그램 아이콘'
-                    ]
-                }
-            ]
-        }
-        
-        return APIResponse.success(
+        data, etag = get_cached_maps_metadata()
+
+        # 조건부 GET: 변경이 없으면 본문 없이 304 반환
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH', '')
+        if etag in [tag.strip() for tag in if_none_match.split(',')]:
+            response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+            response['ETag'] = etag
+            return response
+
+        response = APIResponse.success(
             message="지도 메타데이터를 조회했습니다.",
-            data={
-                'maps': maps_data,
-                'improvements': improvements,
-                'total_floors': len(maps_data),
-                'svg_base_url': '/images/maps/'
-            }
+            data=data
         )
+        response['ETag'] = etag
+        return response
         
     except Exception as e:
         logger.error(f"Get maps metadata error: {str(e)}")
@@ -0,0 +1,84 @@
+# integrations/management/commands/benchmark_hybrid_congestion.py
+"""
+HybridCongestion 보정 벤치마크 (부서별 스칼라 경로 vs 배치 벡터 경로)
+메트릭은 무작위로 생성하므로 DB 조회 시간은 포함하지 않습니다.
+
+사용법:
+    python manage.py benchmark_hybrid_congestion
+    python manage.py benchmark_hybrid_congestion --departments 50 --iterations 500
+"""
+
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from integrations.services.hybrid_congestion import HybridCongestionAlgorithm
+
+
+class Command(BaseCommand):
+    help = 'HybridCongestion 보정의 스칼라/배치 경로 속도와 결과 일치 여부를 비교합니다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--departments', type=int, default=6, help='부서 수 (기본: 6)')
+        parser.add_argument('--iterations', type=int, default=1000, help='측정 반복 횟수 (기본: 1000)')
+
+    def handle(self, *args, **options):
+        rng = random.Random(0)
+        now = timezone.now()
+        cases = [self._random_case(rng) for _ in range(options['departments'])]
+        lstm = [case[0] for case in cases]
+        current_waits = [case[3] for case in cases]
+        iterations = options['iterations']
+
+        def run_scalar():
+            return [
+                HybridCongestionAlgorithm._apply_rules(lstm_wait, metrics, rates, now, current_wait)
+                for lstm_wait, metrics, rates, current_wait in cases
+            ]
+
+        def run_batch():
+            matrix = HybridCongestionAlgorithm.build_metric_matrix(
+                [case[1] for case in cases], [case[2] for case in cases]
+            )
+            return HybridCongestionAlgorithm.apply_corrections_batch(lstm, matrix, now, current_waits)
+
+        identical = run_scalar() == HybridCongestionAlgorithm.batch_to_results(run_batch())
+        scalar_us = self._time(run_scalar, iterations)
+        batch_us = self._time(run_batch, iterations)
+
+        self.stdout.write(f"부서 {len(cases)}개, 반복 {iterations}회")
+        self.stdout.write(f"  스칼라 (부서별)   {scalar_us:10.1f} µs/회")
+        self.stdout.write(f"  배치 (벡터)       {batch_us:10.1f} µs/회")
+        self.stdout.write(f"  결과 일치         {'예' if identical else '아니오'}")
+        style = self.style.SUCCESS if identical else self.style.ERROR
+        self.stdout.write(style(f"  배치 / 스칼라 속도비 x{scalar_us / batch_us:.1f}"))
+
+    @staticmethod
+    def _random_case(rng):
+        total = rng.randint(0, 30)
+        urgent = rng.randint(0, total)
+        metrics = {
+            'waiting_count': rng.randint(0, 40),
+            'avg_exam_duration': round(rng.uniform(5, 60), 1),
+            'recent_avg_duration': round(rng.uniform(5, 90), 1),
+            'priority_distribution': {
+                'normal': total - urgent, 'urgent': urgent, 'emergency': 0, 'total': total,
+            },
+            'recent_no_shows': rng.randint(0, 10),
+            'total_active_patients': rng.randint(0, 60),
+        }
+        busier = rng.random() < 0.3
+        rates = {
+            'is_busier_than_expected': busier,
+            'is_slower_than_expected': not busier and rng.random() < 0.4,
+        }
+        return round(rng.uniform(5, 120), 1), metrics, rates, rng.randint(0, 120)
+
+    @staticmethod
+    def _time(func, iterations):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        return (time.perf_counter() - started) / iterations * 1_000_000
@@ -0,0 +1,123 @@
+# integrations/management/commands/benchmark_lstm_inference.py
+"""
+LSTM 추론 백엔드 벤치마크 (NumPy 엔진 vs TFLite)
+
+사용법:
+    python manage.py benchmark_lstm_inference
+    python manage.py benchmark_lstm_inference --iterations 500 --batch 6
+"""
+
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from integrations.services.model_quantization import build_keras_from_engine
+from integrations.services.numpy_lstm import NumpyLSTMModel
+
+
+class Command(BaseCommand):
+    help = 'NumPy LSTM 추론 엔진과 TFLite 의 속도/오차를 비교합니다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200, help='측정 반복 횟수 (기본: 200)')
+        parser.add_argument('--batch', type=int, default=6, help='배치 크기 = 부서 수 (기본: 6)')
+        parser.add_argument('--model-dir', default='ml_models', help='모델 디렉토리 (기본: ml_models)')
+
+    def handle(self, *args, **options):
+        model_dir = options['model_dir']
+        iterations = options['iterations']
+        batch = np.random.RandomState(0).rand(options['batch'], 12, 11).astype(np.float32)
+
+        h5_path = os.path.join(model_dir, 'hospital_lstm_new.h5')
+        npz_path = os.path.join(model_dir, 'hospital_lstm.npz')
+        engine = NumpyLSTMModel.from_npz(npz_path) if os.path.exists(npz_path) else NumpyLSTMModel.from_h5(h5_path)
+
+        self.stdout.write(f"반복 {iterations}회, 배치 {len(batch)}개 (12 x 11)")
+
+        # 1. import 시간 (새 프로세스 기준)
+        for label, module in [('numpy', 'numpy'), ('tensorflow', 'tensorflow')]:
+            elapsed = self._import_time(module)
+            text = f'{elapsed * 1000:8.0f} ms' if elapsed is not None else '   설치 안 됨'
+            self.stdout.write(f"  import {label:<12}{text}")
+
+        # 2. NumPy 엔진
+        numpy_out = engine.predict(batch)
+        numpy_us = self._time(lambda: engine.predict(batch), iterations)
+        self.stdout.write(f"  NumPy 배치 추론     {numpy_us:10.1f} µs/배치")
+
+        # 3. TFLite (샘플별 invoke, 배치 크기 1 고정 모델)
+        interpreter = self._build_tflite(model_dir, engine)
+        if interpreter is None:
+            self.stdout.write(self.style.WARNING("  TFLite              사용 불가 (TensorFlow 미설치 또는 모델 로드 실패)"))
+            return
+
+        input_index = interpreter.get_input_details()[0]['index']
+        output_index = interpreter.get_output_details()[0]['index']
+
+        def run_tflite():
+            outputs = []
+            for sample in batch:
+                interpreter.set_tensor(input_index, sample[np.newaxis, ...])
+                interpreter.invoke()
+                outputs.append(interpreter.get_tensor(output_index)[0])
+            return np.array(outputs)
+
+        tflite_out = run_tflite()
+        tflite_us = self._time(run_tflite, iterations)
+        self.stdout.write(f"  TFLite 샘플별 추론  {tflite_us:10.1f} µs/배치")
+        self.stdout.write(f"  최대 오차 (출력 0~1) {np.abs(numpy_out - tflite_out).max():.2e}")
+        self.stdout.write(self.style.SUCCESS(f"  NumPy / TFLite 속도비 x{tflite_us / numpy_us:.1f}"))
+
+    @staticmethod
+    def _time(func, iterations):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        return (time.perf_counter() - started) / iterations * 1_000_000
+
+    @staticmethod
+    def _import_time(module):
+        code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True)
+        if result.returncode != 0:
+            return None
+        return float(result.stdout.strip().splitlines()[-1])
+
+    def _build_tflite(self, model_dir, engine):
+        """
+        배포된 hospital_lstm.tflite 를 우선 사용하고,
+        Select TF ops(Flex) 때문에 로드되지 않으면 같은 가중치를 기본 연산으로 변환
+        """
+        try:
+            import tensorflow as tf
+        except ImportError:
+            return None
+
+        try:
+            interpreter = tf.lite.Interpreter(model_path=os.path.join(model_dir, 'hospital_lstm.tflite'))
+            interpreter.allocate_tensors()
+            self.stdout.write("  TFLite 모델: hospital_lstm.tflite")
+            return interpreter
+        except Exception as e:
+            self.stdout.write(f"  hospital_lstm.tflite 로드 실패 ({str(e)[:60]}...) - 같은 가중치로 재변환")
+
+        try:
+            content = build_tflite_from_engine(engine)
+            interpreter = tf.lite.Interpreter(model_content=content)
+            interpreter.allocate_tensors()
+            return interpreter
+        except Exception as e:
+            self.stdout.write(f"  TFLite 변환 실패: {e}")
+            return None
+
+
+def build_tflite_from_engine(engine, batch_size=1):
+    """NumpyLSTMModel 가중치로 Keras 모델을 만들어 TFLite(기본 연산만) 로 변환"""
+    import tensorflow as tf
+
+    model = build_keras_from_engine(engine, batch_size=batch_size)
+    return tf.lite.TFLiteConverter.from_keras_model(model).convert()
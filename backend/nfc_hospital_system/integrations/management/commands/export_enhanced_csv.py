@@ -5,11 +5,10 @@ Includes rolling averages, cross-department correlations, and special event indi
 
 from django.core.management.base import BaseCommand
 from django.utils import timezone
-from django.db.models import Avg, Count, Q, Sum, StdDev
-from p_queue.models import Queue, QueueStatusLog
+from p_queue.models import Queue
 from appointments.models import Exam
-from datetime import datetime, timedelta
-import csv
+from datetime import timedelta
+from itertools import islice
 import os
 import numpy as np
 import pandas as pd
@@ -17,6 +16,23 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# Holidays as month * 100 + day
+HOLIDAY_CODES = [
+    101,                # New Year
+    210, 211, 212,      # Lunar New Year (approximate)
+    301,                # March 1st Movement Day
+    505,                # Children's Day
+    606,                # Memorial Day
+    815,                # Liberation Day
+    928, 929, 930,      # Chuseok (approximate)
+    1003,               # National Foundation Day
+    1009,               # Hangul Day
+    1225,               # Christmas
+]
+
+# Season code by month (index 1-12): winter 0, spring 1, summer 2, fall 3
+SEASON_CODE_BY_MONTH = np.array([0, 0, 0, 1, 1, 1, 2, 2, 2, 3, 3, 3, 0])
+
 class Command(BaseCommand):
     help = 'Export enhanced queue data to CSV with time-series features for LSTM training'
 
@@ -39,6 +55,22 @@ class Command(BaseCommand):
             default=5,
             help='Time interval in minutes (default: 5)'
         )
+        parser.add_argument(
+            '--parquet',
+            action='store_true',
+            help='Also write a Parquet file next to the CSV (requires pyarrow)'
+        )
+        parser.add_argument(
+            '--feather',
+            action='store_true',
+            help='Also write a Feather file next to the CSV (requires pyarrow)'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=50000,
+            help='Queue rows streamed from the DB per chunk (default: 50000)'
+        )
 
     def handle(self, *args, **options):
         output_file = options['output']
@@ -54,317 +86,230 @@ class Command(BaseCommand):
         end_date = timezone.now()
         start_date = end_date - timedelta(days=days)
 
-        # Fetch all queue data
+        # Stream queue data in chunks
         self.stdout.write("\n📥 Loading queue data...")
         queues = Queue.objects.filter(
             created_at__gte=start_date,
             created_at__lte=end_date
-        ).select_related('exam').order_by('created_at')
+        ).order_by('created_at')
 
         self.stdout.write(f"   Found {queues.count():,} queue records")
 
+        departments = sorted(set(Exam.objects.values_list('department', flat=True)))
+
         # Process into time-series data
         self.stdout.write("\n⚙️ Processing time-series features...")
-        time_series_data = self.process_time_series(queues, interval)
+        time_series = self.process_time_series(queues, interval, departments, options['chunk_size'])
+
+        if time_series.empty:
+            self.stdout.write(self.style.WARNING("   No data to export"))
+            return
 
         # Add advanced features
         self.stdout.write("\n🔧 Adding advanced features...")
-        enhanced_data = self.add_advanced_features(time_series_data)
+        enhanced_data = self.add_advanced_features(time_series, departments, interval)
 
-        # Export to CSV
+        # Export to CSV (+ Parquet/Feather)
         self.stdout.write("\n💾 Exporting to CSV...")
         self.export_to_csv(enhanced_data, output_file)
+        if options['parquet']:
+            self.export_columnar(enhanced_data, output_file, 'parquet')
+        if options['feather']:
+            self.export_columnar(enhanced_data, output_file, 'feather')
 
         self.stdout.write(self.style.SUCCESS(f"\n✅ Export complete: {output_file}"))
         self.print_export_summary(enhanced_data, output_file)
 
-    def process_time_series(self, queues, interval):
-        """Process queues into time-series format with specified interval"""
-        time_series = {}
-        departments = list(Exam.objects.values_list('department', flat=True).distinct())
-
-        # Initialize time slots
-        for queue in queues:
-            # Round to interval
-            time_slot = queue.created_at.replace(
-                minute=(queue.created_at.minute // interval) * interval,
-                second=0,
-                microsecond=0
-            )
-
-            if time_slot not in time_series:
-                time_series[time_slot] = {
-                    'timestamp': time_slot,
-                    'date': time_slot.date(),
-                    'hour': time_slot.hour,
-                    'minute': time_slot.minute,
-                    'weekday': time_slot.weekday(),
-                    'month': time_slot.month,
-                    'day_of_month': time_slot.day,
-                    'week_of_year': time_slot.isocalendar()[1],
-                    'is_weekend': time_slot.weekday() >= 5,
-                    'is_holiday': self.is_holiday(time_slot.date()),
-                    'season': self.get_season(time_slot.date()),
-                    'departments': {}
-                }
-
-                # Initialize department data
-                for dept in departments:
-                    time_series[time_slot]['departments'][dept] = {
-                        'waiting_count': 0,
-                        'called_count': 0,
-                        'in_progress_count': 0,
-                        'completed_count': 0,
-                        'total_wait_time': 0,
-                        'urgent_count': 0,
-                        'normal_count': 0,
-                        'queue_numbers': []
-                    }
-
-            # Update department statistics
-            dept = queue.exam.department
-            if dept in time_series[time_slot]['departments']:
-                dept_data = time_series[time_slot]['departments'][dept]
-
-                # Count by state
-                if queue.state == 'waiting':
-                    dept_data['waiting_count'] += 1
-                    dept_data['total_wait_time'] += queue.estimated_wait_time
-                elif queue.state == 'called':
-                    dept_data['called_count'] += 1
-                elif queue.state == 'in_progress':
-                    dept_data['in_progress_count'] += 1
-                elif queue.state == 'completed':
-                    dept_data['completed_count'] += 1
-
-                # Count by priority
-                if queue.priority == 'urgent':
-                    dept_data['urgent_count'] += 1
-                else:
-                    dept_data['normal_count'] += 1
-
-                dept_data['queue_numbers'].append(queue.queue_number)
-
-        return time_series
-
-    def add_advanced_features(self, time_series):
+    def process_time_series(self, queues, interval, departments, chunk_size=50000):
+        """
+        Aggregate queues into (time slot, department) counts.
+        Rows are streamed with .iterator() and aggregated chunk by chunk,
+        so memory is bounded by the number of slots rather than queues.
+        """
+        rows = queues.values_list(
+            'created_at', 'exam__department', 'state', 'priority', 'estimated_wait_time'
+        ).iterator(chunk_size=chunk_size)
+
+        partials = []
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            partials.append(self._aggregate_chunk(chunk, interval, departments))
+
+        if not partials:
+            return pd.DataFrame()
+
+        # Slots can span chunk boundaries, so sum the partial aggregates
+        counts = pd.concat(partials).groupby(level=['timestamp', 'department']).sum()
+
+        # Resample to a continuous slot grid so lags/rolling windows are in time, not rows
+        slots = pd.date_range(
+            counts.index.get_level_values('timestamp').min(),
+            counts.index.get_level_values('timestamp').max(),
+            freq=f'{interval}min'
+        )
+        grid = pd.MultiIndex.from_product([slots, departments], names=['timestamp', 'department'])
+        return counts.reindex(grid, fill_value=0)
+
+    def _aggregate_chunk(self, chunk, interval, departments):
+        """Count states/priorities per (slot, department) for one chunk"""
+        frame = pd.DataFrame.from_records(
+            chunk, columns=['created_at', 'department', 'state', 'priority', 'wait']
+        )
+        frame = frame[frame['department'].isin(departments)]
+
+        waiting = frame['state'] == 'waiting'
+        counts = pd.DataFrame({
+            'timestamp': pd.to_datetime(frame['created_at'], utc=True).dt.floor(f'{interval}min'),
+            'department': frame['department'],
+            'waiting': waiting.astype(int),
+            'called': (frame['state'] == 'called').astype(int),
+            'in_progress': (frame['state'] == 'in_progress').astype(int),
+            'completed': (frame['state'] == 'completed').astype(int),
+            'total_wait_time': frame['wait'].where(waiting, 0),
+            'urgent': (frame['priority'] == 'urgent').astype(int),
+            'total': 1,
+        })
+        return counts.groupby(['timestamp', 'department']).sum()
+
+    def add_advanced_features(self, time_series, departments, interval):
         """Add advanced features for better LSTM training"""
-        enhanced_data = []
-        sorted_times = sorted(time_series.keys())
-
-        # Convert to DataFrame for easier manipulation
-        df_data = []
-        for time_slot in sorted_times:
-            row = {
-                'timestamp': time_slot,
-                'date': time_series[time_slot]['date'],
-                'hour': time_series[time_slot]['hour'],
-                'minute': time_series[time_slot]['minute'],
-                'weekday': time_series[time_slot]['weekday'],
-                'month': time_series[time_slot]['month'],
-                'day_of_month': time_series[time_slot]['day_of_month'],
-                'week_of_year': time_series[time_slot]['week_of_year'],
-                'is_weekend': int(time_series[time_slot]['is_weekend']),
-                'is_holiday': int(time_series[time_slot]['is_holiday']),
-                'season_code': self.encode_season(time_series[time_slot]['season'])
-            }
+        ts = time_series
+        long = pd.DataFrame({
+            'waiting': ts['waiting'],
+            'called': ts['called'],
+            'in_progress': ts['in_progress'],
+            'completed': ts['completed'],
+            'avg_wait': ts['total_wait_time'] / ts['waiting'].clip(lower=1),
+            'urgent_ratio': ts['urgent'] / ts['total'].clip(lower=1),
+            'congestion': (ts['waiting'] / 20.0).clip(upper=1.0),
+        })
+
+        # Per-department time series (groupby + rolling/shift)
+        by_dept = long.groupby(level='department', sort=False)
 
-            # Flatten department data
-            for dept, dept_data in time_series[time_slot]['departments'].items():
-                prefix = f'{dept}_'
-                row[f'{prefix}waiting'] = dept_data['waiting_count']
-                row[f'{prefix}called'] = dept_data['called_count']
-                row[f'{prefix}in_progress'] = dept_data['in_progress_count']
-                row[f'{prefix}completed'] = dept_data['completed_count']
-                row[f'{prefix}avg_wait'] = (
-                    dept_data['total_wait_time'] / max(dept_data['waiting_count'], 1)
-                )
-                row[f'{prefix}urgent_ratio'] = (
-                    dept_data['urgent_count'] / max(
-                        dept_data['urgent_count'] + dept_data['normal_count'], 1
-                    )
-                )
-                row[f'{prefix}congestion'] = min(dept_data['waiting_count'] / 20.0, 1.0)
-
-            df_data.append(row)
-
-        df = pd.DataFrame(df_data)
-
-        # Add rolling features
         self.stdout.write("   Adding rolling averages...")
         window_sizes = [3, 6, 12, 24]  # 15min, 30min, 1hr, 2hr for 5-min intervals
-
-        for dept in time_series[sorted_times[0]]['departments'].keys():
-            for window in window_sizes:
-                col_name = f'{dept}_waiting'
-                if col_name in df.columns:
-                    # Rolling mean
-                    df[f'{col_name}_ma_{window}'] = df[col_name].rolling(
-                        window=window, min_periods=1
-                    ).mean()
-
-                    # Rolling std
-                    df[f'{col_name}_std_{window}'] = df[col_name].rolling(
-                        window=window, min_periods=1
-                    ).std().fillna(0)
-
-                    # Rolling max/min
-                    df[f'{col_name}_max_{window}'] = df[col_name].rolling(
-                        window=window, min_periods=1
-                    ).max()
-                    df[f'{col_name}_min_{window}'] = df[col_name].rolling(
-                        window=window, min_periods=1
-                    ).min()
+        waiting_by_dept = by_dept['waiting']
+        for window in window_sizes:
+            rolling = waiting_by_dept.rolling(window=window, min_periods=1)
+            long[f'waiting_ma_{window}'] = rolling.mean().droplevel(0)
+            long[f'waiting_std_{window}'] = rolling.std().droplevel(0).fillna(0)
+            long[f'waiting_max_{window}'] = rolling.max().droplevel(0)
+            long[f'waiting_min_{window}'] = rolling.min().droplevel(0)
 
         # Add lag features (previous time slots)
         self.stdout.write("   Adding lag features...")
         lag_periods = [1, 6, 12, 24]  # 5min, 30min, 1hr, 2hr ago
-
-        for dept in time_series[sorted_times[0]]['departments'].keys():
-            for lag in lag_periods:
-                col_name = f'{dept}_waiting'
-                if col_name in df.columns:
-                    df[f'{col_name}_lag_{lag}'] = df[col_name].shift(lag).fillna(0)
-
-                col_name = f'{dept}_avg_wait'
-                if col_name in df.columns:
-                    df[f'{col_name}_lag_{lag}'] = df[col_name].shift(lag).fillna(0)
+        for lag in lag_periods:
+            long[f'waiting_lag_{lag}'] = waiting_by_dept.shift(lag).fillna(0)
+            long[f'avg_wait_lag_{lag}'] = by_dept['avg_wait'].shift(lag).fillna(0)
 
         # Add difference features (change from previous period)
         self.stdout.write("   Adding difference features...")
-        for dept in time_series[sorted_times[0]]['departments'].keys():
-            col_name = f'{dept}_waiting'
-            if col_name in df.columns:
-                df[f'{col_name}_diff'] = df[col_name].diff().fillna(0)
-                df[f'{col_name}_pct_change'] = df[col_name].pct_change().fillna(0)
+        long['waiting_diff'] = waiting_by_dept.diff().fillna(0)
+        long['waiting_pct_change'] = waiting_by_dept.pct_change().fillna(0)
+
+        # Add previous same-time statistics (same time yesterday/last week)
+        self.stdout.write("   Adding historical same-time features...")
+        periods_per_day = (24 * 60) // interval
+        long['waiting_yesterday'] = waiting_by_dept.shift(periods_per_day).fillna(0)
+        long['waiting_lastweek'] = waiting_by_dept.shift(periods_per_day * 7).fillna(0)
+        history_depts = set(departments[:3])  # Top 3 depts only
+
+        # Wide format: one row per slot, '{dept}_{feature}' columns
+        wide = long.unstack('department')
+        wide.columns = [f'{dept}_{feature}' for feature, dept in wide.columns]
+        wide = wide.drop(columns=[
+            f'{dept}_waiting_{suffix}'
+            for dept in departments if dept not in history_depts
+            for suffix in ('yesterday', 'lastweek')
+        ])
 
         # Add cross-department correlations
         self.stdout.write("   Adding cross-department features...")
         main_depts = ['내과', '정형외과', '응급의학과']
         imaging_depts = ['X-ray실', 'CT실', 'MRI실']
-
         for main_dept in main_depts:
             main_col = f'{main_dept}_waiting'
-            if main_col in df.columns:
+            if main_col in wide.columns:
                 for img_dept in imaging_depts:
                     img_col = f'{img_dept}_waiting'
-                    if img_col in df.columns:
+                    if img_col in wide.columns:
                         # Correlation feature (ratio)
-                        df[f'{main_dept}_to_{img_dept}_ratio'] = (
-                            df[main_col] / (df[img_col] + 1)
-                        )
+                        wide[f'{main_dept}_to_{img_dept}_ratio'] = wide[main_col] / (wide[img_col] + 1)
+
+        # Time features
+        timestamps = wide.index
+        month = timestamps.month
+        weekday = timestamps.weekday
+        wide.insert(0, 'timestamp', timestamps)
+        time_features = pd.DataFrame({
+            'date': timestamps.date,
+            'hour': timestamps.hour,
+            'minute': timestamps.minute,
+            'weekday': weekday,
+            'month': month,
+            'day_of_month': timestamps.day,
+            'week_of_year': timestamps.isocalendar().week.to_numpy(),
+            'is_weekend': (weekday >= 5).astype(int),
+            'is_holiday': np.isin(month * 100 + timestamps.day, HOLIDAY_CODES).astype(int),
+            'season_code': SEASON_CODE_BY_MONTH[month],
+        }, index=wide.index)
+        wide = pd.concat([wide, time_features], axis=1)
 
         # Add time-based cyclical features
         self.stdout.write("   Adding cyclical time features...")
-        df['hour_sin'] = np.sin(2 * np.pi * df['hour'] / 24)
-        df['hour_cos'] = np.cos(2 * np.pi * df['hour'] / 24)
-        df['weekday_sin'] = np.sin(2 * np.pi * df['weekday'] / 7)
-        df['weekday_cos'] = np.cos(2 * np.pi * df['weekday'] / 7)
-        df['month_sin'] = np.sin(2 * np.pi * df['month'] / 12)
-        df['month_cos'] = np.cos(2 * np.pi * df['month'] / 12)
+        wide['hour_sin'] = np.sin(2 * np.pi * wide['hour'] / 24)
+        wide['hour_cos'] = np.cos(2 * np.pi * wide['hour'] / 24)
+        wide['weekday_sin'] = np.sin(2 * np.pi * wide['weekday'] / 7)
+        wide['weekday_cos'] = np.cos(2 * np.pi * wide['weekday'] / 7)
+        wide['month_sin'] = np.sin(2 * np.pi * wide['month'] / 12)
+        wide['month_cos'] = np.cos(2 * np.pi * wide['month'] / 12)
 
         # Add peak hour indicators
-        df['is_morning_peak'] = ((df['hour'] >= 9) & (df['hour'] <= 11)).astype(int)
-        df['is_afternoon_peak'] = ((df['hour'] >= 14) & (df['hour'] <= 16)).astype(int)
-        df['is_lunch_time'] = ((df['hour'] >= 12) & (df['hour'] <= 13)).astype(int)
+        wide['is_morning_peak'] = ((wide['hour'] >= 9) & (wide['hour'] <= 11)).astype(int)
+        wide['is_afternoon_peak'] = ((wide['hour'] >= 14) & (wide['hour'] <= 16)).astype(int)
+        wide['is_lunch_time'] = ((wide['hour'] >= 12) & (wide['hour'] <= 13)).astype(int)
 
         # Add special event indicators
         self.stdout.write("   Adding special event indicators...")
-        df['days_to_weekend'] = df['weekday'].apply(
-            lambda x: min(5 - x, 7 - x) if x < 5 else 0
-        )
+        wide['days_to_weekend'] = np.where(wide['weekday'] < 5, 5 - wide['weekday'], 0)
 
-        # Add previous same-time statistics (same time yesterday/last week)
-        self.stdout.write("   Adding historical same-time features...")
-        periods_per_day = (24 * 60) // 5  # 5-minute intervals per day
-
-        for dept in time_series[sorted_times[0]]['departments'].keys()[:3]:  # Top 3 depts only
-            col_name = f'{dept}_waiting'
-            if col_name in df.columns:
-                # Same time yesterday
-                df[f'{col_name}_yesterday'] = df[col_name].shift(periods_per_day).fillna(0)
-                # Same time last week
-                df[f'{col_name}_lastweek'] = df[col_name].shift(periods_per_day * 7).fillna(0)
-
-        # Convert back to list of dictionaries
-        enhanced_data = df.to_dict('records')
-
-        return enhanced_data
-
-    def is_holiday(self, date):
-        """Check if date is a holiday"""
-        holidays = [
-            (1, 1),   # New Year
-            (2, 10), (2, 11), (2, 12),  # Lunar New Year (approximate)
-            (3, 1),   # March 1st Movement Day
-            (5, 5),   # Children's Day
-            (6, 6),   # Memorial Day
-            (8, 15),  # Liberation Day
-            (9, 28), (9, 29), (9, 30),  # Chuseok (approximate)
-            (10, 3),  # National Foundation Day
-            (10, 9),  # Hangul Day
-            (12, 25)  # Christmas
-        ]
-
-        for month, day in holidays:
-            if date.month == month and date.day == day:
-                return True
-        return False
-
-    def get_season(self, date):
-        """Get season for date"""
-        month = date.month
-        if month in [12, 1, 2]:
-            return 'winter'
-        elif month in [3, 4, 5]:
-            return 'spring'
-        elif month in [6, 7, 8]:
-            return 'summer'
-        else:
-            return 'fall'
-
-    def encode_season(self, season):
-        """Encode season as numeric"""
-        seasons = {'winter': 0, 'spring': 1, 'summer': 2, 'fall': 3}
-        return seasons.get(season, 0)
-
-    def export_to_csv(self, data, output_file):
-        """Export enhanced data to CSV"""
-        if not data:
-            self.stdout.write(self.style.WARNING("   No data to export"))
-            return
+        return wide.reset_index(drop=True)
+
+    def _clean(self, df):
+        """Sorted columns, NaN/inf → 0, floats rounded to 4 places"""
+        df = df[sorted(df.columns)]
+        floats = df.select_dtypes(include='float').columns
+        cleaned = df[floats].replace([np.inf, -np.inf], np.nan).fillna(0).round(4)
+        return df.assign(**{col: cleaned[col] for col in floats})
 
+    def export_to_csv(self, df, output_file):
+        """Export enhanced data to CSV"""
         # Create output directory
         os.makedirs('data', exist_ok=True)
         output_path = os.path.join('data', output_file)
 
-        # Get all field names
-        fieldnames = set()
-        for row in data:
-            fieldnames.update(row.keys())
-        fieldnames = sorted(list(fieldnames))
-
-        # Write CSV
-        with open(output_path, 'w', newline='', encoding='utf-8-sig') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            writer.writeheader()
-
-            for row in data:
-                # Clean NaN and inf values
-                cleaned_row = {}
-                for key, value in row.items():
-                    if isinstance(value, float):
-                        if np.isnan(value) or np.isinf(value):
-                            cleaned_row[key] = 0
-                        else:
-                            cleaned_row[key] = round(value, 4)
-                    else:
-                        cleaned_row[key] = value
-                writer.writerow(cleaned_row)
-
-        self.stdout.write(f"   Exported {len(data)} rows to {output_path}")
+        self._clean(df).to_csv(output_path, index=False, encoding='utf-8-sig')
+        self.stdout.write(f"   Exported {len(df)} rows to {output_path}")
+
+    def export_columnar(self, df, output_file, file_format):
+        """Write Parquet/Feather next to the CSV (requires pyarrow)"""
+        output_path = os.path.join('data', f'{os.path.splitext(output_file)[0]}.{file_format}')
+        cleaned = self._clean(df).astype({'date': 'datetime64[ns]'})
+        try:
+            if file_format == 'parquet':
+                cleaned.to_parquet(output_path, index=False)
+            else:
+                cleaned.to_feather(output_path)
+        except ImportError:
+            self.stdout.write(self.style.WARNING(f"   {file_format} export skipped: pip install pyarrow"))
+            return
+        self.stdout.write(f"   Exported {len(df)} rows to {output_path}")
 
-    def print_export_summary(self, data, output_file):
+    def print_export_summary(self, df, output_file):
         """Print export summary"""
         self.stdout.write('\n' + '=' * 60)
         self.stdout.write('📊 Enhanced Export Summary')
@@ -372,10 +317,10 @@ class Command(BaseCommand):
 
         output_path = os.path.join('data', output_file)
 
-        if data:
+        if not df.empty:
             # Basic statistics
-            self.stdout.write(f'Total Records: {len(data):,}')
-            self.stdout.write(f'Total Features: {len(data[0].keys())}')
+            self.stdout.write(f'Total Records: {len(df):,}')
+            self.stdout.write(f'Total Features: {len(df.columns)}')
             self.stdout.write(f'File Size: {os.path.getsize(output_path) / 1024:.1f} KB')
 
             # Feature categories
@@ -390,7 +335,7 @@ class Command(BaseCommand):
                 'Special Events': 0
             }
 
-            for key in data[0].keys():
+            for key in df.columns:
                 if any(x in key for x in ['hour', 'minute', 'weekday', 'month', 'date', 'time']):
                     feature_categories['Time Features'] += 1
                 elif any(x in key for x in ['waiting', 'called', 'progress', 'completed']):
@@ -415,10 +360,9 @@ class Command(BaseCommand):
                     self.stdout.write(f'   {category}: {count}')
 
             # Date range
-            timestamps = [row['timestamp'] for row in data if 'timestamp' in row]
-            if timestamps:
-                min_date = min(timestamps)
-                max_date = max(timestamps)
+            if 'timestamp' in df.columns:
+                min_date = df['timestamp'].min()
+                max_date = df['timestamp'].max()
                 self.stdout.write(f'\n📅 Date Range:')
                 self.stdout.write(f'   From: {min_date}')
                 self.stdout.write(f'   To: {max_date}')
@@ -0,0 +1,44 @@
+# integrations/management/commands/export_lstm_weights.py
+"""
+Keras .h5 LSTM 모델을 NumPy 추론 엔진용 .npz 로 변환합니다.
+TensorFlow 가 없는 워커는 이 파일만으로 예측할 수 있습니다.
+
+사용법:
+    python manage.py export_lstm_weights
+    python manage.py export_lstm_weights --source ml_models/hospital_lstm_new.h5 --output ml_models/hospital_lstm.npz
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from integrations.services.numpy_lstm import NumpyLSTMModel
+
+
+class Command(BaseCommand):
+    help = 'Keras .h5 LSTM 가중치를 NumPy 추론용 .npz 로 변환합니다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--source',
+            default='ml_models/hospital_lstm_new.h5',
+            help='변환할 Keras .h5 모델 (기본: ml_models/hospital_lstm_new.h5)'
+        )
+        parser.add_argument(
+            '--output',
+            default='ml_models/hospital_lstm.npz',
+            help='저장할 .npz 경로 (기본: ml_models/hospital_lstm.npz)'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            model = NumpyLSTMModel.from_h5(options['source'])
+        except (OSError, KeyError) as e:
+            raise CommandError(f"모델을 읽을 수 없습니다: {options['source']} ({e})")
+
+        model.save_npz(options['output'])
+
+        layers = ', '.join(
+            f"{layer['type']}({layer['weights'][-1].shape[0] // (4 if layer['type'] == 'lstm' else 1)})"
+            for layer in model.layers
+        )
+        self.stdout.write(f"   입력: {model.input_shape} / 레이어: {layers}")
+        self.stdout.write(self.style.SUCCESS(f"✅ 변환 완료: {options['output']}"))
@@ -8,6 +8,7 @@ from django.utils import timezone
 from django.db import transaction, models
 from datetime import datetime, timedelta
 from p_queue.models import Queue, QueueStatusLog
+from p_queue.position_engine import invalidate_queue_positions
 from appointments.models import Appointment, Exam
 from authentication.models import User
 from common.state_definitions import QueueDetailState
@@ -223,6 +224,8 @@ class Command(BaseCommand):
 
         Queue.objects.bulk_create(queues_to_create, batch_size=1000)
         self.stdout.write(f'   - {len(queues_to_create)}개 Queue 저장')
+        # bulk_create 는 시그널이 없으므로 실행 중인 서버의 대기 순서 엔진 무효화
+        invalidate_queue_positions(*{queue.exam_id for queue in queues_to_create})
 
         QueueStatusLog.objects.bulk_create(logs_to_create, batch_size=1000)
         self.stdout.write(f'   - {len(logs_to_create)}개 Log 저장')
@@ -1,16 +1,20 @@
 """
 Django management command to extract Queue data into CSV format for LSTM training.
-Converts Queue model data with realistic wait times into time-series format.
+Reads per-department 5-minute buckets from the feature store (DepartmentFeatureBucket)
+and merges them into the requested interval.
 """
 
 from django.core.management.base import BaseCommand
 from django.utils import timezone
-from django.db.models import Avg, Count, Q, F
-from p_queue.models import Queue, QueueStatusLog
-from appointments.models import Exam, Appointment
-from datetime import datetime, timedelta
-import csv
+from django.db.models import Min
+from appointments.models import Exam
+from integrations.models import DepartmentFeatureBucket
+from integrations.services.feature_store import (
+    BUCKET_MINUTES, load_feature_frame, refresh_feature_store
+)
+from datetime import timedelta
 import os
+import numpy as np
 import pandas as pd
 
 
@@ -60,98 +64,17 @@ class Command(BaseCommand):
 
         self.stdout.write(f"📊 발견된 부서: {', '.join(departments)}")
 
-        # CSV 데이터 준비
-        csv_data = []
-
-        # 시간대별로 데이터 집계
-        current_time = start_time
-        total_intervals = int((end_time - start_time).total_seconds() / (interval * 60))
-        processed = 0
-
-        while current_time < end_time:
-            interval_end = current_time + timedelta(minutes=interval)
-
-            for dept in departments:
-                try:
-                    # 해당 시간대의 대기 인원 수
-                    waiting_count = Queue.objects.filter(
-                        exam__department=dept,
-                        state__in=['waiting', 'called'],
-                        created_at__lte=interval_end,
-                        updated_at__gte=current_time
-                    ).count()
-
-                    # 평균 대기 시간 (estimated_wait_time 사용)
-                    avg_wait = Queue.objects.filter(
-                        exam__department=dept,
-                        created_at__lte=interval_end,
-                        updated_at__gte=current_time
-                    ).aggregate(avg=Avg('estimated_wait_time'))['avg'] or 0
-
-                    # 완료된 환자 수 (처리량)
-                    completed = Queue.objects.filter(
-                        exam__department=dept,
-                        state='completed',
-                        updated_at__gte=current_time,
-                        updated_at__lt=interval_end
-                    ).count()
-
-                    # 새로 들어온 환자 수
-                    new_patients = Queue.objects.filter(
-                        exam__department=dept,
-                        created_at__gte=current_time,
-                        created_at__lt=interval_end
-                    ).count()
-
-                    # 호출된 환자 수
-                    called = Queue.objects.filter(
-                        exam__department=dept,
-                        state='called',
-                        called_at__gte=current_time,
-                        called_at__lt=interval_end
-                    ).count()
-
-                    # 특별 우선순위 환자 비율
-                    priority_ratio = Queue.objects.filter(
-                        exam__department=dept,
-                        priority__in=['urgent', 'emergency'],
-                        created_at__lte=interval_end,
-                        updated_at__gte=current_time
-                    ).count() / max(waiting_count, 1)
-                except Exception as e:
-                    # DB 연결 오류 시 기본값 사용
-                    self.stdout.write(f"   ⚠️ {dept} 데이터 처리 오류: {e}")
-                    waiting_count = 0
-                    avg_wait = 0
-                    completed = 0
-                    new_patients = 0
-                    called = 0
-                    priority_ratio = 0
-
-                # CSV 행 추가
-                csv_data.append({
-                    'timestamp': current_time.isoformat(),
-                    'date': current_time.date(),
-                    'hour': current_time.hour,
-                    'minute': current_time.minute,
-                    'weekday': current_time.weekday(),  # 0=월, 6=일
-                    'department': dept,
-                    'waiting_count': waiting_count,
-                    'avg_wait_time': round(avg_wait, 1),  # 실제 대기시간!
-                    'completed_count': completed,
-                    'new_patients': new_patients,
-                    'called_count': called,
-                    'priority_ratio': round(priority_ratio, 3),
-                    'congestion_level': min(waiting_count / 20.0, 1.0),  # 0~1 정규화
-                })
-
-            current_time = interval_end
-            processed += 1
-
-            # 진행 상황 표시
-            if processed % 100 == 0:
-                progress = (processed / total_intervals) * 100
-                self.stdout.write(f"   진행: {progress:.1f}% ({processed}/{total_intervals})")
+        if interval % BUCKET_MINUTES:
+            self.stdout.write(self.style.ERROR(f"❌ --interval 은 {BUCKET_MINUTES}분의 배수여야 합니다."))
+            return
+
+        # 피처 스토어를 요청 구간까지 갱신한 뒤 구간 조회 (시간대 x 부서별 Queue 집계 쿼리 없음)
+        first_bucket = DepartmentFeatureBucket.objects.aggregate(first=Min('bucket_start'))['first']
+        since = start_time if first_bucket is None or first_bucket > start_time else None
+        refresh_feature_store(since=since, until=end_time)
+        frame = load_feature_frame(start_time, end_time, departments)
+
+        csv_data = self._rows_from_feature_store(frame, interval)
 
         # CSV 파일로 저장
         if csv_data:
@@ -201,4 +124,45 @@ class Command(BaseCommand):
                 self.style.ERROR("❌ 추출할 Queue 데이터가 없습니다.")
             )
             self.stdout.write("   generate_emr_data 명령을 먼저 실행하세요:")
-            self.stdout.write("   python manage.py generate_emr_data --days 90")
\ No newline at end of file
+            self.stdout.write("   python manage.py generate_emr_data --days 90")
+
+    def _rows_from_feature_store(self, frame, interval):
+        """5분 버킷을 interval 분 단위로 합쳐 CSV 행 생성"""
+        if frame.empty:
+            return []
+
+        frame['slot'] = frame['bucket_start'].dt.floor(f'{interval}min')
+        frame['wait_sum'] = frame['mean_wait'].fillna(0) * frame['queue_count']
+        grouped = frame.groupby(['slot', 'department'], sort=True).agg(
+            new_patients=('queue_count', 'sum'),
+            wait_sum=('wait_sum', 'sum'),
+            # 구간과 겹치는 인원은 하위 버킷 중 최대값으로 근사
+            waiting_count=('waiting_count', 'max'),
+            priority_count=('priority_count', 'max'),
+            called_count=('called_count', 'sum'),
+            completed_count=('completed_count', 'sum'),
+        ).reset_index()
+
+        new_patients = grouped['new_patients'].to_numpy()
+        avg_wait = np.divide(
+            grouped['wait_sum'].to_numpy(), new_patients,
+            out=np.zeros(len(grouped)), where=new_patients > 0
+        )
+        waiting = grouped['waiting_count'].to_numpy()
+
+        df = pd.DataFrame({
+            'timestamp': grouped['slot'].map(lambda ts: ts.isoformat()),
+            'date': grouped['slot'].dt.date,
+            'hour': grouped['slot'].dt.hour,
+            'minute': grouped['slot'].dt.minute,
+            'weekday': grouped['slot'].dt.weekday,  # 0=월, 6=일
+            'department': grouped['department'],
+            'waiting_count': waiting,
+            'avg_wait_time': np.round(avg_wait, 1),  # 실제 대기시간!
+            'completed_count': grouped['completed_count'],
+            'new_patients': new_patients,
+            'called_count': grouped['called_count'],
+            'priority_ratio': np.round(grouped['priority_count'].to_numpy() / np.maximum(waiting, 1), 3),
+            'congestion_level': np.minimum(waiting / 20.0, 1.0),  # 0~1 정규화
+        })
+        return df.to_dict('records')
@@ -0,0 +1,89 @@
+# integrations/management/commands/model_registry.py
+"""
+대기시간 예측 모델 레지스트리 관리 (ml_models/registry.json)
+변경 사항은 워커 재시작 없이 각 워커의 다음 예측 호출 때 반영됩니다.
+
+사용법:
+    python manage.py model_registry list
+    python manage.py model_registry register 1.2-lstm --npz hospital_lstm_v12.npz --description "10월 재학습"
+    python manage.py model_registry shadow 1.2-lstm      # 섀도 채점 시작
+    python manage.py model_registry shadow --clear       # 섀도 채점 종료
+    python manage.py model_registry activate 1.2-lstm    # 활성 버전 교체
+    python manage.py model_registry reload               # 캐시 버전만 올려 재로드 신호
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Avg, Count, Max
+
+from integrations.models import ModelShadowScore
+from integrations.services.model_loader import predictor
+from integrations.services.model_registry import ModelRegistry, ModelRegistryError
+
+
+class Command(BaseCommand):
+    help = '예측 모델 버전을 등록/활성화하고 섀도 채점 대상을 지정합니다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=['list', 'register', 'activate', 'shadow', 'reload'])
+        parser.add_argument('version', nargs='?', help='모델 버전 (예: 1.1-lstm-new)')
+        parser.add_argument('--tflite', help='TFLite 파일명 (ml_models 기준)')
+        parser.add_argument('--npz', help='NumPy 가중치 파일명 (ml_models 기준)')
+        parser.add_argument('--h5', help='Keras 모델 파일명 (ml_models 기준)')
+        parser.add_argument('--metrics', help='평가 지표 JSON 파일명 (ml_models 기준)')
+        parser.add_argument('--description', default='', help='버전 설명')
+        parser.add_argument('--clear', action='store_true', help='shadow: 섀도 채점 해제')
+
+    def handle(self, *args, **options):
+        registry = ModelRegistry(predictor.model_dir)
+        action = options['action']
+        version = options['version']
+
+        if action in ('register', 'activate') or (action == 'shadow' and not options['clear']):
+            if not version:
+                raise CommandError(f'{action} 에는 모델 버전이 필요합니다.')
+
+        try:
+            if action == 'register':
+                artifacts = {key: options[key] for key in ('tflite', 'npz', 'h5')}
+                registry.register(version, artifacts, metrics=options['metrics'], description=options['description'])
+                self.stdout.write(self.style.SUCCESS(f'✅ 등록: {version}'))
+            elif action == 'activate':
+                registry.activate(version)
+                self.stdout.write(self.style.SUCCESS(f'✅ 활성 버전: {version}'))
+            elif action == 'shadow':
+                registry.set_shadow(None if options['clear'] else version)
+                self.stdout.write(self.style.SUCCESS(
+                    '✅ 섀도 채점 해제' if options['clear'] else f'✅ 섀도 버전: {version}'
+                ))
+            elif action == 'reload':
+                registry.bump()
+                self.stdout.write(self.style.SUCCESS('✅ 재로드 신호 전송'))
+        except ModelRegistryError as e:
+            raise CommandError(str(e))
+
+        self._print_registry(registry)
+
+    def _print_registry(self, registry):
+        manifest = registry.read()
+        scores = {
+            row['shadow_version']: row
+            for row in ModelShadowScore.objects.values('shadow_version').annotate(
+                runs=Count('id'), mean_diff=Avg('mean_abs_diff'), max_diff=Max('max_abs_diff'),
+                latency=Avg('shadow_latency_ms'),
+            )
+        }
+
+        self.stdout.write('')
+        for version, spec in manifest['models'].items():
+            marker = '*' if version == manifest['active'] else ('S' if version == manifest.get('shadow') else ' ')
+            artifacts = ', '.join(spec[key] for key in ('tflite', 'npz', 'h5') if spec.get(key))
+            self.stdout.write(f" {marker} {version:<16} {artifacts}")
+            if spec.get('description'):
+                self.stdout.write(f"   {'':<16} {spec['description']}")
+            score = scores.get(version)
+            if score:
+                self.stdout.write(
+                    f"   {'':<16} 섀도 {score['runs']}회 - 평균 차이 {score['mean_diff']:.2f}분, "
+                    f"최대 {score['max_diff']:.0f}분, 지연 {score['latency']:.2f}ms"
+                )
+        self.stdout.write('\n * 활성  S 섀도')
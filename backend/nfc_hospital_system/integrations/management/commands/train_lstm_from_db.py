@@ -5,14 +5,20 @@ LSTM 모델 재학습 스크립트 (실제 DB 데이터 사용)
 Queue 테이블에서 시계열 데이터를 추출하여 LSTM 모델 학습
 """
 import os
+import hashlib
+import shutil
 import numpy as np
 import json
+from numpy.lib.stride_tricks import sliding_window_view
 from datetime import timedelta
 from django.core.management.base import BaseCommand
 from django.utils import timezone
-from django.db.models import Avg
+from django.db.models import Count, Min, Max
 from p_queue.models import Queue
 from appointments.models import Exam
+from integrations.services.numpy_lstm import NumpyLSTMModel
+from integrations.services.model_registry import ModelRegistry
+from integrations.services.model_quantization import build_quantized_variants, VARIANTS
 import tensorflow as tf
 from tensorflow import keras
 from tensorflow.keras.models import Sequential
@@ -34,6 +40,9 @@ class Command(BaseCommand):
         'X-ray실', 'CT실', 'MRI실'
     ]
 
+    # 추출한 학습 데이터셋 캐시 위치 (.npy, mmap 으로 로드)
+    DATASET_CACHE_DIR = 'ml_models/training_cache'
+
     def add_arguments(self, parser):
         parser.add_argument(
             '--epochs',
@@ -53,6 +62,32 @@ class Command(BaseCommand):
             default=12,
             help='Sequence length (timesteps) for LSTM (default: 12)'
         )
+        parser.add_argument(
+            '--no-cache',
+            action='store_true',
+            help='Ignore cached training dataset and extract again'
+        )
+        parser.add_argument(
+            '--register',
+            metavar='VERSION',
+            help='Register the trained model in ml_models/registry.json under VERSION'
+        )
+        parser.add_argument(
+            '--shadow',
+            action='store_true',
+            help='With --register, score the new version in shadow mode'
+        )
+        parser.add_argument(
+            '--quantize',
+            action='store_true',
+            help='Also build dynamic-range/float16/int8 TFLite variants and write quantization_report.json'
+        )
+        parser.add_argument(
+            '--representative-samples',
+            type=int,
+            default=200,
+            help='Training windows used to calibrate the int8 variant (default: 200)'
+        )
 
     def handle(self, *args, **options):
         epochs = options['epochs']
@@ -65,7 +100,7 @@ class Command(BaseCommand):
 
         # 1단계: 데이터 추출
         self.stdout.write("\n[1/5] Queue 테이블에서 시계열 데이터 추출 중...")
-        X, y, dept_names = self.extract_training_data(seq_length)
+        X, y, dept_names = self.extract_training_data(seq_length, use_cache=not options['no_cache'])
 
         if len(X) == 0:
             self.stdout.write(self.style.ERROR("학습 데이터가 없습니다. Queue 테이블에 데이터를 추가하세요."))
@@ -89,32 +124,48 @@ class Command(BaseCommand):
 
         # 5단계: 모델 저장 및 변환
         self.stdout.write("\n[5/5] 모델 저장 및 TFLite 변환 중...")
-        self.save_and_convert_model(model, history, scaler_y, X_test, y_test)
+        metrics = self.save_and_convert_model(model, history, scaler_y, X_test, y_test)
+
+        if options['quantize']:
+            self.stdout.write("\n[+] 양자화 변형 생성 및 비교 중...")
+            self.quantize_model(X_train, X_test, y_test, scaler_y, options['representative_samples'])
+
+        if options['register']:
+            self.register_model(options['register'], metrics, shadow=options['shadow'])
 
         self.stdout.write("\n" + "=" * 70)
         self.stdout.write(self.style.SUCCESS("LSTM 모델 재학습 완료!"))
         self.stdout.write("=" * 70)
         self.stdout.write("\n다음 단계:")
         self.stdout.write("1. python test_prediction_rule7.py 실행하여 정확도 검증")
-        self.stdout.write("2. 만족스러우면 hospital_lstm_new.tflite를 hospital_lstm.tflite로 교체")
-        self.stdout.write("3. Django 서버 재시작 (model_loader.py가 새 모델 로드)")
-
-    def extract_training_data(self, seq_length):
-        """Queue 테이블에서 시계열 학습 데이터 추출"""
-        X = []  # 입력 시퀀스 (shape: [N, seq_length, 11])
-        y = []  # 출력 타겟 (shape: [N, 1]) - 30분 후 대기시간
-        dept_names = []
+        self.stdout.write("2. --register 로 등록한 뒤 model_registry shadow <버전> 으로 섀도 채점")
+        self.stdout.write("3. 만족스러우면 model_registry activate <버전> (서버 재시작 없이 교체)")
+
+    def extract_training_data(self, seq_length, use_cache=True):
+        """
+        Queue 테이블에서 시계열 학습 데이터 추출
+        부서별로 (created_at, estimated_wait_time) 를 한 번만 스트리밍해 NumPy 배열로 만들고
+        sliding_window_view 로 윈도우를 생성한다.
+        결과는 데이터 범위로 키를 만든 .npy 로 저장해 재학습 시 추출을 생략한다.
+        """
+        total_queues = Queue.objects.count()
+        self.stdout.write(f"   총 Queue 레코드: {total_queues}개")
 
-        # 모든 Queue 데이터 조회 (오래된 것부터)
-        all_queues = Queue.objects.select_related('exam').order_by('created_at')
-        total_queues = all_queues.count()
+        dept_queues = Queue.objects.filter(exam__department__in=self.DEPARTMENTS)
+        cache_dir = self._dataset_cache_dir(dept_queues, seq_length)
+        if use_cache and os.path.exists(os.path.join(cache_dir, 'y.npy')):
+            X = np.load(os.path.join(cache_dir, 'X.npy'), mmap_mode='r')
+            y = np.load(os.path.join(cache_dir, 'y.npy'), mmap_mode='r')
+            dept_names = np.load(os.path.join(cache_dir, 'dept.npy')).tolist()
+            self.stdout.write(f"   캐시된 데이터셋 사용: {cache_dir}")
+            return X, y, dept_names
 
-        self.stdout.write(f"   총 Queue 레코드: {total_queues}개")
+        X_parts, y_parts, dept_names = [], [], []
 
         # 부서별로 시계열 데이터 생성
         for dept in self.DEPARTMENTS:
-            dept_queues = all_queues.filter(exam__department=dept)
-            dept_count = dept_queues.count()
+            timestamps, wait_times = self._load_department_rows(dept)
+            dept_count = len(wait_times)
 
             if dept_count < seq_length + 1:
                 self.stdout.write(self.style.WARNING(f"   {dept}: 데이터 부족 ({dept_count}개) - 스킵"))
@@ -122,55 +173,86 @@ class Command(BaseCommand):
 
             self.stdout.write(f"   {dept}: {dept_count}개 레코드 처리 중...")
 
+            features = self._create_feature_matrix(timestamps, wait_times, dept)
+
             # 시계열 윈도우 생성 (슬라이딩 윈도우 방식)
-            dept_sequences = 0
-            for i in range(dept_count - seq_length):
-                try:
-                    # 입력: seq_length개 시간 단계
-                    input_sequence = []
-                    for j in range(seq_length):
-                        q = dept_queues[i + j]
-                        features = self._create_feature_vector(q, dept)
-                        input_sequence.append(features)
-
-                    # 타겟: seq_length 이후 큐의 대기시간
-                    target_queue = dept_queues[i + seq_length]
-                    target_wait_time = target_queue.estimated_wait_time
-
-                    # 비정상 값 필터링 (0~120분 범위)
-                    if not (5 <= target_wait_time <= 120):
-                        continue
-
-                    X.append(input_sequence)
-                    y.append(target_wait_time)
-                    dept_names.append(dept)
-                    dept_sequences += 1
-
-                except Exception as e:
-                    continue
-
-            self.stdout.write(f"      → {dept_sequences}개 시퀀스 생성")
-
-        return np.array(X, dtype=np.float32), np.array(y, dtype=np.float32), dept_names
-
-    def _create_feature_vector(self, queue, department):
-        """Queue 객체에서 11개 특징 벡터 생성 (prediction_service.py와 동일)"""
-        features = []
-
-        # 기본 특징 3개
-        created_time = queue.created_at
-        features.append(created_time.hour / 24.0)  # 시간 정규화
-        features.append(created_time.weekday() / 6.0)  # 요일 정규화
-        features.append(min(queue.estimated_wait_time / 60.0, 1.0))  # 대기시간 정규화
+            # 입력: i ~ i+seq_length-1 / 타겟: i+seq_length 큐의 대기시간
+            windows = sliding_window_view(features[:-1], seq_length, axis=0).transpose(0, 2, 1)
+            targets = wait_times[seq_length:]
+
+            # 비정상 값 필터링 (5~120분 범위)
+            valid = (targets >= 5) & (targets <= 120)
+            X_parts.append(windows[valid])
+            y_parts.append(targets[valid])
+            dept_names.extend([dept] * int(valid.sum()))
+
+            self.stdout.write(f"      → {int(valid.sum())}개 시퀀스 생성")
+
+        if X_parts:
+            X = np.concatenate(X_parts).astype(np.float32)
+            y = np.concatenate(y_parts).astype(np.float32)
+        else:
+            X = np.empty((0, seq_length, 11), dtype=np.float32)
+            y = np.empty((0,), dtype=np.float32)
+
+        if use_cache and len(X):
+            os.makedirs(cache_dir, exist_ok=True)
+            np.save(os.path.join(cache_dir, 'X.npy'), X)
+            np.save(os.path.join(cache_dir, 'dept.npy'), np.array(dept_names))
+            np.save(os.path.join(cache_dir, 'y.npy'), y)  # 마지막에 저장 (완료 표시)
+            self.stdout.write(f"   데이터셋 캐시 저장: {cache_dir}")
+
+        return X, y, dept_names
+
+    def _dataset_cache_dir(self, queues, seq_length):
+        """부서별 건수/기간/최종 수정시각으로 데이터셋 캐시 키 생성"""
+        stats = (
+            queues.values('exam__department')
+            .annotate(
+                count=Count('pk'),
+                first=Min('created_at'),
+                last=Max('created_at'),
+                updated=Max('updated_at'),
+            )
+            .order_by('exam__department')
+        )
+        key_source = json.dumps({
+            'seq_length': seq_length,
+            'departments': self.DEPARTMENTS,
+            'stats': list(stats),
+        }, sort_keys=True, default=str)
+        digest = hashlib.sha1(key_source.encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self.DATASET_CACHE_DIR, f'lstm_{digest}')
+
+    def _load_department_rows(self, department):
+        """부서의 Queue 를 생성 순으로 한 번만 읽어 (UTC timestamp, 대기시간) 배열 반환"""
+        rows = (
+            Queue.objects.filter(exam__department=department)
+            .order_by('created_at')
+            .values_list('created_at', 'estimated_wait_time')
+            .iterator(chunk_size=5000)
+        )
+        timestamps, wait_times = [], []
+        for created_at, wait_time in rows:
+            timestamps.append(created_at.timestamp())
+            wait_times.append(wait_time)
+        return np.array(timestamps, dtype=np.int64), np.array(wait_times, dtype=np.float32)
+
+    def _create_feature_matrix(self, timestamps, wait_times, department):
+        """(N, 11) 특징 행렬 생성 (prediction_service.py와 동일한 특징)"""
+        features = np.zeros((len(wait_times), 11), dtype=np.float32)
+
+        # 기본 특징 3개 (created_at 은 UTC 기준)
+        features[:, 0] = (timestamps // 3600 % 24) / 24.0  # 시간 정규화
+        features[:, 1] = ((timestamps // 86400 + 3) % 7) / 6.0  # 요일 정규화 (1970-01-01 = 목요일)
+        features[:, 2] = np.minimum(wait_times / 60.0, 1.0)  # 대기시간 정규화
 
         # 부서 원핫 인코딩 8개
         if department in self.DEPARTMENTS:
             dept_idx = self.DEPARTMENTS.index(department)
         else:
             dept_idx = 0
-
-        for i in range(8):  # 8개 부서 슬롯
-            features.append(1.0 if i == dept_idx else 0.0)
+        features[:, 3 + dept_idx] = 1.0
 
         return features
 
@@ -264,6 +346,11 @@ class Command(BaseCommand):
             f.write(tflite_model)
         self.stdout.write(f"   TFLite 모델 변환: {tflite_path}")
 
+        # 2-1. NumPy 추론 엔진용 가중치 (TensorFlow 없는 워커용)
+        npz_path = f'{base_dir}/hospital_lstm_new.npz'
+        NumpyLSTMModel.from_h5(keras_path).save_npz(npz_path)
+        self.stdout.write(f"   NumPy 가중치 저장: {npz_path}")
+
         # 3. Scaler 저장
         scaler_params = {
             'min_': float(scaler_y.min_[0]),
@@ -281,7 +368,60 @@ class Command(BaseCommand):
         self._plot_training_history(history, f'{base_dir}/training_history.png')
 
         # 5. 평가 지표 저장
-        self._evaluate_and_save_metrics(model, X_test, y_test, scaler_y, f'{base_dir}/model_metrics.json')
+        return self._evaluate_and_save_metrics(model, X_test, y_test, scaler_y, f'{base_dir}/model_metrics.json')
+
+    def quantize_model(self, X_train, X_test, y_test, scaler_y, samples):
+        """저장한 모델의 양자화 변형 생성 + 크기/지연시간/MAE 리포트"""
+        base_dir = 'ml_models'
+        engine = NumpyLSTMModel.from_npz(f'{base_dir}/hospital_lstm_new.npz')
+
+        # int8 보정용 대표 데이터셋: 학습 윈도우에서 무작위 추출
+        rng = np.random.default_rng(42)
+        picks = rng.choice(len(X_train), size=min(samples, len(X_train)), replace=False)
+
+        report = build_quantized_variants(
+            engine, X_train[np.sort(picks)], X_test, y_test, base_dir, 'hospital_lstm_new', scaler_y=scaler_y
+        )
+
+        self.stdout.write(f"   {'변형':<10}{'크기(KB)':>10}{'단건(µs)':>12}{'배치(µs)':>12}{'MAE(분)':>10}")
+        for variant in VARIANTS:
+            row = report['variants'].get(variant)
+            if row is None:
+                continue
+            if 'error' in row:
+                self.stdout.write(self.style.WARNING(f"   {variant:<10}변환 실패: {row['error'][:60]}"))
+                continue
+            self.stdout.write(
+                f"   {variant:<10}{row['size_bytes'] / 1024:>10.1f}{row['latency_single_us']:>12.1f}"
+                f"{row['latency_batch_us']:>12.1f}{row['mae']:>10.2f}"
+            )
+        if report['recommended']:
+            self.stdout.write(self.style.SUCCESS(f"   추천 변형: {report['recommended']}"))
+        self.stdout.write(f"   리포트 저장: {base_dir}/quantization_report.json")
+
+    def register_model(self, version, metrics, shadow=False):
+        """
+        학습한 모델을 레지스트리에 등록 (활성 버전은 바꾸지 않음)
+        hospital_lstm_new.* 는 다음 학습 때 덮어쓰므로 버전 이름으로 복사해 등록
+        """
+        base_dir = 'ml_models'
+        artifacts = {}
+        for key in ('tflite', 'npz', 'h5'):
+            name = f'hospital_lstm_{version}.{key}'
+            shutil.copy2(f'{base_dir}/hospital_lstm_new.{key}', f'{base_dir}/{name}')
+            artifacts[key] = name
+
+        registry = ModelRegistry(base_dir)
+        registry.register(
+            version,
+            artifacts,
+            metrics=metrics,
+            description='train_lstm_from_db 재학습 모델',
+        )
+        self.stdout.write(self.style.SUCCESS(f"   레지스트리 등록: {version}"))
+        if shadow:
+            registry.set_shadow(version)
+            self.stdout.write(self.style.SUCCESS(f"   섀도 채점 시작: {version}"))
 
     def _plot_training_history(self, history, save_path):
         """학습 곡선 그래프 생성"""
@@ -352,3 +492,4 @@ class Command(BaseCommand):
         self.stdout.write(f"      5분 이내 정확도: {within_5min:.1f}%")
         self.stdout.write(f"      10분 이내 정확도: {within_10min:.1f}%")
         self.stdout.write(f"   지표 저장: {save_path}")
+        return metrics
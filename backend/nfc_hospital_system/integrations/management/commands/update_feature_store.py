@@ -0,0 +1,56 @@
+# integrations/management/commands/update_feature_store.py
+"""
+부서별 5분 버킷 피처 스토어 증분 갱신
+마지막 버킷 이후의 닫힌 버킷만 Queue 에서 집계해 DepartmentFeatureBucket 에 추가합니다.
+
+사용법:
+    python manage.py update_feature_store                     # 1회 증분 갱신 (cron 5분 주기)
+    python manage.py update_feature_store --loop              # 5분마다 계속 실행
+    python manage.py update_feature_store --since 2025-01-01  # 지정일부터 다시 집계 (백필)
+"""
+
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from integrations.services.feature_store import BUCKET_SECONDS, refresh_feature_store
+
+
+class Command(BaseCommand):
+    help = '부서별 5분 버킷 피처 스토어를 증분 갱신합니다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--since',
+            type=str,
+            default=None,
+            help='이 날짜(YYYY-MM-DD 또는 ISO 시각, UTC)부터 다시 집계'
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='버킷 주기마다 계속 갱신'
+        )
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            try:
+                since = datetime.fromisoformat(options['since'])
+            except ValueError:
+                raise CommandError(f"잘못된 날짜 형식입니다: {options['since']}")
+            if since.tzinfo is None:
+                since = since.replace(tzinfo=dt_timezone.utc)
+
+        while True:
+            close_old_connections()
+            saved = refresh_feature_store(since=since)
+            self.stdout.write(self.style.SUCCESS(f'✅ 피처 스토어 갱신 - {saved}개 버킷'))
+
+            if not options['loop']:
+                break
+            since = None
+            # 다음 버킷이 닫히는 시점까지 대기
+            time.sleep(BUCKET_SECONDS - time.time() % BUCKET_SECONDS + 1)
@@ -0,0 +1,41 @@
+# integrations/management/commands/update_prediction_accuracy.py
+"""
+LSTM 예측 정확도 집계 갱신
+PredictionLog 에 실제 호출 대기시간(actual_wait_time)을 채우고 PredictionAccuracy 를 갱신합니다.
+
+사용법:
+    python manage.py update_prediction_accuracy          # 1회 갱신 (cron 5분 주기)
+    python manage.py update_prediction_accuracy --loop   # 5분마다 계속 실행
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from integrations.services.prediction_accuracy import update_prediction_accuracy
+
+INTERVAL_SECONDS = 300
+
+
+class Command(BaseCommand):
+    help = 'PredictionLog 와 실제 대기시간을 조인해 예측 정확도 집계를 갱신합니다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='5분마다 계속 갱신'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            resolved, windows = update_prediction_accuracy()
+            self.stdout.write(self.style.SUCCESS(
+                f'✅ 예측 정확도 갱신 - 로그 {resolved}건, 구간 {windows}개'
+            ))
+
+            if not options['loop']:
+                break
+            time.sleep(INTERVAL_SECONDS - time.time() % INTERVAL_SECONDS + 1)
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.4 on 2026-10-18 23:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("integrations", "0003_alter_emrsyncstatus_mapped_state"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DepartmentFeatureBucket",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("department", models.CharField(max_length=100)),
+                ("bucket_start", models.DateTimeField()),
+                ("queue_count", models.IntegerField(default=0)),
+                ("mean_wait", models.FloatField(blank=True, null=True)),
+                ("waiting_count", models.IntegerField(default=0)),
+                ("priority_count", models.IntegerField(default=0)),
+                ("called_count", models.IntegerField(default=0)),
+                ("completed_count", models.IntegerField(default=0)),
+                ("no_show_count", models.IntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "db_table": "department_feature_buckets",
+                "ordering": ["department", "bucket_start"],
+                "indexes": [
+                    models.Index(
+                        fields=["bucket_start"], name="department__bucket__7b622b_idx"
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("department", "bucket_start"),
+                        name="uniq_department_feature_bucket",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.4 on 2026-10-18 23:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("integrations", "0004_departmentfeaturebucket"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PredictionAccuracy",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("department", models.CharField(max_length=100)),
+                ("window_start", models.DateTimeField()),
+                ("model_version", models.CharField(max_length=20)),
+                ("sample_count", models.IntegerField(default=0)),
+                ("mean_abs_error", models.FloatField(default=0)),
+                ("accuracy", models.FloatField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "db_table": "prediction_accuracy",
+                "ordering": ["department", "window_start"],
+                "indexes": [
+                    models.Index(
+                        fields=["window_start"], name="prediction__window__dc46a8_idx"
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("department", "window_start", "model_version"),
+                        name="uniq_prediction_accuracy_window",
+                    )
+                ],
+            },
+        ),
+    ]
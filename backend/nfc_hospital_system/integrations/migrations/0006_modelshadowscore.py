@@ -0,0 +1,47 @@
+# Generated by Django 5.2.4 on 2026-10-19 00:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("integrations", "0005_predictionaccuracy"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ModelShadowScore",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("active_version", models.CharField(max_length=50)),
+                ("shadow_version", models.CharField(max_length=50)),
+                ("sample_count", models.IntegerField(default=0)),
+                ("mean_abs_diff", models.FloatField(default=0)),
+                ("max_abs_diff", models.FloatField(default=0)),
+                ("mean_active_wait", models.FloatField(default=0)),
+                ("mean_shadow_wait", models.FloatField(default=0)),
+                ("active_latency_ms", models.FloatField(default=0)),
+                ("shadow_latency_ms", models.FloatField(default=0)),
+            ],
+            options={
+                "db_table": "model_shadow_scores",
+                "ordering": ["-created_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["shadow_version", "created_at"],
+                        name="model_shado_shadow__cc7a95_idx",
+                    )
+                ],
+            },
+        ),
+    ]
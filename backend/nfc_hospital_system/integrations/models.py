@@ -73,4 +73,98 @@ class PredictionLog(models.Model):
         ]
 
     def __str__(self):
-        return f"{self.timestamp.strftime('%Y-%m-%d %H:%M')} - {self.department} Prediction"
\ No newline at end of file
+        return f"{self.timestamp.strftime('%Y-%m-%d %H:%M')} - {self.department} Prediction"
+
+class DepartmentFeatureBucket(models.Model):
+    """
+    부서별 5분 단위 집계 (피처 스토어)
+    update_feature_store 명령이 닫힌 버킷을 증분으로 추가하며,
+    실시간 예측과 학습 데이터 생성이 Queue 대신 이 테이블을 읽는다.
+    """
+    department = models.CharField(max_length=100)
+    bucket_start = models.DateTimeField()
+
+    queue_count = models.IntegerField(default=0)       # 버킷 내 신규 등록 대기열 수
+    mean_wait = models.FloatField(null=True, blank=True)  # 신규 등록 대기열의 평균 예상 대기시간(분)
+    waiting_count = models.IntegerField(default=0)     # 버킷과 겹치는 waiting/called 대기열 수
+    priority_count = models.IntegerField(default=0)    # 버킷과 겹치는 urgent/emergency 대기열 수
+    called_count = models.IntegerField(default=0)      # 버킷 내 호출 수
+    completed_count = models.IntegerField(default=0)   # 버킷 내 완료 수
+    no_show_count = models.IntegerField(default=0)     # 버킷 내 노쇼 수
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'department_feature_buckets'
+        constraints = [
+            models.UniqueConstraint(fields=['department', 'bucket_start'], name='uniq_department_feature_bucket'),
+        ]
+        indexes = [
+            models.Index(fields=['bucket_start']),
+        ]
+        ordering = ['department', 'bucket_start']
+
+    def __str__(self):
+        return f"{self.department} {self.bucket_start.strftime('%Y-%m-%d %H:%M')} ({self.queue_count}건)"
+
+
+class PredictionAccuracy(models.Model):
+    """
+    부서별 1시간 단위 예측 정확도 집계
+    update_prediction_accuracy 명령이 PredictionLog 와 실제 호출 대기시간을 조인해 채우며,
+    대시보드는 요청마다 계산하지 않고 이 테이블을 읽는다.
+    """
+    department = models.CharField(max_length=100)
+    window_start = models.DateTimeField()  # 예측 시각 기준 1시간 구간 시작
+    model_version = models.CharField(max_length=20)
+
+    sample_count = models.IntegerField(default=0)     # 실제값이 확인된 예측 수
+    mean_abs_error = models.FloatField(default=0)     # 평균 절대 오차(분)
+    accuracy = models.FloatField(default=0)           # 평균 정확도(%) - max(0, 1 - |예측-실제| / max(실제, 1))
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'prediction_accuracy'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['department', 'window_start', 'model_version'],
+                name='uniq_prediction_accuracy_window'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['window_start']),
+        ]
+        ordering = ['department', 'window_start']
+
+    def __str__(self):
+        return f"{self.department} {self.window_start.strftime('%Y-%m-%d %H:00')} - {self.accuracy:.1f}%"
+
+
+class ModelShadowScore(models.Model):
+    """
+    섀도 모델 채점 기록
+    레지스트리에 섀도 버전이 지정되면 활성 모델과 같은 배치를 예측해 차이와 지연시간을 남긴다.
+    섀도 예측은 응답에 사용하지 않는다.
+    """
+    created_at = models.DateTimeField(auto_now_add=True)
+    active_version = models.CharField(max_length=50)
+    shadow_version = models.CharField(max_length=50)
+
+    sample_count = models.IntegerField(default=0)       # 배치 내 부서 수
+    mean_abs_diff = models.FloatField(default=0)        # 활성/섀도 예측 대기시간 평균 절대 차이(분)
+    max_abs_diff = models.FloatField(default=0)         # 최대 절대 차이(분)
+    mean_active_wait = models.FloatField(default=0)
+    mean_shadow_wait = models.FloatField(default=0)
+    active_latency_ms = models.FloatField(default=0)    # 배치 추론 지연시간
+    shadow_latency_ms = models.FloatField(default=0)
+
+    class Meta:
+        db_table = 'model_shadow_scores'
+        indexes = [
+            models.Index(fields=['shadow_version', 'created_at']),
+        ]
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.shadow_version} vs {self.active_version} (Δ{self.mean_abs_diff}분)"
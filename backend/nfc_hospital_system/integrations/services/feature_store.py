@@ -0,0 +1,251 @@
+"""
+부서별 5분 버킷 피처 스토어
+Queue 원본에서 학습/추론마다 따로 만들던 5분 시계열을 DepartmentFeatureBucket 한 곳에 모은다.
+
+- refresh_feature_store(): 마지막 버킷 이후(+늦게 반영된 변경을 위한 lookback)만 증분 집계
+  (update_feature_store 명령을 5분마다 실행)
+- get_recent_buckets(): 추론용 최근 N개 버킷을 인덱스 조회 1회로 반환
+- load_feature_frame(): 학습용 임의 구간을 Queue 조회 없이 DataFrame 으로 반환
+
+버킷 정의 (bucket_start ~ bucket_start + 5분)
+- queue_count / mean_wait : 버킷 안에 등록된 대기열 수 / 평균 estimated_wait_time
+- waiting_count           : 대기 구간 [created_at, 대기 종료] 이 버킷과 겹치는 대기열
+                            대기 종료 = waiting/called 가 아닌 상태로 바뀐 첫 QueueStatusLog 시각
+                            (로그가 없으면 아직 대기 중이면 열린 구간, 아니면 updated_at)
+- priority_count          : 위 대기열 중 urgent/emergency
+- called_count            : called 상태이며 called_at 이 버킷 안
+- completed_count / no_show_count : 해당 상태이며 updated_at 이 버킷 안
+"""
+
+import logging
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import numpy as np
+from django.db import connection, transaction
+from django.db.models import Case, F, Max, Min, Q, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from appointments.models import Exam
+from p_queue.models import Queue
+from ..models import DepartmentFeatureBucket
+
+logger = logging.getLogger(__name__)
+
+BUCKET_MINUTES = 5
+BUCKET_SECONDS = BUCKET_MINUTES * 60
+REFRESH_LOOKBACK_BUCKETS = 3   # 상태 변경이 늦게 반영되는 최근 버킷은 다시 집계
+REFRESH_CHUNK = timedelta(days=1)  # 백필 시 메모리 상한
+QUERY_CHUNK_SIZE = 5000
+
+# 대기 중으로 보는 Queue 상태 (waiting_count)
+WAITING_STATES = ('waiting', 'called')
+
+METRIC_FIELDS = (
+    'queue_count', 'mean_wait', 'waiting_count', 'priority_count',
+    'called_count', 'completed_count', 'no_show_count',
+)
+
+
+def floor_bucket(value):
+    """datetime 을 5분 버킷 시작 시각(UTC)으로 내림"""
+    seconds = int(value.timestamp()) // BUCKET_SECONDS * BUCKET_SECONDS
+    return datetime.fromtimestamp(seconds, tz=dt_timezone.utc)
+
+
+def _bucket_index(values, start_ts, num_buckets):
+    """UTC timestamp 배열 → 버킷 번호 (범위 밖은 -1)"""
+    index = (values - start_ts) // BUCKET_SECONDS
+    return np.where((index >= 0) & (index < num_buckets), index, -1)
+
+
+def _stream(queryset, fields):
+    """values_list 를 청크 단위로 읽어 (부서, timestamp, ...) 리스트 반환"""
+    return list(queryset.values_list(*fields).iterator(chunk_size=QUERY_CHUNK_SIZE))
+
+
+def _aggregate_range(start, end, departments):
+    """[start, end) 구간의 부서별 버킷 집계 → DepartmentFeatureBucket 리스트 (부서 x 버킷 dense)"""
+    num_buckets = int((end - start).total_seconds()) // BUCKET_SECONDS
+    dept_index = {dept: i for i, dept in enumerate(departments)}
+    size = len(departments) * num_buckets
+    start_ts = int(start.timestamp())
+
+    counters = {field: np.zeros(size, dtype=np.float64) for field in METRIC_FIELDS}
+    wait_sum = np.zeros(size, dtype=np.float64)
+
+    def flat_index(dept_names, timestamps):
+        depts = np.array([dept_index.get(d, -1) for d in dept_names], dtype=np.int64)
+        buckets = _bucket_index(np.array(timestamps, dtype=np.int64), start_ts, num_buckets)
+        valid = (depts >= 0) & (buckets >= 0)
+        return depts[valid] * num_buckets + buckets[valid], valid
+
+    # 1. 신규 등록 (queue_count, mean_wait)
+    rows = _stream(
+        Queue.objects.filter(created_at__gte=start, created_at__lt=end),
+        ('exam__department', 'created_at', 'estimated_wait_time'),
+    )
+    if rows:
+        idx, valid = flat_index([r[0] for r in rows], [r[1].timestamp() for r in rows])
+        counters['queue_count'] += np.bincount(idx, minlength=size)
+        wait_sum += np.bincount(idx, weights=np.array([r[2] for r in rows], dtype=np.float64)[valid], minlength=size)
+
+    # 2. 완료/노쇼 (updated_at 기준)
+    rows = _stream(
+        Queue.objects.filter(state__in=['completed', 'no_show'], updated_at__gte=start, updated_at__lt=end),
+        ('exam__department', 'updated_at', 'state'),
+    )
+    for state, field in (('completed', 'completed_count'), ('no_show', 'no_show_count')):
+        selected = [r for r in rows if r[2] == state]
+        if selected:
+            idx, _ = flat_index([r[0] for r in selected], [r[1].timestamp() for r in selected])
+            counters[field] += np.bincount(idx, minlength=size)
+
+    # 3. 호출 (called_at 기준)
+    rows = _stream(
+        Queue.objects.filter(state='called', called_at__gte=start, called_at__lt=end),
+        ('exam__department', 'called_at'),
+    )
+    if rows:
+        idx, _ = flat_index([r[0] for r in rows], [r[1].timestamp() for r in rows])
+        counters['called_count'] += np.bincount(idx, minlength=size)
+
+    # 4. 대기 구간이 겹치는 대기열 (waiting_count, priority_count) - 차분 배열로 구간 누적
+    # 지금 상태가 아니라 상태 로그로 대기 종료 시각을 구함 (이후 완료된 대기열도 과거 버킷에 포함)
+    # 대기를 마친 대기열은 그 뒤에 수정되었으므로 updated_at >= start 로 먼저 좁힘
+    rows = _stream(
+        Queue.objects.filter(created_at__lte=end).filter(
+            Q(state__in=WAITING_STATES) | Q(updated_at__gte=start)
+        ).annotate(
+            left_at=Coalesce(
+                Min('status_logs__created_at', filter=~Q(status_logs__new_state__in=WAITING_STATES)),
+                Case(When(state__in=WAITING_STATES, then=None), default=F('updated_at')),
+            )
+        ).filter(Q(left_at__isnull=True) | Q(left_at__gte=start)),
+        ('exam__department', 'created_at', 'left_at', 'priority'),
+    )
+    if rows:
+        end_ts = end.timestamp()
+        depts = np.array([dept_index.get(r[0], -1) for r in rows], dtype=np.int64)
+        created = np.array([r[1].timestamp() for r in rows], dtype=np.float64)
+        left = np.array([r[2].timestamp() if r[2] else end_ts for r in rows], dtype=np.float64)
+        # created_at <= 버킷 끝 & 대기 종료 >= 버킷 시작 인 버킷 범위 [first, last]
+        first = np.maximum(np.ceil((created - start_ts) / BUCKET_SECONDS).astype(np.int64) - 1, 0)
+        last = np.minimum(np.floor((left - start_ts) / BUCKET_SECONDS).astype(np.int64), num_buckets - 1)
+
+        masks = {
+            'waiting_count': np.ones(len(rows), dtype=bool),
+            'priority_count': np.array([r[3] in ('urgent', 'emergency') for r in rows]),
+        }
+        for field, mask in masks.items():
+            valid = mask & (depts >= 0) & (first <= last)
+            diff = np.zeros((len(departments), num_buckets + 1), dtype=np.int64)
+            np.add.at(diff, (depts[valid], first[valid]), 1)
+            np.add.at(diff, (depts[valid], last[valid] + 1), -1)
+            counters[field] += np.cumsum(diff, axis=1)[:, :num_buckets].ravel()
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_wait = np.where(counters['queue_count'] > 0, wait_sum / counters['queue_count'], np.nan)
+
+    buckets = []
+    for d, dept in enumerate(departments):
+        for b in range(num_buckets):
+            i = d * num_buckets + b
+            buckets.append(DepartmentFeatureBucket(
+                department=dept,
+                bucket_start=start + timedelta(seconds=b * BUCKET_SECONDS),
+                queue_count=int(counters['queue_count'][i]),
+                mean_wait=None if np.isnan(mean_wait[i]) else round(float(mean_wait[i]), 2),
+                waiting_count=int(counters['waiting_count'][i]),
+                priority_count=int(counters['priority_count'][i]),
+                called_count=int(counters['called_count'][i]),
+                completed_count=int(counters['completed_count'][i]),
+                no_show_count=int(counters['no_show_count'][i]),
+            ))
+    return buckets
+
+
+def refresh_feature_store(since=None, until=None):
+    """
+    닫힌 버킷까지 피처 스토어 증분 갱신
+    Args:
+        since: 이 시각부터 다시 집계 (없으면 마지막 버킷 - lookback, 비어 있으면 첫 Queue 부터)
+        until: 이 시각 이전의 닫힌 버킷까지 (기본: 현재)
+    Returns: 저장(갱신 포함)한 버킷 수
+    """
+    end = floor_bucket(until or timezone.now())
+
+    if since is None:
+        last_bucket = DepartmentFeatureBucket.objects.aggregate(last=Max('bucket_start'))['last']
+        if last_bucket is not None:
+            since = last_bucket - timedelta(minutes=BUCKET_MINUTES * (REFRESH_LOOKBACK_BUCKETS - 1))
+        else:
+            since = Queue.objects.aggregate(first=Min('created_at'))['first']
+            if since is None:
+                return 0
+    start = floor_bucket(since)
+
+    departments = sorted(set(Exam.objects.values_list('department', flat=True)))
+    if not departments or start >= end:
+        return 0
+
+    # MySQL 은 충돌 대상을 지정할 수 없음 - ON DUPLICATE KEY 가 uniq_department_feature_bucket 으로 갱신
+    if connection.features.supports_update_conflicts_with_target:
+        unique_fields = ['department', 'bucket_start']
+    else:
+        unique_fields = None
+
+    saved = 0
+    chunk_start = start
+    while chunk_start < end:
+        chunk_end = min(chunk_start + REFRESH_CHUNK, end)
+        buckets = _aggregate_range(chunk_start, chunk_end, departments)
+        with transaction.atomic():
+            DepartmentFeatureBucket.objects.bulk_create(
+                buckets,
+                batch_size=1000,
+                update_conflicts=True,
+                unique_fields=unique_fields,
+                update_fields=[*METRIC_FIELDS, 'updated_at'],
+            )
+        saved += len(buckets)
+        chunk_start = chunk_end
+
+    logger.info(f"Feature store refreshed - {start:%Y-%m-%d %H:%M} ~ {end:%Y-%m-%d %H:%M}, {saved} buckets")
+    return saved
+
+
+def get_recent_buckets(department, count=12, now=None, padding=2):
+    """
+    추론용 최근 count 개 닫힌 버킷 (과거 → 현재 순)
+    빈 버킷 대체값 계산용으로 앞쪽 padding 개를 더 읽어 (padding 버킷, 본 버킷) 으로 반환
+    스토어가 해당 구간을 아직 채우지 않았으면 None
+    """
+    end = floor_bucket(now or timezone.now())
+    start = end - timedelta(minutes=BUCKET_MINUTES * (count + padding))
+
+    rows = list(
+        DepartmentFeatureBucket.objects.filter(
+            department=department, bucket_start__gte=start, bucket_start__lt=end
+        ).order_by('bucket_start').values('bucket_start', *METRIC_FIELDS)
+    )
+    if len(rows) < count or rows[-1]['bucket_start'] != end - timedelta(minutes=BUCKET_MINUTES):
+        return None
+    return rows[:-count], rows[-count:]
+
+
+def load_feature_frame(start, end, departments=None):
+    """
+    학습용 구간 조회 (Queue 조회 없음)
+    Returns: pandas.DataFrame [department, bucket_start, 지표...]
+    """
+    import pandas as pd
+
+    queryset = DepartmentFeatureBucket.objects.filter(bucket_start__gte=start, bucket_start__lt=end)
+    if departments:
+        queryset = queryset.filter(department__in=departments)
+
+    rows = queryset.order_by('department', 'bucket_start').values_list(
+        'department', 'bucket_start', *METRIC_FIELDS
+    ).iterator(chunk_size=QUERY_CHUNK_SIZE)
+    return pd.DataFrame.from_records(rows, columns=['department', 'bucket_start', *METRIC_FIELDS])
@@ -8,6 +8,7 @@ from .hybrid_metrics_collector import HybridMetricsCollector
 from django.utils import timezone
 import logging
 import math
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
@@ -53,82 +54,10 @@ class HybridCongestionAlgorithm:
             metrics = HybridMetricsCollector.get_real_time_queue_metrics(department)
             transition_rates = HybridMetricsCollector.get_transition_rates(department)
 
-            # 각 규칙별 보정 계수 계산
-            corrections = {}
-            applied_rules = []
-
-            # RULE 1: Queue Length Adjustment
-            queue_factor = cls._rule_queue_length(lstm_prediction, metrics)
-            if queue_factor != 1.0:
-                corrections['queue_length'] = queue_factor
-                applied_rules.append('queue_length')
-
-            # RULE 2: Priority Weighting
-            priority_factor = cls._rule_priority_weighting(metrics)
-            if priority_factor != 1.0:
-                corrections['priority'] = priority_factor
-                applied_rules.append('priority')
-
-            # RULE 3: Transition Rate
-            transition_factor = cls._rule_transition_rate(transition_rates)
-            if transition_factor != 1.0:
-                corrections['transition_rate'] = transition_factor
-                applied_rules.append('transition_rate')
-
-            # RULE 4: Day of Week
-            day_factor = cls._rule_day_of_week(current_time)
-            if day_factor != 1.0:
-                corrections['day_of_week'] = day_factor
-                applied_rules.append('day_of_week')
-
-            # RULE 5: No-Show Impact
-            no_show_factor = cls._rule_no_show(metrics)
-            if no_show_factor != 1.0:
-                corrections['no_show'] = no_show_factor
-                applied_rules.append('no_show')
-
-            # RULE 6: Completion Velocity
-            velocity_factor = cls._rule_completion_velocity(metrics)
-            if velocity_factor != 1.0:
-                corrections['completion_velocity'] = velocity_factor
-                applied_rules.append('completion_velocity')
-
-            # RULE 7: Current Baseline Adjustment (현재 대기시간 기준 보정)
-            if current_wait_time is not None and current_wait_time > 0:
-                baseline_factor = cls._rule_current_baseline_adjustment(lstm_prediction, current_wait_time)
-                if baseline_factor != 1.0:
-                    corrections['current_baseline'] = baseline_factor
-                    applied_rules.append('current_baseline')
-                    logger.info(f"[Rule7-ACTIVE] {department}: current={current_wait_time:.1f}min, lstm={lstm_prediction:.1f}min, factor={baseline_factor:.2f}")
-
-            # 가중 평균으로 최종 보정 계수 계산
-            final_factor = cls._calculate_weighted_factor(corrections)
-
-            # 최종 예측값 계산
-            corrected_wait_time = lstm_prediction * final_factor
-
-            # 신뢰도 계산
-            confidence = cls._calculate_confidence(
-                lstm_prediction,
-                corrected_wait_time,
-                metrics,
-                len(applied_rules)
+            return cls._apply_rules(
+                lstm_prediction, metrics, transition_rates, current_time, current_wait_time, department
             )
 
-            # 범위 제한 (5분 ~ 120분)
-            corrected_wait_time = max(5, min(corrected_wait_time, 120))
-
-            result = {
-                'corrected_wait_time': round(corrected_wait_time, 1),
-                'confidence': round(confidence, 2),
-                'corrections': corrections,
-                'applied_rules': applied_rules,
-                'lstm_base': round(lstm_prediction, 1),
-                'correction_factor': round(final_factor, 2)
-            }
-
-            return result
-
         except Exception as e:
             logger.error(f"Error in hybrid correction for {department}: {e}")
             # 오류 시 원래 LSTM 예측 반환
@@ -141,6 +70,86 @@ class HybridCongestionAlgorithm:
                 'correction_factor': 1.0
             }
 
+    @classmethod
+    def _apply_rules(cls, lstm_prediction, metrics, transition_rates, current_time,
+                     current_wait_time=None, department=None):
+        """수집된 메트릭으로 7가지 규칙 적용 (DB 조회 없음)"""
+        # 각 규칙별 보정 계수 계산
+        corrections = {}
+        applied_rules = []
+
+        # RULE 1: Queue Length Adjustment
+        queue_factor = cls._rule_queue_length(lstm_prediction, metrics)
+        if queue_factor != 1.0:
+            corrections['queue_length'] = queue_factor
+            applied_rules.append('queue_length')
+
+        # RULE 2: Priority Weighting
+        priority_factor = cls._rule_priority_weighting(metrics)
+        if priority_factor != 1.0:
+            corrections['priority'] = priority_factor
+            applied_rules.append('priority')
+
+        # RULE 3: Transition Rate
+        transition_factor = cls._rule_transition_rate(transition_rates)
+        if transition_factor != 1.0:
+            corrections['transition_rate'] = transition_factor
+            applied_rules.append('transition_rate')
+
+        # RULE 4: Day of Week
+        day_factor = cls._rule_day_of_week(current_time)
+        if day_factor != 1.0:
+            corrections['day_of_week'] = day_factor
+            applied_rules.append('day_of_week')
+
+        # RULE 5: No-Show Impact
+        no_show_factor = cls._rule_no_show(metrics)
+        if no_show_factor != 1.0:
+            corrections['no_show'] = no_show_factor
+            applied_rules.append('no_show')
+
+        # RULE 6: Completion Velocity
+        velocity_factor = cls._rule_completion_velocity(metrics)
+        if velocity_factor != 1.0:
+            corrections['completion_velocity'] = velocity_factor
+            applied_rules.append('completion_velocity')
+
+        # RULE 7: Current Baseline Adjustment (현재 대기시간 기준 보정)
+        if current_wait_time is not None and current_wait_time > 0:
+            baseline_factor = cls._rule_current_baseline_adjustment(lstm_prediction, current_wait_time)
+            if baseline_factor != 1.0:
+                corrections['current_baseline'] = baseline_factor
+                applied_rules.append('current_baseline')
+                logger.info(f"[Rule7-ACTIVE] {department}: current={current_wait_time:.1f}min, lstm={lstm_prediction:.1f}min, factor={baseline_factor:.2f}")
+
+        # 가중 평균으로 최종 보정 계수 계산
+        final_factor = cls._calculate_weighted_factor(corrections)
+
+        # 최종 예측값 계산
+        corrected_wait_time = lstm_prediction * final_factor
+
+        # 신뢰도 계산
+        confidence = cls._calculate_confidence(
+            lstm_prediction,
+            corrected_wait_time,
+            metrics,
+            len(applied_rules)
+        )
+
+        # 범위 제한 (5분 ~ 120분)
+        corrected_wait_time = max(5, min(corrected_wait_time, 120))
+
+        result = {
+            'corrected_wait_time': round(corrected_wait_time, 1),
+            'confidence': round(confidence, 2),
+            'corrections': corrections,
+            'applied_rules': applied_rules,
+            'lstm_base': round(lstm_prediction, 1),
+            'correction_factor': round(final_factor, 2)
+        }
+
+        return result
+
     @staticmethod
     def _rule_queue_length(lstm_prediction, metrics):
         """
@@ -439,3 +448,185 @@ class HybridCongestionAlgorithm:
 
         # 범위 제한 (0.5 ~ 0.95)
         return max(0.5, min(0.95, base_confidence))
+
+    # ------------------------------------------------------------------
+    # 배치(벡터) 버전: 전 부서를 한 번에 보정
+    # ------------------------------------------------------------------
+    # 규칙 순서 = applied_rules 비트마스크의 비트 번호 (스칼라 경로의 적용 순서와 동일)
+    RULE_ORDER = (
+        'queue_length', 'priority', 'transition_rate', 'day_of_week',
+        'no_show', 'completion_velocity', 'current_baseline',
+    )
+
+    # 부서 x 메트릭 행렬의 열 순서
+    METRIC_COLUMNS = (
+        'waiting_count', 'avg_exam_duration', 'recent_avg_duration',
+        'priority_total', 'priority_urgent', 'priority_emergency',
+        'recent_no_shows', 'total_active_patients',
+        'is_busier_than_expected', 'is_slower_than_expected',
+    )
+
+    @classmethod
+    def build_metric_matrix(cls, metrics_list, transition_rates_list):
+        """부서별 메트릭/전환 속도 dict 리스트 → (부서 수, len(METRIC_COLUMNS)) 행렬"""
+        rows = []
+        for metrics, rates in zip(metrics_list, transition_rates_list):
+            priority = metrics['priority_distribution']
+            rows.append([
+                metrics['waiting_count'],
+                metrics['avg_exam_duration'],
+                metrics['recent_avg_duration'],
+                priority['total'],
+                priority['urgent'],
+                priority['emergency'],
+                metrics['recent_no_shows'],
+                metrics['total_active_patients'],
+                float(bool(rates['is_busier_than_expected'])),
+                float(bool(rates['is_slower_than_expected'])),
+            ])
+        return np.array(rows, dtype=np.float64).reshape(-1, len(cls.METRIC_COLUMNS))
+
+    @classmethod
+    def apply_corrections_batch(cls, lstm_predictions, metric_matrix, current_time=None, current_wait_times=None):
+        """
+        apply_all_corrections 의 배치 버전 (스칼라 경로와 같은 연산 순서로 동일한 결과)
+
+        Args:
+            lstm_predictions: (N,) LSTM 예측값 (분)
+            metric_matrix: (N, len(METRIC_COLUMNS)) build_metric_matrix() 결과
+            current_time (datetime): 기준 시간 (기본값: 현재)
+            current_wait_times: (N,) 현재 대기시간, 없는 부서는 NaN (Rule 7 미적용)
+
+        Returns:
+            dict: {
+                'corrected_wait_time': (N,) 보정값 (5~120분, 반올림 전),
+                'confidence': (N,) 신뢰도 (반올림 전),
+                'correction_factor': (N,) 최종 보정 계수,
+                'factors': (N, 7) 규칙별 보정 계수 (RULE_ORDER 순),
+                'rule_mask': (N,) 적용 규칙 비트마스크 (bit i = RULE_ORDER[i]),
+                'lstm_base': (N,) 입력 LSTM 예측값
+            }
+        """
+        if current_time is None:
+            current_time = timezone.now()
+
+        lstm = np.asarray(lstm_predictions, dtype=np.float64)
+        m = {name: metric_matrix[:, i] for i, name in enumerate(cls.METRIC_COLUMNS)}
+        if current_wait_times is None:
+            current_wait = np.full(lstm.shape, np.nan)
+        else:
+            current_wait = np.asarray(current_wait_times, dtype=np.float64)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # RULE 1: Queue Length
+            queue = np.where(
+                m['waiting_count'] == 0, 0.7,
+                np.where(lstm > 0, np.clip(m['waiting_count'] * m['avg_exam_duration'] / lstm, 0.7, 1.5), 1.0)
+            )
+
+            # RULE 2: Priority Weighting
+            total = m['priority_total']
+            impact = m['priority_urgent'] / total * 0.1 + m['priority_emergency'] / total * 0.15
+            priority = np.where(total == 0, 1.0, np.clip(1.0 + impact, 0.9, 1.2))
+
+            # RULE 3: Transition Rate
+            transition = np.where(
+                m['is_busier_than_expected'] > 0, 0.85,
+                np.where(m['is_slower_than_expected'] > 0, 1.25, 1.0)
+            )
+
+            # RULE 4: Day of Week (전 부서 공통)
+            day = np.full(lstm.shape, cls._rule_day_of_week(current_time), dtype=np.float64)
+
+            # RULE 5: No-Show
+            active = m['total_active_patients']
+            no_show_rate = m['recent_no_shows'] / np.maximum(active + m['recent_no_shows'], 1)
+            no_show = np.where(active == 0, 1.0, np.clip(1.0 - no_show_rate * 0.2, 0.8, 1.0))
+
+            # RULE 6: Completion Velocity
+            velocity = np.where(
+                m['avg_exam_duration'] == 0, 1.0,
+                np.clip(m['recent_avg_duration'] / m['avg_exam_duration'], 0.75, 1.25)
+            )
+
+            # RULE 7: Current Baseline (현재 대기시간이 있을 때만 평가)
+            ratio = current_wait / lstm
+            baseline = np.where(
+                ratio > 2.0, np.minimum(current_wait * 0.90 / lstm, 5.0),
+                np.where(
+                    ratio < 0.5, np.maximum(current_wait * 1.2 / lstm, 0.4),
+                    np.clip(current_wait * 0.9 / lstm, 0.7, 1.3)
+                )
+            )
+            baseline = np.where(lstm <= 0, 1.0, baseline)
+            baseline_evaluated = current_wait > 0  # NaN 은 False
+
+        factors = np.stack([queue, priority, transition, day, no_show, velocity, baseline], axis=1)
+        applied = factors != 1.0
+        applied[:, 6] &= baseline_evaluated
+        factors[:, 6] = np.where(baseline_evaluated, factors[:, 6], 1.0)
+
+        final_factor = cls._weighted_factor_batch(factors, applied)
+        corrected = lstm * final_factor
+        num_rules = applied.sum(axis=1)
+        confidence = cls._confidence_batch(lstm, corrected, m['total_active_patients'], num_rules)
+
+        return {
+            'corrected_wait_time': np.maximum(5, np.minimum(corrected, 120)),
+            'confidence': confidence,
+            'correction_factor': final_factor,
+            'factors': factors,
+            'rule_mask': (applied * (1 << np.arange(len(cls.RULE_ORDER)))).sum(axis=1),
+            'lstm_base': lstm,
+        }
+
+    @classmethod
+    def _weighted_factor_batch(cls, factors, applied):
+        """
+        _calculate_weighted_factor 의 배치 버전
+        add.accumulate 는 왼쪽부터 순차 누적하므로 스칼라 경로와 같은 부동소수점 결과
+        """
+        weights = np.array([cls.RULE_WEIGHTS.get(rule, 0.1) for rule in cls.RULE_ORDER[:6]])
+        others = applied[:, :6]
+        weighted_sum = np.add.accumulate(np.where(others, (factors[:, :6] - 1.0) * weights, 0.0), axis=1)[:, -1]
+        total_weight = np.add.accumulate(np.where(others, weights, 0.0), axis=1)[:, -1]
+        has_others = total_weight > 0
+        other_factor = 1.0 + np.divide(weighted_sum, total_weight, out=np.zeros_like(weighted_sum), where=has_others)
+
+        # Rule 7 (85%) + 다른 규칙들 (15%) 혼합, Rule 7 만 있으면 그대로
+        has_baseline = applied[:, 6]
+        final = np.clip(np.where(has_baseline, factors[:, 6] * 0.85 + other_factor * 0.15, other_factor), 0.4, 5.0)
+        final = np.where(has_baseline & ~has_others, factors[:, 6], final)
+        return np.where(applied.any(axis=1), final, 1.0)
+
+    @staticmethod
+    def _confidence_batch(lstm, corrected, total_active, num_rules):
+        """_calculate_confidence 의 배치 버전"""
+        confidence = np.full(lstm.shape, 0.75)
+        confidence = np.where(total_active > 10, confidence + 0.10,
+                              np.where(total_active == 0, confidence - 0.15, confidence))
+        confidence = np.where(num_rules >= 4, confidence + 0.08,
+                              np.where(num_rules == 0, 0.70, confidence))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            deviation = np.abs(corrected - lstm) / lstm
+        confidence = np.where((lstm > 0) & (deviation > 0.5), confidence - 0.05, confidence)
+        return np.clip(confidence, 0.5, 0.95)
+
+    @classmethod
+    def batch_to_results(cls, batch):
+        """apply_corrections_batch 결과 → apply_all_corrections 와 같은 형식의 dict 리스트"""
+        results = []
+        for i in range(len(batch['lstm_base'])):
+            mask = int(batch['rule_mask'][i])
+            applied_rules = [rule for bit, rule in enumerate(cls.RULE_ORDER) if mask & (1 << bit)]
+            results.append({
+                'corrected_wait_time': round(float(batch['corrected_wait_time'][i]), 1),
+                'confidence': round(float(batch['confidence'][i]), 2),
+                'corrections': {
+                    rule: float(batch['factors'][i, cls.RULE_ORDER.index(rule)]) for rule in applied_rules
+                },
+                'applied_rules': applied_rules,
+                'lstm_base': round(float(batch['lstm_base'][i]), 1),
+                'correction_factor': round(float(batch['correction_factor'][i]), 2),
+            })
+        return results
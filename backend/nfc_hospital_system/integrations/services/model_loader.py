@@ -1,14 +1,152 @@
-import tensorflow as tf
 import numpy as np
 import logging
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+from .model_registry import ModelRegistry
+from .numpy_lstm import NumpyLSTMModel
+
+try:
+    import tensorflow as tf
+except ImportError:
+    tf = None
+
 logger = logging.getLogger(__name__)
 
+# 추론 백엔드 선택: auto(기본) | tflite | numpy
+# auto: TensorFlow 가 있고 TFLite 모델이 로드되면 tflite, 아니면 numpy
+BACKEND_ENV = 'LSTM_INFERENCE_BACKEND'
+
+# 레지스트리 변경 확인 주기 (초) - 예측 호출 때만 확인
+RELOAD_CHECK_SECONDS = 10
+
+
+class LoadedModel:
+    """레지스트리 버전 1개의 로드된 추론 백엔드 (핫 리로드 시 통째로 교체되는 단위)"""
+
+    def __init__(self, version, backend, input_details, output_details,
+                 interpreter=None, engine=None, metadata=None, spec=None):
+        self.version = version
+        self.backend = backend
+        self.input_details = input_details
+        self.output_details = output_details
+        self.interpreter = interpreter
+        self.engine = engine
+        self.metadata = metadata or {}
+        self.spec = spec or {}
+        # TFLite 인터프리터는 스레드 안전하지 않음 (섀도 스레드와 공유 방지)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, registry, spec, requested='auto'):
+        """스펙의 아티팩트로 백엔드 로드 (TFLite → NumPy 순), 실패 시 None"""
+        model = None
+        if requested in ('auto', 'tflite'):
+            model = cls._load_tflite(registry, spec)
+        if model is None and requested in ('auto', 'numpy'):
+            model = cls._load_numpy(registry, spec)
+        return model
+
+    @classmethod
+    def _load_tflite(cls, registry, spec):
+        """TFLite 모델 로드"""
+        if tf is None:
+            logger.info("TensorFlow not installed - skipping TFLite backend")
+            return None
+
+        model_path = registry.artifact_path(spec, 'tflite')
+        if model_path is None:
+            logger.info(f"[{spec['version']}] TFLite artifact not found")
+            return None
+
+        try:
+            interpreter = tf.lite.Interpreter(model_path=model_path)
+            interpreter.allocate_tensors()
+        except Exception as e:
+            logger.error(f"❌ Error loading LSTM TFLite model: {e}")
+            return None
+
+        model = cls(
+            spec['version'], 'tflite',
+            interpreter.get_input_details(), interpreter.get_output_details(),
+            interpreter=interpreter, metadata=spec.get('metadata'), spec=spec,
+        )
+
+        # 모델 정보 로깅
+        logger.info(f"✅ LSTM TFLite model {spec['version']} loaded from: {model_path}")
+        logger.info(f"Input shape: {model.input_details[0]['shape']}")
+        logger.info(f"Output shape: {model.output_details[0]['shape']}")
+        return model
+
+    @classmethod
+    def _load_numpy(cls, registry, spec):
+        """NumPy 엔진 로드 (.npz 우선, 없으면 .h5 에서 직접 읽음)"""
+        npz_path = registry.artifact_path(spec, 'npz')
+        h5_path = registry.artifact_path(spec, 'h5')
+
+        try:
+            if npz_path:
+                model_path = npz_path
+                engine = NumpyLSTMModel.from_npz(npz_path)
+            elif h5_path:
+                model_path = h5_path
+                engine = NumpyLSTMModel.from_h5(h5_path)
+            else:
+                logger.error(f"[{spec['version']}] NumPy model artifact (npz/h5) not found")
+                return None
+        except Exception as e:
+            logger.error(f"❌ Error loading LSTM NumPy model: {e}")
+            return None
+
+        # TFLite 와 같은 형식으로 입출력 정보 제공
+        output_units = engine.layers[-1]['weights'][-1].shape[0]
+        model = cls(
+            spec['version'], 'numpy',
+            [{'shape': np.array([1, *engine.input_shape]), 'dtype': np.float32}],
+            [{'shape': np.array([1, output_units]), 'dtype': np.float32}],
+            engine=engine, metadata=spec.get('metadata'), spec=spec,
+        )
+
+        logger.info(f"✅ LSTM NumPy engine {spec['version']} loaded from: {model_path}")
+        logger.info(f"Input shape: {model.input_details[0]['shape']}")
+        return model
+
+    def infer(self, batch):
+        """(N, 12, 11) 배치 → (N, 1) 원시 출력"""
+        if self.backend == 'numpy':
+            return self.engine.predict(batch)
+
+        # TFLite 모델은 배치 크기 1로 고정되어 있어 샘플별로 실행
+        with self._lock:
+            outputs = []
+            for sample in batch:
+                self.interpreter.set_tensor(self.input_details[0]['index'], sample[np.newaxis, ...])
+                self.interpreter.invoke()
+                outputs.append(self.interpreter.get_tensor(self.output_details[0]['index'])[0])
+        return np.array(outputs)
+
+    def prepare_batch(self, input_data):
+        """입력을 (N, timesteps, features) float32 배치로 변환"""
+        expected_shape = self.input_details[0]['shape']
+        input_data = np.asarray(input_data, dtype=np.float32)
+        logger.debug(f"Expected shape: {expected_shape}, Input shape: {input_data.shape}")
+
+        if input_data.ndim == 3 and input_data.shape[1:] == tuple(expected_shape[1:]):
+            return input_data
+
+        logger.warning(f"Input shape mismatch. Expected {expected_shape}, got {input_data.shape}. Attempting to reshape.")
+        return np.reshape(input_data, (-1, *expected_shape[1:]))
+
 
 class LSTMPredictor:
-    """싱글톤 패턴으로 구현된 LSTM 모델 예측기"""
+    """
+    싱글톤 패턴으로 구현된 LSTM 모델 예측기
+    모델은 레지스트리(ml_models/registry.json)의 활성 버전을 사용하며,
+    레지스트리가 바뀌면 다음 예측 호출 때 새 모델을 로드한 뒤 참조만 교체한다.
+    """
     _instance = None
 
     def __new__(cls):
@@ -17,87 +155,250 @@ class LSTMPredictor:
             cls._instance.initialize()
         return cls._instance
 
-    def initialize(self):
-        """TFLite 모델 초기화"""
-        try:
-            # 모델 경로 직접 설정 (settings 의존 제거)
-            base_dir = Path(__file__).resolve().parent.parent.parent
-            model_path = os.path.join(base_dir, 'ml_models', 'hospital_lstm.tflite')
+    def initialize(self, model_dir=None):
+        """레지스트리에서 활성/섀도 모델 로드"""
+        # 모델 경로 직접 설정 (settings 의존 제거)
+        base_dir = Path(__file__).resolve().parent.parent.parent
+        self.model_dir = model_dir or os.path.join(base_dir, 'ml_models')
+        self.registry = ModelRegistry(self.model_dir)
+
+        self._model = None
+        self._shadow = None
+        self._token = None
+        self._last_check = 0.0
+        self._reload_lock = threading.Lock()
+
+        # 섀도 채점은 요청 경로 밖 단일 스레드에서 수행 (이전 작업이 진행 중이면 건너뜀)
+        self.shadow_async = True
+        self._shadow_executor = None
+        self._shadow_future = None
+
+        self.reload(force=True)
+
+        if self._model is None:
+            logger.error(f"❌ No LSTM inference backend available (requested: {os.environ.get(BACKEND_ENV, 'auto')})")
+
+    # 기존 속성 호환 (활성 모델 위임)
+    @property
+    def backend(self):
+        return self._model.backend if self._model else None
 
-            if not os.path.exists(model_path):
-                logger.error(f"Model file not found at: {model_path}")
-                self.interpreter = None
-                return
+    @property
+    def version(self):
+        return self._model.version if self._model else None
 
-            self.interpreter = tf.lite.Interpreter(model_path=model_path)
-            self.interpreter.allocate_tensors()
-            self.input_details = self.interpreter.get_input_details()
-            self.output_details = self.interpreter.get_output_details()
+    @property
+    def metadata(self):
+        return self._model.metadata if self._model else {}
 
-            # 모델 정보 로깅
-            logger.info(f"✅ LSTM TFLite model loaded from: {model_path}")
-            logger.info(f"Input shape: {self.input_details[0]['shape']}")
-            logger.info(f"Output shape: {self.output_details[0]['shape']}")
+    @property
+    def shadow_version(self):
+        return self._shadow.version if self._shadow else None
 
+    @property
+    def engine(self):
+        return self._model.engine if self._model else None
+
+    @property
+    def interpreter(self):
+        return self._model.interpreter if self._model else None
+
+    @property
+    def input_details(self):
+        return self._model.input_details if self._model else None
+
+    @property
+    def output_details(self):
+        return self._model.output_details if self._model else None
+
+    # ------------------------------------------------------------------
+    # 핫 리로드
+    # ------------------------------------------------------------------
+    def reload(self, force=False):
+        """
+        레지스트리가 바뀌었으면 활성/섀도 모델을 다시 로드
+        새 모델 로드가 끝난 뒤 참조만 교체하므로 진행 중인 예측은 이전 모델로 끝난다.
+        활성 버전 로드에 실패하면 기존 모델을 유지한다.
+        Returns: 교체 여부
+        """
+        token = self.registry.version_token()
+        if not force and token == self._token:
+            return False
+
+        with self._reload_lock:
+            if not force and token == self._token:
+                return False
+
+            manifest = self.registry.read()
+            requested = os.environ.get(BACKEND_ENV, 'auto')
+            active = self._load_version(manifest.get('active'), manifest, self._model, requested)
+            shadow = self._load_version(manifest.get('shadow'), manifest, self._shadow, requested)
+
+            if active is None and self._model is not None:
+                logger.error(f"❌ Model {manifest.get('active')} failed to load - keeping {self._model.version}")
+                active = self._model
+
+            previous = self.version
+            self._model, self._shadow = active, shadow
+            self._token = token
+
+        if previous != self.version:
+            logger.info(f"🔄 LSTM model swapped: {previous} → {self.version} (shadow: {self.shadow_version})")
+        return True
+
+    def _load_version(self, version, manifest, current, requested):
+        """버전 로드 - 이미 같은 스펙으로 로드된 모델이면 재사용"""
+        if not version:
+            return None
+        spec = self.registry.get(version, manifest)
+        if spec is None:
+            logger.error(f"Model version not registered: {version}")
+            return None
+        if current is not None and current.version == version and current.spec == spec:
+            return current
+        return LoadedModel.load(self.registry, spec, requested)
+
+    def _maybe_reload(self):
+        """RELOAD_CHECK_SECONDS 마다 레지스트리 변경 확인"""
+        now = time.monotonic()
+        if now - self._last_check < RELOAD_CHECK_SECONDS:
+            return
+        self._last_check = now
+        try:
+            self.reload()
         except Exception as e:
-            self.interpreter = None
-            logger.error(f"❌ Error loading LSTM TFLite model: {e}")
+            logger.error(f"❌ Model registry reload failed: {e}")
+
+    # ------------------------------------------------------------------
+    # 예측
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _postprocess(output):
+        """원시 출력 1개를 대기시간/혼잡도로 변환"""
+        # 새 모델은 이미 분 단위로 예측 (단일 출력) - 30분 후 예측값
+        predicted_wait_time = float(output[0])
+        # 모델이 정규화된 값을 반환할 수 있으므로 스케일 확인
+        if predicted_wait_time <= 1.0:  # 0~1로 정규화된 경우
+            predicted_wait_time = int(predicted_wait_time * 60)  # 최대 60분으로 스케일
+        else:
+            predicted_wait_time = int(predicted_wait_time)  # 이미 분 단위
+
+        # 혼잡도 계산 (0~1로 정규화)
+        congestion = min(predicted_wait_time / 60.0, 1.0)  # 60분을 최대로 가정
+
+        logger.debug(f"Predicted wait time: {predicted_wait_time} minutes, congestion: {congestion}")
+
+        return {
+            'predicted_wait_time': max(0, min(predicted_wait_time, 120)),  # 0~120분 범위 제한
+            'congestion_level': float(np.clip(congestion, 0, 1))
+        }
 
     def predict(self, input_data):
         """입력 데이터로부터 대기 시간 예측"""
-        if not self.interpreter:
+        self._maybe_reload()
+        model = self._model
+        if model is None:
             logger.error("Model not loaded, returning error")
             return {'error': 'Model not loaded'}
 
         try:
-            # 입력 데이터 형태와 타입 확인 및 변환
-            expected_shape = self.input_details[0]['shape']
-            logger.debug(f"Expected shape: {expected_shape}, Input shape: {input_data.shape}")
-
-            if list(input_data.shape) != list(expected_shape):
-                # 배치 크기가 1이 아닐 경우 조정
-                if len(expected_shape) == 3 and input_data.shape[1:] == tuple(expected_shape[1:]):
-                    pass  # OK
-                else:
-                    logger.warning(f"Input shape mismatch. Expected {expected_shape}, got {input_data.shape}. Attempting to reshape.")
-                    input_data = np.reshape(input_data, expected_shape)
-
-            input_data = np.float32(input_data)
-            self.interpreter.set_tensor(self.input_details[0]['index'], input_data)
-            self.interpreter.invoke()
-            output = self.interpreter.get_tensor(self.output_details[0]['index'])
-
+            output = model.infer(model.prepare_batch(input_data)[:1])
             logger.debug(f"Raw model output: {output}")
 
-            # 새 모델은 이미 분 단위로 예측 (단일 출력)
-            # output shape이 (1, 1)인 경우 - 30분 후 예측값
-            if output.shape == (1, 1):
-                # 단일 출력 모델 - 직접 대기시간 예측
-                predicted_wait_time = float(output[0][0])
-                # 모델이 정규화된 값을 반환할 수 있으므로 스케일 확인
-                if predicted_wait_time <= 1.0:  # 0~1로 정규화된 경우
-                    predicted_wait_time = int(predicted_wait_time * 60)  # 최대 60분으로 스케일
-                else:
-                    predicted_wait_time = int(predicted_wait_time)  # 이미 분 단위
-            else:
+            if output.shape != (1, 1):
                 # 예상치 못한 출력 형태
                 logger.warning(f"Unexpected output shape: {output.shape}")
-                predicted_wait_time = 0
-
-            # 혼잡도 계산 (0~1로 정규화)
-            congestion = min(predicted_wait_time / 60.0, 1.0)  # 60분을 최대로 가정
+                return {'predicted_wait_time': 0, 'congestion_level': 0.0}
 
-            logger.debug(f"Predicted wait time: {predicted_wait_time} minutes, congestion: {congestion}")
-
-            return {
-                'predicted_wait_time': max(0, min(predicted_wait_time, 120)),  # 0~120분 범위 제한
-                'congestion_level': float(np.clip(congestion, 0, 1))
-            }
+            return self._postprocess(output[0])
 
         except Exception as e:
             logger.error(f"❌ Error during prediction: {e}", exc_info=True)
             return {'error': str(e)}
 
+    def predict_batch(self, inputs):
+        """
+        여러 부서 입력을 한 번에 예측
+        Args: inputs (N, 12, 11)
+        Returns: 입력 순서대로 predict() 와 같은 형식의 dict 리스트
+        """
+        self._maybe_reload()
+        model, shadow = self._model, self._shadow  # 교체 중에도 이번 호출은 같은 모델 사용
+        if model is None:
+            logger.error("Model not loaded, returning error")
+            return [{'error': 'Model not loaded'} for _ in range(len(inputs))]
+
+        try:
+            batch = model.prepare_batch(inputs)
+            started = time.perf_counter()
+            outputs = model.infer(batch)
+            latency_ms = (time.perf_counter() - started) * 1000
+            results = [self._postprocess(output) for output in outputs]
+        except Exception as e:
+            logger.error(f"❌ Error during batch prediction: {e}", exc_info=True)
+            return [{'error': str(e)} for _ in range(len(inputs))]
+
+        if shadow is not None:
+            self._submit_shadow(model, shadow, batch, results, latency_ms)
+        return results
+
+    # ------------------------------------------------------------------
+    # 섀도 채점
+    # ------------------------------------------------------------------
+    def _submit_shadow(self, model, shadow, batch, results, latency_ms):
+        """섀도 모델 채점을 요청 경로 밖에서 실행"""
+        if not self.shadow_async:
+            score_shadow(model, shadow, batch, results, latency_ms)
+            return
+
+        if self._shadow_future is not None and not self._shadow_future.done():
+            logger.debug("[Shadow] previous scoring still running - skipped")
+            return
+        if self._shadow_executor is None:
+            self._shadow_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='lstm-shadow')
+        self._shadow_future = self._shadow_executor.submit(
+            score_shadow, model, shadow, batch, results, latency_ms, True
+        )
+
+
+def score_shadow(model, shadow, batch, results, latency_ms, close_connection=False):
+    """
+    같은 배치를 섀도 모델로 예측해 활성 모델과의 차이를 ModelShadowScore 에 저장
+    (결과는 응답에 사용하지 않음)
+    """
+    from django.db import close_old_connections
+    from ..models import ModelShadowScore
+
+    try:
+        started = time.perf_counter()
+        shadow_outputs = shadow.infer(shadow.prepare_batch(batch))
+        shadow_latency_ms = (time.perf_counter() - started) * 1000
+
+        active_waits = np.array([r['predicted_wait_time'] for r in results], dtype=np.float64)
+        shadow_waits = np.array(
+            [LSTMPredictor._postprocess(output)['predicted_wait_time'] for output in shadow_outputs],
+            dtype=np.float64,
+        )
+        diff = np.abs(active_waits - shadow_waits)
+
+        return ModelShadowScore.objects.create(
+            active_version=model.version,
+            shadow_version=shadow.version,
+            sample_count=len(diff),
+            mean_abs_diff=round(float(diff.mean()), 2),
+            max_abs_diff=round(float(diff.max()), 2),
+            mean_active_wait=round(float(active_waits.mean()), 2),
+            mean_shadow_wait=round(float(shadow_waits.mean()), 2),
+            active_latency_ms=round(latency_ms, 3),
+            shadow_latency_ms=round(shadow_latency_ms, 3),
+        )
+    except Exception as e:
+        logger.error(f"❌ Shadow scoring failed ({shadow.version}): {e}")
+        return None
+    finally:
+        if close_connection:
+            close_old_connections()
+
 
 # 싱글톤 인스턴스 생성
-predictor = LSTMPredictor()
\ No newline at end of file
+predictor = LSTMPredictor()
@@ -0,0 +1,187 @@
+"""
+LSTM 모델 사후 양자화 (post-training quantization) 및 비교 리포트
+
+NumpyLSTMModel 가중치로 배치 크기 1 고정 Keras 모델을 만들어 TFLite 기본 연산만으로 변환한다.
+(Select TF ops 없이 변환되므로 Flex delegate 가 없는 런타임에서도 로드된다)
+
+- float   : 양자화 없음 (비교 기준)
+- dynamic : 가중치 int8, 활성값 float (동적 범위 양자화)
+- float16 : 가중치 float16
+- int8    : 가중치/활성값 int8 (대표 데이터셋으로 범위 보정, 입출력은 float32 유지)
+            fused LSTM 연산의 int8 보정이 TF 2.21 에서 비정상 종료되어 LSTM 을 펼쳐(unroll) 변환
+
+리포트 항목: 파일 크기, 단건/부서 배치 추론 지연시간, MAE(분), float 대비 최대 출력 차이
+"""
+
+import json
+import logging
+import os
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+VARIANTS = ('float', 'dynamic', 'float16', 'int8')
+REPORT_FILE = 'quantization_report.json'
+
+# 추천 기준: float 대비 MAE 증가 허용 비율 (5%)
+MAE_TOLERANCE_RATIO = 0.05
+# 부서 배치 크기 (prediction_service 의 부서 수)
+BATCH_DEPARTMENTS = 6
+
+
+def build_keras_from_engine(engine, batch_size=1, unroll=False):
+    """NumpyLSTMModel 가중치로 Keras 모델 구성 (입력 배치 크기 고정)"""
+    import tensorflow as tf
+
+    keras_layers = [tf.keras.Input(engine.input_shape, batch_size=batch_size)]
+    for layer in engine.layers:
+        if layer['type'] == 'lstm':
+            keras_layers.append(tf.keras.layers.LSTM(
+                layer['weights'][1].shape[0],
+                activation=layer['activation'],
+                recurrent_activation=layer['recurrent_activation'],
+                return_sequences=layer['return_sequences'],
+                unroll=unroll,
+            ))
+        else:
+            keras_layers.append(tf.keras.layers.Dense(
+                layer['weights'][0].shape[1], activation=layer['activation']
+            ))
+
+    model = tf.keras.Sequential(keras_layers)
+    for keras_layer, layer in zip(model.layers, engine.layers):
+        keras_layer.set_weights(layer['weights'])
+    return model
+
+
+def convert_variant(engine, variant, representative=None):
+    """
+    변형 1개를 TFLite 바이트로 변환
+    Args:
+        representative: int8 보정용 입력 윈도우 (N, 12, 11)
+    """
+    import tensorflow as tf
+
+    if variant not in VARIANTS:
+        raise ValueError(f"Unknown quantization variant: {variant}")
+    if variant == 'int8' and representative is None:
+        raise ValueError("int8 변환에는 대표 데이터셋이 필요합니다.")
+
+    model = build_keras_from_engine(engine, unroll=(variant == 'int8'))
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+
+    if variant != 'float':
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if variant == 'float16':
+        converter.target_spec.supported_types = [tf.float16]
+    if variant == 'int8':
+        samples = np.asarray(representative, dtype=np.float32)
+        converter.representative_dataset = lambda: ([sample[np.newaxis, ...]] for sample in samples)
+
+    return converter.convert()
+
+
+def _interpreter(content):
+    import tensorflow as tf
+
+    interpreter = tf.lite.Interpreter(model_content=content)
+    interpreter.allocate_tensors()
+    return interpreter
+
+
+def _run(interpreter, batch):
+    """샘플별 invoke (model_loader 의 TFLite 추론과 같은 방식)"""
+    input_index = interpreter.get_input_details()[0]['index']
+    output_index = interpreter.get_output_details()[0]['index']
+    outputs = []
+    for sample in batch:
+        interpreter.set_tensor(input_index, sample[np.newaxis, ...])
+        interpreter.invoke()
+        outputs.append(interpreter.get_tensor(output_index)[0])
+    return np.array(outputs)
+
+
+def _latency_us(func, iterations):
+    func()  # 워밍업
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - started) / iterations * 1_000_000
+
+
+def build_quantized_variants(engine, representative, X_test, y_test, out_dir, prefix,
+                             scaler_y=None, variants=VARIANTS, iterations=200):
+    """
+    양자화 변형을 만들어 ml_models 에 저장하고 float 대비 비교 리포트 작성
+    Args:
+        engine: 원본 NumpyLSTMModel
+        representative: int8 보정용 학습 윈도우
+        X_test, y_test: 평가 데이터 (y_test 는 모델 출력과 같은 정규화 스케일)
+        prefix: 저장 파일명 접두사 (예: hospital_lstm_new → hospital_lstm_new_int8.tflite)
+        scaler_y: 정규화 역변환용 MinMaxScaler (없으면 출력 스케일 그대로 MAE 계산)
+    Returns: 리포트 dict (quantization_report.json 과 동일)
+    """
+    X_test = np.asarray(X_test, dtype=np.float32)
+    y_true = _to_minutes(np.asarray(y_test, dtype=np.float32).reshape(-1), scaler_y)
+    single = X_test[:1]
+    batch = X_test[:BATCH_DEPARTMENTS]
+
+    rows = {}
+    baseline = None
+    for variant in ('float', *[v for v in variants if v != 'float']):
+        try:
+            content = convert_variant(engine, variant, representative)
+            interpreter = _interpreter(content)
+        except Exception as e:
+            logger.error(f"❌ {variant} 변환 실패: {e}")
+            rows[variant] = {'error': str(e)}
+            continue
+
+        outputs = _run(interpreter, X_test)
+        if baseline is None:
+            baseline = outputs
+        y_pred = _to_minutes(outputs.reshape(-1), scaler_y)
+
+        row = {
+            'size_bytes': len(content),
+            'latency_single_us': round(_latency_us(lambda: _run(interpreter, single), iterations), 1),
+            'latency_batch_us': round(_latency_us(lambda: _run(interpreter, batch), iterations), 1),
+            'mae': round(float(np.mean(np.abs(y_true - y_pred))), 4),
+            'max_abs_diff_vs_float': float(np.abs(outputs - baseline).max()),
+        }
+        if variant != 'float':
+            row['file'] = f'{prefix}_{variant}.tflite'
+            with open(os.path.join(out_dir, row['file']), 'wb') as f:
+                f.write(content)
+        rows[variant] = row
+
+    report = {
+        'test_samples': int(len(X_test)),
+        'batch_size': int(len(batch)),
+        'mae_tolerance_ratio': MAE_TOLERANCE_RATIO,
+        'variants': rows,
+        'recommended': _recommend(rows),
+    }
+    with open(os.path.join(out_dir, REPORT_FILE), 'w') as f:
+        json.dump(report, f, indent=2)
+    return report
+
+
+def _to_minutes(values, scaler_y):
+    if scaler_y is None:
+        return values
+    return scaler_y.inverse_transform(values.reshape(-1, 1)).reshape(-1)
+
+
+def _recommend(rows):
+    """float 대비 MAE 증가가 MAE_TOLERANCE_RATIO 이내인 변형 중 배치 지연시간이 가장 짧은 것"""
+    float_row = rows.get('float')
+    if not float_row or 'error' in float_row:
+        return None
+    candidates = [
+        (row['latency_batch_us'], variant) for variant, row in rows.items()
+        if 'error' not in row and row['mae'] <= float_row['mae'] * (1 + MAE_TOLERANCE_RATIO)
+    ]
+    return min(candidates)[1] if candidates else None
@@ -0,0 +1,181 @@
+"""
+대기시간 예측 모델 레지스트리
+ml_models/registry.json 에 버전별 아티팩트와 메타데이터, 활성/섀도 버전을 기록한다.
+
+{
+  "active": "1.0-lstm",
+  "shadow": null,
+  "models": {
+    "1.0-lstm": {"tflite": "hospital_lstm.tflite", "npz": "hospital_lstm.npz",
+                 "metrics": "model_metrics.json", "description": "..."}
+  }
+}
+
+- metrics 는 파일명(ml_models 기준) 또는 dict
+- registry.json 이 없으면 기존 고정 경로(hospital_lstm.*)를 단일 버전으로 사용
+- 변경 감지 토큰 = (registry.json mtime, 캐시 버전) → 워커 재시작 없이 핫 리로드
+  (파일을 수정하거나 bump() 로 캐시 버전을 올리면 각 워커가 다음 예측 때 교체)
+"""
+
+import json
+import logging
+import os
+import tempfile
+
+from django.core.cache import cache
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+REGISTRY_FILE = 'registry.json'
+VERSION_CACHE_KEY = 'model_registry:version'
+ARTIFACT_KEYS = ('tflite', 'npz', 'h5')
+
+DEFAULT_MANIFEST = {
+    'active': '1.0-lstm',
+    'shadow': None,
+    'models': {
+        '1.0-lstm': {
+            'tflite': 'hospital_lstm.tflite',
+            'npz': 'hospital_lstm.npz',
+            'h5': 'hospital_lstm_new.h5',
+            'metrics': 'model_metrics.json',
+        },
+    },
+}
+
+
+class ModelRegistryError(Exception):
+    """레지스트리 조작 오류 (없는 버전, 아티팩트 누락 등)"""
+
+
+class ModelRegistry:
+    """ml_models/registry.json 읽기/쓰기"""
+
+    def __init__(self, model_dir):
+        self.model_dir = model_dir
+        self.path = os.path.join(model_dir, REGISTRY_FILE)
+
+    # ------------------------------------------------------------------
+    # 조회
+    # ------------------------------------------------------------------
+    def read(self):
+        """매니페스트 dict (파일이 없으면 기본 매니페스트)"""
+        if not os.path.exists(self.path):
+            return json.loads(json.dumps(DEFAULT_MANIFEST))
+        with open(self.path, encoding='utf-8') as f:
+            manifest = json.load(f)
+        manifest.setdefault('shadow', None)
+        manifest.setdefault('models', {})
+        return manifest
+
+    def get(self, version, manifest=None):
+        """버전 스펙 + 메타데이터 (없으면 None)"""
+        manifest = manifest or self.read()
+        spec = manifest['models'].get(version)
+        if spec is None:
+            return None
+        spec = dict(spec, version=version)
+        spec['metadata'] = self._load_metrics(spec.get('metrics'))
+        return spec
+
+    def artifact_path(self, spec, key):
+        """스펙의 아티팩트 절대 경로 (없거나 파일이 없으면 None)"""
+        name = spec.get(key)
+        if not name:
+            return None
+        path = os.path.join(self.model_dir, name)
+        return path if os.path.exists(path) else None
+
+    def version_token(self):
+        """핫 리로드 감지용 토큰 - 파일 수정 또는 캐시 버전 증가 시 변경"""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = 0
+        try:
+            cache_version = cache.get(VERSION_CACHE_KEY, 1)
+        except Exception:
+            cache_version = 1
+        return mtime, cache_version
+
+    def _load_metrics(self, metrics):
+        if isinstance(metrics, dict):
+            return metrics
+        if not metrics:
+            return {}
+        path = os.path.join(self.model_dir, metrics)
+        try:
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Model metrics not readable: {path} ({e})")
+            return {}
+
+    # ------------------------------------------------------------------
+    # 변경 (원자적 파일 교체 + 캐시 버전 증가)
+    # ------------------------------------------------------------------
+    def register(self, version, artifacts, metrics=None, description=''):
+        """새 버전 등록 (활성화하지 않음)"""
+        if not any(artifacts.get(key) for key in ARTIFACT_KEYS):
+            raise ModelRegistryError("tflite/npz/h5 중 하나 이상의 아티팩트가 필요합니다.")
+        for key in ARTIFACT_KEYS:
+            name = artifacts.get(key)
+            if name and not os.path.exists(os.path.join(self.model_dir, name)):
+                raise ModelRegistryError(f"아티팩트 파일이 없습니다: {name}")
+
+        manifest = self.read()
+        entry = {key: artifacts[key] for key in ARTIFACT_KEYS if artifacts.get(key)}
+        entry['metrics'] = metrics if metrics is not None else {}
+        entry['description'] = description
+        entry['registered_at'] = timezone.now().isoformat()
+        manifest['models'][version] = entry
+        self._write(manifest)
+        return entry
+
+    def activate(self, version):
+        """활성 버전 교체 (섀도였다면 섀도 해제)"""
+        manifest = self.read()
+        self._require(manifest, version)
+        manifest['active'] = version
+        if manifest.get('shadow') == version:
+            manifest['shadow'] = None
+        self._write(manifest)
+
+    def set_shadow(self, version):
+        """섀도 버전 지정 (None 이면 해제)"""
+        manifest = self.read()
+        if version is not None:
+            self._require(manifest, version)
+            if version == manifest.get('active'):
+                raise ModelRegistryError("활성 버전은 섀도로 지정할 수 없습니다.")
+        manifest['shadow'] = version
+        self._write(manifest)
+
+    @staticmethod
+    def bump():
+        """캐시 버전 증가 - 파일을 공유하지 않는 워커까지 다시 읽도록 신호"""
+        try:
+            return cache.incr(VERSION_CACHE_KEY)
+        except ValueError:
+            cache.set(VERSION_CACHE_KEY, 2, None)
+            return 2
+
+    @staticmethod
+    def _require(manifest, version):
+        if version not in manifest['models']:
+            raise ModelRegistryError(f"등록되지 않은 모델 버전입니다: {version}")
+
+    def _write(self, manifest):
+        """임시 파일에 쓴 뒤 os.replace 로 교체 (읽는 워커가 반쯤 쓴 파일을 보지 않도록)"""
+        os.makedirs(self.model_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.model_dir, prefix='.registry-', suffix='.json')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.bump()
@@ -0,0 +1,184 @@
+"""
+NumPy 기반 LSTM 추론 엔진
+TensorFlow 없이 hospital_lstm_new.h5 (또는 변환된 .npz) 가중치로 순전파만 수행한다.
+
+- 지원 레이어: LSTM, Dense, Dropout(추론 시 항등)
+- 입력 (N, 12, 11) 배치 전체를 한 번에 계산 (부서별 반복 호출 불필요)
+- 입력 투영(x @ W)은 모든 timestep 을 한 번에, 순환 부분만 timestep 루프
+- Keras LSTM 게이트 순서: i, f, c, o (로드 시 i, f, o, c 로 재배치)
+"""
+
+import json
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def _sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+def _hard_sigmoid(x):
+    return np.clip(0.2 * x + 0.5, 0.0, 1.0)
+
+
+ACTIVATIONS = {
+    'linear': lambda x: x,
+    None: lambda x: x,
+    'relu': lambda x: np.maximum(x, 0.0),
+    'tanh': np.tanh,
+    'sigmoid': _sigmoid,
+    'hard_sigmoid': _hard_sigmoid,
+}
+
+
+class NumpyLSTMModel:
+    """
+    Keras Sequential(LSTM/Dense/Dropout) 모델의 NumPy 순전파
+
+    layers: [{'type': 'lstm'|'dense', 'activation', 'recurrent_activation',
+              'return_sequences', 'weights': [ndarray, ...]}, ...]
+    """
+
+    def __init__(self, layers, input_shape):
+        self.layers = layers
+        self.input_shape = tuple(input_shape)  # (timesteps, features)
+        for layer in layers:
+            layer['weights'] = [np.asarray(w, dtype=np.float32) for w in layer['weights']]
+        self._compiled = [self._compile(layer) for layer in layers]
+
+    @staticmethod
+    def _compile(layer):
+        """
+        추론용 가중치 준비
+        LSTM 은 게이트 열 순서를 (i, f, c, o) → (i, f, o, c) 로 바꿔
+        timestep 마다 recurrent_activation 을 한 번만 적용하도록 한다
+        """
+        if layer['type'] != 'lstm':
+            return layer['weights']
+
+        kernel, recurrent_kernel, bias = layer['weights']
+        units = recurrent_kernel.shape[0]
+        order = np.r_[0:2 * units, 3 * units:4 * units, 2 * units:3 * units]
+        return [kernel[:, order], recurrent_kernel[:, order], bias[order]]
+
+    # ------------------------------------------------------------------
+    # 로딩 / 저장
+    # ------------------------------------------------------------------
+    @classmethod
+    def from_h5(cls, path):
+        """Keras 2 형식 .h5 에서 설정과 가중치 로드 (h5py 필요)"""
+        import h5py
+
+        with h5py.File(path, 'r') as f:
+            config = json.loads(f.attrs['model_config'])
+            weights_group = f['model_weights']
+
+            layers = []
+            input_shape = None
+            for layer_conf in config['config']['layers']:
+                class_name = layer_conf['class_name']
+                conf = layer_conf['config']
+                if input_shape is None and conf.get('batch_input_shape'):
+                    input_shape = conf['batch_input_shape'][1:]
+
+                if class_name not in ('LSTM', 'Dense'):
+                    continue  # InputLayer, Dropout 등 추론 시 무시
+
+                group = weights_group[conf['name']]
+                names = [n.decode() if isinstance(n, bytes) else n
+                         for n in group.attrs['weight_names']]
+                weights = {n.rsplit('/', 1)[-1].split(':')[0]: group[n][()] for n in names}
+
+                if class_name == 'LSTM':
+                    layers.append({
+                        'type': 'lstm',
+                        'activation': conf.get('activation', 'tanh'),
+                        'recurrent_activation': conf.get('recurrent_activation', 'sigmoid'),
+                        'return_sequences': conf.get('return_sequences', False),
+                        'weights': [weights['kernel'], weights['recurrent_kernel'], weights['bias']],
+                    })
+                else:
+                    layers.append({
+                        'type': 'dense',
+                        'activation': conf.get('activation', 'linear'),
+                        'weights': [weights['kernel'], weights['bias']],
+                    })
+
+        return cls(layers, input_shape)
+
+    @classmethod
+    def from_npz(cls, path):
+        """save_npz() 로 변환한 가중치 로드 (NumPy 만 필요)"""
+        with np.load(path, allow_pickle=False) as data:
+            spec = json.loads(str(data['spec']))
+            layers = []
+            for i, layer in enumerate(spec['layers']):
+                layer['weights'] = [data[f'layer{i}_w{j}'] for j in range(layer.pop('num_weights'))]
+                layers.append(layer)
+        return cls(layers, spec['input_shape'])
+
+    def save_npz(self, path):
+        """TensorFlow/h5py 없는 환경 배포용 .npz 저장"""
+        arrays = {}
+        spec_layers = []
+        for i, layer in enumerate(self.layers):
+            spec = {k: v for k, v in layer.items() if k != 'weights'}
+            spec['num_weights'] = len(layer['weights'])
+            spec_layers.append(spec)
+            for j, w in enumerate(layer['weights']):
+                arrays[f'layer{i}_w{j}'] = w
+        arrays['spec'] = np.array(json.dumps({
+            'input_shape': list(self.input_shape),
+            'layers': spec_layers,
+        }))
+        np.savez(path, **arrays)
+
+    # ------------------------------------------------------------------
+    # 추론
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _lstm(x, layer, weights):
+        kernel, recurrent_kernel, bias = weights
+        activation = ACTIVATIONS[layer['activation']]
+        recurrent_activation = ACTIVATIONS[layer['recurrent_activation']]
+
+        batch, timesteps, _ = x.shape
+        units = recurrent_kernel.shape[0]
+
+        # 모든 timestep 의 입력 투영을 한 번에 계산: (N, T, 4u)
+        projected = x @ kernel + bias
+        h = np.zeros((batch, units), dtype=np.float32)
+        c = np.zeros((batch, units), dtype=np.float32)
+        outputs = np.empty((batch, timesteps, units), dtype=np.float32) if layer['return_sequences'] else None
+
+        for t in range(timesteps):
+            z = projected[:, t, :] + h @ recurrent_kernel
+            gates = recurrent_activation(z[:, :3 * units])  # i, f, o
+            g = activation(z[:, 3 * units:])
+            c = gates[:, units:2 * units] * c + gates[:, :units] * g
+            h = gates[:, 2 * units:] * activation(c)
+            if outputs is not None:
+                outputs[:, t, :] = h
+
+        return outputs if outputs is not None else h
+
+    def predict(self, inputs):
+        """
+        배치 추론
+        Args: inputs (N, timesteps, features) 또는 (timesteps, features)
+        Returns: (N, output_units) float32
+        """
+        x = np.asarray(inputs, dtype=np.float32)
+        if x.ndim == 2:
+            x = x[np.newaxis, ...]
+
+        for layer, weights in zip(self.layers, self._compiled):
+            if layer['type'] == 'lstm':
+                x = self._lstm(x, layer, weights)
+            else:
+                kernel, bias = weights
+                x = ACTIVATIONS[layer['activation']](x @ kernel + bias)
+        return x
@@ -0,0 +1,173 @@
+"""
+LSTM 예측 정확도 집계
+PredictionLog(30분 후 예측)를 실제 호출 대기시간과 조인해 actual_wait_time 을 채우고
+부서/1시간/모델 버전별 정확도를 PredictionAccuracy 에 저장한다.
+
+- update_prediction_accuracy(): 실제값 확인 가능한 로그만 증분 처리
+  (update_prediction_accuracy 명령을 주기적으로 실행)
+- get_recent_accuracy(): 대시보드용 최근 N시간 부서별 정확도를 집계 쿼리 1회로 반환
+
+실제 대기시간 정의
+- 예측 시각 T 의 실제값 = T + 30분 ± 5분 사이에 호출된 같은 부서 대기열의
+  평균 (called_at - created_at) 분
+- 해당 구간에 호출이 없으면 실제값을 채우지 않고 다음 실행에서 다시 시도 (최대 LOOKBACK)
+"""
+
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+import numpy as np
+from django.db import connection, transaction
+from django.db.models import F, Sum
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from p_queue.models import Queue
+from ..models import PredictionAccuracy, PredictionLog
+
+logger = logging.getLogger(__name__)
+
+PREDICTION_HORIZON = timedelta(minutes=30)
+MATCH_WINDOW = timedelta(minutes=5)
+LOOKBACK = timedelta(days=1)  # 이보다 오래된 미확정 로그는 포기
+
+
+def log_accuracy(predicted, actual):
+    """예측 1건의 정확도(%) - 실제값이 0분이어도 1분으로 나눠 과대평가 방지"""
+    return max(0.0, 1.0 - abs(predicted - actual) / max(actual, 1.0)) * 100
+
+
+def _realized_waits(logs):
+    """
+    로그별 실제 대기시간 (없으면 None)
+    부서별 호출 시각 정렬 배열 + 누적합으로 구간 평균을 searchsorted 로 계산 (Queue 조회 1회)
+    """
+    timestamps = [log.timestamp for log in logs]
+    rows = Queue.objects.filter(
+        exam__department__in={log.department for log in logs},
+        called_at__gte=min(timestamps) + PREDICTION_HORIZON - MATCH_WINDOW,
+        called_at__lte=max(timestamps) + PREDICTION_HORIZON + MATCH_WINDOW,
+    ).values_list('exam__department', 'called_at', 'created_at')
+
+    calls = defaultdict(list)
+    for department, called_at, created_at in rows:
+        calls[department].append((called_at.timestamp(), (called_at - created_at).total_seconds() / 60))
+
+    series = {}
+    for department, values in calls.items():
+        values.sort()
+        called = np.array([v[0] for v in values])
+        cumulative = np.concatenate([[0.0], np.cumsum([v[1] for v in values])])
+        series[department] = (called, cumulative)
+
+    horizon = PREDICTION_HORIZON.total_seconds()
+    window = MATCH_WINDOW.total_seconds()
+    realized = []
+    for log in logs:
+        if log.department not in series:
+            realized.append(None)
+            continue
+        called, cumulative = series[log.department]
+        target = log.timestamp.timestamp() + horizon
+        lo = np.searchsorted(called, target - window, side='left')
+        hi = np.searchsorted(called, target + window, side='right')
+        realized.append(round(float((cumulative[hi] - cumulative[lo]) / (hi - lo)), 2) if hi > lo else None)
+    return realized
+
+
+def _rollup(hours):
+    """영향받은 1시간 구간들의 PredictionAccuracy 재계산"""
+    start, end = min(hours), max(hours) + timedelta(hours=1)
+    rows = PredictionLog.objects.filter(
+        timestamp__gte=start, timestamp__lt=end, actual_wait_time__isnull=False
+    ).annotate(window_start=TruncHour('timestamp')).values_list(
+        'department', 'window_start', 'model_version', 'predicted_wait_time', 'actual_wait_time'
+    )
+
+    groups = defaultdict(list)
+    for department, window_start, model_version, predicted, actual in rows:
+        if window_start in hours:
+            groups[(department, window_start, model_version)].append((predicted, actual))
+
+    windows = []
+    for (department, window_start, model_version), pairs in groups.items():
+        predicted, actual = np.array(pairs, dtype=np.float64).T
+        windows.append(PredictionAccuracy(
+            department=department,
+            window_start=window_start,
+            model_version=model_version,
+            sample_count=len(pairs),
+            mean_abs_error=round(float(np.abs(predicted - actual).mean()), 2),
+            accuracy=round(float(np.mean([log_accuracy(p, a) for p, a in pairs])), 2),
+        ))
+
+    # MySQL 은 충돌 대상을 지정할 수 없음 - ON DUPLICATE KEY 가 (부서, 구간, 모델) 유니크 제약으로 갱신
+    if connection.features.supports_update_conflicts_with_target:
+        unique_fields = ['department', 'window_start', 'model_version']
+    else:
+        unique_fields = None
+
+    PredictionAccuracy.objects.bulk_create(
+        windows,
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=unique_fields,
+        update_fields=['sample_count', 'mean_abs_error', 'accuracy', 'updated_at'],
+    )
+    return len(windows)
+
+
+def update_prediction_accuracy(now=None):
+    """
+    실제값이 확정된(예측 후 35분 경과) 로그의 actual_wait_time 을 채우고 정확도 집계 갱신
+    Returns: (실제값을 채운 로그 수, 갱신한 정확도 구간 수)
+    """
+    now = now or timezone.now()
+    logs = list(PredictionLog.objects.filter(
+        actual_wait_time__isnull=True,
+        timestamp__gte=now - LOOKBACK,
+        timestamp__lte=now - PREDICTION_HORIZON - MATCH_WINDOW,
+    ).only('id', 'timestamp', 'department'))
+    if not logs:
+        return 0, 0
+
+    resolved = []
+    for log, actual in zip(logs, _realized_waits(logs)):
+        if actual is not None:
+            log.actual_wait_time = actual
+            resolved.append(log)
+    if not resolved:
+        return 0, 0
+
+    hours = {log.timestamp.replace(minute=0, second=0, microsecond=0) for log in resolved}
+    with transaction.atomic():
+        PredictionLog.objects.bulk_update(resolved, ['actual_wait_time'], batch_size=1000)
+        windows = _rollup(hours)
+
+    logger.info(f"Prediction accuracy updated - {len(resolved)} logs, {windows} windows")
+    return len(resolved), windows
+
+
+def get_recent_accuracy(departments, hours=24, now=None):
+    """
+    부서별 최근 hours 시간 예측 정확도 (표본 수 가중 평균)
+    Returns: {부서: {'accuracy', 'mean_abs_error', 'samples'}} - 집계가 없는 부서는 제외
+    """
+    now = now or timezone.now()
+    rows = PredictionAccuracy.objects.filter(
+        department__in=departments, window_start__gte=now - timedelta(hours=hours)
+    ).values('department').annotate(
+        samples=Sum('sample_count'),
+        weighted_accuracy=Sum(F('accuracy') * F('sample_count')),
+        weighted_error=Sum(F('mean_abs_error') * F('sample_count')),
+    )
+
+    return {
+        row['department']: {
+            'accuracy': round(row['weighted_accuracy'] / row['samples'], 1),
+            'mean_abs_error': round(row['weighted_error'] / row['samples'], 1),
+            'samples': row['samples'],
+        }
+        for row in rows if row['samples']
+    }
@@ -1,16 +1,38 @@
 from django.core.cache import cache
 from django.utils import timezone
-from django.db.models import Avg, Count, Q
+from django.db.models import Avg, Count, F, Q, Window
+from django.db.models.functions import RowNumber
 from p_queue.models import Queue, QueueStatusLog
 from appointments.models import Exam
 from .model_loader import predictor
+from .feature_store import BUCKET_MINUTES, get_recent_buckets
+from .prediction_accuracy import get_recent_accuracy
 from ..models import PredictionLog
 from datetime import timedelta
 import numpy as np
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
+# 공용 예측 스냅샷 주기 (피처 스토어 버킷과 동일한 5분)
+SNAPSHOT_SECONDS = BUCKET_MINUTES * 60
+SNAPSHOT_LOCK_TIMEOUT = 60      # 스냅샷 계산 중 잠금 유지 시간(초)
+SNAPSHOT_LOCK_WAIT_STEPS = 50   # 다른 워커의 계산 완료 대기 (0.1초 x 50)
+
+# 시간대별 분 단위 변환
+TIMEFRAME_MINUTES = {
+    '30min': 30,
+    '1hour': 60,
+    '2hour': 120
+}
+
+# 모델 오류 시 부서별 기본 대기시간 (실제 데이터 기반)
+DEFAULT_PREDICTED_WAIT = {
+    '내과': 35, '정형외과': 25, '진단검사의학과': 15,
+    'X-ray실': 10, 'MRI실': 45, 'CT실': 30
+}
+
 
 class PredictionService:
     # 학습 시와 동일한 부서 리스트 (순서 중요!)
@@ -44,6 +66,13 @@ class PredictionService:
             }
             default_wait = dept_defaults.get(department, 15.0)
 
+            # 피처 스토어에 최근 버킷이 있으면 인덱스 조회 1회로 입력 생성
+            store = get_recent_buckets(department, count=num_timesteps, now=current_time)
+            if store is not None:
+                input_array = PredictionService._input_from_buckets(*store, department, default_wait)
+                logger.info(f"[FeatureStore] {department} LSTM input created from feature store")
+                return input_array
+
             logger.debug(f"[RealData] Fetching actual Queue data for {department}")
 
             for i in range(num_timesteps):
@@ -85,35 +114,7 @@ class PredictionService:
                         avg_wait = default_wait
                         logger.debug(f"[RealData] {time_point.strftime('%H:%M')} - 기본값 사용: {avg_wait:.1f}분")
 
-                # 대기시간 정규화 (5~120분 범위)
-                waiting_time = max(5, min(avg_wait, 120))
-
-                # 특징 벡터 생성 (정확히 11개)
-                features = []
-
-                # 기본 특징 3개
-                features.append(time_point.hour / 24.0)  # 시간 (0-1)
-                features.append(time_point.weekday() / 6.0)  # 요일 (0-1)
-                features.append(min(waiting_time / 60.0, 1.0))  # 대기 시간을 정규화 (0-1, 60분 기준)
-
-                # 부서 특징 8개 (모델이 기대하는 원핫 인코딩)
-                train_departments = PredictionService.DEPARTMENT_LIST  # 6개 부서
-
-                if department in train_departments:
-                    dept_idx = train_departments.index(department)
-                else:
-                    dept_idx = 0  # 알 수 없는 부서는 첫 번째로 매핑
-
-                for j in range(8):  # 8개 부서 원핫 인코딩 (모델에 맞춤)
-                    if j == dept_idx:
-                        features.append(1.0)
-                    else:
-                        features.append(0.0)
-
-                # 정확히 11개 특징 확인 (3 + 8 = 11)
-                assert len(features) == 11, f"Feature count mismatch: {len(features)} != 11"
-
-                input_data.append(features)
+                input_data.append(PredictionService._feature_vector(time_point, avg_wait, department))
 
             # 시간 순서를 반대로 (과거 → 현재)
             input_data.reverse()
@@ -133,182 +134,332 @@ class PredictionService:
             return np.zeros((1, 12, 11), dtype=np.float32)
 
     @staticmethod
-    def get_predictions(timeframe='30min'):
-        """부서별 대기시간 예측 (다중 시간대 지원)"""
-        cache_key = f"predictions:{timezone.now().strftime('%Y%m%d%H%M')[:12]}:{timeframe}"
-        cached = cache.get(cache_key)
-
-        if cached:
-            return cached
-
-        # 시간대별 분 단위 변환
-        timeframe_minutes = {
-            '30min': 30,
-            '1hour': 60,
-            '2hour': 120
-        }
-        target_minutes = timeframe_minutes.get(timeframe, 30)
+    def _feature_vector(time_point, avg_wait, department):
+        """시점/평균 대기시간으로 모델 입력 특징 벡터 생성 (정확히 11개)"""
+        # 대기시간 정규화 (5~120분 범위)
+        waiting_time = max(5, min(avg_wait, 120))
 
-        departments = list(Exam.objects.values_list('department', flat=True).distinct())
-        predictions = {}
+        # 기본 특징 3개
+        features = [
+            time_point.hour / 24.0,  # 시간 (0-1)
+            time_point.weekday() / 6.0,  # 요일 (0-1)
+            min(waiting_time / 60.0, 1.0),  # 대기 시간을 정규화 (0-1, 60분 기준)
+        ]
 
-        for dept in departments:
-            try:
-                # 현재 대기 시간 (최근 24시간 데이터만 사용)
-                now = timezone.now()
-                cutoff_time = now - timedelta(hours=24)
-
-                # 최근 24시간 내 waiting 큐만 조회
-                waiting_queues = Queue.objects.filter(
-                    exam__department=dept,
-                    state='waiting',
-                    created_at__gte=cutoff_time
+        # 부서 특징 8개 (모델이 기대하는 원핫 인코딩)
+        train_departments = PredictionService.DEPARTMENT_LIST  # 6개 부서
+
+        if department in train_departments:
+            dept_idx = train_departments.index(department)
+        else:
+            dept_idx = 0  # 알 수 없는 부서는 첫 번째로 매핑
+
+        for j in range(8):  # 8개 부서 원핫 인코딩 (모델에 맞춤)
+            features.append(1.0 if j == dept_idx else 0.0)
+
+        # 정확히 11개 특징 확인 (3 + 8 = 11)
+        assert len(features) == 11, f"Feature count mismatch: {len(features)} != 11"
+        return features
+
+    @staticmethod
+    def _input_from_buckets(padding, buckets, department, default_wait):
+        """피처 스토어 버킷(과거 → 현재)으로 (1, 12, 11) 입력 생성"""
+        rows = padding + buckets
+        offset = len(padding)
+        input_data = []
+
+        for i, bucket in enumerate(buckets):
+            avg_wait = bucket['mean_wait']
+            if avg_wait is None:
+                # 빈 버킷은 인접 버킷(±10분) 가중 평균, 그것도 없으면 부서 기본값
+                nearby = [
+                    row for row in rows[max(offset + i - 2, 0):offset + i + 3]
+                    if row['mean_wait'] is not None
+                ]
+                total = sum(row['queue_count'] for row in nearby)
+                avg_wait = (
+                    sum(row['mean_wait'] * row['queue_count'] for row in nearby) / total
+                    if total else default_wait
                 )
+            avg_wait = avg_wait or default_wait
 
-                waiting_count = waiting_queues.count()
+            time_point = bucket['bucket_start'] + timedelta(minutes=BUCKET_MINUTES)
+            input_data.append(PredictionService._feature_vector(time_point, avg_wait, department))
 
-                if waiting_count > 0:
-                    # 실제 estimated_wait_time 평균 사용
-                    avg_estimated = waiting_queues.aggregate(
-                        avg=Avg('estimated_wait_time')
-                    )['avg'] or 0
+        return np.array(input_data, dtype=np.float32).reshape(1, len(buckets), 11)
 
-                    current_wait_time = round(avg_estimated)
+    @staticmethod
+    def get_prediction_snapshot():
+        """
+        공용 예측 스냅샷 (5분 버킷당 LSTM + 하이브리드 계산 1회)
+        get_predictions / timeline / domino / heatmap 은 모두 이 스냅샷에서 파생한다.
+        Returns: {'bucket', 'generated_at', 'departments': {부서: 30분 기준 결과}, 'active_counts': {부서: 대기+호출 인원}}
+        """
+        now = timezone.now()
+        bucket = int(now.timestamp()) // SNAPSHOT_SECONDS * SNAPSHOT_SECONDS
+        cache_key = f"prediction_snapshot:{bucket}"
+        snapshot = cache.get(cache_key)
+        if snapshot is not None:
+            return snapshot
+
+        # 여러 워커가 동시에 버킷 전환을 만나도 모델 계산은 한 번만 수행
+        lock_key = f"{cache_key}:lock"
+        locked = cache.add(lock_key, 1, SNAPSHOT_LOCK_TIMEOUT)
+        if not locked:
+            for _ in range(SNAPSHOT_LOCK_WAIT_STEPS):
+                time.sleep(0.1)
+                snapshot = cache.get(cache_key)
+                if snapshot is not None:
+                    return snapshot
 
-                    logger.debug(f"[CurrentWait] {dept}: {waiting_count}명 대기 (최근 24h), 평균 {avg_estimated:.1f}분")
-                else:
-                    # 대기 인원 없으면 0
-                    current_wait_time = 0
-                    logger.debug(f"[CurrentWait] {dept}: 대기 인원 없음 (최근 24h)")
-
-                # LSTM 예측 (try-except로 모델 오류 처리)
-                try:
-                    input_data = PredictionService.get_recent_data_for_prediction(dept)
-                    logger.debug(f"Input shape for {dept}: {input_data.shape}")
-
-                    future = predictor.predict(input_data)
-
-                    if 'error' in future:
-                        logger.warning(f"Model returned error for {dept}: {future['error']}")
-                        # 부서별 기본 대기시간 사용 (실제 데이터 기반)
-                        dept_defaults = {
-                            '내과': 35, '정형외과': 25, '진단검사의학과': 15,
-                            'X-ray실': 10, 'MRI실': 45, 'CT실': 30
-                        }
-                        predicted_wait_30min = dept_defaults.get(dept, 20)
-                        congestion = min(predicted_wait_30min / 60.0, 1.0)
-                    else:
-                        predicted_wait_30min = future.get('predicted_wait_time', current_wait_time)
-                        congestion = future.get('congestion_level', 0.5)
-                        logger.debug(f"LSTM base prediction for {dept}: {predicted_wait_30min}분, congestion: {congestion}")
-
-                    # HybridCongestion Algorithm (30min predictions only)
-                    if target_minutes == 30:
-                        try:
-                            from .hybrid_congestion import HybridCongestionAlgorithm
-                            hybrid_result = HybridCongestionAlgorithm.apply_all_corrections(
-                                lstm_prediction=predicted_wait_30min,
-                                department=dept,
-                                current_time=timezone.now(),
-                                current_wait_time=current_wait_time  # Rule 7을 위해 현재 대기시간 전달
-                            )
-                            lstm_base = hybrid_result['lstm_base']
-                            predicted_wait_30min = hybrid_result['corrected_wait_time']
-                            hybrid_confidence = hybrid_result['confidence']
-                            hybrid_corrections = hybrid_result['corrections']
-                            applied_rules = hybrid_result['applied_rules']
-                            correction_pct = ((predicted_wait_30min - lstm_base) / lstm_base * 100) if lstm_base > 0 else 0
-                            logger.info(f"[HybridAlgorithm] {dept} | LSTM: {lstm_base:.1f}min -> Hybrid: {predicted_wait_30min:.1f}min ({correction_pct:+.1f}%) | Rules: {len(applied_rules)}/6 | Confidence: {hybrid_confidence:.2f}")
-                        except Exception as hybrid_error:
-                            logger.warning(f"[HybridAlgorithm] {dept} | ERROR: {str(hybrid_error)[:50]} | Fallback: Pure LSTM")
-                            hybrid_confidence = 0.70
-                            hybrid_corrections = {}
-                            applied_rules = []
-
-                    # 시간대별 예측값 계산 (선형 보간)
-                    if target_minutes == 30:
-                        predicted_wait = predicted_wait_30min
-                    elif target_minutes == 60:
-                        # 1시간 후 = 30분 예측의 1.5배 (추세 반영)
-                        predicted_wait = round(predicted_wait_30min * 1.5)
-                    elif target_minutes == 120:
-                        # 2시간 후 = 30분 예측의 2.0배 (추세 더 반영)
-                        predicted_wait = round(predicted_wait_30min * 2.0)
-                    else:
-                        predicted_wait = predicted_wait_30min
-
-                    # 혼잡도도 시간에 비례해 증가
-                    congestion_multiplier = target_minutes / 30.0
-                    congestion = min(congestion * congestion_multiplier, 1.0)
-
-                except Exception as model_error:
-                    logger.warning(f"Model prediction failed for {dept}: {model_error}")
-                    # 모델 예측 실패 시 부서별 기본값 사용 (실제 데이터 기반)
-                    dept_defaults = {
-                        '내과': 35, '정형외과': 25, '진단검사의학과': 15,
-                        'X-ray실': 10, 'MRI실': 45, 'CT실': 30
-                    }
-                    base_wait = dept_defaults.get(dept, current_wait_time if current_wait_time > 0 else 20)
-                    # 시간대별 스케일링
-                    predicted_wait = round(base_wait * (target_minutes / 30.0))
-                    congestion = min(predicted_wait / 60.0, 1.0)
-
-                # 과거 예측 데이터 조회 (30분 전 예측)
-                past_prediction_value = None
-                try:
-                    past_log = PredictionLog.objects.filter(
-                        department=dept,
-                        timestamp__range=[now - timedelta(minutes=35), now - timedelta(minutes=25)]
-                    ).order_by('-timestamp').first()
-
-                    if past_log:
-                        past_prediction_value = round(past_log.predicted_wait_time)
-                        logger.debug(f"[PastPrediction] {dept}: {past_prediction_value}min (30min ago)")
-                except Exception as log_error:
-                    logger.debug(f"[PastPrediction] {dept}: No data available")
-
-                # 하이브리드 정보 추가 (30분 예측일 때만)
-                prediction_dict = {
-                    'current_wait': round(current_wait_time),
-                    'predicted_wait': predicted_wait,
-                    'past_prediction': past_prediction_value,  # ← 30분 전 AI 예측값 추가
-                    'congestion': round(congestion, 2),
-                    'trend': 'up' if predicted_wait > current_wait_time else 'down',
-                    'timeframe': timeframe,
-                    'target_minutes': target_minutes
-                }
-
-                # 하이브리드 알고리즘 적용 시 추가 정보
-                if target_minutes == 30 and 'hybrid_confidence' in locals():
-                    prediction_dict['hybrid'] = {
-                        'confidence': hybrid_confidence,
-                        'corrections': hybrid_corrections,
-                        'applied_rules': applied_rules,
-                        'is_hybrid': len(applied_rules) > 0
-                    }
-
-                predictions[dept] = prediction_dict
-
-                # 예측 결과 로깅 (30분 예측만 로그)
-                if target_minutes == 30:
-                    PredictionLog.objects.create(
-                        department=dept,
-                        current_wait_time=current_wait_time,
-                        predicted_wait_time=predicted_wait,
-                        congestion_level=congestion,
-                        model_version='1.0-lstm'
-                    )
+        try:
+            snapshot = PredictionService._build_snapshot(now, bucket)
+            cache.set(cache_key, snapshot, SNAPSHOT_SECONDS * 2)
+        finally:
+            # 대기 시간이 지나 직접 계산한 워커는 잠금 소유자가 아니므로 지우지 않음
+            if locked:
+                cache.delete(lock_key)
+        return snapshot
+
+    @staticmethod
+    def _build_snapshot(now, bucket):
+        """전 부서 30분 예측 계산 + PredictionLog 일괄 저장"""
+        departments = list(Exam.objects.values_list('department', flat=True).distinct())
 
+        # 전 부서 LSTM 입력을 모아 한 번에 배치 추론
+        lstm_outputs = {}
+        if departments:
+            lstm_inputs = np.concatenate([
+                PredictionService.get_recent_data_for_prediction(dept) for dept in departments
+            ])
+            lstm_outputs = dict(zip(departments, predictor.predict_batch(lstm_inputs)))
+
+        # 30분 전 예측값, 최근 정확도, 현재 대기 인원은 전 부서를 한 번에 조회
+        past_predictions = PredictionService._get_past_predictions(departments, now)
+        recent_accuracy = get_recent_accuracy(departments, now=now) if departments else {}
+        active_counts = dict(
+            Queue.objects.filter(state__in=['waiting', 'called'])
+            .values_list('exam__department')
+            .annotate(count=Count('queue_id'))
+        )
+
+        base = {}
+        for dept in departments:
+            try:
+                base[dept] = PredictionService._predict_department(dept, now, lstm_outputs.get(dept))
+                base[dept]['past_prediction'] = past_predictions.get(dept)
+                base[dept]['accuracy'] = recent_accuracy.get(dept)
             except Exception as e:
                 logger.error(f"Error predicting for department {dept}: {e}")
-                predictions[dept] = {'error': str(e)}
+                base[dept] = {'error': str(e)}
 
-        # 예측 세션 요약 통계 (30분 예측일 때만)
-        if target_minutes == 30 and predictions:
+        PredictionService._apply_hybrid(base, now)
+
+        # 예측 결과 로깅 (30분 예측, 스냅샷당 1회 일괄 저장)
+        predictions = {
+            dept: PredictionService._derive_prediction(result, '30min', 30)
+            for dept, result in base.items()
+        }
+        new_logs = [
+            PredictionLog(
+                department=dept,
+                current_wait_time=base[dept]['current_wait'],
+                predicted_wait_time=prediction['predicted_wait'],
+                congestion_level=base[dept]['congestion'],
+                model_version=predictor.version or '1.0-lstm'
+            )
+            for dept, prediction in predictions.items() if 'error' not in prediction
+        ]
+        if new_logs:
+            try:
+                PredictionLog.objects.bulk_create(new_logs)
+            except Exception as log_error:
+                logger.error(f"Failed to save prediction logs: {log_error}")
+
+        # 예측 세션 요약 통계
+        if predictions:
             PredictionService._log_prediction_summary(predictions)
 
-        cache.set(cache_key, predictions, 300)  # 5분 캐싱
-        return predictions
+        return {
+            'bucket': bucket,
+            'generated_at': now.isoformat(),
+            'departments': base,
+            'active_counts': active_counts,
+        }
+
+    @staticmethod
+    def _predict_department(dept, now, future):
+        """부서 1곳의 30분 기준 LSTM 예측 (하이브리드 보정은 _apply_hybrid 에서 일괄 적용)"""
+        # 현재 대기 시간 (최근 24시간 데이터만 사용)
+        cutoff_time = now - timedelta(hours=24)
+
+        # 최근 24시간 내 waiting 큐만 조회
+        waiting_queues = Queue.objects.filter(
+            exam__department=dept,
+            state='waiting',
+            created_at__gte=cutoff_time
+        )
+
+        waiting_count = waiting_queues.count()
+
+        if waiting_count > 0:
+            # 실제 estimated_wait_time 평균 사용
+            avg_estimated = waiting_queues.aggregate(
+                avg=Avg('estimated_wait_time')
+            )['avg'] or 0
+
+            current_wait_time = round(avg_estimated)
+
+            logger.debug(f"[CurrentWait] {dept}: {waiting_count}명 대기 (최근 24h), 평균 {avg_estimated:.1f}분")
+        else:
+            # 대기 인원 없으면 0
+            current_wait_time = 0
+            logger.debug(f"[CurrentWait] {dept}: 대기 인원 없음 (최근 24h)")
+
+        # LSTM 예측 (try-except로 모델 오류 처리)
+        try:
+            if 'error' in future:
+                logger.warning(f"Model returned error for {dept}: {future['error']}")
+                # 부서별 기본 대기시간 사용 (실제 데이터 기반)
+                predicted_wait_30min = DEFAULT_PREDICTED_WAIT.get(dept, 20)
+                congestion = min(predicted_wait_30min / 60.0, 1.0)
+            else:
+                predicted_wait_30min = future.get('predicted_wait_time', current_wait_time)
+                congestion = future.get('congestion_level', 0.5)
+                logger.debug(f"LSTM base prediction for {dept}: {predicted_wait_30min}분, congestion: {congestion}")
+            hybrid_eligible = True
+
+        except Exception as model_error:
+            logger.warning(f"Model prediction failed for {dept}: {model_error}")
+            # 모델 예측 실패 시 부서별 기본값 사용 (실제 데이터 기반)
+            predicted_wait_30min = DEFAULT_PREDICTED_WAIT.get(dept, current_wait_time if current_wait_time > 0 else 20)
+            congestion = min(predicted_wait_30min / 60.0, 1.0)
+            hybrid_eligible = False
+
+        return {
+            'current_wait': current_wait_time,
+            'lstm_wait': predicted_wait_30min,
+            'congestion': congestion,
+            'hybrid': None,
+            'hybrid_eligible': hybrid_eligible,
+        }
+
+    @staticmethod
+    def _apply_hybrid(base, current_time):
+        """HybridCongestion Algorithm (30min predictions only) - 전 부서를 벡터 연산 1회로 보정"""
+        targets = [dept for dept, result in base.items() if result.get('hybrid_eligible')]
+        if not targets:
+            return
+
+        try:
+            from .hybrid_congestion import HybridCongestionAlgorithm
+            from .hybrid_metrics_collector import HybridMetricsCollector
+
+            metric_matrix = HybridCongestionAlgorithm.build_metric_matrix(
+                [HybridMetricsCollector.get_real_time_queue_metrics(dept) for dept in targets],
+                [HybridMetricsCollector.get_transition_rates(dept) for dept in targets],
+            )
+            batch = HybridCongestionAlgorithm.apply_corrections_batch(
+                [base[dept]['lstm_wait'] for dept in targets],
+                metric_matrix,
+                current_time=current_time,
+                current_wait_times=[base[dept]['current_wait'] for dept in targets],  # Rule 7을 위해 현재 대기시간 전달
+            )
+            results = HybridCongestionAlgorithm.batch_to_results(batch)
+        except Exception as hybrid_error:
+            logger.warning(f"[HybridAlgorithm] ERROR: {str(hybrid_error)[:50]} | Fallback: Pure LSTM")
+            results = [{
+                'corrected_wait_time': base[dept]['lstm_wait'],
+                'confidence': 0.70,
+                'corrections': {},
+                'applied_rules': [],
+                'lstm_base': base[dept]['lstm_wait'],
+            } for dept in targets]
+
+        for dept, hybrid_result in zip(targets, results):
+            lstm_base = hybrid_result['lstm_base']
+            corrected = hybrid_result['corrected_wait_time']
+            base[dept]['hybrid'] = {
+                'corrected_wait_time': corrected,
+                'confidence': hybrid_result['confidence'],
+                'corrections': hybrid_result['corrections'],
+                'applied_rules': hybrid_result['applied_rules'],
+            }
+            correction_pct = ((corrected - lstm_base) / lstm_base * 100) if lstm_base > 0 else 0
+            logger.info(f"[HybridAlgorithm] {dept} | LSTM: {lstm_base:.1f}min -> Hybrid: {corrected:.1f}min ({correction_pct:+.1f}%) | Rules: {len(hybrid_result['applied_rules'])}/6 | Confidence: {hybrid_result['confidence']:.2f}")
+
+    @staticmethod
+    def _derive_prediction(base, timeframe, target_minutes):
+        """스냅샷의 30분 기준 결과로 시간대별 예측 응답 생성"""
+        if 'error' in base:
+            return {'error': base['error']}
+
+        current_wait_time = base['current_wait']
+        hybrid = base['hybrid']
+
+        # 시간대별 예측값 계산 (선형 보간) - 하이브리드 보정은 30분 예측에만 적용
+        if target_minutes == 30:
+            predicted_wait = hybrid['corrected_wait_time'] if hybrid else base['lstm_wait']
+        elif target_minutes == 60:
+            # 1시간 후 = 30분 예측의 1.5배 (추세 반영)
+            predicted_wait = round(base['lstm_wait'] * 1.5)
+        elif target_minutes == 120:
+            # 2시간 후 = 30분 예측의 2.0배 (추세 더 반영)
+            predicted_wait = round(base['lstm_wait'] * 2.0)
+        else:
+            predicted_wait = base['lstm_wait']
+
+        # 혼잡도도 시간에 비례해 증가
+        congestion = min(base['congestion'] * (target_minutes / 30.0), 1.0)
+
+        prediction_dict = {
+            'current_wait': round(current_wait_time),
+            'predicted_wait': predicted_wait,
+            'past_prediction': base['past_prediction'],  # ← 30분 전 AI 예측값 추가
+            'accuracy': base['accuracy'],  # 최근 24시간 예측 정확도 (집계 테이블)
+            'congestion': round(congestion, 2),
+            'trend': 'up' if predicted_wait > current_wait_time else 'down',
+            'timeframe': timeframe,
+            'target_minutes': target_minutes
+        }
+
+        # 하이브리드 알고리즘 적용 시 추가 정보
+        if target_minutes == 30 and hybrid:
+            prediction_dict['hybrid'] = {
+                'confidence': hybrid['confidence'],
+                'corrections': hybrid['corrections'],
+                'applied_rules': hybrid['applied_rules'],
+                'is_hybrid': len(hybrid['applied_rules']) > 0
+            }
+
+        return prediction_dict
+
+    @staticmethod
+    def get_predictions(timeframe='30min'):
+        """부서별 대기시간 예측 (다중 시간대 지원) - 공용 스냅샷에서 파생"""
+        target_minutes = TIMEFRAME_MINUTES.get(timeframe, 30)
+        snapshot = PredictionService.get_prediction_snapshot()
+        return {
+            dept: PredictionService._derive_prediction(base, timeframe, target_minutes)
+            for dept, base in snapshot['departments'].items()
+        }
+
+    @staticmethod
+    def _get_past_predictions(departments, now):
+        """부서별 30분 전(±5분) 최신 예측값 - 부서별 1건만 남기는 윈도우 쿼리 1회"""
+        if not departments:
+            return {}
+        try:
+            rows = PredictionLog.objects.filter(
+                department__in=departments,
+                timestamp__range=[now - timedelta(minutes=35), now - timedelta(minutes=25)]
+            ).annotate(
+                rank=Window(RowNumber(), partition_by=F('department'), order_by=F('timestamp').desc())
+            ).filter(rank=1).values_list('department', 'predicted_wait_time')
+            return {dept: round(predicted) for dept, predicted in rows}
+        except Exception as log_error:
+            logger.debug(f"[PastPrediction] lookup failed: {log_error}")
+            return {}
 
     @staticmethod
     def _log_prediction_summary(predictions):
@@ -358,26 +509,19 @@ class PredictionService:
 
     @staticmethod
     def get_timeline_predictions():
-        """시계열 예측 데이터 (현재, 10분, 20분, 30분)"""
-        cache_key = f"timeline_predictions:{timezone.now().strftime('%Y%m%d%H%M')[:12]}"
-        cached = cache.get(cache_key)
-
-        if cached:
-            return cached
-
-        departments = list(Exam.objects.values_list('department', flat=True).distinct())
+        """시계열 예측 데이터 (현재, 10분, 20분, 30분) - 공용 스냅샷에서 파생"""
+        base_prediction = PredictionService.get_predictions()
         timeline_data = {}
 
-        for dept in departments:
+        for dept, prediction in base_prediction.items():
             try:
                 # 각 시점별 예측
                 dept_timeline = []
-                base_prediction = PredictionService.get_predictions()
 
-                if dept in base_prediction and 'error' not in base_prediction[dept]:
-                    current = base_prediction[dept]['current_wait']
-                    predicted = base_prediction[dept]['predicted_wait']
-                    congestion = base_prediction[dept]['congestion']
+                if 'error' not in prediction:
+                    current = prediction['current_wait']
+                    predicted = prediction['predicted_wait']
+                    congestion = prediction['congestion']
 
                     # 현재 시점
                     dept_timeline.append({
@@ -412,17 +556,12 @@ class PredictionService:
             except Exception as e:
                 logger.error(f"Error creating timeline for {dept}: {e}")
 
-        cache.set(cache_key, timeline_data, 300)  # 5분 캐싱
         return timeline_data
 
     @staticmethod
     def get_domino_predictions(source_dept, delay_minutes):
-        """도미노 효과 예측"""
-        cache_key = f"domino:{source_dept}:{delay_minutes}"
-        cached = cache.get(cache_key)
-
-        if cached:
-            return cached
+        """도미노 효과 예측 - 대기 인원은 공용 스냅샷 사용"""
+        active_counts = PredictionService.get_prediction_snapshot()['active_counts']
 
         # 부서 간 영향 매트릭스 (실제 병원 데이터 기반으로 조정 필요)
         impact_matrix = {
@@ -438,10 +577,7 @@ class PredictionService:
 
         for dept, factor in impacts.items():
             # 현재 대기 상황 확인
-            current_queue = Queue.objects.filter(
-                exam__department=dept,
-                state__in=['waiting', 'called']
-            ).count()
+            current_queue = active_counts.get(dept, 0)
 
             delay_impact = round(delay_minutes * factor)
             affected_patients = current_queue + round(delay_impact / 3)
@@ -455,18 +591,12 @@ class PredictionService:
                 'probability': round(factor * 100)
             })
 
-        result = sorted(predictions, key=lambda x: x['impact_delay'], reverse=True)
-        cache.set(cache_key, result, 180)  # 3분 캐싱
-        return result
+        return sorted(predictions, key=lambda x: x['impact_delay'], reverse=True)
 
     @staticmethod
     def get_heatmap_predictions():
-        """시간대별 부서별 혼잡도 히트맵"""
-        cache_key = f"heatmap:{timezone.now().strftime('%Y%m%d%H')}"
-        cached = cache.get(cache_key)
-
-        if cached:
-            return cached
+        """시간대별 부서별 혼잡도 히트맵 - 현재 시간대는 공용 스냅샷 사용"""
+        active_counts = PredictionService.get_prediction_snapshot()['active_counts']
 
         departments = ['영상의학과', '내과', '정형외과', '진단검사의학과', '응급실']
         current_hour = timezone.now().hour
@@ -477,10 +607,7 @@ class PredictionService:
                 # 실제 대기 데이터 조회
                 if hour == current_hour:
                     # 현재 시간은 실제 데이터
-                    queue_count = Queue.objects.filter(
-                        exam__department=dept,
-                        state__in=['waiting', 'called']
-                    ).count()
+                    queue_count = active_counts.get(dept, 0)
                     congestion = min(100, queue_count * 5)  # 대기 인원 기반 혼잡도
                 else:
                     # 다른 시간은 예측 (과거 패턴 기반)
@@ -513,5 +640,4 @@ class PredictionService:
                     'risk': 'high' if congestion > 70 else 'medium' if congestion > 50 else 'low'
                 })
 
-        cache.set(cache_key, heatmap_data, 600)  # 10분 캐싱
         return heatmap_data
\ No newline at end of file
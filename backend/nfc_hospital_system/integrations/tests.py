@@ -189,11 +189,762 @@ class PredictionAPITestCase(TestCase):
         """LSTM 모델이 정상적으로 로드되는지 테스트"""
         from integrations.services.model_loader import predictor
 
-        # 모델이 로드되었는지 확인
-        self.assertIsNotNone(predictor.interpreter)
+        # 모델이 로드되었는지 확인 (TFLite 또는 NumPy 엔진)
+        self.assertIn(predictor.backend, ('tflite', 'numpy'))
         self.assertIsNotNone(predictor.input_details)
         self.assertIsNotNone(predictor.output_details)
 
         print(f"\n✅ LSTM model loaded successfully")
         print(f"  - Input shape: {predictor.input_details[0]['shape']}")
-        print(f"  - Output shape: {predictor.output_details[0]['shape']}")
\ No newline at end of file
+        print(f"  - Output shape: {predictor.output_details[0]['shape']}")
+
+
+class NumpyLSTMEngineTestCase(TestCase):
+    """TensorFlow 없이 동작하는 NumPy LSTM 추론 엔진 검증"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        import os
+        import numpy as np
+        from django.conf import settings
+        from integrations.services.numpy_lstm import NumpyLSTMModel
+
+        cls.model_dir = os.path.join(settings.BASE_DIR, 'ml_models')
+        cls.engine = NumpyLSTMModel.from_npz(os.path.join(cls.model_dir, 'hospital_lstm.npz'))
+        cls.batch = np.random.RandomState(42).rand(6, 12, 11).astype(np.float32)
+
+    def test_matches_tflite_within_tolerance(self):
+        """같은 가중치의 TFLite 출력과 허용 오차 내 일치"""
+        import numpy as np
+        try:
+            import tensorflow as tf
+        except ImportError:
+            self.skipTest('TensorFlow 미설치')
+        from integrations.management.commands.benchmark_lstm_inference import build_tflite_from_engine
+
+        interpreter = tf.lite.Interpreter(model_content=build_tflite_from_engine(self.engine))
+        interpreter.allocate_tensors()
+        input_index = interpreter.get_input_details()[0]['index']
+        output_index = interpreter.get_output_details()[0]['index']
+
+        expected = []
+        for sample in self.batch:
+            interpreter.set_tensor(input_index, sample[np.newaxis, ...])
+            interpreter.invoke()
+            expected.append(interpreter.get_tensor(output_index)[0])
+
+        np.testing.assert_allclose(self.engine.predict(self.batch), np.array(expected), atol=1e-5)
+
+    def test_quantized_variants_report(self):
+        """양자화 변형 저장 + 크기/지연시간/MAE 리포트, 추천 변형은 MAE 허용치 이내"""
+        import json
+        import os
+        import shutil
+        import tempfile
+        import numpy as np
+        try:
+            import tensorflow  # noqa: F401
+        except ImportError:
+            self.skipTest('TensorFlow 미설치')
+        from integrations.services.model_quantization import (
+            MAE_TOLERANCE_RATIO, REPORT_FILE, VARIANTS, build_quantized_variants,
+        )
+
+        out_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, out_dir)
+        rng = np.random.RandomState(0)
+        windows = rng.rand(80, 12, 11).astype(np.float32)
+        targets = self.engine.predict(windows).reshape(-1) + rng.normal(0, 0.05, 80).astype(np.float32)
+
+        report = build_quantized_variants(
+            self.engine, windows[:50], windows[50:], targets[50:], out_dir, 'test', iterations=2
+        )
+
+        self.assertEqual(report, json.load(open(os.path.join(out_dir, REPORT_FILE))))
+        self.assertEqual(set(report['variants']), set(VARIANTS))
+        for variant in VARIANTS[1:]:
+            row = report['variants'][variant]
+            self.assertTrue(os.path.exists(os.path.join(out_dir, row['file'])))
+            self.assertLess(row['max_abs_diff_vs_float'], 0.05)
+        self.assertLess(report['variants']['dynamic']['size_bytes'], report['variants']['float']['size_bytes'])
+
+        recommended = report['variants'][report['recommended']]
+        self.assertLessEqual(recommended['mae'], report['variants']['float']['mae'] * (1 + MAE_TOLERANCE_RATIO))
+
+    def test_npz_matches_h5_source(self):
+        """변환된 .npz 가 원본 .h5 와 같은 결과"""
+        import os
+        import numpy as np
+        try:
+            import h5py  # noqa: F401
+        except ImportError:
+            self.skipTest('h5py 미설치')
+        from integrations.services.numpy_lstm import NumpyLSTMModel
+
+        source = NumpyLSTMModel.from_h5(os.path.join(self.model_dir, 'hospital_lstm_new.h5'))
+        np.testing.assert_allclose(self.engine.predict(self.batch), source.predict(self.batch), atol=1e-6)
+
+    def test_batch_prediction_matches_single(self):
+        """부서 배치 예측이 부서별 단건 예측과 동일"""
+        from integrations.services.model_loader import predictor
+
+        results = predictor.predict_batch(self.batch)
+        self.assertEqual(len(results), 6)
+        for sample, result in zip(self.batch, results):
+            self.assertEqual(result, predictor.predict(sample[None, ...]))
+            self.assertTrue(0 <= result['predicted_wait_time'] <= 120)
+
+
+class TrainingDataExtractionTestCase(TestCase):
+    """train_lstm_from_db 슬라이딩 윈도우 추출 검증"""
+
+    def setUp(self):
+        import tempfile
+        from datetime import datetime, timedelta, timezone as dt_timezone
+        from appointments.models import Appointment
+        from p_queue.models import Queue
+
+        user = User.objects.create(
+            email='train@test.com', name='학습', role='patient',
+            phone_number='010-3333-4444', birth_date='1990-01-01'
+        )
+        base = datetime(2025, 3, 1, 20, 0, tzinfo=dt_timezone.utc)
+        queues = []
+        for dept, count in [('내과', 30), ('CT실', 20), ('MRI실', 5)]:
+            exam = Exam.objects.create(exam_id=f'EX-{dept}', title=dept, description=dept, department=dept)
+            appointment = Appointment.objects.create(
+                appointment_id=f'AP-{dept}', exam=exam, user=user, scheduled_at=base
+            )
+            for i in range(count):
+                queues.append(Queue(
+                    appointment=appointment, user=user, exam=exam, queue_number=i + 1,
+                    estimated_wait_time=(i * 7) % 130,  # 범위 밖 값 포함
+                    created_at=base + timedelta(minutes=37 * i),
+                ))
+        Queue.objects.bulk_create(queues)
+
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def _command(self):
+        from io import StringIO
+        from integrations.management.commands.train_lstm_from_db import Command
+
+        command = Command(stdout=StringIO())
+        command.DATASET_CACHE_DIR = self.cache_dir
+        return command
+
+    def _reference(self, seq_length):
+        """변경 전 알고리즘 (행 단위 특징 벡터)"""
+        from p_queue.models import Queue
+
+        command = self._command()
+        X, y, names = [], [], []
+        for dept in command.DEPARTMENTS:
+            rows = list(Queue.objects.filter(exam__department=dept).order_by('created_at'))
+            for i in range(len(rows) - seq_length):
+                target = rows[i + seq_length].estimated_wait_time
+                if not (5 <= target <= 120):
+                    continue
+                X.append([self._feature_vector(q, dept, command.DEPARTMENTS) for q in rows[i:i + seq_length]])
+                y.append(target)
+                names.append(dept)
+        return X, y, names
+
+    @staticmethod
+    def _feature_vector(queue, dept, departments):
+        features = [queue.created_at.hour / 24.0, queue.created_at.weekday() / 6.0,
+                    min(queue.estimated_wait_time / 60.0, 1.0)]
+        features.extend(1.0 if i == departments.index(dept) else 0.0 for i in range(8))
+        return features
+
+    def test_matches_row_by_row_extraction(self):
+        """행 단위 추출과 같은 윈도우/타겟 생성, 부서당 쿼리 1회"""
+        import numpy as np
+
+        # count 1 + 캐시 키 1 + 부서 6개 각 1
+        with self.assertNumQueries(8):
+            X, y, names = self._command().extract_training_data(12, use_cache=False)
+
+        X_ref, y_ref, names_ref = self._reference(12)
+        self.assertEqual(X.shape, (len(y_ref), 12, 11))
+        np.testing.assert_allclose(X, np.array(X_ref, dtype=np.float32), atol=1e-6)
+        np.testing.assert_array_equal(y, np.array(y_ref, dtype=np.float32))
+        self.assertEqual(names, names_ref)
+
+    def test_cached_dataset_reused(self):
+        """같은 데이터 범위면 캐시된 .npy 를 mmap 으로 재사용, 데이터 변경 시 재추출"""
+        import numpy as np
+        from p_queue.models import Queue
+
+        X, y, names = self._command().extract_training_data(12)
+
+        with self.assertNumQueries(2):
+            X_cached, y_cached, names_cached = self._command().extract_training_data(12)
+        self.assertIsInstance(X_cached, np.memmap)
+        np.testing.assert_array_equal(X, X_cached)
+        self.assertEqual(names, names_cached)
+
+        Queue.objects.filter(exam__department='CT실').delete()
+        X_new, _, names_new = self._command().extract_training_data(12)
+        self.assertNotIn('CT실', names_new)
+        self.assertLess(len(X_new), len(X))
+
+
+class FeatureStoreTestCase(TestCase):
+    """부서별 5분 버킷 피처 스토어 검증"""
+
+    def setUp(self):
+        from datetime import datetime, timezone as dt_timezone
+        from appointments.models import Appointment
+
+        self.base = datetime(2025, 3, 3, 1, 0, tzinfo=dt_timezone.utc)
+        self.user = User.objects.create(
+            email='store@test.com', name='스토어', role='patient',
+            phone_number='010-5555-6666', birth_date='1990-01-01'
+        )
+        self.exam = Exam.objects.create(exam_id='EX-CT', title='CT', description='CT', department='CT실')
+        Exam.objects.create(exam_id='EX-MRI', title='MRI', description='MRI', department='MRI실')
+        self.appointment = Appointment.objects.create(
+            appointment_id='AP-CT', exam=self.exam, user=self.user, scheduled_at=self.base
+        )
+
+    @staticmethod
+    def _department_count():
+        return Exam.objects.values('department').distinct().count()
+
+    def _queue(self, minutes, wait, state='waiting', updated_minutes=None, number=1):
+        from datetime import timedelta
+        from p_queue.models import Queue
+
+        created = self.base + timedelta(minutes=minutes)
+        updated = self.base + timedelta(minutes=updated_minutes if updated_minutes is not None else minutes)
+        return Queue.objects.bulk_create([Queue(
+            appointment=self.appointment, user=self.user, exam=self.exam, queue_number=number,
+            estimated_wait_time=wait, state=state, created_at=created, updated_at=updated,
+        )])[0]
+
+    def _status_log(self, queue, previous_state, new_state, minutes):
+        from datetime import timedelta
+        from p_queue.models import QueueStatusLog
+
+        log = QueueStatusLog.objects.create(queue=queue, previous_state=previous_state, new_state=new_state)
+        QueueStatusLog.objects.filter(pk=log.pk).update(created_at=self.base + timedelta(minutes=minutes))
+
+    def test_buckets_aggregate_queue_rows(self):
+        """버킷별 등록 수/평균 대기/완료/겹치는 대기 인원 집계"""
+        from datetime import timedelta
+        from integrations.models import DepartmentFeatureBucket
+        from integrations.services.feature_store import refresh_feature_store
+
+        self._queue(1, 10)                                    # 0번 버킷 등록, 계속 대기
+        self._queue(3, 20, state='completed', updated_minutes=12)  # 0번 등록, 2번 버킷 완료
+        self._queue(7, 30, state='no_show', updated_minutes=8)     # 1번 등록/노쇼
+
+        saved = refresh_feature_store(until=self.base + timedelta(minutes=15))
+        self.assertEqual(saved, self._department_count() * 3)  # 부서 x 버킷 3개 (dense)
+
+        ct = {b.bucket_start: b for b in DepartmentFeatureBucket.objects.filter(department='CT실')}
+        first, second, third = (ct[self.base + timedelta(minutes=m)] for m in (0, 5, 10))
+        self.assertEqual((first.queue_count, first.mean_wait), (2, 15.0))
+        self.assertEqual((second.queue_count, second.no_show_count), (1, 1))
+        self.assertEqual(third.completed_count, 1)
+        self.assertIsNone(third.mean_wait)
+        # 계속 대기 중인 대기열은 updated_at 과 무관하게 모든 버킷, 상태 로그가 없는 종료 대기열은 updated_at 까지
+        self.assertEqual([first.waiting_count, second.waiting_count, third.waiting_count], [2, 3, 2])
+
+    def test_waiting_interval_uses_status_logs(self):
+        """대기 종료는 지금 상태가 아니라 상태 로그 시각 - 이후 완료된 대기열도 과거 버킷에 남음"""
+        from datetime import timedelta
+        from integrations.models import DepartmentFeatureBucket
+        from integrations.services.feature_store import refresh_feature_store
+
+        queue = self._queue(1, 10, state='completed', updated_minutes=40)
+        self._status_log(queue, 'waiting', 'called', 4)
+        self._status_log(queue, 'called', 'in_progress', 8)
+        self._status_log(queue, 'in_progress', 'completed', 40)
+
+        refresh_feature_store(until=self.base + timedelta(minutes=15))
+
+        counts = list(
+            DepartmentFeatureBucket.objects.filter(department='CT실')
+            .order_by('bucket_start').values_list('waiting_count', flat=True)
+        )
+        self.assertEqual(counts, [1, 1, 0])
+
+    def test_incremental_refresh_only_recomputes_recent_buckets(self):
+        """증분 갱신은 마지막 버킷 근처만 다시 집계"""
+        from datetime import timedelta
+        from integrations.models import DepartmentFeatureBucket
+        from integrations.services.feature_store import refresh_feature_store
+
+        self._queue(1, 10)
+        refresh_feature_store(until=self.base + timedelta(hours=1))
+        self.assertEqual(DepartmentFeatureBucket.objects.count(), self._department_count() * 12)
+
+        self._queue(62, 40, number=2)
+        saved = refresh_feature_store(until=self.base + timedelta(minutes=70))
+        self.assertEqual(saved, self._department_count() * 5)  # lookback 3개 + 신규 2개
+        bucket = DepartmentFeatureBucket.objects.get(department='CT실', bucket_start=self.base + timedelta(minutes=60))
+        self.assertEqual((bucket.queue_count, bucket.mean_wait), (1, 40.0))
+
+    def test_upsert_without_conflict_target_on_mysql(self):
+        """충돌 대상 지정을 지원하지 않는 DB(MySQL)에서는 unique_fields 없이 upsert"""
+        from datetime import timedelta
+        from unittest import mock
+        from django.db import connection
+        from integrations.models import DepartmentFeatureBucket
+        from integrations.services.feature_store import refresh_feature_store
+
+        self._queue(1, 10)
+        with mock.patch.object(connection.features, 'supports_update_conflicts_with_target', False), \
+                mock.patch.object(DepartmentFeatureBucket.objects, 'bulk_create') as bulk_create:
+            refresh_feature_store(until=self.base + timedelta(minutes=15))
+
+        kwargs = bulk_create.call_args.kwargs
+        self.assertTrue(kwargs['update_conflicts'])
+        self.assertIsNone(kwargs['unique_fields'])
+
+    def test_inference_reads_last_buckets_in_one_query(self):
+        """최근 12개 버킷이 있으면 추론 입력을 쿼리 1회로 생성, 없으면 Queue 조회로 대체"""
+        from datetime import timedelta
+        from unittest import mock
+        from integrations.services.feature_store import refresh_feature_store
+        from integrations.services.prediction_service import PredictionService
+
+        for i in range(12):
+            self._queue(5 * i + 1, 10 + i, number=i + 1)
+        now = self.base + timedelta(minutes=61)
+
+        with mock.patch('django.utils.timezone.now', return_value=now):
+            fallback = PredictionService.get_recent_data_for_prediction('CT실')
+            refresh_feature_store(until=now)
+            with self.assertNumQueries(1):
+                stored = PredictionService.get_recent_data_for_prediction('CT실')
+
+        self.assertEqual(stored.shape, (1, 12, 11))
+        self.assertAlmostEqual(float(stored[0, -1, 2]), 21 / 60.0, places=5)
+        self.assertAlmostEqual(float(stored[0, 0, 2]), 10 / 60.0, places=5)
+        self.assertEqual(fallback.shape, stored.shape)
+
+
+class EnhancedCSVExportTestCase(TestCase):
+    """export_enhanced_csv 벡터화 파이프라인 검증"""
+
+    def setUp(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from appointments.models import Appointment
+        from p_queue.models import Queue
+
+        user = User.objects.create(
+            email='export@test.com', name='내보내기', role='patient',
+            phone_number='010-7777-8888', birth_date='1990-01-01'
+        )
+        exam = Exam.objects.create(exam_id='EX-XR', title='X-ray', description='X-ray', department='X-ray실')
+        appointment = Appointment.objects.create(
+            appointment_id='AP-XR', exam=exam, user=user, scheduled_at=timezone.now()
+        )
+
+        # 5분 슬롯 0 에 대기 2건(대기시간 10, 30), 슬롯 2 에 완료 1건 (슬롯 1 은 비어 있음)
+        self.base = timezone.now().replace(second=0, microsecond=0) - timedelta(hours=2)
+        self.base -= timedelta(minutes=self.base.minute % 5)
+        rows = [(0, 10, 'waiting', 'urgent'), (1, 30, 'waiting', 'normal'), (11, 0, 'completed', 'normal')]
+        Queue.objects.bulk_create([
+            Queue(
+                appointment=appointment, user=user, exam=exam, queue_number=i + 1,
+                estimated_wait_time=wait, state=state, priority=priority,
+                created_at=self.base + timedelta(minutes=minutes),
+                updated_at=self.base + timedelta(minutes=minutes),
+            )
+            for i, (minutes, wait, state, priority) in enumerate(rows)
+        ])
+
+    def test_export_builds_dense_feature_frame(self):
+        """청크 집계 → 연속 슬롯 재샘플링 → 부서별 rolling/lag 피처"""
+        import os
+        import tempfile
+        from io import StringIO
+        import pandas as pd
+        from django.core.management import call_command
+
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            try:
+                call_command('export_enhanced_csv', days=1, output='out.csv', chunk_size=2, stdout=StringIO())
+                df = pd.read_csv(os.path.join('data', 'out.csv'), encoding='utf-8-sig')
+            finally:
+                os.chdir(cwd)
+
+        self.assertEqual(len(df), 3)  # 빈 슬롯 1 도 0 으로 채움
+        self.assertEqual(list(df.columns), sorted(df.columns))
+        self.assertEqual(df['X-ray실_waiting'].tolist(), [2, 0, 0])
+        self.assertEqual(df['X-ray실_completed'].tolist(), [0, 0, 1])
+        self.assertEqual(df['X-ray실_avg_wait'].tolist(), [20.0, 0.0, 0.0])
+        self.assertEqual(df['X-ray실_urgent_ratio'].tolist(), [0.5, 0.0, 0.0])
+        self.assertEqual(df['X-ray실_waiting_ma_3'].tolist(), [2.0, 1.0, 0.6667])
+        self.assertEqual(df['X-ray실_waiting_lag_1'].tolist(), [0.0, 2.0, 0.0])
+        self.assertEqual(df['X-ray실_waiting_diff'].tolist(), [0.0, -2.0, 0.0])
+        self.assertEqual(df['hour'].iloc[0], self.base.hour)
+
+    def test_columnar_output_next_to_csv(self):
+        """--parquet 지정 시 CSV 와 같은 이름의 Parquet 파일 생성"""
+        import os
+        import tempfile
+        import unittest
+        from io import StringIO
+        import pandas as pd
+        from django.core.management import call_command
+
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise unittest.SkipTest('pyarrow not installed')
+
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            try:
+                call_command('export_enhanced_csv', days=1, output='out.csv', parquet=True, stdout=StringIO())
+                csv_frame = pd.read_csv(os.path.join('data', 'out.csv'), encoding='utf-8-sig')
+                parquet_frame = pd.read_parquet(os.path.join('data', 'out.parquet'))
+            finally:
+                os.chdir(cwd)
+
+        self.assertEqual(list(parquet_frame.columns), list(csv_frame.columns))
+        self.assertEqual(parquet_frame['X-ray실_waiting'].tolist(), csv_frame['X-ray실_waiting'].tolist())
+
+
+class PredictionLogBatchingTestCase(TestCase):
+    """PredictionLog 일괄 저장 / 과거 예측 윈도우 조회 / 정확도 집계 검증"""
+
+    def setUp(self):
+        from datetime import datetime, timezone as dt_timezone
+        from appointments.models import Appointment
+
+        cache.clear()
+        self.now = datetime(2025, 3, 3, 2, 0, tzinfo=dt_timezone.utc)
+        self.user = User.objects.create(
+            email='acc@test.com', name='정확도', role='patient',
+            phone_number='010-1212-3434', birth_date='1990-01-01'
+        )
+        self.exam = Exam.objects.create(exam_id='EX-ACC-CT', title='CT', description='CT', department='CT실')
+        Exam.objects.create(exam_id='EX-ACC-MRI', title='MRI', description='MRI', department='MRI실')
+        self.appointment = Appointment.objects.create(
+            appointment_id='AP-ACC', exam=self.exam, user=self.user, scheduled_at=self.now
+        )
+
+    def _log(self, department, minutes_ago, predicted):
+        from datetime import timedelta
+        from integrations.models import PredictionLog
+
+        log = PredictionLog.objects.create(
+            department=department, current_wait_time=0, predicted_wait_time=predicted,
+            congestion_level=0.5, model_version='1.0-lstm'
+        )
+        PredictionLog.objects.filter(pk=log.pk).update(timestamp=self.now - timedelta(minutes=minutes_ago))
+        return log
+
+    def test_one_lookup_and_one_insert_per_pass(self):
+        """부서 수와 무관하게 PredictionLog 조회 1회, INSERT 1회"""
+        from unittest import mock
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from integrations.models import PredictionLog
+        from integrations.services.prediction_service import PredictionService
+
+        self._log('CT실', 32, 20)
+        self._log('CT실', 28, 24)  # 구간 내 최신
+        self._log('CT실', 50, 99)  # 구간 밖
+        self._log('MRI실', 30, 40)
+
+        with mock.patch('django.utils.timezone.now', return_value=self.now):
+            with CaptureQueriesContext(connection) as ctx:
+                predictions = PredictionService.get_predictions()
+
+        log_queries = [q['sql'] for q in ctx.captured_queries if 'predictionlog' in q['sql'].lower()]
+        self.assertEqual(sum(sql.lstrip().upper().startswith('SELECT') for sql in log_queries), 1)
+        self.assertEqual(sum(sql.lstrip().upper().startswith('INSERT') for sql in log_queries), 1)
+        self.assertEqual(predictions['CT실']['past_prediction'], 24)
+        self.assertEqual(predictions['MRI실']['past_prediction'], 40)
+        self.assertEqual(PredictionLog.objects.count(), 4 + len(predictions))
+
+    def test_accuracy_job_joins_realized_waits(self):
+        """예측 30분 후 ±5분 내 호출 대기열의 평균 대기시간으로 실제값/정확도 집계"""
+        from datetime import timedelta
+        from p_queue.models import Queue
+        from integrations.models import PredictionAccuracy, PredictionLog
+        from integrations.services.prediction_accuracy import get_recent_accuracy, update_prediction_accuracy
+
+        predicted_at = self.now - timedelta(minutes=60)
+        log = self._log('CT실', 60, 20)
+        unmatched = self._log('MRI실', 60, 30)  # MRI 호출 없음 → 미확정
+        self._log('CT실', 10, 15)  # 아직 35분이 지나지 않음
+
+        # 예측 30분 후 호출된 대기열 2건: 실제 대기 10분, 20분 → 평균 15분
+        Queue.objects.bulk_create([
+            Queue(
+                appointment=self.appointment, user=self.user, exam=self.exam, queue_number=i + 1,
+                state='called', created_at=predicted_at + timedelta(minutes=31 - wait),
+                called_at=predicted_at + timedelta(minutes=31), updated_at=predicted_at,
+            )
+            for i, wait in enumerate([10, 20])
+        ])
+
+        resolved, windows = update_prediction_accuracy(now=self.now)
+        self.assertEqual((resolved, windows), (1, 1))
+
+        log.refresh_from_db()
+        unmatched.refresh_from_db()
+        self.assertAlmostEqual(log.actual_wait_time, 15.0, places=1)
+        self.assertIsNone(unmatched.actual_wait_time)
+
+        window = PredictionAccuracy.objects.get(department='CT실')
+        self.assertEqual(window.window_start, predicted_at.replace(minute=0))
+        self.assertEqual((window.sample_count, window.mean_abs_error), (1, 5.0))
+        self.assertAlmostEqual(window.accuracy, 66.67, places=2)
+
+        # 재실행 시 이미 확정된 로그는 다시 처리하지 않음
+        self.assertEqual(update_prediction_accuracy(now=self.now), (0, 0))
+        self.assertEqual(get_recent_accuracy(['CT실', 'MRI실'], now=self.now),
+                         {'CT실': {'accuracy': 66.7, 'mean_abs_error': 5.0, 'samples': 1}})
+
+
+    def test_accuracy_upsert_without_conflict_target_on_mysql(self):
+        """충돌 대상 지정을 지원하지 않는 DB(MySQL)에서는 unique_fields 없이 upsert"""
+        from datetime import timedelta
+        from unittest import mock
+        from django.db import connection
+        from integrations.models import PredictionAccuracy, PredictionLog
+        from integrations.services.prediction_accuracy import _rollup
+
+        self._log('CT실', 60, 20)
+        PredictionLog.objects.update(actual_wait_time=15)
+        hour = (self.now - timedelta(minutes=60)).replace(minute=0)
+
+        with mock.patch.object(connection.features, 'supports_update_conflicts_with_target', False), \
+                mock.patch.object(PredictionAccuracy.objects, 'bulk_create') as bulk_create:
+            _rollup({hour})
+
+        kwargs = bulk_create.call_args.kwargs
+        self.assertTrue(kwargs['update_conflicts'])
+        self.assertIsNone(kwargs['unique_fields'])
+
+class PredictionSnapshotTestCase(TestCase):
+    """예측/타임라인/도미노/히트맵이 5분 버킷당 공용 스냅샷 1개를 공유하는지 검증"""
+
+    def setUp(self):
+        from datetime import datetime, timezone as dt_timezone
+
+        cache.clear()
+        self.now = datetime(2025, 3, 3, 2, 1, tzinfo=dt_timezone.utc)
+        Exam.objects.create(exam_id='EX-SNAP-CT', title='CT', description='CT', department='CT실')
+        Exam.objects.create(exam_id='EX-SNAP-MRI', title='MRI', description='MRI', department='MRI실')
+
+    def test_one_model_pass_per_bucket(self):
+        """네 가지 예측 조회가 버킷당 모델 계산 1회, PredictionLog 저장 1회만 수행"""
+        from datetime import timedelta
+        from unittest import mock
+        from integrations.models import PredictionLog
+        from integrations.services.model_loader import predictor
+        from integrations.services.prediction_service import PredictionService
+
+        with mock.patch('django.utils.timezone.now', return_value=self.now), \
+                mock.patch.object(predictor, 'predict_batch', wraps=predictor.predict_batch) as predict_batch:
+            predictions = PredictionService.get_predictions()
+            hourly = PredictionService.get_predictions('1hour')
+            timeline = PredictionService.get_timeline_predictions()
+            PredictionService.get_domino_predictions('CT실', 30)
+            PredictionService.get_heatmap_predictions()
+            self.assertEqual(predict_batch.call_count, 1)
+            departments = len(predictions)
+            self.assertEqual(PredictionLog.objects.count(), departments)
+
+        # 같은 버킷의 파생 값은 서로 일관
+        self.assertEqual(timeline['CT실'][-1]['wait_time'], predictions['CT실']['predicted_wait'])
+        self.assertEqual(hourly['CT실']['target_minutes'], 60)
+        self.assertNotIn('hybrid', hourly['CT실'])
+
+        # 다음 버킷에서만 다시 계산
+        with mock.patch('django.utils.timezone.now', return_value=self.now + timedelta(minutes=5)), \
+                mock.patch.object(predictor, 'predict_batch', wraps=predictor.predict_batch) as predict_batch:
+            PredictionService.get_predictions()
+            PredictionService.get_timeline_predictions()
+            self.assertEqual(predict_batch.call_count, 1)
+        self.assertEqual(PredictionLog.objects.count(), departments * 2)
+
+
+    def test_waiter_does_not_release_owner_lock(self):
+        """잠금 대기 시간이 지나 직접 계산한 워커는 소유자의 잠금을 지우지 않음"""
+        from unittest import mock
+        from integrations.services import prediction_service
+        from integrations.services.prediction_service import PredictionService
+
+        bucket = int(self.now.timestamp()) // prediction_service.SNAPSHOT_SECONDS * prediction_service.SNAPSHOT_SECONDS
+        lock_key = f"prediction_snapshot:{bucket}:lock"
+        cache.add(lock_key, 1, 60)
+
+        with mock.patch('django.utils.timezone.now', return_value=self.now), \
+                mock.patch.object(prediction_service.time, 'sleep'):
+            snapshot = PredictionService.get_prediction_snapshot()
+
+        self.assertEqual(snapshot['bucket'], bucket)
+        self.assertEqual(cache.get(lock_key), 1)
+
+class HybridCongestionBatchTestCase(TestCase):
+    """HybridCongestion 배치(벡터) 경로가 스칼라 경로와 같은 결과를 내는지 무작위 속성 검증"""
+
+    @staticmethod
+    def _random_case(rng):
+        # 경계값(0, 동일값, 임계 비율)이 자주 나오도록 후보 중에서 선택
+        total = rng.choice([0, rng.randint(0, 30)])
+        urgent = rng.randint(0, total)
+        emergency = rng.randint(0, total - urgent)
+        avg = rng.choice([0.0, 15.0, round(rng.uniform(0, 60), 1)])
+        metrics = {
+            'waiting_count': rng.choice([0, rng.randint(0, 40)]),
+            'avg_exam_duration': avg,
+            'recent_avg_duration': rng.choice([avg, 0.0, round(rng.uniform(0, 90), 1)]),
+            'priority_distribution': {
+                'normal': total - urgent - emergency, 'urgent': urgent, 'emergency': emergency, 'total': total,
+            },
+            'recent_no_shows': rng.choice([0, rng.randint(0, 10)]),
+            'total_active_patients': rng.choice([0, 11, rng.randint(0, 60)]),
+        }
+        busier = rng.random() < 0.3
+        rates = {
+            'is_busier_than_expected': busier,
+            'is_slower_than_expected': not busier and rng.random() < 0.4,
+        }
+        lstm = rng.choice([0.0, -1.0, 20.0, round(rng.uniform(0, 130), 1), rng.randint(1, 120)])
+        current_wait = rng.choice([None, 0, rng.randint(0, 120), lstm * 2.5, lstm * 0.3, lstm])
+        return lstm, metrics, rates, current_wait
+
+    def test_batch_matches_scalar(self):
+        """무작위 부서 묶음 500개 x 8부서: 보정값/신뢰도/규칙별 계수/적용 규칙이 모두 동일"""
+        import random
+        from datetime import datetime, timedelta, timezone as dt_timezone
+        from integrations.services.hybrid_congestion import HybridCongestionAlgorithm
+
+        rng = random.Random(20250303)
+        for trial in range(500):
+            current_time = datetime(2025, 3, 3, tzinfo=dt_timezone.utc) + timedelta(days=trial % 7)
+            cases = [self._random_case(rng) for _ in range(8)]
+
+            scalar = [
+                HybridCongestionAlgorithm._apply_rules(lstm, metrics, rates, current_time, current_wait)
+                for lstm, metrics, rates, current_wait in cases
+            ]
+            matrix = HybridCongestionAlgorithm.build_metric_matrix([c[1] for c in cases], [c[2] for c in cases])
+            batch = HybridCongestionAlgorithm.apply_corrections_batch(
+                [c[0] for c in cases], matrix, current_time,
+                [float('nan') if c[3] is None else c[3] for c in cases],
+            )
+
+            self.assertEqual(HybridCongestionAlgorithm.batch_to_results(batch), scalar, msg=f"trial {trial}: {cases}")
+
+    def test_rule_mask_bits(self):
+        """적용 규칙 비트마스크는 RULE_ORDER 순서의 비트"""
+        from datetime import datetime, timezone as dt_timezone
+        from integrations.services.hybrid_congestion import HybridCongestionAlgorithm
+        from integrations.services.hybrid_metrics_collector import HybridMetricsCollector
+
+        # 기본 메트릭(대기 0명) + 느린 호출 + 화요일(요일 계수 1.0) + 현재 대기 없음 → queue_length, transition_rate 만 적용
+        matrix = HybridCongestionAlgorithm.build_metric_matrix(
+            [HybridMetricsCollector._get_default_metrics()],
+            [{'is_busier_than_expected': False, 'is_slower_than_expected': True}],
+        )
+        batch = HybridCongestionAlgorithm.apply_corrections_batch(
+            [30.0], matrix, datetime(2025, 3, 4, tzinfo=dt_timezone.utc), [float('nan')]
+        )
+        order = HybridCongestionAlgorithm.RULE_ORDER
+        expected = (1 << order.index('queue_length')) | (1 << order.index('transition_rate'))
+        self.assertEqual(int(batch['rule_mask'][0]), expected)
+        self.assertEqual(batch['factors'][0, order.index('queue_length')], 0.7)
+
+
+class ModelRegistryTestCase(TestCase):
+    """모델 레지스트리 핫 리로드 및 섀도 채점"""
+
+    def setUp(self):
+        import os
+        import shutil
+        import tempfile
+        from integrations.services.model_loader import predictor
+        import numpy as np
+        from integrations.services.model_registry import ModelRegistry
+
+        self.model_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.model_dir)
+        source = os.path.join(predictor.model_dir, 'hospital_lstm.npz')
+        shutil.copy(source, os.path.join(self.model_dir, 'v1.npz'))
+        shutil.copy(source, os.path.join(self.model_dir, 'v2.npz'))
+
+        self.registry = ModelRegistry(self.model_dir)
+        self.registry.register('v1', {'npz': 'v1.npz'})
+        self.registry.register('v2', {'npz': 'v2.npz'}, metrics={'mae': 4.0})
+        self.registry.activate('v1')
+
+        self.batch = np.random.default_rng(7).random((4, 12, 11), dtype=np.float32)
+
+    def _predictor(self):
+        from integrations.services.model_loader import LSTMPredictor
+        instance = object.__new__(LSTMPredictor)  # 싱글톤과 분리된 인스턴스
+        instance.initialize(model_dir=self.model_dir)
+        instance.shadow_async = False
+        return instance
+
+    def test_activate_swaps_model_without_restart(self):
+        """activate 후 다음 예측 호출 때 새 버전으로 교체, 예측 결과 형식 유지"""
+        from unittest import mock
+        from integrations.services import model_loader
+
+        p = self._predictor()
+        self.assertEqual(p.version, 'v1')
+        self.assertEqual(p.backend, 'numpy')
+        before = p.predict_batch(self.batch)
+
+        self.registry.activate('v2')
+        with mock.patch.object(model_loader, 'RELOAD_CHECK_SECONDS', 0):
+            after = p.predict_batch(self.batch)
+
+        self.assertEqual(p.version, 'v2')
+        self.assertEqual(p.metadata, {'mae': 4.0})
+        self.assertEqual(after, before)
+
+    def test_failed_load_keeps_previous_model(self):
+        """활성 버전 로드 실패 시 기존 모델 유지"""
+        import os
+
+        p = self._predictor()
+        with open(os.path.join(self.model_dir, 'broken.npz'), 'wb') as f:
+            f.write(b'not a model')
+        self.registry.register('broken', {'npz': 'broken.npz'})
+        self.registry.activate('broken')
+
+        self.assertTrue(p.reload())
+        self.assertEqual(p.version, 'v1')
+        self.assertNotIn('error', p.predict_batch(self.batch)[0])
+
+    def test_shadow_scoring_records_difference(self):
+        """섀도 버전 지정 시 같은 배치를 채점해 ModelShadowScore 기록 (응답은 활성 모델 결과)"""
+        from integrations.models import ModelShadowScore
+
+        p = self._predictor()
+        expected = p.predict_batch(self.batch)
+        self.assertEqual(ModelShadowScore.objects.count(), 0)
+
+        self.registry.set_shadow('v2')
+        p.reload()
+        self.assertEqual(p.shadow_version, 'v2')
+        self.assertEqual(p.predict_batch(self.batch), expected)
+
+        score = ModelShadowScore.objects.get()
+        self.assertEqual((score.active_version, score.shadow_version), ('v1', 'v2'))
+        self.assertEqual(score.sample_count, 4)
+        self.assertEqual(score.mean_abs_diff, 0)  # 같은 가중치
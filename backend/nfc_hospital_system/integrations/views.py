@@ -1,10 +1,12 @@
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework import status, permissions
+from django.db.models import F
 from django.utils import timezone
 from datetime import timedelta
 from .models import EmrSyncStatus
 from p_queue.models import PatientState
+from p_queue.position_engine import invalidate_queue_positions
 from authentication.models import User
 from nfc.models import NFCTag, FacilityRoute
 from hospital_navigation.models import HospitalMap, NavigationNode, DepartmentZone
@@ -633,7 +635,11 @@ def test_update_patient_state(request):
             print(f"[DEBUG TEST API]   → {appointments_updated}개 예약을 pending → scheduled로 변경")
 
             # ✅ 모든 Queue를 waiting으로 초기화 (Bulk Update)
-            queues_updated = user_queues.exclude(state='waiting').update(state='waiting')
+            reset_queues = user_queues.exclude(state='waiting')
+            exam_ids = set(reset_queues.values_list('exam_id', flat=True))
+            queues_updated = reset_queues.update(state='waiting')
+            # update()는 시그널을 발생시키지 않으므로 대기 순서 직접 무효화
+            invalidate_queue_positions(*exam_ids)
             print(f"[DEBUG TEST API]   → {queues_updated}개 Queue를 waiting으로 초기화")
 
             # ✅ 첫 번째 검사를 current_exam으로 설정하되, waiting 상태 유지
@@ -807,7 +813,11 @@ def test_update_patient_state(request):
         elif new_state == 'PAYMENT' or new_state == 'FINISHED':
             # ✅ 수납/완료 - 모든 Queue를 completed로 변경 (Bulk Update)
             print(f"[DEBUG TEST API] 💳 {new_state} 상태 전환 - 수납/완료 단계")
-            queues_updated = user_queues.exclude(state='completed').update(state='completed')
+            completed_queues = user_queues.exclude(state='completed')
+            exam_ids = set(completed_queues.values_list('exam_id', flat=True))
+            queues_updated = completed_queues.update(state='completed')
+            # update()는 시그널을 발생시키지 않으므로 대기 순서 직접 무효화
+            invalidate_queue_positions(*exam_ids)
             print(f"[DEBUG TEST API]   → {queues_updated}개 Queue를 completed로 변경")
 
             # current_exam 초기화
@@ -945,7 +955,8 @@ def test_reset_all_states(request):
     count = PatientState.objects.update(
         current_state='REGISTERED',
         current_location=None,
-        current_exam=None
+        current_exam=None,
+        version=F('version') + 1
     )
     
     return APIResponse.success(
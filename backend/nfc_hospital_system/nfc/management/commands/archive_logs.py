@@ -0,0 +1,108 @@
+# nfc/management/commands/archive_logs.py
+"""
+로그 테이블 아카이브
+오래된 스캔 로그(TagLog)를 아카이브 테이블로 배치 이동합니다.
+핫+아카이브 조회 경로가 있는 모델만 대상입니다. (nfc_hospital_system/archival.py, 설정: LOG_ARCHIVE)
+
+사용법:
+    python manage.py archive_logs                          # 전체 대상, HOT_DAYS 이전 행 이동
+    python manage.py archive_logs --tables nfc.TagLog --older-than 30
+    python manage.py archive_logs --max-batches 50 --sleep 1   # 업무 시간 중 천천히
+    python manage.py archive_logs --dry-run                # 대상 건수만 출력
+    python manage.py archive_logs --purge                  # RETENTION_DAYS 지난 아카이브 삭제
+"""
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from nfc_hospital_system.archival import (
+    archive_table, archived_labels, ensure_monthly_partitions, purge_archive,
+)
+
+
+class Command(BaseCommand):
+    help = '오래된 로그를 아카이브 테이블로 배치 단위 이동합니다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tables',
+            nargs='+',
+            default=None,
+            help='대상 모델 label (기본: 전체, 예: nfc.TagLog)'
+        )
+        parser.add_argument(
+            '--older-than',
+            type=int,
+            default=None,
+            help='이 일수보다 오래된 행 이동 (기본: LOG_ARCHIVE HOT_DAYS)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='배치당 이동 행 수 (기본: LOG_ARCHIVE BATCH_SIZE)'
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=None,
+            help='배치 사이 대기 초 (기본: LOG_ARCHIVE SLEEP)'
+        )
+        parser.add_argument(
+            '--max-batches',
+            type=int,
+            default=None,
+            help='테이블당 최대 배치 수 (나머지는 다음 실행에서 이어서)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='옮기지 않고 대상 건수만 출력'
+        )
+        parser.add_argument(
+            '--purge',
+            action='store_true',
+            help='RETENTION_DAYS 가 지난 아카이브 행(또는 MySQL 월 파티션) 삭제'
+        )
+
+    def handle(self, *args, **options):
+        labels = options['tables'] or archived_labels()
+        unknown = sorted(set(labels) - set(archived_labels()))
+        if unknown:
+            raise CommandError(f"아카이브 대상이 아닌 모델: {', '.join(unknown)} (가능: {', '.join(archived_labels())})")
+
+        cutoff = None
+        if options['older_than'] is not None:
+            cutoff = timezone.now() - timedelta(days=options['older_than'])
+
+        for label in labels:
+            if not options['dry_run']:
+                added = ensure_monthly_partitions(label)
+                if added:
+                    self.stdout.write(f"  {label}: 파티션 추가 {', '.join(added)}")
+
+            result = archive_table(
+                label,
+                cutoff=cutoff,
+                batch_size=options['batch_size'],
+                sleep=options['sleep'],
+                max_batches=options['max_batches'],
+                dry_run=options['dry_run'],
+            )
+            if options['dry_run']:
+                self.stdout.write(f"  {label}: {result['cutoff']:%Y-%m-%d %H:%M} 이전 {result['moved']}건 이동 예정")
+            else:
+                self.stdout.write(f"  {label}: {result['moved']}건 이동 ({result['batches']}배치)")
+
+            if options['purge'] and not options['dry_run']:
+                purged = purge_archive(label, batch_size=options['batch_size'], sleep=options['sleep'])
+                if purged['before'] is None:
+                    self.stdout.write(self.style.WARNING(f"  {label}: RETENTION_DAYS 미설정 - 아카이브 정리 건너뜀"))
+                else:
+                    self.stdout.write(
+                        f"  {label}: 아카이브 정리 - 파티션 {len(purged['dropped_partitions'])}개, {purged['deleted']}건"
+                    )
+
+        self.stdout.write(self.style.SUCCESS('✅ 로그 아카이브 완료'))
@@ -0,0 +1,66 @@
+# nfc/management/commands/flush_scan_logs.py
+"""
+NFC 스캔 버퍼 플러셔
+Redis Stream 에 쌓인 스캔 이벤트를 TagLog 로 일괄 적재합니다.
+
+사용법:
+    python manage.py flush_scan_logs            # 계속 실행 (운영용 별도 프로세스)
+    python manage.py flush_scan_logs --once     # 현재 쌓인 것만 적재 후 종료
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from nfc.scan_ingest import flush_scan_buffer, get_ingest_settings, get_scan_backlog
+
+
+class Command(BaseCommand):
+    help = 'NFC 스캔 버퍼를 TagLog 로 일괄 적재합니다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='현재 버퍼만 비우고 종료'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='배치당 최대 이벤트 수 (기본: NFC_SCAN_INGEST BATCH_SIZE)'
+        )
+
+    def handle(self, *args, **options):
+        conf = get_ingest_settings()
+        if conf['BACKEND'] == 'sync':
+            self.stdout.write(self.style.WARNING('NFC_SCAN_INGEST BACKEND 가 sync 입니다. 적재할 버퍼가 없습니다.'))
+            return
+
+        batch_size = options['batch_size'] or conf['BATCH_SIZE']
+        interval = conf['FLUSH_INTERVAL']
+        self.stdout.write(f"스캔 플러셔 시작 - backend: {conf['BACKEND']}, batch: {batch_size}")
+
+        total = 0
+        dead_letters = 0
+        while True:
+            close_old_connections()
+            while True:
+                flushed = flush_scan_buffer(batch_size=batch_size)
+                if not flushed:
+                    break
+                total += flushed
+
+            backlog = get_scan_backlog()
+            if backlog['warning']:
+                self.stdout.write(self.style.WARNING(f"스캔 적재 지연 - 대기 {backlog['pending']}건"))
+            if backlog['dead_letters'] > dead_letters:
+                self.stdout.write(self.style.WARNING(f"적재 실패(dead-letter) 누적 {backlog['dead_letters']}건"))
+            dead_letters = backlog['dead_letters']
+
+            if options['once']:
+                break
+            time.sleep(interval)
+
+        self.stdout.write(self.style.SUCCESS(f'✅ {total}건 적재 완료'))
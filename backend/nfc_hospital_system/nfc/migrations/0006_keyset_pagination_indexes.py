@@ -0,0 +1,28 @@
+# Generated by Django 5.2.4 on 2026-10-19 00:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """
+    태그별 스캔 로그 커서 페이지네이션용 (tag, timestamp, log_id) 인덱스
+    기존 (tag, timestamp) 인덱스는 새 인덱스의 접두사이므로 제거
+    (facilityroute 의 미반영 변경은 이 마이그레이션에 포함하지 않음)
+    """
+
+    dependencies = [
+        ("nfc", "0005_upgrade_facilityroute_schema"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="taglog",
+            index=models.Index(
+                fields=["tag", "timestamp", "log_id"], name="tag_logs_tag_id_4b5b42_idx"
+            ),
+        ),
+        migrations.RemoveIndex(
+            model_name="taglog",
+            name="tag_logs_tag_id_48e147_idx",
+        ),
+    ]
@@ -0,0 +1,126 @@
+# Generated by Django 5.2.4 on 2026-10-19 00:33
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+from nfc_hospital_system.archive_models import history_view_operation
+
+
+class Migration(migrations.Migration):
+    """
+    스캔 로그 아카이브 테이블과 핫+아카이브 UNION ALL 뷰
+    (facilityroute 의 미반영 변경은 이 마이그레이션에 포함하지 않음)
+    """
+
+    dependencies = [
+        ("nfc", "0006_keyset_pagination_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TagLogHistory",
+            fields=[
+                ("log_id", models.BigIntegerField(primary_key=True, serialize=False)),
+                (
+                    "action_type",
+                    models.CharField(
+                        choices=[
+                            ("scan", "위치 스캔"),
+                            ("enter", "검사실 입장"),
+                            ("exit", "검사실 퇴장"),
+                            ("fail", "스캔 실패"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                ("timestamp", models.DateTimeField()),
+            ],
+            options={
+                "db_table": "tag_logs_history",
+                "managed": False,
+            },
+        ),
+        migrations.CreateModel(
+            name="TagLogArchive",
+            fields=[
+                ("log_id", models.BigIntegerField()),
+                (
+                    "action_type",
+                    models.CharField(
+                        choices=[
+                            ("scan", "위치 스캔"),
+                            ("enter", "검사실 입장"),
+                            ("exit", "검사실 퇴장"),
+                            ("fail", "스캔 실패"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                ("timestamp", models.DateTimeField()),
+                (
+                    "pk",
+                    models.CompositePrimaryKey(
+                        "log_id",
+                        "timestamp",
+                        blank=True,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "tag_logs_archive",
+            },
+        ),
+        migrations.AddField(
+            model_name="taglogarchive",
+            name="tag",
+            field=models.ForeignKey(
+                db_column="tag_id",
+                db_constraint=False,
+                on_delete=django.db.models.deletion.DO_NOTHING,
+                related_name="+",
+                to="nfc.nfctag",
+            ),
+        ),
+        migrations.AddField(
+            model_name="taglogarchive",
+            name="user",
+            field=models.ForeignKey(
+                db_column="user_id",
+                db_constraint=False,
+                on_delete=django.db.models.deletion.DO_NOTHING,
+                related_name="+",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="taglogarchive",
+            index=models.Index(
+                fields=["user", "timestamp"], name="tag_logs_ar_user_id_32a27d_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="taglogarchive",
+            index=models.Index(
+                fields=["tag", "timestamp", "log_id"],
+                name="tag_logs_ar_tag_id_5db686_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="taglogarchive",
+            index=models.Index(
+                fields=["action_type"], name="tag_logs_ar_action__991c95_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="taglogarchive",
+            index=models.Index(
+                fields=["timestamp"], name="tag_logs_ar_timesta_955d25_idx"
+            ),
+        ),
+        history_view_operation("nfc", "TagLog"),
+    ]
@@ -4,6 +4,7 @@ from django.utils import timezone
 from appointments.models import Exam
 import uuid
 import json
+from nfc_hospital_system.archive_models import archive_model_for, history_model_for
 
 User = get_user_model()
 
@@ -188,7 +189,8 @@ class TagLog(models.Model):
         ordering = ['-timestamp']
         indexes = [
             models.Index(fields=['user', 'timestamp']),
-            models.Index(fields=['tag', 'timestamp']),
+            # 태그별 스캔 로그 커서 페이지네이션 (timestamp, log_id)
+            models.Index(fields=['tag', 'timestamp', 'log_id']),
             models.Index(fields=['action_type']),
             models.Index(fields=['timestamp']),
         ]
@@ -457,3 +459,8 @@ class FacilityRoute(models.Model):
             self.edges = self.route_data.get('edges', [])
 
         super().save(*args, **kwargs)
+
+
+# 스캔 로그 아카이브 (nfc_hospital_system/archival.py, archive_logs 명령)
+TagLogArchive = archive_model_for(TagLog, 'timestamp')
+TagLogHistory = history_model_for(TagLog)
@@ -0,0 +1,553 @@
+"""
+NFC 스캔 로그 write-behind 적재
+입구 키오스크 등에서 스캔이 몰릴 때 요청마다 TagLog INSERT + NFCTag 행 UPDATE +
+post_save 알림 2회가 직렬화되는 것을 피하기 위해, 스캔 이벤트를 버퍼에 넣고 즉시 응답한다.
+
+- 버퍼: Redis Stream (운영, 워커 간 공유) 또는 프로세스 내 메모리 큐 (개발)
+- 플러셔: TagLog bulk_create, 태그별 last_scanned_at UPDATE 1회, 알림 일괄 전송
+- 전달 보장: at-least-once (DB 커밋 후 ack, 실패 시 재전달)
+- 행 단위 오류(삭제된 태그/사용자 FK 등)는 배치를 반으로 나눠 해당 행만 골라내고,
+  MAX_ATTEMPTS 회 실패하면 dead-letter 로 옮긴다 (한 배치 때문에 적재 전체가 멈추지 않도록)
+- 버퍼가 STREAM_MAXLEN 에 차면 미적재 이벤트를 잘라내지 않고 즉시 저장으로 전환 (오류 로그)
+- settings.NFC_SCAN_INGEST['BACKEND'] == 'sync' 이면 기존과 동일하게 즉시 저장
+
+설정 예시:
+    NFC_SCAN_INGEST = {
+        'BACKEND': 'redis',          # sync | memory | redis
+        'BATCH_SIZE': 500,
+        'FLUSH_INTERVAL': 1.0,       # 초
+        'STREAM_KEY': 'nfc:scan_events',
+        'STREAM_MAXLEN': 100000,     # 미적재 이벤트 상한 (넘으면 즉시 저장)
+        'BACKLOG_WARNING': 5000,
+        'MAX_ATTEMPTS': 3,           # 행 단위 저장 실패 허용 횟수
+    }
+"""
+
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import DataError, IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import NFCTag, TagLog
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INGEST_SETTINGS = {
+    'BACKEND': 'sync',
+    'BATCH_SIZE': 500,
+    'FLUSH_INTERVAL': 1.0,
+    'STREAM_KEY': 'nfc:scan_events',
+    'STREAM_GROUP': 'taglog_flushers',
+    'STREAM_MAXLEN': 100000,
+    'CLAIM_IDLE_MS': 60000,
+    'BACKLOG_WARNING': 5000,
+    'MAX_ATTEMPTS': 3,
+    'DEAD_LETTER_KEY': 'nfc:scan_events:dead',
+}
+
+# 재시도해도 성공할 수 없는 행 단위 오류
+ROW_ERRORS = (IntegrityError, DataError)
+
+
+def get_ingest_settings():
+    return {**DEFAULT_INGEST_SETTINGS, **getattr(settings, 'NFC_SCAN_INGEST', {})}
+
+
+class MemoryScanBuffer:
+    """
+    프로세스 내 메모리 버퍼 (단일 워커/개발용)
+    읽은 이벤트는 ack 전까지 in-flight 로 보관하고 실패 시 큐 앞으로 되돌린다.
+    """
+
+    name = 'memory'
+
+    def __init__(self, maxlen=None):
+        self._lock = threading.Lock()
+        self._maxlen = maxlen
+        self._queue = deque()
+        self._in_flight = {}
+        self._attempts = {}
+        self.dead_letters = []
+
+    def append(self, event):
+        """버퍼에 추가 - 가득 찼으면 False"""
+        with self._lock:
+            if self._maxlen and len(self._queue) + len(self._in_flight) >= self._maxlen:
+                return False
+            self._queue.append((event['event_id'], event))
+            return True
+
+    def read(self, count):
+        with self._lock:
+            batch = []
+            while self._queue and len(batch) < count:
+                entry_id, event = self._queue.popleft()
+                self._in_flight[entry_id] = event
+                batch.append((entry_id, event))
+            return batch
+
+    def ack(self, entry_ids):
+        with self._lock:
+            for entry_id in entry_ids:
+                self._in_flight.pop(entry_id, None)
+                self._attempts.pop(entry_id, None)
+
+    def requeue(self, entry_ids):
+        with self._lock:
+            for entry_id in reversed(list(entry_ids)):
+                event = self._in_flight.pop(entry_id, None)
+                if event is not None:
+                    self._queue.appendleft((entry_id, event))
+
+    def record_failure(self, entry_id):
+        """행 단위 저장 실패 횟수 증가 후 반환"""
+        with self._lock:
+            self._attempts[entry_id] = self._attempts.get(entry_id, 0) + 1
+            return self._attempts[entry_id]
+
+    def dead_letter(self, entry_id, event, error):
+        with self._lock:
+            self._in_flight.pop(entry_id, None)
+            self._attempts.pop(entry_id, None)
+            self.dead_letters.append({'entry_id': entry_id, 'event': event, 'error': error})
+
+    def dead_letter_count(self):
+        with self._lock:
+            return len(self.dead_letters)
+
+    def backlog(self):
+        with self._lock:
+            return len(self._queue) + len(self._in_flight)
+
+
+class RedisScanBuffer:
+    """
+    Redis Stream 버퍼 (운영용, 여러 워커와 별도 플러셔 프로세스가 공유)
+    컨슈머 그룹으로 읽고 커밋 후 XACK + XDEL, 죽은 컨슈머의 미처리 항목은 XAUTOCLAIM 으로 회수
+    ack 한 항목은 XDEL 하므로 XLEN = 미적재 이벤트 수 (STREAM_MAXLEN 트림 없이 상한으로만 사용)
+    """
+
+    name = 'redis'
+
+    def __init__(self, conf, connection=None):
+        if connection is None:
+            from django_redis import get_redis_connection
+            connection = get_redis_connection('default')
+        self._redis = connection
+        self._stream = conf['STREAM_KEY']
+        self._group = conf['STREAM_GROUP']
+        self._maxlen = conf['STREAM_MAXLEN']
+        self._claim_idle_ms = conf['CLAIM_IDLE_MS']
+        self._attempts_key = f"{conf['STREAM_KEY']}:attempts"
+        self._dead_letter_key = conf['DEAD_LETTER_KEY']
+        self._consumer = f"flusher-{uuid.uuid4().hex[:8]}"
+        self._group_ready = False
+
+    def _ensure_group(self):
+        if self._group_ready:
+            return
+        try:
+            self._redis.xgroup_create(self._stream, self._group, id='0', mkstream=True)
+        except Exception as e:
+            if 'BUSYGROUP' not in str(e):
+                raise
+        self._group_ready = True
+
+    def append(self, event):
+        """
+        스트림에 추가 - 가득 찼으면 False
+        MAXLEN ~ 트림은 아직 적재하지 않은(pending 포함) 이벤트까지 지우므로 쓰지 않는다.
+        """
+        if self._redis.xlen(self._stream) >= self._maxlen:
+            return False
+        self._redis.xadd(self._stream, {'event': json.dumps(event)})
+        return True
+
+    def _decode(self, entries):
+        """
+        Returns: (배치, 내용이 없는 항목 ID 목록)
+        XAUTOCLAIM 은 이미 삭제된 항목을 fields=None 으로 돌려준다 (Redis 6.2)
+        """
+        batch = []
+        empty = []
+        for entry_id, fields in entries:
+            raw = (fields.get(b'event') or fields.get('event')) if fields else None
+            if raw is None:
+                empty.append(entry_id)
+                continue
+            if isinstance(raw, bytes):
+                raw = raw.decode('utf-8')
+            try:
+                event = json.loads(raw)
+            except ValueError:
+                # 형식이 깨진 이벤트는 flush_scan_buffer 에서 바로 dead-letter
+                event = {'raw': raw}
+            batch.append((entry_id, event))
+        return batch, empty
+
+    def read(self, count):
+        self._ensure_group()
+
+        # 다른 플러셔가 읽고 ack 하지 못한 항목 먼저 회수
+        claimed = self._redis.xautoclaim(
+            self._stream, self._group, self._consumer,
+            min_idle_time=self._claim_idle_ms, start_id='0-0', count=count
+        )
+        batch, empty = self._decode(claimed[1])
+        self.ack(empty)
+        if len(batch) >= count:
+            return batch
+
+        response = self._redis.xreadgroup(
+            self._group, self._consumer, {self._stream: '>'}, count=count - len(batch)
+        )
+        for _stream, entries in response or []:
+            decoded, empty = self._decode(entries)
+            batch.extend(decoded)
+            self.ack(empty)
+        return batch
+
+    def ack(self, entry_ids):
+        if not entry_ids:
+            return
+        pipe = self._redis.pipeline()
+        pipe.xack(self._stream, self._group, *entry_ids)
+        pipe.xdel(self._stream, *entry_ids)
+        pipe.hdel(self._attempts_key, *entry_ids)
+        pipe.execute()
+
+    def requeue(self, entry_ids):
+        # ack 하지 않으면 pending 으로 남아 CLAIM_IDLE_MS 이후 재전달된다
+        pass
+
+    def record_failure(self, entry_id):
+        return int(self._redis.hincrby(self._attempts_key, entry_id, 1))
+
+    def dead_letter(self, entry_id, event, error):
+        if isinstance(entry_id, bytes):
+            entry_id = entry_id.decode('utf-8')
+        self._redis.xadd(self._dead_letter_key, {
+            'entry_id': entry_id,
+            'event': json.dumps(event),
+            'error': error,
+        })
+        self.ack([entry_id])
+
+    def dead_letter_count(self):
+        return self._redis.xlen(self._dead_letter_key)
+
+    def backlog(self):
+        return self._redis.xlen(self._stream)
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+_flusher_thread = None
+
+
+def get_scan_buffer():
+    """설정된 버퍼 인스턴스 (sync 모드면 None)"""
+    global _buffer
+    conf = get_ingest_settings()
+    if conf['BACKEND'] == 'sync':
+        return None
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                if conf['BACKEND'] == 'redis':
+                    _buffer = RedisScanBuffer(conf)
+                else:
+                    _buffer = MemoryScanBuffer(maxlen=conf['STREAM_MAXLEN'])
+    return _buffer
+
+
+def _scan_message(tag, user_id, user_name, action_type, timestamp):
+    """signals.notify_nfc_scan 과 같은 형식의 알림 메시지"""
+    return {
+        'tag_id': str(tag.tag_id),
+        'tag_code': tag.code,
+        'location': tag.get_location_display(),
+        'building': tag.building,
+        'floor': tag.floor,
+        'room': tag.room,
+        'x_coord': tag.x_coord,
+        'y_coord': tag.y_coord,
+        'action_type': action_type,
+        'timestamp': timestamp.isoformat(),
+        'user_id': str(user_id),
+        'user_name': user_name
+    }
+
+
+def _monitor_message(tag, user_label, action_type, timestamp):
+    """admin_dashboard.signals.nfc_scan_notification 과 같은 형식의 NFC 모니터 메시지"""
+    return {
+        'tagCode': tag.code,
+        'location': tag.get_location_display(),
+        'user': user_label,
+        'timestamp': timestamp.isoformat(),
+        'actionType': action_type
+    }
+
+
+def _send_batched_notifications(logs, tags, users):
+    """
+    사용자별 최신 스캔 1건 + 관리자 대시보드 일괄 알림 1건 + NFC 모니터 일괄 알림 1건
+    users: user_id → (name, email)
+    bulk_create 는 post_save 를 보내지 않으므로 시그널이 하던 nfc_monitoring 알림도 여기서 보낸다
+    """
+    channel_layer = get_channel_layer()
+    if channel_layer is None or not logs:
+        return
+
+    logs = [log for log in logs if log.tag_id in tags]
+    messages = [
+        _scan_message(tags[log.tag_id], log.user_id, users.get(log.user_id, ('', ''))[0],
+                      log.action_type, log.timestamp)
+        for log in logs
+    ]
+
+    latest_by_user = {}
+    for message in messages:
+        previous = latest_by_user.get(message['user_id'])
+        if previous is None or message['timestamp'] >= previous['timestamp']:
+            latest_by_user[message['user_id']] = message
+
+    for user_id, message in latest_by_user.items():
+        async_to_sync(channel_layer.group_send)(
+            f'queue_{user_id}',
+            {'type': 'nfc_scan_update', 'message': message}
+        )
+
+    async_to_sync(channel_layer.group_send)(
+        'admin_dashboard',
+        {
+            'type': 'admin_nfc_notification',
+            'message': {
+                'notification_type': 'nfc_scan_batch',
+                'priority': 'low',
+                'count': len(messages),
+                'scans': messages
+            }
+        }
+    )
+
+    monitor_scans = []
+    for log in logs:
+        name, email = users.get(log.user_id, ('', ''))
+        monitor_scans.append(
+            _monitor_message(tags[log.tag_id], name or email or 'Unknown', log.action_type, log.timestamp)
+        )
+    async_to_sync(channel_layer.group_send)(
+        'nfc_monitoring',
+        {'type': 'nfc_scan_notification', 'scans': monitor_scans}
+    )
+
+
+def _tag_log(event):
+    """버퍼 이벤트 → TagLog (형식이 깨졌으면 KeyError/ValueError/TypeError)"""
+    timestamp = parse_datetime(event['timestamp'])
+    if timestamp is None:
+        raise ValueError(f"invalid timestamp: {event['timestamp']}")
+    return TagLog(
+        tag_id=uuid.UUID(event['tag_id']),
+        user_id=uuid.UUID(event['user_id']),
+        action_type=event['action_type'],
+        timestamp=timestamp
+    )
+
+
+def _save_logs(rows, batch_size):
+    """
+    TagLog 일괄 저장 + 태그별 last_scanned_at 갱신 (한 트랜잭션)
+    행 단위 오류면 반으로 나눠 다시 저장해 문제 행만 골라낸다.
+    Returns: (저장한 (entry_id, log) 목록, 실패한 (entry_id, 오류) 목록)
+    """
+    if not rows:
+        return [], []
+
+    logs = [log for _entry_id, log in rows]
+    latest_scan = {}
+    for log in logs:
+        if log.tag_id not in latest_scan or log.timestamp > latest_scan[log.tag_id]:
+            latest_scan[log.tag_id] = log.timestamp
+
+    try:
+        with transaction.atomic():
+            TagLog.objects.bulk_create(logs, batch_size=batch_size)
+            # 태그별 마지막 스캔 시간은 배치당 1회만 갱신 (과거 값으로 되돌리지 않음)
+            for tag_id, scanned_at in latest_scan.items():
+                NFCTag.objects.filter(
+                    Q(last_scanned_at__isnull=True) | Q(last_scanned_at__lt=scanned_at),
+                    tag_id=tag_id
+                ).update(last_scanned_at=scanned_at)
+    except ROW_ERRORS as e:
+        for log in logs:
+            log.pk = None
+        if len(rows) == 1:
+            return [], [(rows[0][0], str(e))]
+        middle = len(rows) // 2
+        saved_head, failed_head = _save_logs(rows[:middle], batch_size)
+        saved_tail, failed_tail = _save_logs(rows[middle:], batch_size)
+        return saved_head + saved_tail, failed_head + failed_tail
+    return rows, []
+
+
+def flush_scan_buffer(buffer=None, batch_size=None):
+    """
+    버퍼에서 한 배치를 꺼내 저장
+    - 형식이 깨진 이벤트는 바로 dead-letter
+    - 행 단위 오류는 해당 행만 다시 버퍼로, MAX_ATTEMPTS 회 실패하면 dead-letter
+    - 그 밖의 오류(DB 연결 등)는 배치 전체를 되돌리고 예외 전달
+    Returns: 저장한 TagLog 수
+    """
+    from authentication.models import User
+
+    buffer = buffer or get_scan_buffer()
+    if buffer is None:
+        return 0
+    conf = get_ingest_settings()
+    batch_size = batch_size or conf['BATCH_SIZE']
+
+    batch = buffer.read(batch_size)
+    if not batch:
+        return 0
+
+    events = dict(batch)
+    rows = []
+    for entry_id, event in batch:
+        try:
+            rows.append((entry_id, _tag_log(event)))
+        except (KeyError, TypeError, ValueError) as e:
+            logger.error(f"Dead-lettering malformed NFC scan event {entry_id}: {e}")
+            buffer.dead_letter(entry_id, event, f"invalid event: {e}")
+
+    try:
+        saved, failed = _save_logs(rows, batch_size)
+    except Exception:
+        buffer.requeue([entry_id for entry_id, _log in rows])
+        raise
+
+    buffer.ack([entry_id for entry_id, _log in saved])
+
+    retry = []
+    for entry_id, error in failed:
+        if buffer.record_failure(entry_id) >= conf['MAX_ATTEMPTS']:
+            logger.error(f"Dead-lettering NFC scan event {entry_id}: {error}")
+            buffer.dead_letter(entry_id, events[entry_id], error)
+        else:
+            retry.append(entry_id)
+    buffer.requeue(retry)
+
+    logs = [log for _entry_id, log in saved]
+    if not logs:
+        return 0
+
+    tag_ids = {log.tag_id for log in logs}
+    try:
+        tags = {
+            tag.tag_id: tag
+            for tag in NFCTag.objects.filter(tag_id__in=list(tag_ids))
+        }
+        user_ids = {log.user_id for log in logs}
+        users = {
+            user_id: (name or '', email or '')
+            for user_id, name, email in User.objects.filter(user_id__in=user_ids).values_list('user_id', 'name', 'email')
+        }
+        _send_batched_notifications(logs, tags, users)
+    except Exception as e:
+        logger.error(f"Failed to send batched NFC scan notifications: {str(e)}")
+
+    logger.info(f"Flushed {len(logs)} NFC scan logs ({len(tag_ids)} tags)")
+    return len(logs)
+
+
+def get_scan_backlog():
+    """미적재 스캔 수 (모니터링용)"""
+    conf = get_ingest_settings()
+    buffer = get_scan_buffer()
+    pending = buffer.backlog() if buffer is not None else 0
+    return {
+        'backend': conf['BACKEND'],
+        'pending': pending,
+        'dead_letters': buffer.dead_letter_count() if buffer is not None else 0,
+        'warning': pending >= conf['BACKLOG_WARNING'],
+        'full': buffer is not None and pending >= conf['STREAM_MAXLEN'],
+    }
+
+
+def _flusher_loop(interval):
+    from django.db import close_old_connections
+
+    while True:
+        try:
+            close_old_connections()
+            while flush_scan_buffer():
+                pass
+        except Exception as e:
+            logger.error(f"NFC scan flusher error: {str(e)}", exc_info=True)
+        time.sleep(interval)
+
+
+def _ensure_memory_flusher():
+    """메모리 버퍼는 같은 프로세스의 데몬 스레드가 주기적으로 플러시"""
+    global _flusher_thread
+    if _flusher_thread is not None and _flusher_thread.is_alive():
+        return
+    with _buffer_lock:
+        if _flusher_thread is not None and _flusher_thread.is_alive():
+            return
+        _flusher_thread = threading.Thread(
+            target=_flusher_loop,
+            args=(get_ingest_settings()['FLUSH_INTERVAL'],),
+            name='nfc-scan-flusher',
+            daemon=True
+        )
+        _flusher_thread.start()
+
+
+def ingest_scan(user, tag, action_type='scan', timestamp=None):
+    """
+    NFC 스캔 기록
+    sync 모드: TagLog 를 즉시 저장하고 log_id 반환
+    버퍼 모드: 이벤트를 버퍼에 넣고 None 반환 (플러셔가 저장), 버퍼가 가득 찼으면 즉시 저장
+    """
+    timestamp = timestamp or timezone.now()
+    buffer = get_scan_buffer()
+
+    if buffer is not None:
+        appended = buffer.append({
+            'event_id': uuid.uuid4().hex,
+            'tag_id': str(tag.tag_id),
+            'user_id': str(user.user_id),
+            'action_type': action_type,
+            'timestamp': timestamp.isoformat(),
+        })
+        if buffer.name == 'memory':
+            _ensure_memory_flusher()
+        if appended:
+            return None
+        # 버퍼가 가득 참 (플러셔 중단/지연) - 미적재 이벤트를 버리지 않고 즉시 저장
+        logger.error(
+            f"NFC scan buffer full ({buffer.backlog()} pending) - writing synchronously, check flush_scan_logs"
+        )
+
+    with transaction.atomic():
+        scan_log = TagLog.objects.create(
+            user=user,
+            tag=tag,
+            action_type=action_type,
+            timestamp=timestamp
+        )
+        tag.update_scan_time()
+    return scan_log.log_id
@@ -1,8 +1,9 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from channels.layers import get_channel_layer
 from asgiref.sync import async_to_sync
 from .models import TagLog, NFCTag
+from .tag_index import invalidate_tag_index
 from p_queue.models import PatientState
 import json
 import logging
@@ -72,6 +73,11 @@ def notify_tag_update(sender, instance, created, **kwargs):
     """
     NFC 태그가 생성되거나 업데이트될 때 관리자에게 알림
     """
+    # 태그 식별자 인덱스 무효화 (스캔 시간 갱신만 있는 경우 제외)
+    update_fields = kwargs.get('update_fields')
+    if not update_fields or set(update_fields) != {'last_scanned_at'}:
+        invalidate_tag_index()
+
     try:
         channel_layer = get_channel_layer()
         
@@ -101,6 +107,14 @@ def notify_tag_update(sender, instance, created, **kwargs):
         logger.error(f"Failed to send tag update notification: {str(e)}")
 
 
+@receiver(post_delete, sender=NFCTag)
+def invalidate_deleted_tag(sender, instance, **kwargs):
+    """
+    NFC 태그 삭제 시 태그 식별자 인덱스 무효화
+    """
+    invalidate_tag_index()
+
+
 @receiver(post_save, sender=PatientState)
 def notify_patient_location_update(sender, instance, created, **kwargs):
     """
@@ -108,26 +122,33 @@ def notify_patient_location_update(sender, instance, created, **kwargs):
     """
     # current_location이 변경된 경우만 처리
     if not created and instance.current_location:
-        try:
-            channel_layer = get_channel_layer()
-            
-            # 환자에게 위치 업데이트 알림
-            patient_message = {
-                'type': 'location_update',
-                'message': {
-                    'current_state': instance.current_state,
-                    'current_location': instance.current_location,
-                    'current_exam': instance.current_exam,
-                    'timestamp': instance.updated_at.isoformat()
-                }
+        send_location_update(instance)
+
+
+def send_location_update(instance):
+    """
+    환자에게 위치 업데이트 알림
+    compare_and_swap 으로 바꾼 경우(post_save 없음)에는 호출 측에서 직접 보냄
+    """
+    try:
+        channel_layer = get_channel_layer()
+        
+        patient_message = {
+            'type': 'location_update',
+            'message': {
+                'current_state': instance.current_state,
+                'current_location': instance.current_location,
+                'current_exam': instance.current_exam,
+                'timestamp': instance.updated_at.isoformat()
             }
-            
-            async_to_sync(channel_layer.group_send)(
-                f'queue_{instance.user.user_id}',
-                patient_message
-            )
-            
-            logger.info(f"Patient location update sent - User: {instance.user.user_id}")
-            
-        except Exception as e:
-            logger.error(f"Failed to send location update: {str(e)}")
\ No newline at end of file
+        }
+        
+        async_to_sync(channel_layer.group_send)(
+            f'queue_{instance.user.user_id}',
+            patient_message
+        )
+        
+        logger.info(f"Patient location update sent - User: {instance.user.user_id}")
+        
+    except Exception as e:
+        logger.error(f"Failed to send location update: {str(e)}")
\ No newline at end of file
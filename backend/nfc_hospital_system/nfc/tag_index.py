@@ -0,0 +1,169 @@
+"""
+NFC 태그 식별자 인메모리 인덱스
+스캔 요청마다 tag_id → tag_uid → (tag_uid | code) 순으로 최대 3회 조회하던 것을
+프로세스 내 dict 조회로 대체한다.
+
+- 활성 태그 전체를 한 번에 읽어 tag_id / tag_uid / code 별 dict로 보관
+- NFCTag post_save / post_delete 시그널에서 invalidate_tag_index() 호출
+- 무효화와 버전 증가는 transaction.on_commit 으로 커밋 후에만 실행
+  (커밋 전에 버전을 올리면 다른 워커가 커밋 전 행 - 예: 아직 활성인 비활성화 대상 - 으로 다시 빌드해
+  새 버전으로 들고 있게 되고, 인덱스에는 유효 기간이 없어 다음 태그 변경까지 남음)
+- 다른 워커 프로세스의 변경은 공유 캐시의 버전 키로 감지
+  (VERSION_CHECK_INTERVAL 초마다 한 번만 확인)
+- last_scanned_at 은 스냅샷 시점 값이므로 최신값이 필요하면 DB에서 다시 읽을 것
+"""
+
+import logging
+import threading
+import time
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+
+from .models import NFCTag
+
+logger = logging.getLogger(__name__)
+
+TAG_INDEX_VERSION_KEY = "nfc_tag_index_version"
+VERSION_CHECK_INTERVAL = 2  # 초
+
+_FIELD_NAMES = [field.attname for field in NFCTag._meta.concrete_fields]
+
+
+class _TagIndex:
+    """활성 태그의 식별자별 compact 레코드(필드값 튜플) 보관"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._maps = None  # (by_tag_id, by_tag_uid, by_code)
+        self._version = None
+        self._checked_at = 0.0
+
+    def _shared_version(self):
+        version = cache.get(TAG_INDEX_VERSION_KEY)
+        if version is None:
+            cache.add(TAG_INDEX_VERSION_KEY, 1, None)
+            version = cache.get(TAG_INDEX_VERSION_KEY, 1)
+        return version
+
+    def _rebuild(self, version):
+        by_tag_id, by_tag_uid, by_code = {}, {}, {}
+        rows = NFCTag.objects.filter(is_active=True).values_list(*_FIELD_NAMES)
+        for row in rows:
+            record = dict(zip(_FIELD_NAMES, row))
+            by_tag_id[str(record['tag_id'])] = row
+            by_tag_uid[record['tag_uid']] = row
+            by_code[record['code']] = row
+
+        self._maps = (by_tag_id, by_tag_uid, by_code)
+        self._version = version
+        logger.info(f"NFC tag index rebuilt - {len(by_tag_id)} tags, version {version}")
+
+    def _current_maps(self):
+        now = time.monotonic()
+        maps = self._maps
+        if maps is not None and now - self._checked_at < VERSION_CHECK_INTERVAL:
+            return maps
+
+        with self._lock:
+            if self._maps is not None and now - self._checked_at < VERSION_CHECK_INTERVAL:
+                return self._maps
+            version = self._shared_version()
+            if self._maps is None or version != self._version:
+                self._rebuild(version)
+            self._checked_at = now
+            return self._maps
+
+    def lookup(self, identifier, fields=('tag_id', 'tag_uid', 'code')):
+        """식별자에 해당하는 레코드 반환 (tag_id > tag_uid > code 우선순위)"""
+        by_tag_id, by_tag_uid, by_code = self._current_maps()
+
+        if 'tag_id' in fields:
+            try:
+                row = by_tag_id.get(str(uuid.UUID(identifier)))
+            except (ValueError, AttributeError, TypeError):
+                row = None
+            if row is not None:
+                return row
+
+        if 'tag_uid' in fields:
+            row = by_tag_uid.get(identifier)
+            if row is not None:
+                return row
+
+        if 'code' in fields:
+            return by_code.get(identifier)
+        return None
+
+    def clear(self):
+        with self._lock:
+            self._maps = None
+            self._version = None
+
+
+_index = _TagIndex()
+
+
+def _to_instance(row):
+    """레코드로부터 DB에서 읽은 것과 동일한 NFCTag 인스턴스 생성 (쿼리 없음)"""
+    return NFCTag.from_db('default', _FIELD_NAMES, row)
+
+
+def _fallback_lookup(identifier, fields):
+    """
+    인덱스 미스 시 DB 1회 확인
+    다른 프로세스에서 방금 생성된 태그가 버전 확인 주기 전에 스캔된 경우 대비
+    """
+    query = None
+    if 'tag_id' in fields:
+        try:
+            query = Q(tag_id=uuid.UUID(identifier))
+        except (ValueError, AttributeError, TypeError):
+            pass
+    for field in ('tag_uid', 'code'):
+        if field in fields:
+            condition = Q(**{field: identifier})
+            query = condition if query is None else query | condition
+
+    tag = NFCTag.objects.filter(query, is_active=True).first()
+    if tag is not None:
+        # 인덱스가 오래된 것이므로 다음 조회에서 다시 빌드
+        invalidate_tag_index()
+    return tag
+
+
+def resolve_tag(identifier, fields=('tag_id', 'tag_uid', 'code')):
+    """
+    스캔된 식별자(tag_id, tag_uid, code)로 활성 NFC 태그 조회
+    Returns: NFCTag 또는 None
+    """
+    if not identifier:
+        return None
+    identifier = str(identifier)
+
+    row = _index.lookup(identifier, fields)
+    if row is not None:
+        return _to_instance(row)
+
+    logger.warning(f"NFC tag index miss: {identifier}")
+    return _fallback_lookup(identifier, fields)
+
+
+def resolve_tag_by_code(code):
+    """태그 코드로만 활성 NFC 태그 조회"""
+    return resolve_tag(code, fields=('code',))
+
+
+def _invalidate_now():
+    _index.clear()
+    try:
+        cache.incr(TAG_INDEX_VERSION_KEY)
+    except ValueError:
+        cache.set(TAG_INDEX_VERSION_KEY, 2, None)
+
+
+def invalidate_tag_index():
+    """커밋 후 현재 프로세스 인덱스를 비우고 공유 버전을 올려 다른 워커도 재빌드하도록 함"""
+    transaction.on_commit(_invalidate_now)
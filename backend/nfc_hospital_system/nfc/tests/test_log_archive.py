@@ -0,0 +1,125 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from authentication.models import User
+from hospital_navigation.models import HospitalMap, NavigationNode, PatientRoute, RouteProgress
+from nfc.models import NFCTag, TagLog, TagLogArchive, TagLogHistory
+from nfc_hospital_system.archive_models import ARCHIVE_MODELS
+from nfc_hospital_system.archival import archive_table, archive_watermark, history_queryset, purge_archive
+
+
+class LogArchiveTestCase(TestCase):
+    """로그 아카이브 - 배치 이동, 핫+아카이브 통합 조회"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(
+            email='archive@test.com', name='환자', role='patient',
+            phone_number='010-4444-0000', birth_date='1990-01-01'
+        )
+        self.tag = NFCTag.objects.create(
+            tag_uid='archive-uid', code='ARCHIVE-1',
+            building='본관', floor=2, room='201호', description='테스트'
+        )
+        self.now = timezone.now()
+        # 120일 전 25건(아카이브 대상) + 1시간 전 5건
+        TagLog.objects.bulk_create([
+            TagLog(tag=self.tag, user=self.user, timestamp=self.now - timedelta(days=120, minutes=i))
+            for i in range(25)
+        ] + [
+            TagLog(tag=self.tag, user=self.user, timestamp=self.now - timedelta(hours=1, minutes=i))
+            for i in range(5)
+        ])
+
+    def test_moves_old_rows_in_bounded_batches(self):
+        """배치 크기 단위로 이동, max_batches 로 중단 후 재실행 시 이어서 처리"""
+        result = archive_table('nfc.TagLog', batch_size=10, sleep=0, max_batches=2)
+        self.assertEqual((result['moved'], result['batches']), (20, 2))
+        self.assertEqual(TagLog.objects.count(), 10)
+
+        result = archive_table('nfc.TagLog', batch_size=10, sleep=0)
+        self.assertEqual((result['moved'], result['batches']), (5, 1))
+        self.assertEqual(TagLog.objects.count(), 5)
+        self.assertEqual(TagLogArchive.objects.count(), 25)
+        self.assertEqual(TagLogArchive.objects.filter(tag_id=self.tag.tag_id, user_id=self.user.pk).count(), 25)
+
+    def test_history_spans_hot_and_archive(self):
+        """아카이브된 기간 조회는 핫+아카이브 통합, 최근 기간은 원본 테이블만"""
+        archive_table('nfc.TagLog', sleep=0)
+
+        old_start = self.now - timedelta(days=180)
+        self.assertEqual(history_queryset(TagLog, old_start).count(), 30)
+        self.assertEqual(
+            history_queryset(TagLog, old_start).filter(tag__building='본관').values('user').distinct().count(), 1
+        )
+        self.assertIs(history_queryset(TagLog, self.now - timedelta(days=1)).model, TagLog)
+
+        client = APIClient()
+        client.force_authenticate(user=User.objects.create(
+            email='admin@test.com', name='관리자', role='dept',
+            phone_number='010-4444-9999', birth_date='1990-01-01'
+        ))
+        response = client.get('/api/v1/analytics/patient-flow/', {
+            'startDate': old_start.isoformat(), 'endDate': self.now.isoformat(),
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['data']['summary']['totalScans'], 30)
+
+    def test_command_and_purge(self):
+        """archive_logs 명령 dry-run 은 이동하지 않음, 보관 기간 지난 아카이브는 배치 삭제"""
+        out = StringIO()
+        call_command('archive_logs', '--tables', 'nfc.TagLog', '--dry-run', stdout=out)
+        self.assertIn('25건 이동 예정', out.getvalue())
+        self.assertEqual(TagLogArchive.objects.count(), 0)
+
+        call_command('archive_logs', '--tables', 'nfc.TagLog', '--batch-size', '7', '--sleep', '0', stdout=out)
+        self.assertEqual(TagLogArchive.objects.count(), 25)
+
+        purged = purge_archive('nfc.TagLog', before=self.now - timedelta(days=120, minutes=10), batch_size=4, sleep=0)
+        self.assertEqual(purged['deleted'], 14)
+        self.assertEqual(TagLogArchive.objects.count(), 11)
+
+    def test_rows_referenced_by_route_progress_stay_hot(self):
+        """RouteProgress 가 가리키는 스캔 로그는 옮기지 않아 연결이 유지됨"""
+        linked = TagLog.objects.order_by('timestamp').first()
+        hospital_map = HospitalMap.objects.create(building='본관', floor=2)
+        node = NavigationNode.objects.create(map=hospital_map, node_type='junction', name='교차점', x_coord=0, y_coord=0)
+        route = PatientRoute.objects.create(
+            user=self.user, start_node=node, end_node=node, path_nodes=[str(node.node_id)],
+            total_distance=0, estimated_time=0
+        )
+        progress = RouteProgress.objects.create(route=route, current_node=node, node_index=0, tag_log=linked)
+
+        result = archive_table('nfc.TagLog', sleep=0)
+
+        self.assertEqual(result['moved'], 24)
+        self.assertTrue(TagLog.objects.filter(pk=linked.pk).exists())
+        progress.refresh_from_db()
+        self.assertEqual(progress.tag_log_id, linked.pk)
+
+    def test_watermark_cached_without_query_and_models_without_history_skipped(self):
+        """이동 후 아카이브 최신 시각은 쿼리 없이 캐시에서, 조회 경로가 없는 로그는 이동하지 않음"""
+        archive_table('nfc.TagLog', sleep=0)
+        with self.assertNumQueries(0):
+            watermark = archive_watermark('nfc.TagLog')
+        self.assertEqual(watermark, TagLogArchive.objects.order_by('-timestamp').first().timestamp)
+
+        for label in ('p_queue.QueueStatusLog', 'p_queue.StateTransition', 'integrations.PredictionLog'):
+            with self.assertRaises(ValueError):
+                archive_table(label)
+        # 조회 경로 없이 아카이브 테이블만 있는 모델은 두지 않음 (영원히 빈 테이블)
+        self.assertTrue(all(entry['history'] is not None for entry in ARCHIVE_MODELS.values()))
+
+    def test_history_view_columns_match_model(self):
+        """tag_logs_history 뷰 컬럼이 TagLog 컬럼과 같음 (모델 변경 시 뷰 재생성 누락 방지)"""
+        with connection.cursor() as cursor:
+            description = connection.introspection.get_table_description(cursor, TagLogHistory._meta.db_table)
+        self.assertEqual(sorted(column.name for column in description),
+                         sorted(field.column for field in TagLog._meta.concrete_fields))
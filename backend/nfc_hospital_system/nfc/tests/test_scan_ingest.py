@@ -0,0 +1,137 @@
+import json
+from datetime import timedelta
+from unittest import mock
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import IntegrityError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from authentication.models import User
+from nfc import scan_ingest
+from nfc.models import NFCTag, TagLog
+from nfc.scan_ingest import (
+    MemoryScanBuffer, RedisScanBuffer, flush_scan_buffer, get_ingest_settings, ingest_scan,
+)
+
+
+class ScanIngestTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(
+            email='patient@test.com', name='환자', role='patient',
+            phone_number='010-2222-2222', birth_date='2002-01-30'
+        )
+        self.tags = [
+            NFCTag.objects.create(
+                tag_uid=f'uid-{i}', code=f'TAG-{i}',
+                building='본관', floor=1, room=f'10{i}', description='입구'
+            )
+            for i in range(2)
+        ]
+        self.buffer = MemoryScanBuffer()
+        self.base_time = timezone.now() - timedelta(minutes=5)
+
+    def _append_scans(self, count):
+        for i in range(count):
+            self.buffer.append({
+                'event_id': f'event-{i}',
+                'tag_id': str(self.tags[i % 2].tag_id),
+                'user_id': str(self.user.user_id),
+                'action_type': 'scan',
+                'timestamp': (self.base_time + timedelta(seconds=i)).isoformat(),
+            })
+
+    def test_flush_bulk_creates_logs_and_collapses_scan_time(self):
+        """배치 적재 시 TagLog 일괄 생성, 태그별 최신 스캔 시간 1회 갱신"""
+        self._append_scans(10)
+        self.assertEqual(self.buffer.backlog(), 10)
+
+        flushed = flush_scan_buffer(self.buffer, batch_size=100)
+
+        self.assertEqual(flushed, 10)
+        self.assertEqual(TagLog.objects.count(), 10)
+        self.assertEqual(self.buffer.backlog(), 0)
+        self.tags[0].refresh_from_db()
+        self.tags[1].refresh_from_db()
+        self.assertEqual(self.tags[0].last_scanned_at, self.base_time + timedelta(seconds=8))
+        self.assertEqual(self.tags[1].last_scanned_at, self.base_time + timedelta(seconds=9))
+
+    def test_flush_notifies_nfc_monitor(self):
+        """bulk_create 는 post_save 가 없으므로 플러셔가 nfc_monitoring 그룹에 일괄 알림"""
+        channel_layer = get_channel_layer()
+        channel = async_to_sync(channel_layer.new_channel)()
+        async_to_sync(channel_layer.group_add)('nfc_monitoring', channel)
+        self._append_scans(3)
+
+        flush_scan_buffer(self.buffer, batch_size=100)
+
+        event = async_to_sync(channel_layer.receive)(channel)
+        self.assertEqual(event['type'], 'nfc_scan_notification')
+        self.assertEqual([scan['tagCode'] for scan in event['scans']], ['TAG-0', 'TAG-1', 'TAG-0'])
+        self.assertEqual({scan['user'] for scan in event['scans']}, {'환자'})
+        async_to_sync(channel_layer.group_discard)('nfc_monitoring', channel)
+
+    def test_failed_flush_keeps_events_for_retry(self):
+        """저장 실패 시 이벤트가 버퍼에 남아 다음 플러시에서 재시도"""
+        self._append_scans(4)
+
+        with mock.patch.object(TagLog.objects, 'bulk_create', side_effect=RuntimeError('db down')):
+            with self.assertRaises(RuntimeError):
+                flush_scan_buffer(self.buffer, batch_size=100)
+
+        self.assertEqual(self.buffer.backlog(), 4)
+        self.assertEqual(flush_scan_buffer(self.buffer, batch_size=100), 4)
+        self.assertEqual(TagLog.objects.count(), 4)
+
+    def test_poison_rows_are_split_out_and_dead_lettered(self):
+        """행 단위 오류는 해당 행만 재시도, MAX_ATTEMPTS 회 실패하면 dead-letter (나머지는 적재 계속)"""
+        self._append_scans(4)
+        self.buffer.append({'event_id': 'broken', 'tag_id': 'not-a-uuid'})
+        bad_tag = NFCTag.objects.create(tag_uid='uid-bad', code='TAG-BAD', building='본관', floor=1, room='199')
+        self.buffer.append({
+            'event_id': 'poison', 'tag_id': str(bad_tag.tag_id), 'user_id': str(self.user.user_id),
+            'action_type': 'scan', 'timestamp': self.base_time.isoformat(),
+        })
+        bulk_create = TagLog.objects.bulk_create
+
+        def reject_bad_tag(logs, **kwargs):
+            if any(log.tag_id == bad_tag.tag_id for log in logs):
+                raise IntegrityError('FOREIGN KEY constraint failed')
+            return bulk_create(logs, **kwargs)
+
+        with mock.patch.object(TagLog.objects, 'bulk_create', side_effect=reject_bad_tag):
+            self.assertEqual(flush_scan_buffer(self.buffer, batch_size=100), 4)
+            self.assertEqual(self.buffer.backlog(), 1)
+            self.assertEqual([d['entry_id'] for d in self.buffer.dead_letters], ['broken'])
+            for _ in range(get_ingest_settings()['MAX_ATTEMPTS'] - 1):
+                self.assertEqual(flush_scan_buffer(self.buffer, batch_size=100), 0)
+
+        self.assertEqual(self.buffer.backlog(), 0)
+        self.assertEqual([d['entry_id'] for d in self.buffer.dead_letters], ['broken', 'poison'])
+        self.assertEqual(TagLog.objects.count(), 4)
+
+    @override_settings(NFC_SCAN_INGEST={'BACKEND': 'memory', 'STREAM_MAXLEN': 2})
+    def test_full_buffer_writes_synchronously(self):
+        """버퍼가 가득 차면 이벤트를 버리지 않고 즉시 저장"""
+        with mock.patch.object(scan_ingest, '_buffer', MemoryScanBuffer(maxlen=2)), \
+                mock.patch.object(scan_ingest, '_ensure_memory_flusher'):
+            log_ids = [ingest_scan(self.user, self.tags[0]) for _ in range(3)]
+
+        self.assertEqual(log_ids[:2], [None, None])
+        self.assertEqual(list(TagLog.objects.values_list('log_id', flat=True)), [log_ids[2]])
+
+    def test_redis_read_acks_claimed_entries_without_fields(self):
+        """XAUTOCLAIM 이 돌려준 삭제된 항목(fields=None)은 건너뛰고 ack"""
+        connection = mock.MagicMock()
+        connection.xautoclaim.return_value = [b'0-0', [
+            (b'1-0', None),
+            (b'2-0', {b'event': json.dumps({'event_id': 'e2'}).encode()}),
+        ]]
+        connection.xreadgroup.return_value = []
+        buffer = RedisScanBuffer(get_ingest_settings(), connection=connection)
+
+        batch = buffer.read(10)
+
+        self.assertEqual(batch, [(b'2-0', {'event_id': 'e2'})])
+        connection.pipeline.return_value.xack.assert_called_once_with(
+            'nfc:scan_events', 'taglog_flushers', b'1-0'
+        )
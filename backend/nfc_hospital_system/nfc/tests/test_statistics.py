@@ -0,0 +1,82 @@
+from datetime import timedelta
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from authentication.models import User
+from nfc.models import NFCTag, TagLog
+from analytics.views import _get_export_data
+
+
+class TagUsageStatisticsTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.url = '/api/v1/nfc/admin/tags/statistics/'
+
+        self.admin_user = User.objects.create(
+            email='admin@test.com', name='관리자', role='dept',
+            phone_number='010-1234-5678', birth_date='1990-01-01'
+        )
+        self.patient = User.objects.create(
+            email='patient@test.com', name='환자', role='patient',
+            phone_number='010-2222-2222', birth_date='2002-01-30'
+        )
+        self.client.force_authenticate(user=self.admin_user)
+
+        self.scan_time = timezone.localtime().replace(hour=10, minute=0, second=0, microsecond=0)
+
+    def _create_tags(self, count, start=0):
+        for i in range(start, start + count):
+            tag = NFCTag.objects.create(
+                tag_uid=f'uid-{i}', code=f'TAG-{i}',
+                building='본관', floor=1, room=f'{100 + i}호', description='테스트'
+            )
+            TagLog.objects.bulk_create([
+                TagLog(tag=tag, user=self.patient, action_type='scan', timestamp=self.scan_time),
+                TagLog(tag=tag, user=self.patient, action_type='scan', timestamp=self.scan_time),
+                TagLog(tag=tag, user=self.patient, action_type='error',
+                       timestamp=self.scan_time + timedelta(hours=3)),
+            ])
+
+    def _count_queries(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response.json()['data']
+
+    def test_query_count_independent_of_tag_count(self):
+        """태그 수가 늘어나도 쿼리 수는 일정"""
+        self._create_tags(2)
+        few_tags_queries, _ = self._count_queries()
+
+        self._create_tags(20, start=2)
+        many_tags_queries, data = self._count_queries()
+
+        self.assertEqual(few_tags_queries, many_tags_queries)
+        self.assertEqual(len(data['statistics']), 22)
+
+    def test_statistics_values(self):
+        """스캔 수, 오류율, 피크 시간대, 시간대별 분포"""
+        self._create_tags(1)
+        _, data = self._count_queries()
+
+        stats = data['statistics'][0]
+        self.assertEqual(stats['totalScans'], 3)
+        self.assertAlmostEqual(stats['errorRate'], 100 / 3)
+        self.assertEqual(stats['peakHour'], 10)
+        self.assertEqual(stats['hourlyScans'][10], 2)
+        self.assertEqual(stats['hourlyScans'][13], 1)
+        self.assertEqual(data['summary']['totalScans'], 3)
+
+    def test_nfc_export_uses_single_query(self):
+        """NFC 내보내기는 태그 수와 관계없이 1회 조회"""
+        self._create_tags(5)
+        start = timezone.now() - timedelta(days=1)
+        end = timezone.now() + timedelta(days=1)
+
+        with self.assertNumQueries(1):
+            data, headers = _get_export_data('nfc', start, end)
+
+        self.assertEqual(len(data), 5)
+        self.assertEqual({row[4] for row in data}, {3})
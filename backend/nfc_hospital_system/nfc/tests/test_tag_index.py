@@ -0,0 +1,57 @@
+from django.test import TestCase
+from django.core.cache import cache
+from nfc import tag_index
+from nfc.models import NFCTag
+from nfc.tag_index import resolve_tag, resolve_tag_by_code, invalidate_tag_index
+
+
+class TagIndexTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidate_tag_index()
+        self.tag = NFCTag.objects.create(
+            tag_uid='04:A1:B2:C3', code='LOBBY-01',
+            building='본관', floor=1, room='로비', description='정문 로비'
+        )
+
+    def test_resolves_all_identifiers_without_queries(self):
+        """tag_id, tag_uid, code 모두 같은 태그로 해석되고 두 번째부터는 쿼리 없음"""
+        resolve_tag(self.tag.code)
+
+        with self.assertNumQueries(0):
+            by_id = resolve_tag(str(self.tag.tag_id))
+            by_uid = resolve_tag('04:A1:B2:C3')
+            by_code = resolve_tag_by_code('LOBBY-01')
+
+        for tag in (by_id, by_uid, by_code):
+            self.assertEqual(tag.pk, self.tag.pk)
+            self.assertEqual(tag.get_location_display(), '본관 1층 로비')
+
+    def test_save_invalidates_but_scan_time_update_does_not(self):
+        """태그 정보 변경은 인덱스를 무효화, 스캔 시간 갱신은 유지"""
+        resolve_tag(self.tag.code)
+
+        self.tag.update_scan_time()
+        with self.assertNumQueries(0):
+            resolve_tag(self.tag.code)
+
+        self.tag.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tag.save()
+        self.assertIsNone(resolve_tag(self.tag.code))
+
+    def test_version_bumped_only_after_commit(self):
+        """커밋 전에는 다른 워커가 재빌드하지 않도록 공유 버전을 올리지 않음"""
+        resolve_tag(self.tag.code)
+        version = cache.get(tag_index.TAG_INDEX_VERSION_KEY)
+
+        self.tag.is_active = False
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            self.tag.save()
+            self.assertEqual(cache.get(tag_index.TAG_INDEX_VERSION_KEY), version)
+
+        self.assertEqual(len(callbacks), 1)
+        callbacks[0]()
+        self.assertNotEqual(cache.get(tag_index.TAG_INDEX_VERSION_KEY), version)
+        self.assertIsNone(resolve_tag(self.tag.code))
@@ -6,13 +6,14 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet
 from rest_framework.decorators import action
-from rest_framework.pagination import PageNumberPagination
 from rest_framework.exceptions import NotFound
 from django.utils import timezone
 from django.db import transaction
 import logging
 
 from .models import NFCTag, TagLog, NFCTagExam, FacilityRoute
+from .tag_index import resolve_tag, resolve_tag_by_code, invalidate_tag_index
+from .scan_ingest import ingest_scan, get_scan_backlog
 from appointments.models import Exam
 from p_queue.models import Queue, PatientState
 from hospital_navigation.models import NavigationNode
@@ -28,9 +29,12 @@ from .serializers import (
 from appointments.serializers import ExamSerializer 
 
 from nfc_hospital_system.utils import APIResponse
+from nfc_hospital_system.pagination import KeysetPagination
 from authentication.models import User
 from datetime import datetime, timedelta
 from django.db.models import Count, Q, Avg, Max, Min
+from django.db.models.functions import ExtractHour
+from collections import defaultdict
 
 logger = logging.getLogger(__name__)
 
@@ -69,45 +73,11 @@ def nfc_public_scan(request):
                 status_code=status.HTTP_400_BAD_REQUEST
             )
         
-        # 태그 찾기 (더 유연하게)
-        tag = None
-        
-        logger.info(f"DEBUG 태그 찾기 시작: {tag_id}")
-        
-        # 먼저 tag_id로 검색
-        if len(tag_id) == 36 and '-' in tag_id:
-            try:
-                logger.info(f"DEBUG UUID 형식으로 tag_id 검색: {tag_id}")
-                tag = NFCTag.objects.get(tag_id=tag_id, is_active=True)
-                logger.info(f"SUCCESS tag_id로 태그 찾음: {tag.code}")
-            except NFCTag.DoesNotExist:
-                # tag_id로 못 찾으면 tag_uid로도 시도
-                try:
-                    logger.info(f"DEBUG UUID 형식으로 tag_uid 검색: {tag_id}")
-                    tag = NFCTag.objects.get(tag_uid=tag_id, is_active=True)
-                    logger.info(f"SUCCESS tag_uid로 태그 찾음: {tag.code}")
-                except NFCTag.DoesNotExist:
-                    logger.warning(f"ERROR UUID 형식이지만 tag_id, tag_uid 모두 못 찾음: {tag_id}")
-        
-        # UUID 형식이 아니면 tag_uid 또는 code로 검색
-        if not tag:
-            logger.info(f"DEBUG UUID 검색 실패, tag_uid 또는 code로 검색: {tag_id}")
-            tag = NFCTag.objects.filter(
-                models.Q(tag_uid=tag_id) | models.Q(code=tag_id),
-                is_active=True
-            ).first()
-            
-            if tag:
-                logger.info(f"SUCCESS tag_uid 또는 code로 태그 찾음: {tag.code}")
-            else:
-                logger.warning(f"ERROR 모든 검색 방법 실패: {tag_id}")
+        # 태그 찾기 (tag_id, tag_uid, code 모두 지원 - 인메모리 인덱스)
+        tag = resolve_tag(tag_id)
         
         if not tag:
-            logger.error(f"FINAL ERROR 태그를 찾을 수 없음: {tag_id}")
-            # 디버깅을 위해 실제 태그 목록 출력
-            all_tags = NFCTag.objects.filter(is_active=True).values('tag_id', 'tag_uid', 'code')
-            logger.info(f"DEBUG 활성 태그 목록: {list(all_tags)}")
-            
+            logger.warning(f"ERROR 태그를 찾을 수 없음: {tag_id}")
             return APIResponse.error(
                 message="존재하지 않거나 비활성화된 NFC 태그입니다.",
                 code="TAG_NOT_FOUND",
@@ -171,26 +141,8 @@ def nfc_scan(request):
         tag_id = serializer.validated_data['tag_id']
         action_type = serializer.validated_data.get('action_type', 'scan')
         
-        # 태그 ID 또는 UID로 태그 찾기 (더 유연하게)
-        tag = None
-        
-        # 먼저 tag_id로 검색
-        if len(tag_id) == 36 and '-' in tag_id:
-            try:
-                tag = NFCTag.objects.get(tag_id=tag_id, is_active=True)
-            except NFCTag.DoesNotExist:
-                # tag_id로 못 찾으면 tag_uid로도 시도
-                try:
-                    tag = NFCTag.objects.get(tag_uid=tag_id, is_active=True)
-                except NFCTag.DoesNotExist:
-                    pass
-        
-        # UUID 형식이 아니면 tag_uid 또는 code로 검색
-        if not tag:
-            tag = NFCTag.objects.filter(
-                models.Q(tag_uid=tag_id) | models.Q(code=tag_id),
-                is_active=True
-            ).first()
+        # 태그 ID, UID 또는 코드로 태그 찾기 (인메모리 인덱스)
+        tag = resolve_tag(tag_id)
         
         if not tag:
             return APIResponse.error(
@@ -199,22 +151,21 @@ def nfc_scan(request):
                 status_code=status.HTTP_404_NOT_FOUND
             )
         
-        # 스캔 로그 생성
-        with transaction.atomic():
-            scan_log = TagLog.objects.create(
-                user=request.user,
-                tag=tag,
-                action_type=action_type,
-                timestamp=serializer.validated_data.get('timestamp', timezone.now())
-            )
-            
-            # 태그의 마지막 스캔 시간 업데이트
-            tag.update_scan_time()
+        # 스캔 로그 생성 (버퍼 모드에서는 적재 큐에 넣고 즉시 응답, log_id는 None)
+        scanned_at = serializer.validated_data.get('timestamp', timezone.now())
+        scan_log_id = ingest_scan(
+            user=request.user,
+            tag=tag,
+            action_type=action_type,
+            timestamp=scanned_at
+        )
+        if scan_log_id is None:
+            tag.last_scanned_at = scanned_at
         
         # 응답 데이터 구성
         response_data = {
             'tag_info': tag,
-            'scan_log_id': scan_log.log_id
+            'scan_log_id': scan_log_id
         }
         
         # 시리얼라이저로 응답 형식 맞춤
@@ -245,26 +196,8 @@ def get_tag_info(request, tag_id):
     특정 NFC 태그의 위치 및 연결된 검사/진료 정보
     """
     try:
-        # 태그 조회 (tag_id, tag_uid, code 모두 지원)
-        logger.info(f"🔍 태그 조회 시작 - tag_id: {tag_id}")
-        tag = None
-        try:
-            if len(tag_id) == 36 and '-' in tag_id:
-                logger.info(f"UUID 형식으로 조회 시도: {tag_id}")
-                tag = NFCTag.objects.get(tag_id=tag_id, is_active=True)
-            else:
-                logger.info(f"코드 또는 UID로 조회 시도: {tag_id}")
-                tag = NFCTag.objects.filter(
-                    models.Q(tag_uid=tag_id) | models.Q(code=tag_id),
-                    is_active=True
-                ).first()
-                if tag:
-                    logger.info(f"✅ 태그 찾음: {tag.code} - {tag.get_location_display()}")
-                else:
-                    logger.warning(f"⚠️ 태그를 찾을 수 없음: {tag_id}")
-        except NFCTag.DoesNotExist:
-            logger.warning(f"⚠️ UUID로 태그를 찾을 수 없음: {tag_id}")
-            pass
+        # 태그 조회 (tag_id, tag_uid, code 모두 지원 - 인메모리 인덱스)
+        tag = resolve_tag(tag_id)
             
         if not tag:
             return APIResponse.error(
@@ -289,34 +222,23 @@ def get_tag_info(request, tag_id):
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
-class CustomNFCPagination(PageNumberPagination):
+class CustomNFCPagination(KeysetPagination):
+    """
+    태그 목록 페이지네이션 - (created_at, tag_id) 커서
+    ?page= (관리자 화면) 또는 ?ordering= 이 있으면 페이지 번호 방식 (COUNT 캐시)
+    """
     page_size = 10
     page_size_query_param = 'limit'
     max_page_size = 100
-    
-    def paginate_queryset(self, queryset, request, view=None):
-        """페이지네이션 처리 with 디버깅"""
-        page_number = request.query_params.get(self.page_query_param, 1)
-        logger.info(f"=== PAGINATION DEBUG ===")
-        logger.info(f"Requested page: {page_number}")
-        logger.info(f"Total items in queryset: {queryset.count()}")
-        logger.info(f"Page size: {self.get_page_size(request)}")
-        
-        # 총 페이지 수 계산
-        page_size = self.get_page_size(request)
-        total_items = queryset.count()
-        total_pages = (total_items + page_size - 1) // page_size if page_size > 0 else 0
-        logger.info(f"Total pages: {total_pages}")
-        
-        try:
-            result = super().paginate_queryset(queryset, request, view)
-            logger.info(f"Successfully paginated, returning {len(result) if result else 0} items")
-            return result
-        except NotFound as e:
-            logger.error(f"Pagination NotFound error: {str(e)}")
-            logger.error(f"Page {page_number} requested but only {total_pages} pages available")
-            # 페이지 2를 요청했는데 데이터가 10개 이하라면 페이지 1만 존재
-            raise e
+    ordering = ('-created_at', '-tag_id')
+    fallback_query_params = ('page', 'ordering')
+
+
+class TagScanLogPagination(KeysetPagination):
+    """태그 스캔 로그 - (timestamp, log_id) 커서"""
+    page_size = 20
+    ordering = ('-timestamp', '-log_id')
+    page_fallback_class = None
 
 # 관리자용 API
 
@@ -361,10 +283,8 @@ class AdminNFCTagViewSet(ModelViewSet):
         if is_active is not None and is_active != '':
             if is_active.lower() == 'true':
                 queryset = queryset.filter(is_active=True)
-                logger.info(f"Filtering active tags, count: {queryset.count()}")
             elif is_active.lower() == 'false':
                 queryset = queryset.filter(is_active=False)
-                logger.info(f"Filtering inactive tags, count: {queryset.count()}")
         
         # search 필터
         search = self.request.query_params.get('search', None)
@@ -411,9 +331,8 @@ class AdminNFCTagViewSet(ModelViewSet):
                 logger.info(f"Ordering applied: {ordering}")
         else:
             # 기본 정렬: 최신 생성순
-            queryset = queryset.order_by('-created_at')
+            queryset = queryset.order_by('-created_at', '-tag_id')
         
-        logger.info(f"Final queryset count: {queryset.count()}")
         return queryset
     
     def check_admin_permission(self):
@@ -901,6 +820,8 @@ def bulk_tag_operation(request):
                 updated = NFCTag.objects.filter(tag_id__in=tag_ids).update(
                     is_active=is_active
                 )
+                # update()는 시그널을 발생시키지 않으므로 직접 무효화
+                invalidate_tag_index()
                 results['success'] = {
                     'updated_count': updated,
                     'operation': operation
@@ -992,12 +913,29 @@ def tag_usage_statistics(request):
         if location:
             tags_query = tags_query.filter(location=location)
         
-        # 태그별 통계 집계
+        # 태그별 통계 집계 - (태그, 시간대)별 스캔/오류 수를 한 번에 조회
+        tags = tags_query.all()
+        hourly_rows = logs_query.filter(tag__in=tags_query).annotate(
+            hour=ExtractHour('timestamp')
+        ).values('tag_id', 'hour').annotate(
+            total=Count('log_id'),
+            errors=Count('log_id', filter=Q(action_type='error'))
+        ).order_by()
+        
+        tag_totals = defaultdict(lambda: {'total': 0, 'errors': 0, 'hourly': [0] * 24})
+        for row in hourly_rows:
+            totals = tag_totals[row['tag_id']]
+            totals['total'] += row['total']
+            totals['errors'] += row['errors']
+            if row['hour'] is not None:
+                totals['hourly'][int(row['hour'])] += row['total']
+        
         tag_stats = []
-        for tag in tags_query:
-            tag_logs = logs_query.filter(tag=tag)
-            total_scans = tag_logs.count()
-            error_scans = tag_logs.filter(action_type='error').count()
+        for tag in tags:
+            totals = tag_totals[tag.tag_id]
+            total_scans = totals['total']
+            error_scans = totals['errors']
+            hourly = totals['hourly']
             
             stats = {
                 'tagId': str(tag.tag_id),
@@ -1007,7 +945,8 @@ def tag_usage_statistics(request):
                 'errorRate': (error_scans / total_scans * 100) if total_scans > 0 else 0,
                 'lastScanTime': tag.last_scanned_at.isoformat() if tag.last_scanned_at else None,
                 'averageScansPerDay': 0,
-                'peakHour': None
+                'peakHour': None,
+                'hourlyScans': hourly
             }
             
             # 일평균 스캔 계산
@@ -1015,19 +954,15 @@ def tag_usage_statistics(request):
                 days_diff = (end_date - start_date).days or 1
                 stats['averageScansPerDay'] = round(total_scans / days_diff, 2)
             
-            # 피크 시간대 계산
-            hourly_scans = tag_logs.extra(
-                select={'hour': "EXTRACT(hour FROM timestamp)"}
-            ).values('hour').annotate(count=Count('log_id')).order_by('-count').first()
-            
-            if hourly_scans:
-                stats['peakHour'] = int(hourly_scans['hour'])
+            # 피크 시간대 계산 (동률이면 이른 시간)
+            if total_scans > 0:
+                stats['peakHour'] = max(range(24), key=lambda hour: (hourly[hour], -hour))
             
             tag_stats.append(stats)
         
         # 전체 통계
         overall_stats = {
-            'totalTags': tags_query.count(),
+            'totalTags': len(tags),
             'totalScans': logs_query.count(),
             'averageErrorRate': tag_stats and sum(t['errorRate'] for t in tag_stats) / len(tag_stats) or 0,
             'mostUsedTags': sorted(tag_stats, key=lambda x: x['totalScans'], reverse=True)[:5],
@@ -1132,6 +1067,7 @@ def tag_status_monitoring(request):
             'healthyCount': len(healthy_tags),
             'warningCount': len([t for t in problem_tags if t['status'] == 'warning']),
             'errorCount': len([t for t in problem_tags if t['status'] == 'error']),
+            'scanIngestBacklog': get_scan_backlog(),
             'lastCheckTime': timezone.now().isoformat()
         }
         
@@ -1194,6 +1130,21 @@ def tag_assignment_history(request, tag_id):
             lastScan=Max('timestamp')
         )
         
+        # 최근 스캔 로그 (커서 페이지네이션, 다음 페이지는 recentScans.next)
+        paginator = TagScanLogPagination()
+        scan_page = paginator.paginate_queryset(
+            TagLog.objects.filter(tag=tag).select_related('user'), request
+        )
+        recent_scans = {
+            **paginator.get_page_info(),
+            'results': [{
+                'logId': log.log_id,
+                'userName': log.user.name,
+                'actionType': log.action_type,
+                'timestamp': log.timestamp.isoformat()
+            } for log in scan_page]
+        }
+        
         return APIResponse.success(
             data={
                 'tag': {
@@ -1207,12 +1158,19 @@ def tag_assignment_history(request, tag_id):
                     'totalScans': scan_summary['totalScans'],
                     'firstScan': scan_summary['firstScan'].isoformat() if scan_summary['firstScan'] else None,
                     'lastScan': scan_summary['lastScan'].isoformat() if scan_summary['lastScan'] else None
-                }
+                },
+                'recentScans': recent_scans
             },
             message="태그 할당 이력을 조회했습니다.",
             status_code=status.HTTP_200_OK
         )
         
+    except NotFound as e:
+        return APIResponse.error(
+            message=str(e.detail),
+            code="INVALID_CURSOR",
+            status_code=status.HTTP_400_BAD_REQUEST
+        )
     except Exception as e:
         logger.error(f"Tag assignment history error: {str(e)}", exc_info=True)
         return APIResponse.error(
@@ -1423,11 +1381,10 @@ class NFCTagScanNavigateView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        try:
-            # code로 NFC 태그 찾기 (프론트엔드는 항상 code를 보냄)
-            start_tag = NFCTag.objects.get(code=start_tag_code)
-            destination_tag = NFCTag.objects.get(code=destination_tag_code)
-        except NFCTag.DoesNotExist:
+        # code로 NFC 태그 찾기 (프론트엔드는 항상 code를 보냄)
+        start_tag = resolve_tag_by_code(start_tag_code)
+        destination_tag = resolve_tag_by_code(destination_tag_code)
+        if not start_tag or not destination_tag:
             return Response(
                 {"error": "제공된 코드와 일치하는 NFC 태그를 찾을 수 없습니다."},
                 status=status.HTTP_404_NOT_FOUND
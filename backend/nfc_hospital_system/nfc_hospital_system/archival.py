@@ -0,0 +1,345 @@
+# backend/nfc_hospital_system/archival.py
+"""
+로그 테이블 아카이브
+TagLog 는 스캔마다 쌓이기만 하므로
+오래된 행을 같은 컬럼의 아카이브 테이블({원본}_archive, archive_models.py)로 옮겨 핫 테이블과 인덱스를 작게 유지한다.
+
+- 대상: 핫+아카이브 조회 경로(history 뷰 모델)가 있는 모델만 (현재 TagLog)
+        다른 로그(QueueStatusLog / StateTransition / PredictionLog 등)는 조회 코드가 history_queryset 으로
+        옮겨진 뒤에 아카이브 모델/마이그레이션을 함께 추가한다 (옮기면 모든 조회에서 사라짐)
+- 이동: (시각, PK) 순으로 가장 오래된 BATCH_SIZE 건씩 아카이브 INSERT + 원본 DELETE 를 한 트랜잭션으로,
+        배치 사이 SLEEP 초 대기 (한 번에 큰 DELETE 로 테이블을 잠그지 않음)
+        다른 테이블의 외래키가 아직 가리키는 행(RouteProgress.tag_log 등)은 옮기지 않음 (SET_NULL 로 연결이 끊기므로)
+- MySQL: 아카이브 테이블을 월별 RANGE 파티션으로 관리, 보관 기간이 지난 달은 DROP PARTITION
+         (원본 테이블은 외래키가 있어 파티션 불가 - 파티션 테이블은 FK 를 가질 수 없음)
+- 그 외 DB: 보관 기간이 지난 아카이브 행도 배치 단위 DELETE
+- 조회: history_queryset(모델, 시작 시각) - 기간이 아카이브된 구간에 걸치면 핫+아카이브 UNION ALL 뷰,
+        아니면 원본 테이블 (아카이브 최신 시각은 이동/정리 때 갱신해 만료 없이 캐시 → 추가 쿼리 없음)
+
+설정 예시:
+    LOG_ARCHIVE = {
+        'HOT_DAYS': {'nfc.TagLog': 90},         # 핫 테이블에 남길 일수 (모델 label 별)
+        'RETENTION_DAYS': None,                 # 아카이브 보관 일수 (None 이면 삭제하지 않음)
+        'BATCH_SIZE': 1000,
+        'SLEEP': 0.2,                           # 배치 사이 대기 (초)
+        'PARTITIONING': True,                   # MySQL 아카이브 월별 파티션 사용
+        'PARTITION_MONTHS_AHEAD': 2,            # 미리 만들어 둘 미래 월 파티션 수
+    }
+
+실행: python manage.py archive_logs
+"""
+
+import logging
+import time
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, router, transaction
+from django.db.models import Exists, Max, Min, OuterRef
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .archive_models import ARCHIVE_MODELS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ARCHIVE_SETTINGS = {
+    'HOT_DAYS': {
+        'nfc.TagLog': 90,
+    },
+    'RETENTION_DAYS': None,
+    'BATCH_SIZE': 1000,
+    'SLEEP': 0.2,
+    'PARTITIONING': True,
+    'PARTITION_MONTHS_AHEAD': 2,
+}
+
+
+
+def get_archive_settings():
+    conf = {**DEFAULT_ARCHIVE_SETTINGS, **getattr(settings, 'LOG_ARCHIVE', {})}
+    conf['HOT_DAYS'] = {**DEFAULT_ARCHIVE_SETTINGS['HOT_DAYS'], **conf['HOT_DAYS']}
+    return conf
+
+
+def archived_labels():
+    """아카이브 대상 모델 label 목록 (핫+아카이브 조회 경로가 있는 모델만)"""
+    return [label for label, entry in ARCHIVE_MODELS.items() if entry['history'] is not None]
+
+
+def _entry(label):
+    try:
+        entry = ARCHIVE_MODELS[label]
+    except KeyError:
+        raise ValueError(f"아카이브 대상이 아닌 모델입니다: {label}")
+    return apps.get_model(label), entry['archive'], entry['time_field']
+
+
+# ----------------------------------------------------------------------
+# 핫 → 아카이브 이동
+# ----------------------------------------------------------------------
+
+def _unreferenced(source, queryset):
+    """다른 테이블의 외래키가 가리키지 않는 행만 (옮기면 SET_NULL/CASCADE 로 연결이 끊김)"""
+    for relation in source._meta.related_objects:
+        if relation.many_to_many:
+            continue
+        referencing = relation.related_model._base_manager.filter(
+            **{relation.field.attname: OuterRef(relation.field.target_field.attname)}
+        )
+        queryset = queryset.filter(~Exists(referencing))
+    return queryset
+
+
+def archive_table(label, cutoff=None, batch_size=None, sleep=None, max_batches=None, dry_run=False):
+    """
+    cutoff 이전 행을 아카이브 테이블로 배치 단위 이동
+    Args:
+        label: 'nfc.TagLog' 등
+        cutoff: 이 시각 이전 행 이동 (기본: 지금 - HOT_DAYS)
+        max_batches: 이번 실행에서 처리할 최대 배치 수 (None 이면 끝까지)
+        dry_run: 옮기지 않고 대상 건수만 계산
+    Returns:
+        {'label', 'cutoff', 'moved', 'batches'} (dry_run 이면 moved 는 대상 건수)
+    """
+    conf = get_archive_settings()
+    source, archive, time_field = _entry(label)
+    if label not in archived_labels():
+        raise ValueError(f"핫+아카이브 조회 경로가 없어 아직 아카이브하지 않는 모델입니다: {label}")
+    if cutoff is None:
+        cutoff = timezone.now() - timedelta(days=conf['HOT_DAYS'][label])
+    batch_size = batch_size or conf['BATCH_SIZE']
+    sleep = conf['SLEEP'] if sleep is None else sleep
+
+    pk_name = source._meta.pk.attname
+    columns = [field.attname for field in source._meta.concrete_fields]
+    pk_index = columns.index(pk_name)
+    pending = _unreferenced(
+        source, source._default_manager.filter(**{f'{time_field}__lt': cutoff})
+    ).order_by(time_field, pk_name)
+    result = {'label': label, 'cutoff': cutoff, 'moved': 0, 'batches': 0}
+
+    if dry_run:
+        result['moved'] = pending.count()
+        return result
+
+    db = router.db_for_write(source)
+    while max_batches is None or result['batches'] < max_batches:
+        rows = list(pending.values_list(*columns)[:batch_size])
+        if not rows:
+            break
+
+        with transaction.atomic(using=db):
+            # 중간에 중단됐다 재실행해도 같은 행이 두 번 들어가지 않도록 충돌 무시
+            archive._default_manager.using(db).bulk_create(
+                [archive(**dict(zip(columns, row))) for row in rows],
+                ignore_conflicts=True,
+            )
+            source._default_manager.using(db).filter(pk__in=[row[pk_index] for row in rows]).delete()
+
+        result['moved'] += len(rows)
+        result['batches'] += 1
+        if len(rows) < batch_size:
+            break
+        if sleep:
+            time.sleep(sleep)
+
+    if result['moved']:
+        refresh_watermark(label)
+        logger.info(f"로그 아카이브 - {label}: {result['moved']}건 이동 ({result['batches']}배치)")
+    return result
+
+
+def purge_archive(label, before=None, batch_size=None, sleep=None):
+    """
+    보관 기간이 지난 아카이브 행 삭제
+    MySQL 파티션 테이블은 before 이전에 끝나는 월 파티션을 DROP, 나머지는 배치 단위 DELETE
+    Returns: {'label', 'before', 'dropped_partitions', 'deleted'}
+    """
+    conf = get_archive_settings()
+    source, archive, time_field = _entry(label)
+    if before is None:
+        if conf['RETENTION_DAYS'] is None:
+            return {'label': label, 'before': None, 'dropped_partitions': [], 'deleted': 0}
+        before = timezone.now() - timedelta(days=conf['HOT_DAYS'][label] + conf['RETENTION_DAYS'])
+    batch_size = batch_size or conf['BATCH_SIZE']
+    sleep = conf['SLEEP'] if sleep is None else sleep
+
+    dropped = _drop_partitions_before(archive, before)
+
+    db = router.db_for_write(archive)
+    pk_name = source._meta.pk.attname
+    expired = archive._default_manager.using(db).filter(**{f'{time_field}__lt': before})
+    deleted = 0
+    while True:
+        keys = list(expired.order_by(time_field).values_list(pk_name, time_field)[:batch_size])
+        if not keys:
+            break
+        deleted += archive._default_manager.using(db).filter(pk__in=keys).delete()[0]
+        if len(keys) < batch_size:
+            break
+        if sleep:
+            time.sleep(sleep)
+
+    if dropped or deleted:
+        refresh_watermark(label)
+        logger.info(f"아카이브 정리 - {label}: 파티션 {len(dropped)}개 삭제, {deleted}건 삭제")
+    return {'label': label, 'before': before, 'dropped_partitions': dropped, 'deleted': deleted}
+
+
+# ----------------------------------------------------------------------
+# MySQL 월별 파티션
+# ----------------------------------------------------------------------
+
+def _month_start(value):
+    return datetime(value.year, value.month, 1)
+
+
+def _add_months(value, months):
+    month = value.month - 1 + months
+    return value.replace(year=value.year + month // 12, month=month % 12 + 1)
+
+
+def _partition_name(month):
+    return f"p{month:%Y%m}"
+
+
+def _partition_clause(months):
+    """월 목록 → 'PARTITION p202601 VALUES LESS THAN (...), ..., PARTITION pmax ...'"""
+    parts = [
+        f"PARTITION {_partition_name(month)} VALUES LESS THAN ('{_add_months(month, 1):%Y-%m-%d %H:%M:%S}')"
+        for month in months
+    ]
+    parts.append("PARTITION pmax VALUES LESS THAN (MAXVALUE)")
+    return ", ".join(parts)
+
+
+def _existing_partitions(connection, table):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT PARTITION_NAME FROM information_schema.PARTITIONS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL "
+            "ORDER BY PARTITION_ORDINAL_POSITION",
+            [table]
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _utc_naive(value):
+    # USE_TZ 에서 MySQL DATETIME 은 UTC 로 저장되므로 파티션 경계도 UTC 기준
+    if timezone.is_aware(value):
+        value = value.astimezone(dt_timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def ensure_monthly_partitions(label, months_ahead=None, now=None):
+    """
+    MySQL 아카이브 테이블 월별 RANGE 파티션 생성/연장 (MySQL 이 아니면 아무 것도 하지 않음)
+    - 파티션이 없으면 아카이브 최초 월부터 현재 + months_ahead 월까지로 재구성
+    - 있으면 pmax 를 나눠 부족한 미래 월 추가
+    Returns: 추가한 파티션 이름 목록
+    """
+    conf = get_archive_settings()
+    source, archive, time_field = _entry(label)
+    connection = connections[router.db_for_write(archive)]
+    if connection.vendor != 'mysql' or not conf['PARTITIONING']:
+        return []
+
+    months_ahead = conf['PARTITION_MONTHS_AHEAD'] if months_ahead is None else months_ahead
+    table = archive._meta.db_table
+    column = archive._meta.get_field(time_field).column
+    last_month = _add_months(_month_start(_utc_naive(now or timezone.now())), months_ahead)
+
+    existing = [name for name in _existing_partitions(connection, table) if name != 'pmax']
+    if existing:
+        first_month = _add_months(datetime.strptime(existing[-1], 'p%Y%m'), 1)
+    else:
+        oldest = archive._default_manager.aggregate(oldest=Min(time_field))['oldest']
+        first_month = _month_start(_utc_naive(oldest or now or timezone.now()))
+
+    months = []
+    month = first_month
+    while month <= last_month:
+        months.append(month)
+        month = _add_months(month, 1)
+    if not months:
+        return []
+
+    with connection.cursor() as cursor:
+        if existing:
+            cursor.execute(f"ALTER TABLE {table} REORGANIZE PARTITION pmax INTO ({_partition_clause(months)})")
+        else:
+            cursor.execute(
+                f"ALTER TABLE {table} PARTITION BY RANGE COLUMNS({column}) ({_partition_clause(months)})"
+            )
+    added = [_partition_name(month) for month in months]
+    logger.info(f"아카이브 파티션 추가 - {table}: {', '.join(added)}")
+    return added
+
+
+def _drop_partitions_before(archive, before):
+    """before 이전에 끝나는 월 파티션 DROP (MySQL 파티션 테이블만)"""
+    connection = connections[router.db_for_write(archive)]
+    if connection.vendor != 'mysql' or not get_archive_settings()['PARTITIONING']:
+        return []
+
+    table = archive._meta.db_table
+    boundary = _utc_naive(before)
+    expired = [
+        name for name in _existing_partitions(connection, table)
+        if name != 'pmax' and _add_months(datetime.strptime(name, 'p%Y%m'), 1) <= boundary
+    ]
+    if expired:
+        with connection.cursor() as cursor:
+            cursor.execute(f"ALTER TABLE {table} DROP PARTITION {', '.join(expired)}")
+    return expired
+
+
+# ----------------------------------------------------------------------
+# 핫 + 아카이브 조회
+# ----------------------------------------------------------------------
+
+def _watermark_key(label):
+    return f"log_archive_watermark:{label}"
+
+
+def refresh_watermark(label):
+    """아카이브 최신 시각을 다시 읽어 만료 없이 캐시 (이동/정리 후 호출)"""
+    source, archive, time_field = _entry(label)
+    latest = archive._default_manager.aggregate(latest=Max(time_field))['latest']
+    cache.set(_watermark_key(label), latest.isoformat() if latest else '', None)
+    return latest
+
+
+def archive_watermark(label):
+    """
+    아카이브 테이블의 가장 최근 시각 (비어 있으면 None)
+    아카이브를 바꾸는 곳(archive_table / purge_archive)이 갱신하므로 평소에는 캐시만 읽고,
+    캐시가 비었을 때(재시작, 캐시 초기화)만 MAX 쿼리 1회
+    """
+    value = cache.get(_watermark_key(label))
+    if value is None:
+        return refresh_watermark(label)
+    return parse_datetime(value) if value else None
+
+
+def history_queryset(model, start=None):
+    """
+    기간 조회용 queryset
+    start 가 아카이브된 구간(아카이브 최신 시각 이전)이면 핫+아카이브 UNION ALL 뷰 모델,
+    아니면 원본 모델 - 두 모델은 필드와 조회 경로(tag__building 등)가 같다.
+    """
+    label = model._meta.label
+    entry = ARCHIVE_MODELS.get(label)
+    if entry is None or entry['history'] is None:
+        return model._default_manager.all()
+
+    if start is not None and timezone.is_naive(start):
+        start = timezone.make_aware(start)
+    watermark = archive_watermark(label)
+    if watermark is not None and (start is None or start <= watermark):
+        return entry['history']._default_manager.all()
+    return model._default_manager.all()
@@ -0,0 +1,108 @@
+# backend/nfc_hospital_system/archive_models.py
+"""
+로그 테이블 아카이브 모델 생성기
+원본(핫) 모델의 컬럼을 그대로 복제해 아카이브 테이블과 핫+아카이브 UNION ALL 뷰 모델을 만든다.
+원본 모델이 바뀌면 makemigrations 가 아카이브 테이블 변경도 함께 만든다.
+
+- 아카이브: 기본키 (원본 PK, 시각) 복합키 - MySQL RANGE 파티션 키가 모든 유니크 키에 포함되어야 하므로
+           외래키는 제약 없이(db_constraint=False) 컬럼과 조인만 유지 (파티션 테이블은 FK 불가)
+- 히스토리: managed=False 뷰 모델 ({원본 테이블}_history), 분석 조회가 기간에 따라 원본 대신 사용
+           뷰는 마이그레이션에서 history_view_operation() 으로 생성 - 컬럼은 그 시점 모델 _meta 에서 가져오므로
+           원본 컬럼이 바뀌는 마이그레이션에도 같은 작업을 추가해 뷰를 다시 만든다
+
+각 앱의 models.py 하단에서:
+    TagLogArchive = archive_model_for(TagLog, 'timestamp')
+    TagLogHistory = history_model_for(TagLog)
+"""
+
+from django.db import migrations, models
+from django.db.models.fields import AutoFieldMixin
+
+# 원본 모델 label → {'archive': 모델, 'history': 모델 | None, 'time_field': 이름}
+ARCHIVE_MODELS = {}
+
+
+def _clone_field(field, keep_primary_key=False):
+    """원본 필드를 같은 컬럼 타입으로 복제 (기본값/자동값/유니크 제거, FK 는 제약 없이)"""
+    if isinstance(field, AutoFieldMixin):
+        return models.BigIntegerField(db_column=field.db_column, primary_key=keep_primary_key)
+
+    if field.is_relation:
+        # deconstruct() 는 앱 레지스트리가 준비되어야 하므로 외래키는 직접 구성
+        return models.ForeignKey(
+            field.remote_field.model,
+            to_field=field.to_fields[0],
+            db_column=field.db_column,
+            null=field.null,
+            blank=field.blank,
+            on_delete=models.DO_NOTHING,
+            related_name='+',
+            db_constraint=False,
+        )
+
+    name, path, args, kwargs = field.deconstruct()
+    for key in ('default', 'auto_now', 'auto_now_add', 'unique', 'editable', 'verbose_name', 'help_text'):
+        kwargs.pop(key, None)
+    kwargs['primary_key'] = keep_primary_key and field.primary_key
+    return field.__class__(*args, **kwargs)
+
+
+def _build(source, suffix, attrs, meta_attrs):
+    meta = type('Meta', (), {'app_label': source._meta.app_label, **meta_attrs})
+    attrs.update({'__module__': source.__module__, 'Meta': meta})
+    return type(f'{source.__name__}{suffix}', (models.Model,), attrs)
+
+
+def archive_model_for(source, time_field):
+    """원본 모델의 아카이브 테이블 모델"""
+    attrs = {field.name: _clone_field(field) for field in source._meta.concrete_fields}
+    attrs['pk'] = models.CompositePrimaryKey(source._meta.pk.name, time_field)
+
+    index_fields = [list(index.fields) for index in source._meta.indexes]
+    if [time_field] not in index_fields:
+        index_fields.append([time_field])
+    archive = _build(source, 'Archive', attrs, {
+        'db_table': f'{source._meta.db_table}_archive',
+        'indexes': [models.Index(fields=fields) for fields in index_fields],
+    })
+    ARCHIVE_MODELS[source._meta.label] = {'archive': archive, 'history': None, 'time_field': time_field}
+    return archive
+
+
+def history_model_for(source):
+    """핫 + 아카이브 UNION ALL 뷰 모델 (조회 전용, 뷰는 마이그레이션의 history_view_operation 으로 생성)"""
+    attrs = {field.name: _clone_field(field, keep_primary_key=True) for field in source._meta.concrete_fields}
+    history = _build(source, 'History', attrs, {
+        'db_table': f'{source._meta.db_table}_history',
+        'managed': False,
+    })
+    ARCHIVE_MODELS[source._meta.label]['history'] = history
+    return history
+
+
+
+def _drop_history_view(schema_editor, table):
+    schema_editor.execute(f"DROP VIEW IF EXISTS {schema_editor.quote_name(f'{table}_history')}")
+
+
+def history_view_operation(app_label, model_name):
+    """
+    핫 + 아카이브 UNION ALL 뷰를 (다시) 만드는 마이그레이션 작업
+    컬럼 목록은 마이그레이션 시점의 모델 상태(_meta.concrete_fields)에서 만든다.
+    """
+    def create(apps, schema_editor):
+        model = apps.get_model(app_label, model_name)
+        table = model._meta.db_table
+        quote = schema_editor.quote_name
+        columns = ", ".join(quote(field.column) for field in model._meta.concrete_fields)
+        _drop_history_view(schema_editor, table)
+        schema_editor.execute(
+            f"CREATE VIEW {quote(f'{table}_history')} AS "
+            f"SELECT {columns} FROM {quote(table)} "
+            f"UNION ALL SELECT {columns} FROM {quote(f'{table}_archive')}"
+        )
+
+    def drop(apps, schema_editor):
+        _drop_history_view(schema_editor, apps.get_model(app_label, model_name)._meta.db_table)
+
+    return migrations.RunPython(create, drop)
@@ -11,7 +11,7 @@ from channels.middleware import BaseMiddleware
 from channels.auth import AuthMiddlewareStack
 from rest_framework_simplejwt.tokens import UntypedToken
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
-from authentication.models import User
+from authentication.user_cache import get_cached_user, is_token_revoked
 import logging
 
 logger = logging.getLogger(__name__)
@@ -93,15 +93,14 @@ class JWTAuthMiddleware(BaseMiddleware):
                 logger.warning("JWT token has expired")
                 return AnonymousUser()
             
-            # 사용자 조회
+            # 사용자 조회 (폐기 토큰 확인 + 캐시 경유)
             from channels.db import database_sync_to_async
             
             @database_sync_to_async
             def get_user(user_id):
-                try:
-                    return User.objects.get(user_id=user_id, is_active=True)
-                except User.DoesNotExist:
+                if is_token_revoked(token):
                     return None
+                return get_cached_user(user_id)
             
             user = await get_user(user_id)
             
@@ -0,0 +1,250 @@
+# backend/nfc_hospital_system/pagination.py
+"""
+키셋(커서) 페이지네이션
+알림, 태그 로그, 상태 전환처럼 계속 쌓이기만 하는 테이블은 OFFSET 이 깊어질수록,
+그리고 페이지마다 COUNT(*) 를 다시 셀수록 느려진다.
+
+- (시각, ID) 복합 인덱스 순서로 정렬하고 마지막 행의 (시각, ID) 를 커서로 넘겨
+  WHERE (시각, ID) < (커서) 로 다음 페이지를 읽으므로 N 페이지도 1 페이지와 비용이 같다.
+- 전체 건수는 근사치: 필터 없는 대형 테이블은 DB 통계, 그 외는 COUNT 결과를 캐시
+- ?page= 를 보내는 기존 클라이언트는 페이지 번호 방식으로 동작 (COUNT 는 캐시)
+
+응답 형식 (DRF PageNumberPagination 과 같은 키 + 근사치 여부):
+    {"count": 1234, "count_is_approximate": true, "next": "...?cursor=...", "previous": null, "results": [...]}
+"""
+
+import base64
+import hashlib
+import json
+from collections import OrderedDict
+
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+# COUNT 캐시 시간 (초)
+COUNT_CACHE_TIMEOUT = 60
+# 이보다 작은 테이블은 통계 대신 정확한 COUNT (캐시)
+STATS_MIN_ROWS = 10000
+
+
+def _table_row_estimate(model, using):
+    """DB 통계의 테이블 행 수 (지원하지 않는 DB 면 None)"""
+    connection = connections[using]
+    table = model._meta.db_table
+    if connection.vendor == 'mysql':
+        sql = "SELECT TABLE_ROWS FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s"
+    elif connection.vendor == 'postgresql':
+        sql = "SELECT reltuples::bigint FROM pg_class WHERE relname = %s"
+    else:
+        return None
+
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [table])
+            row = cursor.fetchone()
+    except Exception:
+        return None
+    return int(row[0]) if row and row[0] is not None and row[0] >= 0 else None
+
+
+def approximate_count(queryset, timeout=COUNT_CACHE_TIMEOUT):
+    """
+    전체 건수 근사치
+    Returns: (건수, 근사치 여부)
+    """
+    if not queryset.query.where:
+        estimate = _table_row_estimate(queryset.model, queryset.db)
+        if estimate is not None and estimate >= STATS_MIN_ROWS:
+            return estimate, True
+
+    return cached_count(queryset, timeout), timeout > 0
+
+
+def cached_count(queryset, timeout=COUNT_CACHE_TIMEOUT):
+    """같은 쿼리의 COUNT 결과를 timeout 초 동안 재사용"""
+    if timeout <= 0:
+        return queryset.count()
+    sql, params = queryset.order_by().query.sql_with_params()
+    digest = hashlib.md5(f"{sql}|{params}".encode()).hexdigest()
+    key = f"pagination_count:{queryset.model._meta.db_table}:{digest}"
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, timeout)
+    return count
+
+
+class CachedCountPaginator(Paginator):
+    """COUNT(*) 를 캐시하는 Paginator (페이지 번호 방식 호환용)"""
+
+    @cached_property
+    def count(self):
+        if hasattr(self.object_list, 'query'):
+            return cached_count(self.object_list)
+        return super().count
+
+
+class CachedCountPageNumberPagination(PageNumberPagination):
+    """기존 페이지 번호 방식 - COUNT 만 캐시"""
+    django_paginator_class = CachedCountPaginator
+
+
+class KeysetPagination(BasePagination):
+    """
+    (시각, ID) 키셋 페이지네이션
+    ordering 은 (시각 필드, 고유 필드) 2개이며 같은 방향이어야 한다. 예: ('-created_at', '-pk')
+    fallback_query_params 중 하나라도 있으면 page_fallback_class 로 위임 (기존 ?page= 클라이언트)
+    """
+    page_size = 20
+    page_size_query_param = 'limit'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    ordering = ('-created_at', '-pk')
+    page_fallback_class = CachedCountPageNumberPagination
+    fallback_query_params = ('page',)
+    count_cache_timeout = COUNT_CACHE_TIMEOUT
+
+    invalid_cursor_message = '잘못된 커서입니다.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.fallback = None
+        if self.page_fallback_class and any(param in request.query_params for param in self.fallback_query_params):
+            self.fallback = self.page_fallback_class()
+            self.fallback.page_size = self.page_size
+            self.fallback.page_size_query_param = self.page_size_query_param
+            self.fallback.max_page_size = self.max_page_size
+            return self.fallback.paginate_queryset(queryset, request, view)
+
+        self.page_size_value = self.get_page_size(request)
+        self.count, self.count_is_approximate = approximate_count(queryset, self.count_cache_timeout)
+
+        cursor = self.decode_cursor(request)
+        reverse = bool(cursor and cursor['reverse'])
+        descending = self.ordering[0].startswith('-')
+        time_field, id_field = (field.lstrip('-') for field in self.ordering)
+
+        # previous 커서는 정렬을 뒤집어 읽고 결과를 다시 뒤집는다
+        forward_desc = descending != reverse
+        ordering = [f'-{time_field}', f'-{id_field}'] if forward_desc else [time_field, id_field]
+        queryset = queryset.order_by(*ordering)
+
+        if cursor:
+            lookup = 'lt' if forward_desc else 'gt'
+            queryset = queryset.filter(
+                Q(**{f'{time_field}__{lookup}': cursor['time']})
+                | Q(**{time_field: cursor['time'], f'{id_field}__{lookup}': cursor['id']})
+            )
+
+        rows = list(queryset[:self.page_size_value + 1])
+        has_more = len(rows) > self.page_size_value
+        rows = rows[:self.page_size_value]
+        if reverse:
+            rows.reverse()
+
+        self.page = rows
+        self.time_field, self.id_field = time_field, id_field
+        # 앞 방향으로 더 있음 / 뒤 방향으로 더 있음
+        self.has_next = has_more if not reverse else cursor is not None
+        self.has_previous = (cursor is not None) if not reverse else has_more
+        return rows
+
+    def get_page_size(self, request):
+        if self.page_size_query_param:
+            try:
+                size = int(request.query_params[self.page_size_query_param])
+                if size > 0:
+                    return min(size, self.max_page_size)
+            except (KeyError, ValueError):
+                pass
+        return self.page_size
+
+    # ------------------------------------------------------------------
+    # 커서
+    # ------------------------------------------------------------------
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            time_value, id_value, reverse = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+            parsed = parse_datetime(time_value)
+            if parsed is None:
+                raise ValueError(time_value)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        return {'time': parsed, 'id': id_value, 'reverse': bool(reverse)}
+
+    def encode_cursor(self, row, reverse):
+        time_value = getattr(row, self.time_field)
+        id_value = getattr(row, self.id_field)
+        payload = json.dumps([time_value.isoformat(), str(id_value), reverse])
+        encoded = base64.urlsafe_b64encode(payload.encode()).decode()
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if self.fallback:
+            return self.fallback.get_next_link()
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if self.fallback:
+            return self.fallback.get_previous_link()
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    # ------------------------------------------------------------------
+    # 응답
+    # ------------------------------------------------------------------
+    def get_page_info(self):
+        """함수형 뷰가 APIResponse 안에 넣을 페이지 정보"""
+        if self.fallback:
+            return {
+                'count': self.fallback.page.paginator.count,
+                'countIsApproximate': False,
+                'next': self.fallback.get_next_link(),
+                'previous': self.fallback.get_previous_link(),
+            }
+        return {
+            'count': self.count,
+            'countIsApproximate': self.count_is_approximate,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+        }
+
+    def get_paginated_response(self, data):
+        if self.fallback:
+            return self.fallback.get_paginated_response(data)
+        return Response(OrderedDict([
+            ('count', self.count),
+            ('count_is_approximate', self.count_is_approximate),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'count': {'type': 'integer'},
+                'count_is_approximate': {'type': 'boolean'},
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
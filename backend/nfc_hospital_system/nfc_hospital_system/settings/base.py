@@ -39,6 +39,7 @@ LOCAL_APPS = [
     'admin_dashboard',
     'integrations',
     'hospital_navigation',  # 경로 안내 앱 추가
+    'analytics',  # 내보내기 작업(ExportJob) 모델
 ]
 
 INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
@@ -195,6 +196,7 @@ CORS_ALLOW_HEADERS = [
 CORS_EXPOSE_HEADERS = [
     'content-type',
     'x-total-count',
+    'etag',
 ]
 
 # 프리플라이트 캐시 시간 (초)
@@ -291,6 +293,57 @@ except ImportError:
     print("⚠️ Firebase Admin SDK가 설치되지 않았습니다. FCM 기능이 비활성화됩니다.")
     print("   설치 방법: pip install firebase-admin")
 
+# NFC 스캔 로그 적재 방식 (nfc/scan_ingest.py)
+# sync: 요청 내 즉시 저장 / memory: 프로세스 내 버퍼 / redis: Redis Stream + flush_scan_logs 프로세스
+NFC_SCAN_INGEST = {
+    'BACKEND': 'sync',
+    'BATCH_SIZE': 500,
+    'FLUSH_INTERVAL': 1.0,
+}
+
+# 알림 일괄 발송 (admin_dashboard/notification_dispatch.py)
+# BACKEND: fcm (Firebase) | fake (로컬 가짜 FCM, 대량 발송 테스트용)
+NOTIFICATION_DISPATCH = {
+    'BACKEND': 'fcm',
+    'BATCH_SIZE': 500,
+    'WORKERS': 4,
+    'MAX_RETRIES': 3,
+    'BACKOFF': 0.5,
+}
+
+# 분석 데이터 내보내기 (analytics/exports.py)
+# 기간이 ASYNC_DAYS 일을 넘으면 백그라운드 작업으로 DIR 에 파일 생성 후 ID 로 다운로드
+ANALYTICS_EXPORT = {
+    'CHUNK_SIZE': 2000,
+    'ASYNC_DAYS': 31,
+    'DIR': MEDIA_ROOT / 'exports',
+    'STALE_MINUTES': 60,    # 서버 재시작 등으로 멈춘 작업은 실패 처리
+    'RETENTION_DAYS': 7,    # cleanup_exports 가 지난 작업/파일 삭제
+}
+
+# WebSocket 이벤트 재전송 (p_queue/event_stream.py)
+# 대기열/환자 상태 이벤트에 그룹별 seq 를 붙여 MAXLEN 건 보관, 재연결 시 last_seq 이후만 재전송
+# BACKEND: memory (프로세스 내) | redis (Redis Stream, 워커 간 공유)
+EVENT_STREAM = {
+    'BACKEND': 'memory',
+    'MAXLEN': 500,
+    'TTL': 86400,
+}
+
+# 로그 테이블 아카이브 (nfc_hospital_system/archival.py, manage.py archive_logs)
+# HOT_DAYS 보다 오래된 로그는 {테이블}_archive 로 이동, RETENTION_DAYS 가 지나면 아카이브에서도 삭제 (None 이면 보관)
+# 핫+아카이브 조회 경로(history 뷰)가 있는 TagLog 만 대상
+LOG_ARCHIVE = {
+    'HOT_DAYS': {
+        'nfc.TagLog': 90,
+    },
+    'RETENTION_DAYS': None,
+    'BATCH_SIZE': 1000,
+    'SLEEP': 0.2,
+    'PARTITIONING': True,
+    'PARTITION_MONTHS_AHEAD': 2,
+}
+
 # FCM 관련 설정
 FCM_SETTINGS = {
     "APP_VERBOSE_NAME": "NFC Hospital System",
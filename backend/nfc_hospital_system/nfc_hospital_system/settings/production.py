@@ -84,6 +84,26 @@ CACHES = {
     }
 }
 
+# NFC 스캔 로그는 Redis Stream 에 버퍼링 후 flush_scan_logs 프로세스가 일괄 적재
+# (.github/workflows/deploy.yml 의 scan-flusher screen 세션, STREAM_MAXLEN 을 넘으면 즉시 저장)
+NFC_SCAN_INGEST = {
+    'BACKEND': 'redis',
+    'BATCH_SIZE': 500,
+    'FLUSH_INTERVAL': 1.0,
+    'STREAM_KEY': 'nfc:scan_events',
+    'STREAM_MAXLEN': 100000,
+    'BACKLOG_WARNING': 5000,
+    'MAX_ATTEMPTS': 3,
+}
+
+# WebSocket 이벤트 재전송 버퍼는 워커 간 공유되도록 Redis Stream 사용
+EVENT_STREAM = {
+    'BACKEND': 'redis',
+    'MAXLEN': 500,
+    'TTL': 86400,
+    'KEY_PREFIX': 'ws:events',
+}
+
 # Django Channels (운영용 - Redis)
 CHANNEL_LAYERS = {
     'default': {
@@ -1,4 +1,5 @@
 from django.contrib import admin
+from django.db.models import F
 from .models import Queue, QueueStatusLog, PatientState, StateTransition
 
 
@@ -288,25 +289,25 @@ class PatientStateAdmin(admin.ModelAdmin):
     
     def mark_as_waiting(self, request, queryset):
         """선택된 환자를 '대기중' 상태로 변경"""
-        updated = queryset.update(current_state='WAITING')
+        updated = queryset.update(current_state='WAITING', version=F('version') + 1)
         self.message_user(request, f'{updated}명의 환자 상태를 WAITING으로 변경했습니다.')
     mark_as_waiting.short_description = "선택된 환자를 '대기중'으로 표시"
     
     def mark_as_called(self, request, queryset):
         """선택된 환자를 '호출됨' 상태로 변경"""
-        updated = queryset.update(current_state='CALLED')
+        updated = queryset.update(current_state='CALLED', version=F('version') + 1)
         self.message_user(request, f'{updated}명의 환자 상태를 CALLED로 변경했습니다.')
     mark_as_called.short_description = "선택된 환자를 '호출됨'으로 표시"
     
     def mark_as_completed(self, request, queryset):
-        """선택된 환자를 '완료됨' 상태로 변경"""
-        updated = queryset.update(current_state='COMPLETED')
-        self.message_user(request, f'{updated}명의 환자 상태를 COMPLETED로 변경했습니다.')
+        """선택된 환자를 '완료됨'(FINISHED) 상태로 변경"""
+        updated = queryset.update(current_state='FINISHED', version=F('version') + 1)
+        self.message_user(request, f'{updated}명의 환자 상태를 FINISHED로 변경했습니다.')
     mark_as_completed.short_description = "선택된 환자를 '완료됨'으로 표시"
     
     def reset_login_status(self, request, queryset):
         """선택된 환자의 로그인 상태 초기화"""
-        updated = queryset.update(is_logged_in=False, login_method=None)
+        updated = queryset.update(is_logged_in=False, login_method=None, version=F('version') + 1)
         self.message_user(request, f'{updated}명의 환자 로그인 상태를 초기화했습니다.')
     reset_login_status.short_description = "로그인 상태 초기화"
     
@@ -316,7 +317,7 @@ class PatientStateAdmin(admin.ModelAdmin):
         # 첫 번째 활성 검사를 할당 (예시)
         first_exam = Exam.objects.filter(is_active=True).first()
         if first_exam:
-            updated = queryset.update(current_exam=first_exam)
+            updated = queryset.update(current_exam=first_exam, version=F('version') + 1)
             self.message_user(request, f'{updated}명의 환자에게 {first_exam.title} 검사를 할당했습니다.')
         else:
             self.message_user(request, '할당 가능한 검사가 없습니다.', level='WARNING')
@@ -0,0 +1,433 @@
+"""
+의료진 일괄 액션
+환자마다 PatientJourneyService.perform_action 을 호출하면 건마다 트랜잭션, 조회 여러 번,
+StateTransition INSERT, WebSocket 전송이 반복된다. 여기서는 여러 (환자, 액션) 을
+
+1. 환자 상태/활성 대기열을 각각 쿼리 1회로 잠금 조회 (select_for_update)
+2. STATE_TRANSITIONS 로 메모리에서 전부 검증 - 하나라도 불가능하면 아무것도 바꾸지 않음
+3. PatientState / Queue bulk_update, QueueStatusLog / StateTransition bulk_create (한 트랜잭션)
+4. 커밋 후 그룹별 알림 1회 (환자별 patient_{user_id}, 검사별 exam_{exam_id}, admin_dashboard, 재연결 재전송용 seq 포함)
+5. 커밋 후 순번이 실제로 바뀐 남은 대기자에게만 순번 푸시 일괄 발송 (수신 설정 캐시로 필터링)
+   - 적용 전 대기 순서 엔진의 순번을 스냅샷해 두고 커밋 후 순번과 비교
+   - FCM 멀티캐스트(재시도 백오프 포함)가 의료진 요청을 붙잡지 않도록 데몬 스레드에서 발송
+
+로 처리한다. bulk 쓰기는 시그널이 없으므로 대기 순서 엔진은 검사별로 직접 무효화한다.
+
+- 지원 액션: STATE_TRANSITIONS 에 정의된 의료진 액션 (call_patient, start_exam, mark_no_show)
+- 같은 환자가 여러 번 나오면 요청 순서대로 이어서 적용
+- call_next(): 검사 대기열에서 대기 순서 엔진 기준으로 앞선 N 명 호출
+"""
+
+import logging
+import threading
+import uuid
+from collections import OrderedDict, defaultdict
+
+from channels.layers import get_channel_layer
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from common.state_definitions import (
+    JOURNEY_TO_QUEUE_MAPPING, STATE_TRANSITIONS, PatientJourneyState, QueueDetailState, StaffAction,
+)
+from .event_stream import publish_event
+from .models import PatientState, Queue, QueueStatusLog, StateTransition
+from .position_engine import estimate_wait, invalidate_queue_positions, people_ahead, waiting_positions
+from .services import InvalidActionError
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_QUEUE_STATES = [
+    QueueDetailState.WAITING.value,
+    QueueDetailState.CALLED.value,
+    QueueDetailState.IN_PROGRESS.value,
+]
+
+MAX_BULK_ACTIONS = 200
+
+# 대기 인원 동순위일 때 호출 순서
+PRIORITY_RANK = {'emergency': 0, 'urgent': 1, 'normal': 2}
+
+
+class BulkActionError(InvalidActionError):
+    """일괄 액션 검증 실패 - errors: [{'index', 'user_id', 'error'}]"""
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__(f"{len(errors)}건의 액션을 수행할 수 없습니다.")
+
+
+def _staff_action(action_type):
+    try:
+        return StaffAction(action_type)
+    except ValueError:
+        raise InvalidActionError(f"Unknown staff action type: {action_type}")
+
+
+def _next_state(current_state, action):
+    """STATE_TRANSITIONS 기준 다음 상태 (불가능하면 InvalidActionError, perform_action 과 같은 메시지)"""
+    transitions = STATE_TRANSITIONS.get(current_state)
+    if transitions is None:
+        raise InvalidActionError(f"No transitions defined for state: {current_state.value}")
+    if action not in transitions:
+        raise InvalidActionError(
+            f"Action '{action.value}' is not allowed in state '{current_state.value}'"
+        )
+    return transitions[action]
+
+
+def _load(user_ids, queue_ids):
+    """환자 상태와 활성 대기열 잠금 조회 (각 1회)"""
+    states = {
+        state.user_id: state
+        for state in PatientState.objects.select_for_update().filter(user_id__in=user_ids)
+    }
+    queues_by_user = defaultdict(list)
+    queues_by_id = {}
+    condition = Q(user_id__in=user_ids, state__in=ACTIVE_QUEUE_STATES)
+    if queue_ids:
+        condition |= Q(queue_id__in=queue_ids)
+    queues = Queue.objects.select_for_update().filter(condition)
+    # perform_action 의 .first() 와 같은 순서 (Queue.Meta.ordering)
+    for queue in queues.order_by('priority', 'queue_number'):
+        queues_by_id[queue.queue_id] = queue
+        if queue.state in ACTIVE_QUEUE_STATES:
+            queues_by_user[queue.user_id].append(queue)
+    return states, queues_by_user, queues_by_id
+
+
+def _plan(items, states, queues_by_user, queues_by_id):
+    """
+    메모리에서 전이 검증 및 변경 계획
+    Returns: (계획 목록, 오류 목록)
+    """
+    current = {user_id: PatientJourneyState(state.current_state) for user_id, state in states.items()}
+    plans = []
+    errors = []
+    for index, item in enumerate(items):
+        user_id = item['user_id']
+        try:
+            action = _staff_action(item['action_type'])
+            if user_id not in current:
+                # perform_action 은 상태가 없으면 UNREGISTERED 로 생성 - 의료진 액션은 모두 불가
+                current_state = PatientJourneyState.UNREGISTERED
+            else:
+                current_state = current[user_id]
+            new_state = _next_state(current_state, action)
+
+            queue = None
+            if item.get('queue_id'):
+                queue = queues_by_id.get(item['queue_id'])
+                if queue is None or queue.user_id != user_id:
+                    raise InvalidActionError(f"Queue not found for patient: {item['queue_id']}")
+            elif queues_by_user.get(user_id):
+                queue = queues_by_user[user_id][0]
+        except InvalidActionError as e:
+            errors.append({'index': index, 'user_id': str(user_id), 'error': str(e)})
+            continue
+
+        current[user_id] = new_state
+        plans.append({
+            'user_id': user_id,
+            'action': action,
+            'from_state': current_state,
+            'to_state': new_state,
+            'queue': queue,
+            'payload': item.get('payload') or {},
+        })
+    return plans, errors
+
+
+def _apply(plans, states, actor, reason=None):
+    """계획 반영 - bulk_update 2회, bulk_create 2회"""
+    now = timezone.now()
+    changed_states = OrderedDict()
+    changed_queues = OrderedDict()
+    queue_logs = []
+    transitions = []
+
+    for plan in plans:
+        state = states[plan['user_id']]
+        if state.user_id not in changed_states:
+            state.version += 1  # perform_action 의 compare_and_swap 이 이 변경을 감지하도록
+        state.current_state = plan['to_state'].value
+        state.updated_at = now
+        changed_states[state.user_id] = state
+
+        queue = plan['queue']
+        queue_state = JOURNEY_TO_QUEUE_MAPPING.get(plan['to_state'])
+        if queue is not None and queue_state is not None:
+            old_queue_state = queue.state
+            queue.state = queue_state.value
+            queue.updated_at = now
+            if queue_state == QueueDetailState.CALLED:
+                queue.called_at = now
+            changed_queues[queue.queue_id] = queue
+            queue_logs.append(QueueStatusLog(
+                queue=queue,
+                previous_state=old_queue_state,
+                new_state=queue.state,
+                previous_number=queue.queue_number,
+                new_number=queue.queue_number,
+                changed_by=actor,
+                reason=reason or f"Journey state changed to {plan['to_state'].value}",
+                metadata=plan['payload'] or None,
+            ))
+
+        transitions.append(StateTransition(
+            user_id=plan['user_id'],
+            from_state=plan['from_state'].value,
+            to_state=plan['to_state'].value,
+            trigger_type='staff_action',
+            trigger_source=(
+                f"{plan['action'].value} | bulk | queue_id:{queue.queue_id if queue else 'N/A'}"
+                f" | apt_id:{queue.appointment_id if queue else 'N/A'}"
+            )[:100],
+            exam_id=queue.exam_id if queue else None,
+        ))
+
+    PatientState.objects.bulk_update(changed_states.values(), ['current_state', 'version', 'updated_at'])
+    Queue.objects.bulk_update(changed_queues.values(), ['state', 'called_at', 'updated_at'])
+    QueueStatusLog.objects.bulk_create(queue_logs)
+    StateTransition.objects.bulk_create(transitions)
+    return list(changed_queues.values())
+
+
+def _notify(plans, queues):
+    """그룹별 알림 1회씩 (커밋 후)"""
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    timestamp = timezone.now().isoformat()
+
+    final_state = OrderedDict()
+    actions = defaultdict(list)
+    for plan in plans:
+        final_state[plan['user_id']] = plan['to_state'].value
+        actions[plan['user_id']].append(plan['action'].value)
+
+    by_exam = defaultdict(list)
+    for queue in queues:
+        by_exam[queue.exam_id].append({
+            'queue_id': str(queue.queue_id),
+            'user_id': str(queue.user_id),
+            'queue_number': queue.queue_number,
+            'state': queue.state,
+            'priority': queue.priority,
+        })
+
+    messages = [
+        (f"patient_{user_id}", {
+            "type": "state_update",
+            "journey_state": state,
+            "action": ",".join(actions[user_id]),
+            "timestamp": timestamp,
+        })
+        for user_id, state in final_state.items()
+    ]
+    messages += [
+        (f"exam_{exam_id}", {
+            "type": "queue_update",
+            "data": {"event_type": "queue_bulk_update", "exam_id": exam_id, "queues": changed},
+        })
+        for exam_id, changed in by_exam.items()
+    ]
+    messages.append(("admin_dashboard", {
+        "type": "dashboard_notification",
+        "data": {
+            "event_type": "queue_bulk_update",
+            "patients": len(final_state),
+            "queues": [queue for changed in by_exam.values() for queue in changed],
+            "timestamp": timestamp,
+        },
+    }))
+
+    for group, message in messages:
+        try:
+            publish_event(group, message, channel_layer)
+        except Exception as e:
+            logger.warning(f"일괄 액션 알림 전송 실패 ({group}): {e}")
+
+
+def _notify_waiting(before):
+    """
+    순번이 바뀐 남은 대기자에게 순번 푸시 (커밋 후)
+    Args:
+        before: 적용 전 검사별 순번 {exam_id: {queue_id: 앞선 대기자 수}}
+    """
+    from admin_dashboard.utils import send_queue_update_notifications
+
+    try:
+        changed = {}
+        for exam_id, positions in before.items():
+            for queue_id, ahead in waiting_positions(exam_id).items():
+                if queue_id in positions and positions[queue_id] != ahead:
+                    changed[queue_id] = ahead
+        if not changed:
+            return
+
+        waiting = Queue.objects.filter(
+            queue_id__in=changed, state=QueueDetailState.WAITING.value
+        ).select_related('user', 'exam')
+        updates = [
+            {
+                'user': queue.user,
+                'queue_number': changed[queue.queue_id] + 1,
+                'estimated_wait': estimate_wait(queue.exam, changed[queue.queue_id]),
+            }
+            for queue in waiting
+        ]
+        if updates:
+            result = send_queue_update_notifications(updates)
+            logger.info(f"대기 순번 푸시 - 대상 {result['total']}, 성공 {result['success']}, 제외 {result['skipped']}")
+    except Exception as e:
+        logger.warning(f"대기 순번 푸시 발송 실패: {e}")
+
+
+def _waiting_push_thread(before):
+    close_old_connections()
+    try:
+        _notify_waiting(before)
+    finally:
+        close_old_connections()
+
+
+def start_waiting_push(before):
+    """순번 푸시를 데몬 스레드에서 발송 (요청은 바로 응답)"""
+    thread = threading.Thread(
+        target=_waiting_push_thread,
+        args=(before,),
+        name='queue-position-push',
+        daemon=True
+    )
+    thread.start()
+    return thread
+
+
+def _execute(items, states, queues_by_user, queues_by_id, actor, reason=None):
+    plans, errors = _plan(items, states, queues_by_user, queues_by_id)
+    if errors:
+        raise BulkActionError(errors)
+
+    # 대기(waiting)에서 빠진 환자가 있는 검사만 나머지 대기자 순번이 바뀔 수 있음 - 적용 전 순번 스냅샷
+    moved = {
+        plan['queue'].exam_id for plan in plans
+        if plan['queue'] is not None and plan['from_state'] == PatientJourneyState.WAITING
+    }
+    before = {exam_id: waiting_positions(exam_id) for exam_id in moved}
+
+    queues = _apply(plans, states, actor, reason)
+    exam_ids = {queue.exam_id for queue in queues}
+    if exam_ids:
+        invalidate_queue_positions(*exam_ids)
+    transaction.on_commit(lambda: _notify(plans, queues))
+    if before:
+        transaction.on_commit(lambda: start_waiting_push(before))
+    return plans, queues
+
+
+def _result(plans, queues):
+    return {
+        'applied': len(plans),
+        'results': [
+            {
+                'user_id': str(plan['user_id']),
+                'action_type': plan['action'].value,
+                'from_state': plan['from_state'].value,
+                'to_state': plan['to_state'].value,
+                'queue_id': str(plan['queue'].queue_id) if plan['queue'] else None,
+            }
+            for plan in plans
+        ],
+        'queues': [
+            {'queue_id': str(q.queue_id), 'exam_id': q.exam_id, 'queue_number': q.queue_number, 'state': q.state}
+            for q in queues
+        ],
+    }
+
+
+def _normalize(items):
+    """user_id / queue_id 를 UUID 로 변환 (JSON 문자열 입력 대응)"""
+    normalized, errors = [], []
+    for index, item in enumerate(items):
+        try:
+            item = dict(item, user_id=uuid.UUID(str(item['user_id'])))
+            if item.get('queue_id'):
+                item['queue_id'] = uuid.UUID(str(item['queue_id']))
+        except (KeyError, ValueError):
+            errors.append({'index': index, 'user_id': str(item.get('user_id')), 'error': "Invalid user_id or queue_id"})
+            continue
+        normalized.append(item)
+    return normalized, errors
+
+
+def perform_bulk_actions(items, actor=None):
+    """
+    여러 (환자, 액션) 을 한 트랜잭션으로 적용
+    Args:
+        items: [{'user_id': UUID, 'action_type': 'call_patient', 'queue_id': UUID(선택), 'payload': {...}(선택)}]
+               queue_id 가 없으면 perform_action 처럼 환자의 첫 활성 대기열을 동기화
+        actor: 처리한 의료진 (QueueStatusLog.changed_by)
+    Raises:
+        BulkActionError: 하나라도 전이가 불가능하면 (아무것도 변경하지 않음)
+    """
+    items = list(items)
+    if not items:
+        return {'applied': 0, 'results': [], 'queues': []}
+    if len(items) > MAX_BULK_ACTIONS:
+        raise InvalidActionError(f"한 번에 최대 {MAX_BULK_ACTIONS}건까지 처리할 수 있습니다.")
+
+    items, errors = _normalize(items)
+    if errors:
+        raise BulkActionError(errors)
+
+    user_ids = {item['user_id'] for item in items}
+    queue_ids = {item['queue_id'] for item in items if item.get('queue_id')}
+    with transaction.atomic():
+        states, queues_by_user, queues_by_id = _load(user_ids, queue_ids)
+        plans, queues = _execute(items, states, queues_by_user, queues_by_id, actor)
+    return _result(plans, queues)
+
+
+def call_next(exam_id, count, actor=None, exam_room=None):
+    """
+    검사 대기열에서 다음 count 명 호출
+    대기 순서 엔진의 앞선 대기자 수가 적은 순 (같으면 우선순위, 대기 번호 순),
+    여정 상태가 WAITING 이 아닌 환자는 건너뜀
+    Returns: perform_bulk_actions 결과 + skipped (건너뛴 대기열 ID)
+    """
+    if count < 1:
+        raise InvalidActionError("count 는 1 이상이어야 합니다.")
+    count = min(count, MAX_BULK_ACTIONS)
+
+    with transaction.atomic():
+        waiting = list(Queue.objects.select_for_update().filter(exam_id=exam_id, state=QueueDetailState.WAITING.value))
+        waiting.sort(key=lambda q: (
+            people_ahead(exam_id, q.priority, q.queue_number), PRIORITY_RANK.get(q.priority, 2), q.queue_number
+        ))
+        states = {
+            state.user_id: state
+            for state in PatientState.objects.select_for_update().filter(user_id__in={q.user_id for q in waiting})
+        }
+
+        items, skipped, called_users = [], [], set()
+        for queue in waiting:
+            if len(items) >= count:
+                break
+            state = states.get(queue.user_id)
+            if (state is None or state.current_state != PatientJourneyState.WAITING.value
+                    or queue.user_id in called_users):
+                skipped.append(str(queue.queue_id))
+                continue
+            called_users.add(queue.user_id)
+            items.append({'user_id': queue.user_id, 'action_type': StaffAction.CALL_PATIENT.value,
+                          'queue_id': queue.queue_id})
+
+        queues_by_id = {queue.queue_id: queue for queue in waiting}
+        reason = f'검사실: {exam_room}' if exam_room else '호출'
+        plans, queues = _execute(items, states, {}, queues_by_id, actor, reason=reason)
+
+    result = _result(plans, queues)
+    result['skipped'] = skipped
+    return result
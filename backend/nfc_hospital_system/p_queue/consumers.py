@@ -1,15 +1,68 @@
 # p_queue/consumers.py - 완전한 버전 (기존 + 신규 기능)
 import json
 import logging
+from urllib.parse import parse_qs
+from asgiref.sync import sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
+from channels.consumer import get_handler_name
 from django.contrib.auth import get_user_model
 from datetime import datetime
+from .event_stream import replay_events
 
 logger = logging.getLogger(__name__)
 User = get_user_model()
 
-class QueueConsumer(AsyncWebsocketConsumer):
+class EventReplayMixin:
+    """
+    재연결 시 놓친 이벤트만 재전송 (p_queue/event_stream.py)
+    클라이언트는 ?last_seq=N 으로 연결하거나 {"type": "resume", "group": ..., "last_seq": N} 를 보내고,
+    버퍼 범위를 벗어났으면 group_snapshot() 결과를 'snapshot' 메시지로 받는다.
+    """
+
+    @staticmethod
+    def with_seq(payload, event):
+        """보관된 이벤트면 seq / group 을 메시지에 포함"""
+        if event.get('seq') is not None:
+            payload['seq'] = event['seq']
+            payload['group'] = event.get('group')
+        return payload
+
+    def query_last_seq(self):
+        values = parse_qs(self.scope.get('query_string', b'').decode()).get('last_seq')
+        return self.parse_seq(values[0]) if values else None
+
+    @staticmethod
+    def parse_seq(value):
+        try:
+            return int(value) if value is not None else None
+        except (TypeError, ValueError):
+            return None
+
+    async def resume_group(self, group, last_seq):
+        events, latest = await sync_to_async(replay_events)(group, last_seq)
+        if events is None:
+            await self.send(text_data=json.dumps({
+                'type': 'snapshot',
+                'group': group,
+                'seq': latest,
+                'data': await self.group_snapshot(group),
+                'timestamp': datetime.now().isoformat()
+            }))
+            return
+        # 실시간 전송과 같은 핸들러로 재전송
+        for event in events:
+            handler = getattr(self, get_handler_name(event), None)
+            if handler is not None:
+                await handler(event)
+
+    async def group_snapshot(self, group):
+        """재전송 버퍼를 벗어난 그룹의 현재 상태 - 컨슈머마다 재정의, 없으면 data 없이 스냅샷 전송"""
+        logger.warning(f"{type(self).__name__} has no group_snapshot for {group}")
+        return None
+
+
+class QueueConsumer(EventReplayMixin, AsyncWebsocketConsumer):
     """
     대기열 실시간 업데이트를 위한 WebSocket Consumer
     """
@@ -56,6 +109,13 @@ class QueueConsumer(AsyncWebsocketConsumer):
                 ]
             }))
             
+            self.subscribed_groups = {self.room_group_name}
+            
+            # 재연결: 놓친 이벤트만 재전송
+            last_seq = self.query_last_seq()
+            if last_seq is not None:
+                await self.resume_group(self.room_group_name, last_seq)
+            
             logger.info(f"WebSocket 연결됨: queue_id={self.queue_id}")
             print("=== WebSocket 연결 완료 ===")
             
@@ -150,12 +210,16 @@ class QueueConsumer(AsyncWebsocketConsumer):
                         f'patient_{user_id}',
                         self.channel_name
                     )
+                    self.subscribed_groups.add(f'patient_{user_id}')
                     await self.send(text_data=json.dumps({
                         'type': 'subscription_success',
                         'message': f'환자 {user_id} 알림을 구독했습니다.',
                         'subscription_type': 'patient',
                         'target_id': user_id
                     }))
+                    last_seq = self.parse_seq(text_data_json.get('last_seq'))
+                    if last_seq is not None:
+                        await self.resume_group(f'patient_{user_id}', last_seq)
                     
             elif message_type == 'subscribe_exam':
                 # 특정 검사 알림 구독
@@ -165,12 +229,28 @@ class QueueConsumer(AsyncWebsocketConsumer):
                         f'exam_{exam_id}',
                         self.channel_name
                     )
+                    self.subscribed_groups.add(f'exam_{exam_id}')
                     await self.send(text_data=json.dumps({
                         'type': 'subscription_success',
                         'message': f'검사 {exam_id} 알림을 구독했습니다.',
                         'subscription_type': 'exam',
                         'target_id': exam_id
                     }))
+                    last_seq = self.parse_seq(text_data_json.get('last_seq'))
+                    if last_seq is not None:
+                        await self.resume_group(f'exam_{exam_id}', last_seq)
+                
+            elif message_type == 'resume':
+                # 재연결 후 구독한 그룹의 놓친 이벤트 요청
+                group = text_data_json.get('group', self.room_group_name)
+                last_seq = self.parse_seq(text_data_json.get('last_seq'))
+                if group not in self.subscribed_groups or last_seq is None:
+                    await self.send(text_data=json.dumps({
+                        'type': 'error',
+                        'message': '구독 중인 group 과 last_seq 가 필요합니다.'
+                    }))
+                else:
+                    await self.resume_group(group, last_seq)
                 
             else:
                 await self.send(text_data=json.dumps({
@@ -178,7 +258,7 @@ class QueueConsumer(AsyncWebsocketConsumer):
                     'message': f'알 수 없는 메시지 타입: {message_type}',
                     'supported_types': [
                         'ping', 'chat', 'queue_status_request', 'join_notification',
-                        'subscribe_patient', 'subscribe_exam'
+                        'subscribe_patient', 'subscribe_exam', 'resume'
                     ]
                 }))
                 
@@ -201,13 +281,13 @@ class QueueConsumer(AsyncWebsocketConsumer):
         sender = event.get('sender', 'system')
         timestamp = event.get('timestamp', datetime.now().isoformat())
         
-        await self.send(text_data=json.dumps({
+        await self.send(text_data=json.dumps(self.with_seq({
             'type': 'queue_update',
             'message': message,
             'sender': sender,
             'queue_id': self.queue_id,
             'timestamp': timestamp
-        }))
+        }, event)))
 
     async def client_joined(self, event):
         """새 클라이언트 참가 알림"""
@@ -219,41 +299,50 @@ class QueueConsumer(AsyncWebsocketConsumer):
 
     async def queue_update(self, event):
         """대기열 상태 업데이트 메시지 전송 (기존 + 개선)"""
-        await self.send(text_data=json.dumps({
+        await self.send(text_data=json.dumps(self.with_seq({
             'type': 'queue_status_update',
             'data': event.get('data', event),  # data 키가 있으면 사용, 없으면 전체 event 사용
             'timestamp': datetime.now().isoformat()
-        }))
+        }, event)))
 
     async def patient_called(self, event):
         """환자 호출 알림"""
-        await self.send(text_data=json.dumps({
+        await self.send(text_data=json.dumps(self.with_seq({
             'type': 'patient_call',
             'data': event,
             'timestamp': datetime.now().isoformat()
-        }))
+        }, event)))
 
     async def queue_position_updated(self, event):
         """대기 순서 업데이트"""
-        await self.send(text_data=json.dumps({
+        await self.send(text_data=json.dumps(self.with_seq({
             'type': 'position_update',
             'data': event,
             'timestamp': datetime.now().isoformat()
-        }))
+        }, event)))
 
     # === 5단계에서 추가된 새로운 메서드들 ===
     async def queue_status_update(self, event):
         """Signal에서 전송된 대기열 상태 업데이트를 클라이언트에 전송"""
         print(f"Consumer notification sent: {event['data']}")
         
-        await self.send(text_data=json.dumps({
+        await self.send(text_data=json.dumps(self.with_seq({
             'type': 'queue_status_update',
             'data': event['data'],
             'timestamp': datetime.now().isoformat()
-        }))
+        }, event)))
         
         print("Client notification sent successfully")
 
+    async def state_update(self, event):
+        """환자 여정 상태 변경 (PatientJourneyService, 일괄 액션)"""
+        await self.send(text_data=json.dumps(self.with_seq({
+            'type': 'state_update',
+            'journey_state': event['journey_state'],
+            'action': event.get('action'),
+            'timestamp': event.get('timestamp', datetime.now().isoformat())
+        }, event)))
+
     async def personal_notification(self, event):
         """개인 알림 전송 (signals.py에서 호출)"""
         await self.send(text_data=json.dumps({
@@ -304,6 +393,14 @@ class QueueConsumer(AsyncWebsocketConsumer):
             'timestamp': datetime.now().isoformat()
         }))
 
+    async def group_snapshot(self, group):
+        """재전송 버퍼를 벗어난 그룹의 현재 상태"""
+        if group.startswith('patient_'):
+            return await self.get_user_queues(group[len('patient_'):])
+        if group.startswith('exam_'):
+            return await self.get_exam_queues(group[len('exam_'):])
+        return await self.get_queue_status()
+
     # === 데이터베이스 연동 헬퍼 메서드들 ===
     @database_sync_to_async
     def get_queue_status(self):
@@ -374,4 +471,25 @@ class QueueConsumer(AsyncWebsocketConsumer):
             ]
         except Exception as e:
             logger.error(f"사용자 대기열 조회 오류: {str(e)}")
-            return []
\ No newline at end of file
+            return []
+
+    @database_sync_to_async
+    def get_exam_queues(self, exam_id):
+        """검사별 활성 대기열 조회"""
+        try:
+            from .models import Queue
+            queues = Queue.objects.filter(
+                exam_id=exam_id, state__in=['waiting', 'called', 'in_progress']
+            )
+            return [
+                {
+                    'queue_id': str(q.queue_id),
+                    'user_id': str(q.user_id),
+                    'queue_number': q.queue_number,
+                    'state': q.state,
+                    'priority': q.priority
+                } for q in queues
+            ]
+        except Exception as e:
+            logger.error(f"검사 대기열 조회 오류: {str(e)}")
+            return []
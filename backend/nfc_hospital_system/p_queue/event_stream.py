@@ -0,0 +1,197 @@
+"""
+WebSocket 이벤트 재전송용 그룹별 시퀀스 스트림
+병원 Wi-Fi 가 잠깐 끊겼다 다시 연결한 클라이언트가 get_queue_status / 대시보드 전체 데이터를 다시 받지 않도록,
+대기열/환자 상태 이벤트마다 그룹별로 단조 증가하는 seq 를 붙여 최근 MAXLEN 건을 보관한다.
+
+- publish_event(group, event): seq 부여 + 보관 후 channel layer 로 전송 (메시지에 'seq', 'group' 포함)
+- replay_events(group, last_seq): last_seq 이후 이벤트 목록, 버퍼 범위를 벗어났으면 None (스냅샷 필요)
+- 저장소: Redis Stream (운영, 워커 간 공유) 또는 프로세스 내 메모리 (개발, InMemoryChannelLayer 와 같은 범위)
+- seq 는 그룹이 처음 생길 때(또는 TTL 만료 후) 현재 시각(ms)에서 시작 → 재시작/만료 뒤에도 이전 번호보다 커서
+  클라이언트가 가진 last_seq 가 새 구간과 섞이지 않고 스냅샷으로 처리됨
+- 클라이언트는 seq 가 마지막으로 받은 값 이하인 이벤트를 버린다 (재전송과 실시간 전송이 겹칠 수 있음)
+
+설정 예시:
+    EVENT_STREAM = {
+        'BACKEND': 'redis',          # memory | redis
+        'MAXLEN': 500,               # 그룹당 보관 이벤트 수
+        'TTL': 86400,                # 초, 이벤트가 없는 그룹 정리
+        'KEY_PREFIX': 'ws:events',
+    }
+"""
+
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EVENT_STREAM_SETTINGS = {
+    'BACKEND': 'memory',
+    'MAXLEN': 500,
+    'TTL': 86400,
+    'KEY_PREFIX': 'ws:events',
+    'MAX_GROUPS': 10000,
+}
+
+
+def get_event_stream_settings():
+    return {**DEFAULT_EVENT_STREAM_SETTINGS, **getattr(settings, 'EVENT_STREAM', {})}
+
+
+def _initial_seq():
+    return int(time.time() * 1000)
+
+
+def _select(events, last_seq, latest):
+    """last_seq 이후 latest 까지의 이벤트 - 앞이나 뒤가 비었으면 None"""
+    if last_seq >= latest:
+        return [] if last_seq == latest else None
+    events = [event for event in events if event['seq'] > last_seq]
+    if not events or events[0]['seq'] != last_seq + 1 or events[-1]['seq'] != latest:
+        return None
+    return events
+
+
+class MemoryEventStream:
+    """프로세스 내 메모리 보관 (단일 워커/개발용), 그룹 수는 MAX_GROUPS 로 제한"""
+
+    name = 'memory'
+
+    def __init__(self, conf):
+        self._lock = threading.Lock()
+        self._maxlen = conf['MAXLEN']
+        self._max_groups = conf['MAX_GROUPS']
+        self._groups = OrderedDict()  # group → [latest_seq, deque]
+
+    def append(self, group, event):
+        with self._lock:
+            entry = self._groups.get(group)
+            if entry is None:
+                entry = self._groups[group] = [_initial_seq(), deque(maxlen=self._maxlen)]
+                while len(self._groups) > self._max_groups:
+                    self._groups.popitem(last=False)
+            else:
+                self._groups.move_to_end(group)
+            entry[0] += 1
+            entry[1].append({**event, 'seq': entry[0], 'group': group})
+            return entry[0]
+
+    def since(self, group, last_seq):
+        with self._lock:
+            entry = self._groups.get(group)
+            if entry is None:
+                return None, 0
+            return _select(list(entry[1]), last_seq, entry[0]), entry[0]
+
+
+# seq 증가와 XADD 를 원자적으로 - 동시 발행에서도 스트림 ID 순서 = seq 순서
+_APPEND_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    redis.call('SET', KEYS[1], ARGV[4])
+end
+local seq = redis.call('INCR', KEYS[1])
+redis.call('XADD', KEYS[2], 'MAXLEN', '~', ARGV[2], seq .. '-0', 'event', ARGV[1])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+redis.call('EXPIRE', KEYS[2], ARGV[3])
+return seq
+"""
+
+
+class RedisEventStream:
+    """Redis Stream 보관 (운영용) - 스트림 ID 를 '{seq}-0' 으로 두어 XRANGE 로 seq 범위 조회"""
+
+    name = 'redis'
+
+    def __init__(self, conf, connection=None):
+        if connection is None:
+            from django_redis import get_redis_connection
+            connection = get_redis_connection('default')
+        self._redis = connection
+        self._maxlen = conf['MAXLEN']
+        self._ttl = conf['TTL']
+        self._prefix = conf['KEY_PREFIX']
+        self._append = self._redis.register_script(_APPEND_SCRIPT)
+
+    def _keys(self, group):
+        return f"{self._prefix}:{group}:seq", f"{self._prefix}:{group}"
+
+    def append(self, group, event):
+        seq_key, stream_key = self._keys(group)
+        payload = json.dumps(event, default=str)
+        return int(self._append(
+            keys=[seq_key, stream_key],
+            args=[payload, self._maxlen, self._ttl, _initial_seq()]
+        ))
+
+    def since(self, group, last_seq):
+        seq_key, stream_key = self._keys(group)
+        pipe = self._redis.pipeline()
+        pipe.get(seq_key)
+        # 개수 제한 없이 끝까지 - 스트림은 MAXLEN ~ 로 잘려 있고, 일부만 읽으면 재전송이 중간에서 끊김
+        pipe.xrange(stream_key, min=f"{last_seq + 1}-0", max='+')
+        latest, entries = pipe.execute()
+        if latest is None:
+            return None, 0
+
+        events = []
+        for entry_id, fields in entries:
+            raw = fields.get(b'event') or fields.get('event')
+            if isinstance(raw, bytes):
+                raw = raw.decode('utf-8')
+            if isinstance(entry_id, bytes):
+                entry_id = entry_id.decode('utf-8')
+            seq = int(entry_id.split('-')[0])
+            events.append({**json.loads(raw), 'seq': seq, 'group': group})
+        latest = int(latest)
+        return _select(events, last_seq, latest), latest
+
+
+_stream = None
+_stream_lock = threading.Lock()
+
+
+def get_event_stream():
+    global _stream
+    if _stream is None:
+        with _stream_lock:
+            if _stream is None:
+                conf = get_event_stream_settings()
+                _stream = RedisEventStream(conf) if conf['BACKEND'] == 'redis' else MemoryEventStream(conf)
+    return _stream
+
+
+def publish_event(group, event, channel_layer=None):
+    """
+    이벤트에 seq 를 붙여 보관하고 그룹으로 전송
+    보관에 실패하면 seq 없이 실시간 전송만 (클라이언트는 다음 재연결 때 스냅샷을 받음)
+    Returns: seq (보관 실패 시 None)
+    """
+    seq = None
+    try:
+        seq = get_event_stream().append(group, event)
+        event = {**event, 'seq': seq, 'group': group}
+    except Exception as e:
+        logger.warning(f"Event stream append failed ({group}): {e}")
+
+    channel_layer = channel_layer or get_channel_layer()
+    if channel_layer is not None:
+        async_to_sync(channel_layer.group_send)(group, event)
+    return seq
+
+
+def replay_events(group, last_seq):
+    """
+    재연결한 클라이언트가 놓친 이벤트
+    Returns: (이벤트 목록 또는 None(버퍼 범위 밖 → 스냅샷 필요), 현재 seq)
+    """
+    try:
+        return get_event_stream().since(group, last_seq)
+    except Exception as e:
+        logger.warning(f"Event stream replay failed ({group}): {e}")
+        return None, 0
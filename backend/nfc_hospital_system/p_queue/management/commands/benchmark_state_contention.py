@@ -0,0 +1,175 @@
+# p_queue/management/commands/benchmark_state_contention.py
+"""
+환자 상태 동시 변경 벤치마크
+호출된(CALLED) 환자마다 환자(입실), 의료진(검사 시작), 다른 의료진(미방문 처리)이 동시에 액션을 보내고
+처리량, 지연 시간, 재시도/거절 수, 한 상태에서 두 번 전이된 경우(이중 전이)를 비교합니다.
+
+- optimistic: PatientJourneyService.perform_action (version 비교 UPDATE + 재시도)
+- locking:    같은 액션을 PatientState select_for_update 로 잠근 트랜잭션 안에서 실행 (변경 전 방식)
+
+스레드마다 별도 DB 연결을 쓰므로 MySQL 같은 실제 DB 에서 실행하세요 (SQLite 는 쓰기가 직렬화됨).
+측정용 사용자/예약/대기열은 끝나면 삭제합니다.
+
+사용법:
+    python manage.py benchmark_state_contention
+    python manage.py benchmark_state_contention --patients 50 --rounds 10
+"""
+
+import statistics
+import threading
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from appointments.models import Appointment, Exam
+from authentication.models import User
+from common.state_definitions import PatientJourneyState
+from p_queue.models import PatientState, Queue, StateTransition
+from p_queue.services import InvalidActionError, PatientJourneyService, StateConflictError
+
+# 같은 CALLED 상태에서 동시에 들어오는 액션 (하나만 성공해야 함)
+CONTENDING_ACTIONS = ['enter_exam_room', 'start_exam', 'mark_no_show']
+
+EMAIL_PREFIX = 'benchmark-contention'
+
+
+class Command(BaseCommand):
+    help = '환자 상태 동시 변경 시 낙관적 동시성(version)과 행 잠금 방식을 비교합니다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--patients', type=int, default=20, help='동시에 경합하는 환자 수 (기본: 20)')
+        parser.add_argument('--rounds', type=int, default=5, help='라운드 수 (기본: 5)')
+        parser.add_argument(
+            '--modes', nargs='+', default=['locking', 'optimistic'], choices=['locking', 'optimistic'],
+            help='비교할 방식 (기본: locking optimistic)'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor == 'sqlite':
+            self.stdout.write(self.style.WARNING('SQLite 는 쓰기가 직렬화되어 경합이 재현되지 않습니다.'))
+
+        users = self._setup(options['patients'])
+        try:
+            self.stdout.write(f"환자 {len(users)}명 × 동시 액션 {len(CONTENDING_ACTIONS)}개 × {options['rounds']}라운드")
+            for mode in options['modes']:
+                self._report(mode, self._run(mode, users, options['rounds']))
+        finally:
+            self._cleanup()
+
+    def _setup(self, patients):
+        self._cleanup()
+        exam, _ = Exam.objects.get_or_create(
+            exam_id='benchmark-contention',
+            defaults={'title': '경합 벤치마크', 'department': '벤치마크', 'average_duration': 10, 'buffer_time': 0},
+        )
+        users = []
+        for i in range(patients):
+            user = User.objects.create(
+                email=f'{EMAIL_PREFIX}-{i}@nfc-hospital.kr', name=f'경합{i}', role='patient',
+                phone_number=f'0109{i:07d}', birth_date=date(1990, 1, 1),
+            )
+            appointment = Appointment.objects.create(
+                appointment_id=f'{EMAIL_PREFIX}-{i}', user=user, exam=exam,
+                scheduled_at=timezone.now() + timedelta(hours=1), status='waiting',
+            )
+            Queue.objects.create(
+                appointment=appointment, user=user, exam=exam, state='called', queue_number=i + 1,
+            )
+            PatientState.objects.create(user=user, current_state=PatientJourneyState.CALLED.value)
+            users.append(user)
+        return users
+
+    def _cleanup(self):
+        users = User.objects.filter(email__startswith=EMAIL_PREFIX)
+        Queue.objects.filter(user__in=users).delete()
+        Appointment.objects.filter(user__in=users).delete()
+        users.delete()
+        Exam.objects.filter(exam_id='benchmark-contention').delete()
+
+    def _reset(self, users):
+        """라운드 시작 전 모든 환자를 CALLED 로"""
+        Queue.objects.filter(user__in=users).update(state='called')
+        PatientState.objects.filter(user__in=users).update(
+            current_state=PatientJourneyState.CALLED.value, version=F('version') + 1
+        )
+        StateTransition.objects.filter(user__in=users).delete()
+
+    def _run(self, mode, users, rounds):
+        stats = {'latencies': [], 'applied': 0, 'rejected': 0, 'conflicts': 0, 'errors': 0, 'retries': 0,
+                 'double': 0, 'elapsed': 0.0}
+        lock = threading.Lock()
+
+        # compare_and_swap 실패 횟수 = 재시도 횟수
+        original_cas = PatientState.compare_and_swap
+
+        def counting_cas(state, **changes):
+            swapped = original_cas(state, **changes)
+            if not swapped:
+                with lock:
+                    stats['retries'] += 1
+            return swapped
+
+        def act(user, action_type, barrier):
+            barrier.wait()
+            started = time.perf_counter()
+            outcome = 'applied'
+            try:
+                service = PatientJourneyService(user)
+                if mode == 'locking':
+                    with transaction.atomic():
+                        PatientState.objects.select_for_update().get(user=user)
+                        service.perform_action(action_type)
+                else:
+                    service.perform_action(action_type)
+            except StateConflictError:
+                outcome = 'conflicts'
+            except InvalidActionError:
+                outcome = 'rejected'
+            except Exception:
+                # 잠금 대기 시간 초과, 교착 상태 등
+                outcome = 'errors'
+            finally:
+                elapsed = time.perf_counter() - started
+                with lock:
+                    stats['latencies'].append(elapsed)
+                    stats[outcome] += 1
+                connection.close()
+
+        PatientState.compare_and_swap = counting_cas
+        try:
+            for _ in range(rounds):
+                self._reset(users)
+                barrier = threading.Barrier(len(users) * len(CONTENDING_ACTIONS))
+                threads = [
+                    threading.Thread(target=act, args=(user, action_type, barrier))
+                    for user in users for action_type in CONTENDING_ACTIONS
+                ]
+                started = time.perf_counter()
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+                stats['elapsed'] += time.perf_counter() - started
+
+                # CALLED 에서 나간 전이가 환자당 2건 이상이면 이중 전이 (갱신 손실)
+                for user in users:
+                    if StateTransition.objects.filter(user=user, from_state=PatientJourneyState.CALLED.value).count() > 1:
+                        stats['double'] += 1
+        finally:
+            PatientState.compare_and_swap = original_cas
+        return stats
+
+    def _report(self, mode, stats):
+        latencies = sorted(stats['latencies'])
+        total = len(latencies)
+        p95 = latencies[min(total - 1, int(total * 0.95))] if total else 0
+        self.stdout.write(
+            f"{mode:<11} {total / stats['elapsed']:>8.1f} 액션/초  "
+            f"p50 {statistics.median(latencies) * 1000:>7.1f}ms  p95 {p95 * 1000:>7.1f}ms  "
+            f"성공 {stats['applied']}  거절 {stats['rejected']}  충돌 {stats['conflicts']}  오류 {stats['errors']}  "
+            f"재시도 {stats['retries']}  이중 전이 {stats['double']}"
+        )
@@ -1,12 +1,17 @@
 """
 상태 일관성 및 시스템 헬스 체크 명령어
 V2 리팩토링 - Phase 6 모니터링
-사용법: python manage.py check_state_health
+환자 수와 무관하게 체크마다 집계/anti-join 쿼리 몇 번으로 불일치 행만 조회하고,
+--fix 는 기대 상태별 일괄 UPDATE / bulk_create 로 수정
+사용법: python manage.py check_state_health [--fix] [--verbose] [--json]
 """
 from django.core.management.base import BaseCommand
 from django.db import connection
-from django.db.models import Count, Q
+from django.db.models import (
+    Case, CharField, Count, Exists, F, IntegerField, Max, OuterRef, Q, Subquery, Value, When,
+)
 from django.utils import timezone
+from collections import defaultdict
 from datetime import timedelta
 import json
 
@@ -14,10 +19,38 @@ from p_queue.models import Queue, PatientState, StateTransition, QueueStatusLog
 from appointments.models import Appointment
 from authentication.models import User
 from common.state_definitions import (
-    QUEUE_TO_JOURNEY_MAPPING, JOURNEY_TO_QUEUE_MAPPING,
+    QUEUE_TO_JOURNEY_MAPPING, JOURNEY_TO_QUEUE_MAPPING, STATE_TRANSITIONS,
     PatientJourneyState, QueueDetailState
 )
 
+ACTIVE_QUEUE_STATES = [
+    QueueDetailState.WAITING.value,
+    QueueDetailState.CALLED.value,
+    QueueDetailState.IN_PROGRESS.value,
+]
+
+# 활성 큐가 여러 개면 가장 진행된 큐 기준으로 Journey 상태 기대값 결정
+QUEUE_STATE_RANK = {
+    1: QueueDetailState.WAITING.value,
+    2: QueueDetailState.CALLED.value,
+    3: QueueDetailState.IN_PROGRESS.value,
+}
+QUEUE_RANK_TO_JOURNEY = {
+    order: QUEUE_TO_JOURNEY_MAPPING[QueueDetailState(queue_state)].value
+    for order, queue_state in QUEUE_STATE_RANK.items()
+}
+
+# 허용된 (from, to) 전이 쌍 - STATE_TRANSITIONS + 검사 완료 시 동적 분기 (services.perform_action)
+ALLOWED_TRANSITIONS = frozenset(
+    [(from_state.value, to_state.value)
+     for from_state, transitions in STATE_TRANSITIONS.items()
+     for to_state in transitions.values()]
+    + [(PatientJourneyState.IN_PROGRESS.value, PatientJourneyState.WAITING.value),
+       (PatientJourneyState.IN_PROGRESS.value, PatientJourneyState.PAYMENT.value)]
+)
+
+FIX_BATCH_SIZE = 1000
+
 
 class Command(BaseCommand):
     help = '상태 일관성 및 시스템 헬스 체크'
@@ -110,7 +143,9 @@ class Command(BaseCommand):
             })
             
             if self.fix:
-                updated = ongoing_patients.update(current_state='IN_PROGRESS')
+                updated = self._bulk_set_state(
+                    list(ongoing_patients.values_list('pk', flat=True)), PatientJourneyState.IN_PROGRESS.value
+                )
                 self.stdout.write(
                     self.style.SUCCESS(f'  ✅ {updated}개 PatientState를 "IN_PROGRESS"로 수정')
                 )
@@ -139,66 +174,82 @@ class Command(BaseCommand):
             PatientState.objects.filter(current_state='IN_PROGRESS').count()
         )
     
+    def _expected_states(self):
+        """
+        PatientState 마다 활성 큐 중 가장 진행된 상태(in_progress > called > waiting)로 기대 Journey 상태 계산
+        상관 서브쿼리 1개 (사용자별 MAX 집계)
+        """
+        rank = Case(
+            *[When(state=queue_state, then=Value(order)) for order, queue_state in QUEUE_STATE_RANK.items()],
+            output_field=IntegerField()
+        )
+        max_rank = Queue.objects.filter(
+            user=OuterRef('user'), state__in=ACTIVE_QUEUE_STATES
+        ).values('user').annotate(rank=Max(rank)).values('rank')
+        return PatientState.objects.annotate(
+            queue_rank=Subquery(max_rank, output_field=IntegerField())
+        ).annotate(
+            expected_state=Case(
+                *[When(queue_rank=order, then=Value(QUEUE_RANK_TO_JOURNEY[order]))
+                  for order in QUEUE_STATE_RANK],
+                output_field=CharField()
+            )
+        )
+    
+    def _bulk_set_state(self, state_ids, new_state):
+        """PatientState 일괄 변경 - 시그널 없이 UPDATE 1회, 동시 요청이 감지하도록 version 증가"""
+        updated = 0
+        for offset in range(0, len(state_ids), FIX_BATCH_SIZE):
+            updated += PatientState.objects.filter(
+                pk__in=state_ids[offset:offset + FIX_BATCH_SIZE]
+            ).update(
+                current_state=new_state, version=F('version') + 1, updated_at=timezone.now()
+            )
+        return updated
+    
     def check_state_consistency(self):
-        """Queue와 PatientState 간 일관성 체크"""
+        """Queue와 PatientState 간 일관성 체크 (불일치 행만 조회)"""
         if not self.json_output:
             self.stdout.write('\n🔍 Checking state consistency...')
         
-        inconsistencies = []
+        self.stats['total_patient_states'] = PatientState.objects.count()
         
-        # 모든 PatientState 확인
-        for patient_state in PatientState.objects.all():
-            self.stats['total_patient_states'] += 1
-            
-            # 해당 사용자의 활성 큐 확인
-            active_queues = Queue.objects.filter(
-                user=patient_state.user,
-                state__in=['waiting', 'called', 'in_progress']
-            )
-            
-            if active_queues.exists():
-                # 가장 우선순위가 높은 큐 상태 확인
-                priority_queue = active_queues.order_by(
-                    Q(state='in_progress') | Q(state='called') | Q(state='waiting'),
-                    'queue_number'
-                ).first()
-                
-                # 예상되는 Journey 상태
-                expected_journey_state = None
-                if priority_queue.state in ['waiting', 'delayed']:
-                    expected_journey_state = PatientJourneyState.WAITING.value
-                elif priority_queue.state == 'called':
-                    expected_journey_state = PatientJourneyState.CALLED.value
-                elif priority_queue.state == 'in_progress':
-                    expected_journey_state = PatientJourneyState.IN_PROGRESS.value
-                elif priority_queue.state == 'completed':
-                    expected_journey_state = PatientJourneyState.COMPLETED.value
-                
-                # 불일치 확인
-                if expected_journey_state and patient_state.current_state != expected_journey_state:
-                    inconsistencies.append({
-                        'user_id': str(patient_state.user.user_id),
-                        'patient_state': patient_state.current_state,
-                        'expected_state': expected_journey_state,
-                        'queue_state': priority_queue.state
-                    })
-                    self.stats['inconsistencies'] += 1
-                    
-                    if self.verbose:
-                        self.stdout.write(
-                            self.style.WARNING(
-                                f'  ⚠️ 불일치: User {patient_state.user.email} - '
-                                f'PatientState: {patient_state.current_state}, '
-                                f'Expected: {expected_journey_state}'
-                            )
-                        )
-                    
-                    if self.fix:
-                        patient_state.current_state = expected_journey_state
-                        patient_state.save()
-                        self.stdout.write(
-                            self.style.SUCCESS(f'    ✅ PatientState 수정됨')
-                        )
+        rows = list(
+            self._expected_states().filter(expected_state__isnull=False)
+            .exclude(current_state=F('expected_state'))
+            .values('state_id', 'user_id', 'user__email', 'current_state', 'expected_state')
+        )
+        self.stats['inconsistencies'] = len(rows)
+        
+        inconsistencies = [
+            {
+                'user_id': str(row['user_id']),
+                'patient_state': row['current_state'],
+                'expected_state': row['expected_state'],
+                'queue_state': JOURNEY_TO_QUEUE_MAPPING[PatientJourneyState(row['expected_state'])].value
+            }
+            for row in rows
+        ]
+        
+        if self.verbose:
+            for row in rows:
+                self.stdout.write(
+                    self.style.WARNING(
+                        f'  ⚠️ 불일치: User {row["user__email"]} - '
+                        f'PatientState: {row["current_state"]}, '
+                        f'Expected: {row["expected_state"]}'
+                    )
+                )
+        
+        if self.fix and rows:
+            by_expected = defaultdict(list)
+            for row in rows:
+                by_expected[row['expected_state']].append(row['state_id'])
+            for expected_state, state_ids in by_expected.items():
+                updated = self._bulk_set_state(state_ids, expected_state)
+                self.stdout.write(
+                    self.style.SUCCESS(f'  ✅ {updated}개 PatientState를 "{expected_state}"로 수정')
+                )
         
         if inconsistencies:
             self.issues.append({
@@ -209,53 +260,39 @@ class Command(BaseCommand):
             })
     
     def check_orphaned_states(self):
-        """고아 상태 확인 (Queue 없는 PatientState)"""
+        """고아 상태 확인 (활성 큐도 오늘 예약도 없는 대기/호출/진행 중 PatientState) - anti-join 1회"""
         if not self.json_output:
             self.stdout.write('\n🔍 Checking for orphaned states...')
         
-        orphaned = []
-        
-        for patient_state in PatientState.objects.exclude(
+        today = timezone.now().date()
+        orphaned_states = PatientState.objects.filter(
             current_state__in=[
-                PatientJourneyState.UNREGISTERED.value,
-                PatientJourneyState.FINISHED.value
+                PatientJourneyState.WAITING.value,
+                PatientJourneyState.CALLED.value,
+                PatientJourneyState.IN_PROGRESS.value
             ]
-        ):
-            # 활성 큐가 있는지 확인
-            has_active_queue = Queue.objects.filter(
-                user=patient_state.user,
-                state__in=['waiting', 'called', 'in_progress']
-            ).exists()
-            
-            # 오늘 예약이 있는지 확인
-            has_today_appointment = Appointment.objects.filter(
-                user=patient_state.user,
-                scheduled_at__date=timezone.now().date()
-            ).exists()
-            
-            # 큐도 없고 예약도 없는데 활성 상태인 경우
-            if not has_active_queue and not has_today_appointment:
-                if patient_state.current_state in [
-                    PatientJourneyState.WAITING.value,
-                    PatientJourneyState.CALLED.value,
-                    PatientJourneyState.IN_PROGRESS.value
-                ]:
-                    orphaned.append({
-                        'user_id': str(patient_state.user.user_id),
-                        'state': patient_state.current_state,
-                        'updated_at': patient_state.updated_at.isoformat()
-                    })
-                    self.stats['orphaned_states'] += 1
-                    
-                    if self.fix:
-                        # COMPLETED 상태로 변경
-                        patient_state.current_state = PatientJourneyState.COMPLETED.value
-                        patient_state.save()
-                        self.stdout.write(
-                            self.style.SUCCESS(
-                                f'  ✅ User {patient_state.user.email}의 고아 상태를 COMPLETED로 수정'
-                            )
-                        )
+        ).filter(
+            ~Exists(Queue.objects.filter(user=OuterRef('user'), state__in=ACTIVE_QUEUE_STATES)),
+            ~Exists(Appointment.objects.filter(user=OuterRef('user'), scheduled_at__date=today))
+        )
+        
+        rows = list(orphaned_states.values('state_id', 'user_id', 'user__email', 'current_state', 'updated_at'))
+        self.stats['orphaned_states'] = len(rows)
+        orphaned = [
+            {
+                'user_id': str(row['user_id']),
+                'state': row['current_state'],
+                'updated_at': row['updated_at'].isoformat()
+            }
+            for row in rows
+        ]
+        
+        if self.fix and rows:
+            # 진행할 검사가 남아 있지 않으므로 여정 종료 상태로 정리
+            updated = self._bulk_set_state([row['state_id'] for row in rows], PatientJourneyState.FINISHED.value)
+            self.stdout.write(
+                self.style.SUCCESS(f'  ✅ {updated}개 고아 상태를 FINISHED로 수정')
+            )
         
         if orphaned:
             self.issues.append({
@@ -266,40 +303,51 @@ class Command(BaseCommand):
             })
     
     def check_transition_logs(self):
-        """상태 전이 로그 검증"""
+        """상태 전이 로그 검증 - 허용된 (from, to) 쌍을 제외한 행만 DB 에서 집계"""
         if not self.json_output:
             self.stdout.write('\n📝 Checking transition logs...')
         
-        # 최근 24시간 내 전이 로그
-        recent_transitions = StateTransition.objects.filter(
-            created_at__gte=timezone.now() - timedelta(hours=24)
-        )
+        allowed = Q()
+        for from_state, to_state in ALLOWED_TRANSITIONS:
+            allowed |= Q(from_state=from_state, to_state=to_state)
         
-        invalid_transitions = []
+        # 최근 24시간 내 전이 로그
+        invalid_transitions = StateTransition.objects.filter(
+            created_at__gte=timezone.now() - timedelta(hours=24),
+            from_state__isnull=False,
+            to_state__isnull=False
+        ).exclude(from_state='').exclude(allowed)
         
-        for transition in recent_transitions:
-            # 유효하지 않은 전이 확인
-            if transition.from_state and transition.to_state:
-                # 전이 규칙 확인 (간단한 버전)
-                valid = self.is_valid_transition(transition.from_state, transition.to_state)
-                if not valid:
-                    invalid_transitions.append({
-                        'id': str(transition.transition_id),
-                        'from': transition.from_state,
-                        'to': transition.to_state,
-                        'created_at': transition.created_at.isoformat()
-                    })
+        pairs = list(
+            invalid_transitions.values('from_state', 'to_state')
+            .annotate(count=Count('transition_id')).order_by('-count')
+        )
+        total = sum(pair['count'] for pair in pairs)
         
-        if invalid_transitions:
+        if total:
+            details = None
+            if self.verbose:
+                details = [
+                    {
+                        'id': str(transition['transition_id']),
+                        'from': transition['from_state'],
+                        'to': transition['to_state'],
+                        'created_at': transition['created_at'].isoformat()
+                    }
+                    for transition in invalid_transitions.order_by('-created_at').values(
+                        'transition_id', 'from_state', 'to_state', 'created_at'
+                    )[:10]
+                ]
             self.issues.append({
                 'type': 'INVALID_TRANSITION',
-                'count': len(invalid_transitions),
-                'message': f'{len(invalid_transitions)}개의 잘못된 상태 전이 발견',
-                'details': invalid_transitions[:10] if self.verbose else None
+                'count': total,
+                'message': f'{total}개의 잘못된 상태 전이 발견',
+                'pairs': [f"{pair['from_state']}→{pair['to_state']} ({pair['count']})" for pair in pairs],
+                'details': details
             })
     
     def check_queue_patient_sync(self):
-        """Queue와 Patient 수 일치 확인"""
+        """활성 큐가 있는데 PatientState 가 없는 사용자 확인 (anti-join 1회)"""
         if not self.json_output:
             self.stdout.write('\n📊 Checking queue-patient synchronization...')
         
@@ -307,38 +355,35 @@ class Command(BaseCommand):
         self.stats['total_users'] = User.objects.filter(role='patient').count()
         self.stats['total_queues'] = Queue.objects.count()
         
-        # 활성 큐가 있는 사용자
-        users_with_queues = Queue.objects.filter(
-            state__in=['waiting', 'called', 'in_progress']
-        ).values('user').distinct().count()
-        
-        # PatientState가 있는 사용자
-        users_with_state = PatientState.objects.values('user').distinct().count()
+        rank = Case(
+            *[When(state=queue_state, then=Value(order)) for order, queue_state in QUEUE_STATE_RANK.items()],
+            output_field=IntegerField()
+        )
+        missing = list(
+            Queue.objects.filter(state__in=ACTIVE_QUEUE_STATES)
+            .filter(~Exists(PatientState.objects.filter(user=OuterRef('user'))))
+            .values('user_id').annotate(rank=Max(rank))
+        )
         
-        # 불일치 확인
-        if users_with_queues != users_with_state:
+        if missing:
             self.issues.append({
                 'type': 'USER_STATE_MISMATCH',
-                'message': f'큐가 있는 사용자({users_with_queues})와 '
-                          f'PatientState가 있는 사용자({users_with_state}) 수 불일치'
+                'count': len(missing),
+                'message': f'활성 큐가 있지만 PatientState가 없는 사용자 {len(missing)}명'
             })
-    
-    def is_valid_transition(self, from_state, to_state):
-        """상태 전이 유효성 확인"""
-        # 간단한 유효성 체크 (실제로는 STATE_TRANSITIONS 사용)
-        valid_transitions = {
-            'UNREGISTERED': ['ARRIVED'],
-            'ARRIVED': ['REGISTERED'],
-            'REGISTERED': ['WAITING'],
-            'WAITING': ['CALLED', 'COMPLETED'],
-            'CALLED': ['IN_PROGRESS', 'WAITING'],
-            'IN_PROGRESS': ['COMPLETED'],
-            'COMPLETED': ['PAYMENT', 'WAITING'],
-            'PAYMENT': ['FINISHED'],
-            'FINISHED': ['UNREGISTERED']
-        }
-        
-        return to_state in valid_transitions.get(from_state, [])
+            
+            if self.fix:
+                created = PatientState.objects.bulk_create(
+                    [
+                        PatientState(user_id=row['user_id'], current_state=QUEUE_RANK_TO_JOURNEY[row['rank']])
+                        for row in missing
+                    ],
+                    batch_size=FIX_BATCH_SIZE,
+                    ignore_conflicts=True
+                )
+                self.stdout.write(
+                    self.style.SUCCESS(f'  ✅ {len(created)}개 PatientState 생성')
+                )
     
     def print_statistics(self):
         """통계 정보 수집"""
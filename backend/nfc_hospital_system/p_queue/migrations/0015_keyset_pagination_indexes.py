@@ -0,0 +1,26 @@
+# Generated by Django 5.2.4 on 2026-10-19 00:18
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("p_queue", "0014_alter_patientstate_current_state_and_more"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="statetransition",
+            index=models.Index(
+                fields=["user", "created_at", "transition_id"],
+                name="state_trans_user_id_1f954e_idx",
+            ),
+        ),
+        migrations.RemoveIndex(
+            model_name="statetransition",
+            name="state_trans_user_id_835b0b_idx",
+        ),
+    ]
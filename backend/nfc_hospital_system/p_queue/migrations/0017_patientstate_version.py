@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 00:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("p_queue", "0015_keyset_pagination_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="patientstate",
+            name="version",
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
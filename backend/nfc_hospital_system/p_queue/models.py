@@ -209,6 +209,11 @@ class Queue(models.Model):
                 # 루프 밖에서 한 번에 벌크 업데이트 실행
                 Queue.objects.bulk_update(active_queues_to_update, ['queue_number'])
 
+        if active_queues_to_update:
+            # bulk_update 는 시그널이 없으므로 대기 순서 엔진 직접 무효화
+            from .position_engine import invalidate_queue_positions
+            invalidate_queue_positions(self.exam_id)
+
     @classmethod
     def get_current_queue_status(cls, exam):
         """특정 검사의 현재 대기열 상태 조회"""
@@ -397,6 +402,9 @@ class PatientState(models.Model):
     is_logged_in = models.BooleanField(default=False)
     login_method = models.CharField(max_length=20, null=True, blank=True)
     
+    # 낙관적 동시성 제어 - 저장할 때마다 1 증가 (compare_and_swap 참고)
+    version = models.PositiveIntegerField(default=0)
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -413,6 +421,48 @@ class PatientState(models.Model):
         exam_name = self.current_exam.title if self.current_exam else "검사 없음"
         return f"{self.user.name} - {self.current_state} - {exam_name}"
 
+    def save(self, *args, **kwargs):
+        """
+        저장할 때마다 version 증가
+        기존 행은 읽은 값이 아니라 DB 값에서 올림 (version = version + 1) - 읽은 뒤 다른 요청의
+        compare_and_swap 이 있었어도 같은 번호를 다시 쓰지 않아, 그 상태를 본 요청의 swap 이 실패함
+        """
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | {'version'}
+        if self._state.adding:
+            self.version = (self.version or 0) + 1
+            super().save(*args, **kwargs)
+            return
+
+        read_version = self.version
+        self.version = models.F('version') + 1
+        try:
+            super().save(*args, **kwargs)
+        except Exception:
+            self.version = read_version
+            raise
+        self.refresh_from_db(fields=['version'])
+
+    def compare_and_swap(self, **changes):
+        """
+        읽은 뒤 아무도 바꾸지 않았을 때만 갱신 (UPDATE ... WHERE version = N)
+        행 잠금 없이 짧은 UPDATE 1회 - 실패하면 호출 측에서 다시 읽고 재시도
+        queryset.update 이므로 post_save 시그널은 발생하지 않음
+        Returns: 성공 여부
+        """
+        now = timezone.now()
+        updated = PatientState.objects.filter(pk=self.pk, version=self.version).update(
+            version=models.F('version') + 1, updated_at=now, **changes
+        )
+        if not updated:
+            return False
+        for field, value in changes.items():
+            setattr(self, field, value)
+        self.version += 1
+        self.updated_at = now
+        return True
+
 
 class StateTransition(models.Model):
     """상태 전환 히스토리"""
@@ -451,7 +501,8 @@ class StateTransition(models.Model):
     class Meta:
         db_table = 'state_transitions'
         indexes = [
-            models.Index(fields=['user', 'created_at']),
+            # 상태 히스토리 커서 페이지네이션 (created_at, transition_id)
+            models.Index(fields=['user', 'created_at', 'transition_id']),
             models.Index(fields=['trigger_type', 'created_at']),
             models.Index(fields=['from_state', 'to_state']),
         ]
@@ -0,0 +1,255 @@
+"""
+대기 순서 엔진
+내 순서를 조회할 때마다 우선순위별 COUNT 쿼리를 3~4회 실행하던 것을
+검사별 인메모리 구조 조회로 대체한다.
+
+- 검사마다 우선순위(emergency / urgent / normal)별 대기(waiting) 번호를 Fenwick 트리로 보관
+  → "내 앞 대기자 수" 와 갱신 모두 O(log n)
+- 처음 조회하는 검사는 DB 에서 대기 행만 1회 읽어 빌드
+- Queue post_save / post_delete 시그널에서 apply_queue_change() / remove_queue() 로 커밋 후 반영하고
+  검사별 공유 버전 키를 올려 다른 워커 프로세스는 다음 확인 때 해당 검사만 다시 빌드
+  (VERSION_CHECK_INTERVAL 초마다 한 번만 확인)
+- bulk_update / queryset.update 처럼 시그널이 없는 변경 뒤에는 invalidate_queue_positions(*exam_ids) 호출
+- 반영과 버전 증가는 모두 transaction.on_commit 으로 커밋 후에만 실행
+  (커밋 전에 버전을 올리면 다른 워커가 커밋 전 데이터로 다시 빌드해 새 버전으로 들고 있게 되고,
+  롤백된 변경이 이 프로세스 구조에 남음)
+- 롤백 등으로 어긋난 경우를 대비해 MAX_AGE 초가 지난 검사는 다시 빌드
+
+앞선 대기자 규칙 (모든 순서 조회 API 공통):
+    emergency: 0 (즉시 처리)
+    urgent:    대기 중 emergency 전체 + 번호가 앞선 urgent + 대기 중 normal 의 절반 (urgent 1 : normal 2)
+    normal:    대기 중 emergency 전체 + urgent 전체 + 번호가 앞선 normal
+예상 대기 시간 = 앞선 대기자 수 × 검사 평균 소요 시간 + 버퍼 시간
+"""
+
+import logging
+import threading
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+QUEUE_POSITION_VERSION_PREFIX = "queue_position_version"
+VERSION_CHECK_INTERVAL = 2  # 초
+MAX_AGE = 300  # 초
+
+PRIORITIES = ('emergency', 'urgent', 'normal')
+
+
+class _Fenwick:
+    """대기 번호(1 이상 정수)별 인원 수 - 번호 미만 인원 합계와 갱신 O(log n), 번호 범위는 필요 시 2배 확장"""
+
+    def __init__(self, size=64):
+        self._tree = [0] * (size + 1)
+        self.total = 0
+
+    def _grow(self, number):
+        size = len(self._tree) - 1
+        while size < number:
+            size *= 2
+        counts = [self.count_below(n + 1) - self.count_below(n) for n in range(1, len(self._tree))]
+        self._tree = [0] * (size + 1)
+        self.total = 0
+        for n, count in enumerate(counts, start=1):
+            if count:
+                self.add(n, count)
+
+    def add(self, number, delta):
+        number = max(number, 1)
+        if number >= len(self._tree):
+            self._grow(number)
+        self.total += delta
+        while number < len(self._tree):
+            self._tree[number] += delta
+            number += number & -number
+
+    def count_below(self, number):
+        """number 보다 작은 번호의 인원 수"""
+        number = min(number - 1, len(self._tree) - 1)
+        result = 0
+        while number > 0:
+            result += self._tree[number]
+            number -= number & -number
+        return result
+
+
+class _ExamQueue:
+    """검사 1개의 대기 현황"""
+
+    def __init__(self, version):
+        self.trees = {priority: _Fenwick() for priority in PRIORITIES}
+        self.members = {}  # queue_id → (priority, queue_number)
+        self.version = version
+        self.built_at = time.monotonic()
+        self.checked_at = self.built_at
+
+    def add(self, queue_id, priority, queue_number):
+        priority = priority if priority in self.trees else 'normal'
+        self.members[queue_id] = (priority, queue_number)
+        self.trees[priority].add(queue_number, 1)
+
+    def discard(self, queue_id):
+        entry = self.members.pop(queue_id, None)
+        if entry is not None:
+            priority, queue_number = entry
+            self.trees[priority].add(queue_number, -1)
+
+    def people_ahead(self, priority, queue_number):
+        emergency, urgent, normal = (self.trees[p] for p in PRIORITIES)
+        if priority == 'emergency':
+            return 0
+        if priority == 'urgent':
+            return emergency.total + urgent.count_below(queue_number) + normal.total // 2
+        return emergency.total + urgent.total + normal.count_below(queue_number)
+
+    def waiting_counts(self):
+        return {priority: tree.total for priority, tree in self.trees.items()}
+
+    def positions(self):
+        return {
+            queue_id: self.people_ahead(priority, queue_number)
+            for queue_id, (priority, queue_number) in self.members.items()
+        }
+
+
+class _PositionEngine:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._exams = {}
+
+    def _version_key(self, exam_id):
+        return f"{QUEUE_POSITION_VERSION_PREFIX}:{exam_id}"
+
+    def _shared_version(self, exam_id):
+        key = self._version_key(exam_id)
+        version = cache.get(key)
+        if version is None:
+            cache.add(key, 1, None)
+            version = cache.get(key, 1)
+        return version
+
+    def _build(self, exam_id, version):
+        from .models import Queue
+
+        exam_queue = _ExamQueue(version)
+        rows = Queue.objects.filter(exam_id=exam_id, state='waiting').values_list(
+            'queue_id', 'priority', 'queue_number'
+        )
+        for queue_id, priority, queue_number in rows:
+            exam_queue.add(queue_id, priority, queue_number)
+        logger.debug(f"Queue position index rebuilt - exam {exam_id}: {len(exam_queue.members)} waiting")
+        return exam_queue
+
+    def _exam(self, exam_id):
+        """버전/수명 확인 후 검사 현황 반환 (lock 안에서 호출)"""
+        now = time.monotonic()
+        exam_queue = self._exams.get(exam_id)
+        if exam_queue is not None and now - exam_queue.checked_at < VERSION_CHECK_INTERVAL:
+            return exam_queue
+
+        version = self._shared_version(exam_id)
+        if exam_queue is None or version != exam_queue.version or now - exam_queue.built_at >= MAX_AGE:
+            exam_queue = self._exams[exam_id] = self._build(exam_id, version)
+        exam_queue.checked_at = now
+        return exam_queue
+
+    def people_ahead(self, exam_id, priority, queue_number):
+        with self._lock:
+            return self._exam(exam_id).people_ahead(priority, queue_number)
+
+    def waiting_counts(self, exam_id):
+        with self._lock:
+            return self._exam(exam_id).waiting_counts()
+
+    def positions(self, exam_id):
+        with self._lock:
+            return self._exam(exam_id).positions()
+
+    def _bump(self, exam_id):
+        try:
+            return cache.incr(self._version_key(exam_id))
+        except ValueError:
+            cache.set(self._version_key(exam_id), 2, None)
+            return None
+
+    def apply(self, exam_id, queue_id, state=None, priority=None, queue_number=None):
+        """대기열 1건 변경 반영 (state 가 waiting 이 아니면 제거)"""
+        with self._lock:
+            exam_queue = self._exams.get(exam_id)
+            previous_version = exam_queue.version if exam_queue else None
+            new_version = self._bump(exam_id)
+            if exam_queue is None:
+                return
+            # 다른 프로세스 변경을 놓치지 않은 경우에만 이 프로세스 구조를 직접 갱신
+            if new_version is not None and new_version == previous_version + 1:
+                exam_queue.discard(queue_id)
+                if state == 'waiting':
+                    exam_queue.add(queue_id, priority, queue_number)
+                exam_queue.version = new_version
+            else:
+                self._exams.pop(exam_id, None)
+
+    def invalidate(self, exam_ids):
+        with self._lock:
+            if not exam_ids:
+                exam_ids = list(self._exams)
+                self._exams.clear()
+            for exam_id in exam_ids:
+                self._exams.pop(exam_id, None)
+        for exam_id in set(exam_ids):
+            self._bump(exam_id)
+
+
+_engine = _PositionEngine()
+
+
+def apply_queue_change(queue):
+    """Queue 저장 후 호출 (post_save 시그널) - 커밋 후 반영"""
+    args = (queue.exam_id, queue.queue_id, queue.state, queue.priority, queue.queue_number)
+    transaction.on_commit(lambda: _engine.apply(*args))
+
+
+def remove_queue(queue):
+    """Queue 삭제 후 호출 (post_delete 시그널) - 커밋 후 반영"""
+    exam_id, queue_id = queue.exam_id, queue.queue_id
+    transaction.on_commit(lambda: _engine.apply(exam_id, queue_id))
+
+
+def invalidate_queue_positions(*exam_ids):
+    """
+    시그널 없이 대기열을 바꾼 뒤 호출 (bulk_update, queryset.update, bulk_create 등) - 커밋 후 무효화
+    exam_ids 가 없으면 이 프로세스가 알고 있는 모든 검사
+    """
+    transaction.on_commit(lambda: _engine.invalidate(exam_ids))
+
+
+def people_ahead(exam_id, priority, queue_number):
+    """검사 대기열에서 (우선순위, 대기 번호) 환자보다 먼저 진행될 대기자 수"""
+    return _engine.people_ahead(exam_id, priority, queue_number)
+
+
+def waiting_counts(exam_id):
+    """검사별 우선순위별 대기 인원 {'emergency': n, 'urgent': n, 'normal': n}"""
+    return _engine.waiting_counts(exam_id)
+
+
+def waiting_positions(exam_id):
+    """검사의 대기(waiting) 대기열 전체의 앞선 대기자 수 {queue_id: n}"""
+    return _engine.positions(exam_id)
+
+
+def estimate_wait(exam, ahead):
+    """예상 대기 시간 (분)"""
+    return ahead * exam.average_duration + exam.buffer_time
+
+
+def get_position(queue):
+    """
+    대기열 1건의 현재 순서
+    Returns: {'ahead': 앞선 대기자 수, 'estimated_wait_time': 분}
+    """
+    ahead = people_ahead(queue.exam_id, queue.priority, queue.queue_number)
+    return {'ahead': ahead, 'estimated_wait_time': estimate_wait(queue.exam, ahead)}
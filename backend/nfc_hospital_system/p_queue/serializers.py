@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from .models import Queue, PatientState, StateTransition
+from .position_engine import get_position
 from appointments.models import Exam, Appointment
 from appointments.serializers import ExamSerializer, AppointmentSerializer
 from authentication.serializers import UserSerializer
@@ -292,16 +293,13 @@ class PatientJourneySerializer(serializers.Serializer):
             if not active_queue:
                 return None
             
-            people_ahead = Queue.objects.filter(
-                exam=active_queue.exam,
-                state='waiting',
-                queue_number__lt=active_queue.queue_number
-            ).count()
+            # MyPositionView 와 같은 우선순위 규칙 (대기 순서 엔진)
+            position = get_position(active_queue)
             
             return {
                 'queueNumber': active_queue.queue_number,
-                'estimatedWaitTime': active_queue.estimated_wait_time,
-                'peopleAhead': people_ahead,
+                'estimatedWaitTime': position['estimated_wait_time'],
+                'peopleAhead': position['ahead'],
                 'examName': active_queue.exam.title if active_queue.exam else '검사',
                 'examLocation': self.get_exam_location(active_queue.exam)
             }
@@ -1,10 +1,13 @@
+import logging
+import random
+import time
 from typing import Optional, Dict, Any
 from django.db import transaction
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
 
+from .event_stream import publish_event
 from .models import PatientState, Queue, StateTransition, QueueStatusLog
 from common.state_definitions import (
     PatientJourneyState, QueueDetailState, PatientAction, StaffAction,
@@ -12,6 +15,8 @@ from common.state_definitions import (
 )
 from appointments.models import Appointment
 
+logger = logging.getLogger(__name__)
+
 # 종료된 것으로 간주되는 Appointment 상태 (완료, 취소, 미방문)
 FINAL_APPOINTMENT_STATUSES = ['completed', 'examined', 'cancelled', 'no_show']
 
@@ -19,6 +24,14 @@ class InvalidActionError(Exception):
     """잘못된 액션 요청"""
     pass
 
+class StateConflictError(InvalidActionError):
+    """동시 변경으로 재시도 안에 상태를 반영하지 못함"""
+    pass
+
+# 낙관적 동시성 - compare_and_swap 실패 시 재시도 횟수와 첫 대기 시간 (초, 재시도마다 2배 + 지터)
+MAX_STATE_UPDATE_RETRIES = 5
+STATE_UPDATE_RETRY_DELAY = 0.01
+
 class PatientJourneyService:
     """환자 여정 상태 관리 서비스"""
     
@@ -26,11 +39,14 @@ class PatientJourneyService:
         self.user = user
         self.channel_layer = get_channel_layer()
         
-    @transaction.atomic
     def perform_action(self, action_type: str, payload: Dict[str, Any] = None) -> Dict[str, Any]:
         """
         액션을 수행하고 상태를 전이시킴
         
+        읽기/판단은 트랜잭션 밖에서 하고, PatientState 를 version 비교 UPDATE 로 바꾼 뒤
+        이어지는 쓰기만 짧은 트랜잭션으로 처리한다. 그 사이 다른 요청이 상태를 바꿨으면
+        다시 읽어 재시도 (MAX_STATE_UPDATE_RETRIES 회)
+        
         Args:
             action_type: 수행할 액션 타입
             payload: 액션에 필요한 추가 데이터
@@ -40,14 +56,11 @@ class PatientJourneyService:
             
         Raises:
             InvalidActionError: 잘못된 액션이나 전이 불가능한 경우
+            StateConflictError: 동시 변경이 계속되어 재시도 안에 반영하지 못한 경우
         """
         if payload is None:
             payload = {}
             
-        # 현재 상태 조회
-        patient_state = self._get_or_create_patient_state()
-        current_state = PatientJourneyState(patient_state.current_state)
-        
         # 액션 타입 확인
         try:
             if action_type in [a.value for a in PatientAction]:
@@ -59,32 +72,137 @@ class PatientJourneyService:
         except ValueError:
             raise InvalidActionError(f"Invalid action: {action_type}")
         
-        # 상태 전이 가능 여부 확인
-        if current_state not in STATE_TRANSITIONS:
-            raise InvalidActionError(f"No transitions defined for state: {current_state.value}")
+        for attempt in range(MAX_STATE_UPDATE_RETRIES):
+            if attempt:
+                time.sleep(STATE_UPDATE_RETRY_DELAY * (2 ** (attempt - 1)) * (1 + random.random()))
             
-        transitions = STATE_TRANSITIONS[current_state]
-        if action not in transitions:
-            raise InvalidActionError(
-                f"Action '{action_type}' is not allowed in state '{current_state.value}'"
-            )
+            # 현재 상태 조회 (잠금 없음)
+            patient_state = self._get_or_create_patient_state()
+            current_state = PatientJourneyState(patient_state.current_state)
+            
+            # 상태 전이 가능 여부 확인
+            if current_state not in STATE_TRANSITIONS:
+                raise InvalidActionError(f"No transitions defined for state: {current_state.value}")
+                
+            transitions = STATE_TRANSITIONS[current_state]
+            if action not in transitions:
+                raise InvalidActionError(
+                    f"Action '{action_type}' is not allowed in state '{current_state.value}'"
+                )
+            
+            # 새로운 상태 결정
+            new_state = transitions[action]
+            
+            # IN_PROGRESS 완료 시 동적 분기 처리 (다음 검사 유무로 WAITING / PAYMENT)
+            completion = None
+            if (current_state == PatientJourneyState.IN_PROGRESS and
+                action in [PatientAction.COMPLETE_EXAM, StaffAction.COMPLETE_EXAM]):
+                completion = self._plan_completion()
+                new_state = completion['new_state']
+            
+            old_state_value = patient_state.current_state
+            with transaction.atomic():
+                # 읽은 뒤 다른 요청이 상태를 바꿨으면 아무것도 쓰지 않고 재시도
+                if not patient_state.compare_and_swap(current_state=new_state.value):
+                    continue
+                
+                if completion:
+                    self._apply_completion(completion, action, action_type)
+                
+                # REGISTERED 상태일 때 당일 예약을 pending → scheduled로 변경
+                if new_state == PatientJourneyState.REGISTERED:
+                    today = timezone.now().date()
+                    Appointment.objects.filter(
+                        user=self.user,
+                        scheduled_at__date=today,
+                        status='pending'
+                    ).update(status='scheduled')
+                
+                # Queue 상태 동기화 (필요한 경우)
+                self._sync_queue_state(new_state, payload)
+                
+                # 상태 전환 로그 생성 (상세 정보 포함)
+                # 현재 진행 중인 Queue/Exam 정보 수집
+                active_queue = Queue.objects.filter(
+                    user=self.user,
+                    state__in=[QueueDetailState.WAITING.value,
+                              QueueDetailState.CALLED.value,
+                              QueueDetailState.IN_PROGRESS.value]
+                ).first()
+                
+                StateTransition.objects.create(
+                    user=self.user,
+                    from_state=old_state_value,
+                    to_state=new_state.value,
+                    trigger_type=self._get_trigger_type(action),
+                    trigger_source=f"{action_type} | queue_id:{active_queue.queue_id if active_queue else 'N/A'} | apt_id:{active_queue.appointment_id if active_queue else 'N/A'}",
+                    location_at_transition=payload.get('location') if payload else None,
+                    exam_id=active_queue.exam.exam_id if active_queue else None
+                )
+            
+            # WebSocket 알림 전송
+            self._send_state_update(new_state.value, action_type)
+            
+            # 응답 데이터 구성
+            return self._build_response(patient_state)
         
-        # 새로운 상태 결정
-        new_state = transitions[action]
-
-        # IN_PROGRESS 완료 시 동적 분기 처리
-        if (current_state == PatientJourneyState.IN_PROGRESS and
-            action in [PatientAction.COMPLETE_EXAM, StaffAction.COMPLETE_EXAM]):
-            # 현재 진행 중인 큐를 완료 처리
-            active_queue = Queue.objects.filter(
-                user=self.user,
+        raise StateConflictError(
+            f"Patient state changed concurrently {MAX_STATE_UPDATE_RETRIES} times; action '{action_type}' not applied"
+        )
+    
+    def _plan_completion(self) -> Dict[str, Any]:
+        """검사 완료 시 완료할 대기열과 다음 예약 조회 (읽기만)"""
+        # 현재 진행 중인 큐
+        active_queue = Queue.objects.filter(
+            user=self.user,
+            state=QueueDetailState.IN_PROGRESS.value
+        ).select_related('appointment').first()
+        
+        # ✅ 다음 대기 중인 appointment 확인 (분기 로직 강화)
+        today = timezone.now().date()
+        
+        # 완료되지 않은 당일 예약 (완료/취소/미방문, 진행 중인 예약 제외)
+        pending_appointments = Appointment.objects.filter(
+            user=self.user,
+            scheduled_at__date=today
+        ).exclude(
+            status__in=FINAL_APPOINTMENT_STATUSES
+        ).exclude(
+            appointment_id=active_queue.appointment_id if active_queue else None
+        ).order_by('created_at')
+        
+        # 재시도 루프 안에서 호출되므로 추가 조회 없이 debug 로그만
+        next_appointment = pending_appointments.select_related('exam').first()
+        if next_appointment:
+            # ✅ 다음 검사가 있으면 WAITING으로
+            new_state = PatientJourneyState.WAITING
+        else:
+            # ✅ 다음 검사가 없으면 PAYMENT로
+            new_state = PatientJourneyState.PAYMENT
+        logger.debug(
+            "IN_PROGRESS 완료 처리 - user=%s active_queue=%s next=%s → %s",
+            self.user.user_id, active_queue.appointment_id if active_queue else None,
+            next_appointment.appointment_id if next_appointment else None, new_state.value
+        )
+        
+        return {
+            'active_queue': active_queue,
+            'next_appointment': next_appointment,
+            'new_state': new_state,
+        }
+    
+    def _apply_completion(self, completion: Dict[str, Any], action, action_type: str):
+        """검사 완료 쓰기 (compare_and_swap 성공 후, 같은 트랜잭션)"""
+        active_queue = completion['active_queue']
+        if active_queue:
+            # 조건부 UPDATE - 이미 다른 요청이 완료했으면 건너뜀.
+            # save() 를 쓰면 post_save 시그널(sync_from_queue_update)이 다음 대기열을 한 번 더 만들었음
+            completed = Queue.objects.filter(
+                queue_id=active_queue.queue_id,
                 state=QueueDetailState.IN_PROGRESS.value
-            ).first()
-
-            if active_queue:
-                active_queue.state = QueueDetailState.COMPLETED.value
-                active_queue.save()
-
+            ).update(state=QueueDetailState.COMPLETED.value, updated_at=timezone.now())
+            
+            if completed:
                 QueueStatusLog.objects.create(
                     queue=active_queue,
                     previous_state=QueueDetailState.IN_PROGRESS.value,
@@ -92,50 +210,23 @@ class PatientJourneyService:
                     reason=f"Exam completed by {action_type}",
                     changed_by=self.user if isinstance(action, PatientAction) else None
                 )
-
+                
                 # ✅ 중요: 완료된 검사의 Appointment 상태도 'completed'로 업데이트
                 # 이렇게 해야 다음 검사를 찾을 때 완료된 검사가 제외됨
                 completed_appointment = active_queue.appointment
                 completed_appointment.status = 'completed'
                 completed_appointment.save()
                 print(f"[DEBUG] ✅ 완료된 검사의 Appointment 상태를 'completed'로 변경: {completed_appointment.appointment_id}")
-
-            # ✅ 다음 대기 중인 appointment 확인 (분기 로직 강화)
-            today = timezone.now().date()
-
-            # 🔍 디버깅: 모든 당일 예약 조회
-            all_today_appointments = Appointment.objects.filter(
-                user=self.user,
-                scheduled_at__date=today
-            ).order_by('created_at')
-
-            # 🔍 디버깅: 완료되지 않은 예약만 필터링
-            pending_appointments = all_today_appointments.exclude(
-                status__in=FINAL_APPOINTMENT_STATUSES  # 완료/취소/미방문 제외
-            ).exclude(
-                appointment_id=active_queue.appointment_id if active_queue else None
-            )
-
-            # 🔍 개발 환경에서 로그 출력
-            if True:  # 개발용 - 운영에서는 settings.DEBUG로 변경
-                print(f"[DEBUG] 🔍 IN_PROGRESS 완료 처리 - 다음 검사 찾기")
-                print(f"[DEBUG] 👤 User: {self.user.user_id}")
-                print(f"[DEBUG] 📅 Today: {today}")
-                print(f"[DEBUG] 🏥 Active Queue: {active_queue.appointment_id if active_queue else 'None'}")
-                print(f"[DEBUG] 📋 전체 당일 예약 수: {all_today_appointments.count()}")
-                print(f"[DEBUG] ⏳ 대기 중인 예약 수: {pending_appointments.count()}")
-                for apt in pending_appointments:
-                    print(f"[DEBUG]   → {apt.appointment_id}: {apt.exam.title} (status={apt.status})")
-
-            next_appointment = pending_appointments.first()
-
-            if next_appointment:
-                # ✅ 다음 검사가 있으면 WAITING으로
-                new_state = PatientJourneyState.WAITING
-
-                print(f"[DEBUG] ✅ 다음 검사 발견: {next_appointment.exam.title} → WAITING 상태로 전환")
-
-                # 새로운 Queue 생성
+        
+        next_appointment = completion['next_appointment']
+        if next_appointment:
+            # 새로운 Queue 생성 - 이미 활성 대기열이 있으면 재사용
+            if not Queue.objects.filter(
+                appointment=next_appointment,
+                state__in=[QueueDetailState.WAITING.value,
+                          QueueDetailState.CALLED.value,
+                          QueueDetailState.IN_PROGRESS.value]
+            ).exists():
                 Queue.objects.create(
                     user=self.user,
                     appointment=next_appointment,
@@ -145,58 +236,11 @@ class PatientJourneyService:
                     estimated_wait_time=self._calculate_wait_time(next_appointment.exam),
                     priority='normal'
                 )
-
-                # ✅ 다음 appointment의 status를 'waiting'으로 명시적 업데이트
-                next_appointment.status = 'waiting'
-                next_appointment.save()
-                print(f"[DEBUG] ✅ {next_appointment.exam.title} 상태를 'waiting'으로 변경")
-
-            else:
-                # ✅ 다음 검사가 없으면 PAYMENT로
-                new_state = PatientJourneyState.PAYMENT
-                print(f"[DEBUG] 💰 다음 검사 없음 → PAYMENT 상태로 전환")
-
-        # 상태 변경 수행
-        old_state_value = patient_state.current_state
-        patient_state.current_state = new_state.value
-        patient_state.save()
-
-        # REGISTERED 상태일 때 당일 예약을 pending → scheduled로 변경
-        if new_state == PatientJourneyState.REGISTERED:
-            today = timezone.now().date()
-            Appointment.objects.filter(
-                user=self.user,
-                scheduled_at__date=today,
-                status='pending'
-            ).update(status='scheduled')
-
-        # Queue 상태 동기화 (필요한 경우)
-        self._sync_queue_state(new_state, payload)
-        
-        # 상태 전환 로그 생성 (상세 정보 포함)
-        # 현재 진행 중인 Queue/Exam 정보 수집
-        active_queue = Queue.objects.filter(
-            user=self.user,
-            state__in=[QueueDetailState.WAITING.value,
-                      QueueDetailState.CALLED.value,
-                      QueueDetailState.IN_PROGRESS.value]
-        ).first()
-
-        StateTransition.objects.create(
-            user=self.user,
-            from_state=old_state_value,
-            to_state=new_state.value,
-            trigger_type=self._get_trigger_type(action),
-            trigger_source=f"{action_type} | queue_id:{active_queue.queue_id if active_queue else 'N/A'} | apt_id:{active_queue.appointment_id if active_queue else 'N/A'}",
-            location_at_transition=payload.get('location') if payload else None,
-            exam_id=active_queue.exam.exam_id if active_queue else None
-        )
-        
-        # WebSocket 알림 전송
-        self._send_state_update(new_state.value, action_type)
-        
-        # 응답 데이터 구성
-        return self._build_response(patient_state)
+            
+            # ✅ 다음 appointment의 status를 'waiting'으로 명시적 업데이트
+            next_appointment.status = 'waiting'
+            next_appointment.save()
+            print(f"[DEBUG] ✅ {next_appointment.exam.title} 상태를 'waiting'으로 변경")
     
     def get_current_state(self) -> Dict[str, Any]:
         """현재 환자 상태 조회"""
@@ -269,27 +313,41 @@ class PatientJourneyService:
                 journey_state = QUEUE_TO_JOURNEY_MAPPING.get(queue_state)
 
             if journey_state:
-                patient_state = self._get_or_create_patient_state()
-                if patient_state.current_state != journey_state.value:
-                    old_state = patient_state.current_state
-                    patient_state.current_state = journey_state.value
-                    patient_state.save()
-
-                    # 상태 전환 로그
-                    StateTransition.objects.create(
-                        user=self.user,
-                        from_state=old_state,
-                        to_state=journey_state.value,
-                        trigger_type='queue_sync',
-                        trigger_source=f"Queue state changed to {queue.state}"
-                    )
-
-                    # WebSocket 알림
-                    self._send_state_update(journey_state.value, 'queue_sync')
+                self._sync_journey_state(journey_state, queue)
         except ValueError:
             # 알 수 없는 queue state는 무시
             pass
     
+    def _sync_journey_state(self, journey_state: PatientJourneyState, queue: Queue):
+        """
+        Queue 상태로 정해진 여정 상태로 맞춤 (version 비교 UPDATE)
+        sync_from_queue_update 트랜잭션 안이므로 충돌하면 최신 행을 잠근 읽기로 다시 읽고 재시도
+        (일반 읽기는 REPEATABLE READ 스냅샷이라 계속 예전 version 을 돌려줌)
+        """
+        patient_state = self._get_or_create_patient_state()
+        for _ in range(MAX_STATE_UPDATE_RETRIES):
+            if patient_state.current_state == journey_state.value:
+                return
+            old_state = patient_state.current_state
+            if patient_state.compare_and_swap(current_state=journey_state.value):
+                # 상태 전환 로그
+                StateTransition.objects.create(
+                    user=self.user,
+                    from_state=old_state,
+                    to_state=journey_state.value,
+                    trigger_type='queue_sync',
+                    trigger_source=f"Queue state changed to {queue.state}"
+                )
+
+                # WebSocket 알림
+                self._send_state_update(journey_state.value, 'queue_sync')
+                return
+            patient_state = PatientState.objects.select_for_update().get(pk=patient_state.pk)
+        
+        raise StateConflictError(
+            f"Patient state changed concurrently {MAX_STATE_UPDATE_RETRIES} times; queue sync not applied"
+        )
+    
     @transaction.atomic
     def sync_from_patient_state(self, patient_state: PatientState):
         """PatientState 변경에 따른 Queue 동기화"""
@@ -374,14 +432,15 @@ class PatientJourneyService:
     def _send_state_update(self, new_state: str, action_type: str):
         """WebSocket을 통한 상태 업데이트 알림"""
         try:
-            async_to_sync(self.channel_layer.group_send)(
-                f"patient_{self.user.id}",
+            publish_event(
+                f"patient_{self.user.pk}",
                 {
                     "type": "state_update",
                     "journey_state": new_state,
                     "action": action_type,
                     "timestamp": timezone.now().isoformat()
-                }
+                },
+                self.channel_layer
             )
         except Exception as e:
             # WebSocket 전송 실패는 무시 (로깅만)
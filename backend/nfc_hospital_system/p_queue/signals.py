@@ -1,8 +1,21 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from .models import Queue, PatientState
+from .position_engine import apply_queue_change, remove_queue
 from .services import PatientJourneyService
 
+
+@receiver(post_save, sender=Queue)
+def update_queue_position_index(sender, instance, **kwargs):
+    """대기 순서 엔진에 변경 반영"""
+    apply_queue_change(instance)
+
+
+@receiver(post_delete, sender=Queue)
+def remove_from_queue_position_index(sender, instance, **kwargs):
+    remove_queue(instance)
+
+
 @receiver(post_save, sender=Queue)
 def sync_queue_to_patient_state(sender, instance, created, **kwargs):
     """V2: Queue 변경 시 PatientState 동기화"""
@@ -0,0 +1,191 @@
+"""
+의료진 일괄 액션 - 다음 N명 호출 순서, 전체 롤백, 쿼리 수, 그룹별 알림
+"""
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from admin_dashboard.models import Notification
+from admin_dashboard.notification_dispatch import fake_fcm_backend
+from appointments.models import Appointment, Exam
+from authentication.models import DeviceToken, User
+from p_queue import bulk_actions
+from p_queue.models import PatientState, Queue, QueueStatusLog, StateTransition
+from p_queue.position_engine import invalidate_queue_positions, people_ahead
+
+
+class BulkStaffActionsTestCase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidate_queue_positions()
+        self.exam = Exam.objects.create(
+            exam_id='bulk-ct', title='CT 검사', department='영상의학과',
+            average_duration=20, buffer_time=5
+        )
+        self.staff = User.objects.create(
+            email='bulk-staff@test.com', name='의료진', role='staff',
+            phone_number='010-7000-9999', birth_date='1980-01-01'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.staff)
+        self.count = 0
+
+    def _add(self, priority='normal', journey_state='WAITING'):
+        self.count += 1
+        user = User.objects.create(
+            email=f'bulk{self.count}@test.com', name=f'환자{self.count}', role='patient',
+            phone_number=f'010-7000-{self.count:04d}', birth_date='1990-01-01'
+        )
+        PatientState.objects.create(user=user, current_state=journey_state)
+        appointment = Appointment.objects.create(
+            appointment_id=f'bulk-apt-{self.count}', user=user, exam=self.exam,
+            scheduled_at=timezone.now() + timedelta(hours=1), status='scheduled'
+        )
+        return Queue.objects.create(
+            appointment=appointment, user=user, exam=self.exam, state='waiting',
+            priority=priority, queue_number=self.count
+        )
+
+    def _post(self, body):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post('/api/v1/queue/medical/bulk-actions/', body, format='json')
+
+    def test_call_next_follows_position_order(self):
+        """다음 N명은 앞선 대기자 수 순서, WAITING 이 아닌 환자는 건너뜀"""
+        first = self._add()
+        registered = self._add(journey_state='REGISTERED')
+        third = self._add()
+        self._add()
+        emergency = self._add(priority='emergency')
+
+        response = self._post({'callNext': {'examId': self.exam.exam_id, 'count': 3, 'examRoom': 'CT-1'}})
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()['data']
+        self.assertEqual([q['queue_id'] for q in data['queues']], [str(q.queue_id) for q in (emergency, first, third)])
+        self.assertEqual(data['skipped'], [str(registered.queue_id)])
+        self.assertEqual(
+            set(Queue.objects.filter(state='called').values_list('queue_id', flat=True)),
+            {emergency.queue_id, first.queue_id, third.queue_id}
+        )
+        self.assertEqual(PatientState.objects.get(user=first.user).current_state, 'CALLED')
+        self.assertEqual(QueueStatusLog.objects.filter(reason='검사실: CT-1', changed_by=self.staff).count(), 3)
+        # bulk_update 뒤 대기 순서 엔진도 갱신
+        self.assertEqual(people_ahead(self.exam.exam_id, 'normal', 99), 2)  # registered + 남은 1명
+
+    def test_invalid_transition_rolls_back_whole_batch(self):
+        """하나라도 불가능한 전이가 있으면 아무것도 변경하지 않음"""
+        waiting = self._add()
+        registered = self._add(journey_state='REGISTERED')
+
+        response = self._post({'actions': [
+            {'userId': str(waiting.user_id), 'actionType': 'call_patient'},
+            {'userId': str(registered.user_id), 'actionType': 'start_exam'},
+        ]})
+
+        self.assertEqual(response.status_code, 400)
+        error = response.json()['error']
+        self.assertEqual(error['code'], 'INVALID_TRANSITIONS')
+        self.assertEqual([e['index'] for e in error['details']], [1])
+        self.assertEqual(Queue.objects.filter(state='waiting').count(), 2)
+        self.assertEqual(PatientState.objects.get(user=waiting.user).current_state, 'WAITING')
+        self.assertFalse(StateTransition.objects.exists())
+
+    def test_chained_actions_and_query_count(self):
+        """같은 환자의 연속 액션은 이어서 적용, 인원과 무관하게 쿼리 수 일정"""
+        queues = [self._add() for _ in range(6)]
+        items = [{'user_id': q.user_id, 'action_type': 'call_patient'} for q in queues]
+        items.append({'user_id': queues[0].user_id, 'action_type': 'start_exam'})
+
+        # savepoint 2회 + 잠금 조회 2회 + 적용 전 순번 스냅샷(엔진 빌드) 1회 + bulk_update 2회 + bulk_create 2회
+        with self.assertNumQueries(9):
+            result = bulk_actions.perform_bulk_actions(items, actor=self.staff)
+
+        self.assertEqual(result['applied'], 7)
+        self.assertEqual(PatientState.objects.get(user=queues[0].user).current_state, 'IN_PROGRESS')
+        self.assertEqual(Queue.objects.get(pk=queues[0].pk).state, 'in_progress')
+        self.assertEqual(Queue.objects.filter(state='called').count(), 5)
+        self.assertEqual(StateTransition.objects.filter(trigger_type='staff_action').count(), 7)
+
+    def test_one_notification_per_group(self):
+        """환자 그룹별 1회 + 검사 그룹 1회 + 관리자 대시보드 1회"""
+        queues = [self._add() for _ in range(3)]
+        channel_layer = mock.Mock()
+        channel_layer.group_send = mock.AsyncMock()
+
+        with mock.patch('p_queue.bulk_actions.get_channel_layer', return_value=channel_layer):
+            response = self._post({'callNext': {'examId': self.exam.exam_id, 'count': 3}})
+
+        self.assertEqual(response.status_code, 200)
+        groups = [call.args[0] for call in channel_layer.group_send.call_args_list]
+        self.assertEqual(len(groups), 5)
+        self.assertEqual(
+            set(groups),
+            {f'patient_{q.user_id}' for q in queues} | {f'exam_{self.exam.exam_id}', 'admin_dashboard'}
+        )
+        exam_message = next(
+            call.args[1] for call in channel_layer.group_send.call_args_list
+            if call.args[0] == f'exam_{self.exam.exam_id}'
+        )
+        self.assertEqual(len(exam_message['data']['queues']), 3)
+
+    @override_settings(NOTIFICATION_DISPATCH={'BACKEND': 'fake', 'BACKOFF': 0})
+    def test_remaining_waiting_patients_get_position_push(self):
+        """호출 후 같은 검사의 남은 대기자에게 새 순번 푸시 (토큰 없는 환자는 알림을 만들지 않음)"""
+        fake_fcm_backend.reset()
+        queues = [self._add() for _ in range(4)]
+        for queue in queues[:3]:
+            DeviceToken.objects.create(
+                user=queue.user, token=f'refresh-{queue.pk}', device_uuid=f'device-{queue.pk}',
+                fcm_token=f'token-{queue.user_id}'
+            )
+
+        with mock.patch('p_queue.bulk_actions.get_channel_layer', return_value=None), \
+                mock.patch('p_queue.bulk_actions.start_waiting_push',
+                           side_effect=bulk_actions._notify_waiting) as start_push:
+            response = self._post({'callNext': {'examId': self.exam.exam_id, 'count': 1}})
+
+        self.assertEqual(response.status_code, 200)
+        start_push.assert_called_once()
+        notified = dict(Notification.objects.filter(type='queue_update').values_list('user_id', 'data'))
+        self.assertEqual(notified, {
+            queues[1].user_id: {'queue_number': 1, 'estimated_wait': 5},
+            queues[2].user_id: {'queue_number': 2, 'estimated_wait': 25},
+        })
+        self.assertEqual(sorted(fake_fcm_backend.sent_tokens),
+                         sorted(f'token-{q.user_id}' for q in queues[1:3]))
+
+    @override_settings(NOTIFICATION_DISPATCH={'BACKEND': 'fake', 'BACKOFF': 0})
+    def test_position_push_only_for_changed_positions(self):
+        """앞선 대기자가 그대로인 환자에게는 순번 푸시를 보내지 않음"""
+        fake_fcm_backend.reset()
+        queues = [self._add() for _ in range(3)]
+        for queue in queues:
+            DeviceToken.objects.create(
+                user=queue.user, token=f'refresh-{queue.pk}', device_uuid=f'device-{queue.pk}',
+                fcm_token=f'token-{queue.user_id}'
+            )
+
+        with mock.patch('p_queue.bulk_actions.get_channel_layer', return_value=None), \
+                mock.patch('p_queue.bulk_actions.start_waiting_push',
+                           side_effect=bulk_actions._notify_waiting):
+            response = self._post({'actions': [{'userId': str(queues[1].user_id), 'actionType': 'call_patient'}]})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            dict(Notification.objects.filter(type='queue_update').values_list('user_id', 'data')),
+            {queues[2].user_id: {'queue_number': 2, 'estimated_wait': 25}},
+        )
+        self.assertEqual(fake_fcm_backend.sent_tokens, [f'token-{queues[2].user_id}'])
+
+    def test_requires_staff_role(self):
+        patient = self._add()
+        self.client.force_authenticate(user=patient.user)
+        response = self._post({'callNext': {'examId': self.exam.exam_id, 'count': 1}})
+        self.assertEqual(response.status_code, 403)
@@ -0,0 +1,110 @@
+"""
+check_state_health - 불일치 행 조회, 허용 전이 쌍 검증, --fix 일괄 수정, 환자 수와 무관한 쿼리 수
+"""
+import json
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from appointments.models import Appointment, Exam
+from authentication.models import User
+from p_queue.models import PatientState, Queue, StateTransition
+
+
+class CheckStateHealthTestCase(TestCase):
+
+    def setUp(self):
+        self.exam = Exam.objects.create(
+            exam_id='health-ct', title='CT 검사', department='영상의학과', average_duration=20, buffer_time=5
+        )
+        self.count = 0
+
+    def _patient(self, journey_state=None, queue_states=()):
+        self.count += 1
+        user = User.objects.create(
+            email=f'health{self.count}@test.com', name=f'환자{self.count}', role='patient',
+            phone_number=f'010-9000-{self.count:04d}', birth_date='1990-01-01'
+        )
+        if journey_state:
+            PatientState.objects.create(user=user, current_state=journey_state)
+        for i, queue_state in enumerate(queue_states):
+            appointment = Appointment.objects.create(
+                appointment_id=f'health-apt-{self.count}-{i}', user=user, exam=self.exam,
+                scheduled_at=timezone.now() + timedelta(days=1), status='waiting'
+            )
+            Queue.objects.create(
+                appointment=appointment, user=user, exam=self.exam, state=queue_state,
+                queue_number=self.count * 10 + i
+            )
+        return user
+
+    def _run(self, *args):
+        out = StringIO()
+        call_command('check_state_health', '--json', *args, stdout=out)
+        text = out.getvalue()
+        return json.loads(text[text.index('{'):])
+
+    def _issues(self, result):
+        return {issue['type']: issue for issue in result['issues']}
+
+    def test_reports_only_inconsistent_rows(self):
+        called = self._patient('WAITING', ['called'])
+        in_progress = self._patient('WAITING', ['waiting', 'in_progress'])
+        self._patient('WAITING', ['waiting'])
+        orphan = self._patient('CALLED')
+        self._patient(None, ['called'])
+        StateTransition.objects.create(user=called, from_state='WAITING', to_state='CALLED', trigger_type='staff_action')
+        StateTransition.objects.create(user=called, from_state='WAITING', to_state='IN_PROGRESS', trigger_type='queue_sync')
+        StateTransition.objects.create(user=called, from_state='IN_PROGRESS', to_state='PAYMENT', trigger_type='staff_action')
+
+        issues = self._issues(self._run('--verbose'))
+
+        details = {d['user_id']: d['expected_state'] for d in issues['STATE_INCONSISTENCY']['details']}
+        self.assertEqual(details, {str(called.user_id): 'CALLED', str(in_progress.user_id): 'IN_PROGRESS'})
+        self.assertEqual([d['user_id'] for d in issues['ORPHANED_STATE']['details']], [str(orphan.user_id)])
+        self.assertEqual(issues['INVALID_TRANSITION']['pairs'], ['WAITING→IN_PROGRESS (1)'])
+        self.assertEqual(issues['USER_STATE_MISMATCH']['count'], 1)
+
+    def test_fix_repairs_in_bulk(self):
+        called = self._patient('WAITING', ['called'])
+        orphan = self._patient('IN_PROGRESS')
+        missing = self._patient(None, ['waiting', 'in_progress'])
+        version = PatientState.objects.get(user=called).version
+
+        self._run('--fix')
+
+        state = PatientState.objects.get(user=called)
+        self.assertEqual((state.current_state, state.version), ('CALLED', version + 1))
+        self.assertEqual(PatientState.objects.get(user=orphan).current_state, 'FINISHED')
+        self.assertEqual(PatientState.objects.get(user=missing).current_state, 'IN_PROGRESS')
+        self.assertEqual(Queue.objects.get(user=called).state, 'called')
+        self.assertEqual(self._run()['health_status'], 'HEALTHY')
+
+    def test_fix_ongoing_bumps_version(self):
+        legacy = self._patient('ONGOING', ['in_progress'])
+        version = PatientState.objects.get(user=legacy).version
+
+        self._run('--fix')
+
+        state = PatientState.objects.get(user=legacy)
+        self.assertEqual((state.current_state, state.version), ('IN_PROGRESS', version + 1))
+
+    def test_query_count_independent_of_patients(self):
+        self._patient('WAITING', ['called'])
+        self._patient('CALLED')
+        with CaptureQueriesContext(connection) as small:
+            self._run()
+
+        for _ in range(10):
+            self._patient('WAITING', ['called'])
+            self._patient('CALLED')
+            self._patient('WAITING', ['waiting'])
+        with CaptureQueriesContext(connection) as large:
+            self._run()
+
+        self.assertEqual(len(small), len(large))
@@ -0,0 +1,128 @@
+"""
+WebSocket 이벤트 재전송 - 그룹별 seq, 재연결 시 놓친 이벤트만 전송, 버퍼 범위 밖이면 스냅샷
+"""
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.test import TestCase
+from django.urls import re_path
+
+from admin_dashboard.consumers import DashboardConsumer
+from p_queue import event_stream
+from p_queue.consumers import QueueConsumer
+from p_queue.event_stream import MemoryEventStream, get_event_stream_settings, publish_event
+
+application = URLRouter([
+    re_path(r'^ws/queue/(?P<queue_id>[\w-]+)/?$', QueueConsumer.as_asgi()),
+    re_path(r'^ws/admin/dashboard/?$', DashboardConsumer.as_asgi()),
+])
+
+
+def _stream(maxlen=500):
+    return MemoryEventStream({**get_event_stream_settings(), 'MAXLEN': maxlen})
+
+
+def _queue_event(n):
+    return {'type': 'queue_message', 'message': {'n': n}}
+
+
+class EventStreamTestCase(TestCase):
+
+    def test_since_returns_only_missed_events(self):
+        stream = _stream(maxlen=3)
+        seqs = [stream.append('queue_a', _queue_event(n)) for n in range(5)]
+        stream.append('queue_b', _queue_event(99))
+
+        self.assertEqual(seqs, list(range(seqs[0], seqs[0] + 5)))
+        events, latest = stream.since('queue_a', seqs[2])
+        self.assertEqual(latest, seqs[-1])
+        self.assertEqual([e['message']['n'] for e in events], [3, 4])
+        self.assertEqual(stream.since('queue_a', seqs[-1]), ([], seqs[-1]))
+
+        # 버퍼(3건) 밖, 다른 구간의 번호, 모르는 그룹 → 스냅샷 필요
+        self.assertIsNone(stream.since('queue_a', seqs[0])[0])
+        self.assertIsNone(stream.since('queue_a', seqs[-1] + 10)[0])
+        self.assertEqual(stream.since('queue_c', 1), (None, 0))
+
+    def test_truncated_replay_needs_snapshot(self):
+        """뒤쪽이 빠진 목록(일부만 읽힌 스트림)은 재전송하지 않음"""
+        events = [{'seq': seq} for seq in range(11, 14)]
+        self.assertEqual(event_stream._select(events, 10, 13), events)
+        self.assertIsNone(event_stream._select(events[:2], 10, 13))
+
+
+class EventReplayConsumerTestCase(TestCase):
+
+    def setUp(self):
+        patcher = mock.patch.object(event_stream, '_stream', _stream(maxlen=3))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def _connect(self, path):
+        communicator = WebsocketCommunicator(application, path)
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        return communicator
+
+    async def test_reconnect_replays_missed_events(self):
+        seqs = [await sync_to_async(publish_event)('queue_q1', _queue_event(n)) for n in range(3)]
+
+        communicator = await self._connect(f'/ws/queue/q1/?last_seq={seqs[0]}')
+        self.assertEqual((await communicator.receive_json_from())['type'], 'connection_established')
+        replayed = [await communicator.receive_json_from() for _ in range(2)]
+        self.assertEqual([(m['type'], m['seq'], m['message']['n']) for m in replayed],
+                         [('queue_update', seqs[1], 1), ('queue_update', seqs[2], 2)])
+
+        # 이후 실시간 이벤트도 이어지는 seq
+        live_seq = await sync_to_async(publish_event)('queue_q1', _queue_event(3))
+        live = await communicator.receive_json_from()
+        self.assertEqual((live['seq'], live['group']), (seqs[2] + 1, 'queue_q1'))
+        self.assertEqual(live_seq, seqs[2] + 1)
+        await communicator.disconnect()
+
+    async def test_gap_beyond_buffer_sends_snapshot(self):
+        seqs = [await sync_to_async(publish_event)('queue_q2', _queue_event(n)) for n in range(5)]
+
+        communicator = await self._connect(f'/ws/queue/q2/?last_seq={seqs[0]}')
+        await communicator.receive_json_from()
+        snapshot = await communicator.receive_json_from()
+        self.assertEqual((snapshot['type'], snapshot['group'], snapshot['seq']), ('snapshot', 'queue_q2', seqs[-1]))
+        self.assertTrue(await communicator.receive_nothing())
+        await communicator.disconnect()
+
+    async def test_resume_subscribed_patient_group(self):
+        seqs = [
+            await sync_to_async(publish_event)(
+                'patient_u1', {'type': 'state_update', 'journey_state': state, 'action': 'call_patient'}
+            )
+            for state in ['CALLED', 'IN_PROGRESS']
+        ]
+
+        communicator = await self._connect('/ws/queue/q3/')
+        await communicator.receive_json_from()
+        await communicator.send_json_to({'type': 'subscribe_patient', 'user_id': 'u1', 'last_seq': seqs[0]})
+        self.assertEqual((await communicator.receive_json_from())['type'], 'subscription_success')
+        replayed = await communicator.receive_json_from()
+        self.assertEqual((replayed['type'], replayed['journey_state'], replayed['seq']),
+                         ('state_update', 'IN_PROGRESS', seqs[1]))
+
+        await communicator.send_json_to({'type': 'resume', 'group': 'patient_other', 'last_seq': 1})
+        self.assertEqual((await communicator.receive_json_from())['type'], 'error')
+        await communicator.disconnect()
+
+    async def test_dashboard_reconnect_skips_full_refresh(self):
+        seq = await sync_to_async(publish_event)(
+            'admin_dashboard', {'type': 'dashboard_notification', 'data': {'event_type': 'queue_update'}}
+        )
+
+        communicator = await self._connect(f'/ws/admin/dashboard/?last_seq={seq}')
+        self.assertTrue(await communicator.receive_nothing())
+
+        await sync_to_async(publish_event)(
+            'admin_dashboard', {'type': 'dashboard_notification', 'data': {'event_type': 'alert'}}
+        )
+        message = await communicator.receive_json_from()
+        self.assertEqual((message['type'], message['seq']), ('notification', seq + 1))
+        await communicator.disconnect()
@@ -0,0 +1,163 @@
+"""
+대기 순서 엔진 - 우선순위 규칙, 시그널 동기화, 조회 쿼리 수
+"""
+import random
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from appointments.models import Appointment, Exam
+from authentication.models import User
+from p_queue.models import PatientState, Queue
+from p_queue.position_engine import invalidate_queue_positions, people_ahead, waiting_counts
+
+
+def reference_ahead(queue):
+    """기존 MyPositionView 의 COUNT 쿼리 규칙"""
+    waiting = Queue.objects.filter(exam=queue.exam, state='waiting')
+    if queue.priority == 'emergency':
+        return 0
+    ahead = waiting.filter(priority='emergency').count()
+    if queue.priority == 'urgent':
+        ahead += waiting.filter(priority='urgent', queue_number__lt=queue.queue_number).count()
+        ahead += waiting.filter(priority='normal').count() // 2
+    else:
+        ahead += waiting.filter(priority='urgent').count()
+        ahead += waiting.filter(priority='normal', queue_number__lt=queue.queue_number).count()
+    return ahead
+
+
+class QueuePositionEngineTestCase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidate_queue_positions()
+        self.exam = Exam.objects.create(
+            exam_id='position-ct', title='CT 검사', department='영상의학과',
+            average_duration=20, buffer_time=5
+        )
+        self.count = 0
+
+    def _add(self, priority='normal', state='waiting', queue_number=None):
+        self.count += 1
+        user = User.objects.create(
+            email=f'position{self.count}@test.com', name=f'환자{self.count}', role='patient',
+            phone_number=f'010-6000-{self.count:04d}', birth_date='1990-01-01'
+        )
+        appointment = Appointment.objects.create(
+            appointment_id=f'position-apt-{self.count}', user=user, exam=self.exam,
+            scheduled_at=timezone.now() + timedelta(hours=1), status='scheduled'
+        )
+        return Queue.objects.create(
+            appointment=appointment, user=user, exam=self.exam, state=state,
+            priority=priority, queue_number=queue_number or self.count
+        )
+
+    def test_matches_count_query_rules(self):
+        """무작위 대기열에서 모든 환자의 앞선 대기자 수가 기존 COUNT 규칙과 같음"""
+        rng = random.Random(7)
+        queues = [
+            self._add(
+                priority=rng.choice(['normal', 'normal', 'urgent', 'emergency']),
+                state=rng.choice(['waiting', 'waiting', 'waiting', 'called', 'completed'])
+            )
+            for _ in range(40)
+        ]
+        for queue in queues:
+            self.assertEqual(people_ahead(queue.exam_id, queue.priority, queue.queue_number),
+                             reference_ahead(queue), queue.queue_number)
+
+    def test_demo_state_api_invalidates_positions(self):
+        """시그널 없는 queryset.update 로 대기열을 옮기는 시연 API 도 대기 순서를 무효화"""
+        first = self._add()
+        second = self._add()
+        PatientState.objects.create(user=first.user, current_state='WAITING')
+        self.assertEqual(people_ahead(self.exam.exam_id, 'normal', second.queue_number), 1)
+
+        client = APIClient()
+        for new_state, ahead in (('FINISHED', 0), ('REGISTERED', 1)):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = client.put(
+                    '/api/v1/test/patient-state/',
+                    {'user_id': str(first.user.user_id), 'new_state': new_state}, format='json'
+                )
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(people_ahead(self.exam.exam_id, 'normal', second.queue_number), ahead, new_state)
+
+    def test_signals_keep_index_in_sync(self):
+        """저장/삭제 시그널로 커밋 후 재빌드 없이 반영 (조회 쿼리 0회)"""
+        first = self._add()
+        second = self._add()
+        self.assertEqual(people_ahead(self.exam.exam_id, 'normal', second.queue_number), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            urgent = self._add(priority='urgent')
+            first.state = 'called'
+            first.save()
+        with self.assertNumQueries(0):
+            self.assertEqual(people_ahead(self.exam.exam_id, 'normal', second.queue_number), 1)
+            self.assertEqual(waiting_counts(self.exam.exam_id), {'emergency': 0, 'urgent': 1, 'normal': 1})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            urgent.delete()
+        with self.assertNumQueries(0):
+            self.assertEqual(people_ahead(self.exam.exam_id, 'normal', second.queue_number), 0)
+
+    def test_rolled_back_change_not_applied(self):
+        """커밋 전에는 공유 버전/이 프로세스 구조를 바꾸지 않고, 롤백된 변경은 반영되지 않음"""
+        from django.db import transaction
+        from p_queue.position_engine import QUEUE_POSITION_VERSION_PREFIX
+
+        second = self._add(queue_number=2)
+        self.assertEqual(people_ahead(self.exam.exam_id, 'normal', second.queue_number), 0)
+        version_key = f"{QUEUE_POSITION_VERSION_PREFIX}:{self.exam.exam_id}"
+        version = cache.get(version_key)
+
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            try:
+                with transaction.atomic():
+                    self._add(queue_number=1)
+                    self.assertEqual(cache.get(version_key), version)
+                    raise RuntimeError('rollback')
+            except RuntimeError:
+                pass
+
+        self.assertEqual(callbacks, [])
+        with self.assertNumQueries(0):
+            self.assertEqual(people_ahead(self.exam.exam_id, 'normal', second.queue_number), 0)
+
+    def test_reorder_invalidates(self):
+        """bulk_update 로 번호를 재정렬하면 다음 조회에서 다시 빌드"""
+        queues = [self._add(queue_number=10 + i) for i in range(3)]
+        self.assertEqual(people_ahead(self.exam.exam_id, 'normal', 12), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            queues[0].cancel()
+        self.assertEqual(
+            list(Queue.objects.filter(state='waiting').order_by('queue_number').values_list('queue_number', flat=True)),
+            [1, 2]
+        )
+        self.assertEqual(people_ahead(self.exam.exam_id, 'normal', 2), 1)
+
+    def test_my_position_view(self):
+        """내 순서 조회는 대기열 1회 조회 + 엔진 조회"""
+        for priority in ['normal', 'emergency', 'normal']:
+            self._add(priority=priority)
+        me = self._add(priority='urgent')
+
+        client = APIClient()
+        client.force_authenticate(user=me.user)
+        client.get('/api/v1/queue/my-position/')
+        with self.assertNumQueries(1):
+            response = client.get('/api/v1/queue/my-position/')
+
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        data = body.get('data', body)
+        # emergency 1 + 앞선 urgent 0 + normal 2 // 2
+        self.assertEqual(data['aheadCount'], 2)
+        self.assertEqual(data['estimatedTime'], 2 * 20 + 5)
@@ -0,0 +1,155 @@
+"""
+PatientState 낙관적 동시성 - version 비교 UPDATE, 재시도, 충돌 시 무변경
+"""
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.admin.sites import site
+from django.db import connection
+from django.db.models import F
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from django.utils import timezone
+
+from appointments.models import Appointment, Exam
+from authentication.models import User
+from nfc.models import NFCTag
+from p_queue.models import PatientState, Queue, QueueStatusLog, StateTransition
+from p_queue.services import InvalidActionError, PatientJourneyService, StateConflictError
+
+
+@mock.patch('p_queue.services.STATE_UPDATE_RETRY_DELAY', 0)
+class PatientStateConcurrencyTestCase(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(
+            email='cas@test.com', name='환자', role='patient',
+            phone_number='010-8000-0001', birth_date='1990-01-01'
+        )
+        exam = Exam.objects.create(
+            exam_id='cas-ct', title='CT 검사', department='영상의학과', average_duration=20, buffer_time=5
+        )
+        appointment = Appointment.objects.create(
+            appointment_id='cas-apt', user=self.user, exam=exam,
+            scheduled_at=timezone.now() + timedelta(hours=1), status='waiting'
+        )
+        self.queue = Queue.objects.create(
+            appointment=appointment, user=self.user, exam=exam, state='called', queue_number=1
+        )
+        self.state = PatientState.objects.create(user=self.user, current_state='CALLED')
+        self.service = PatientJourneyService(self.user)
+
+    def _interfere(self, times, **changes):
+        """상태를 읽은 직후 다른 요청이 먼저 쓰는 상황 재현 (앞의 times 회)"""
+        original = self.service._get_or_create_patient_state
+        calls = {'count': 0}
+
+        def read_then_concurrent_write():
+            state = original()
+            if calls['count'] < times:
+                PatientState.objects.filter(pk=state.pk).update(version=F('version') + 1, **changes)
+            calls['count'] += 1
+            return state
+
+        return mock.patch.object(self.service, '_get_or_create_patient_state', side_effect=read_then_concurrent_write)
+
+    def test_compare_and_swap_rejects_stale_version(self):
+        stale = PatientState.objects.get(pk=self.state.pk)
+        self.state.is_logged_in = True
+        self.state.save()
+
+        self.assertFalse(stale.compare_and_swap(current_state='IN_PROGRESS'))
+        self.assertTrue(self.state.compare_and_swap(current_state='IN_PROGRESS'))
+        self.state.refresh_from_db()
+        self.assertEqual((self.state.current_state, self.state.version), ('IN_PROGRESS', 3))
+
+    def test_retries_after_concurrent_write(self):
+        """읽은 뒤 버전이 바뀌면 다시 읽고 재시도, 전이는 한 번만 기록"""
+        with self._interfere(times=2):
+            result = self.service.perform_action('start_exam')
+
+        self.assertEqual(result['journey_state'], 'IN_PROGRESS')
+        self.assertEqual(StateTransition.objects.filter(user=self.user).count(), 1)
+        self.queue.refresh_from_db()
+        self.assertEqual(self.queue.state, 'in_progress')
+
+    def test_retry_revalidates_against_new_state(self):
+        """다른 요청이 먼저 미방문 처리하면 재시도에서 검사 시작이 거절됨"""
+        with self._interfere(times=1, current_state='WAITING'):
+            with self.assertRaises(InvalidActionError):
+                self.service.perform_action('start_exam')
+
+        self.assertFalse(StateTransition.objects.exists())
+        self.assertFalse(QueueStatusLog.objects.exists())
+
+    def test_conflict_after_retries_writes_nothing(self):
+        with self._interfere(times=100):
+            with self.assertRaises(StateConflictError):
+                self.service.perform_action('start_exam')
+
+        self.state.refresh_from_db()
+        self.assertEqual(self.state.current_state, 'CALLED')
+        self.queue.refresh_from_db()
+        self.assertEqual(self.queue.state, 'called')
+        self.assertFalse(StateTransition.objects.exists())
+
+    def test_admin_bulk_action_bumps_version(self):
+        """관리자 일괄 변경 뒤에는 그 전에 읽은 상태로 덮어쓸 수 없음"""
+        stale = PatientState.objects.get(pk=self.state.pk)
+        admin = site._registry[PatientState]
+
+        with mock.patch.object(admin, 'message_user'):
+            admin.mark_as_completed(None, PatientState.objects.filter(pk=self.state.pk))
+
+        self.assertFalse(stale.compare_and_swap(current_state='IN_PROGRESS'))
+        self.state.refresh_from_db()
+        self.assertEqual((self.state.current_state, self.state.version), ('FINISHED', stale.version + 1))
+
+    def test_stale_save_does_not_reuse_swapped_version(self):
+        """swap 전에 읽은 인스턴스의 save() 뒤에는 swap 결과를 본 요청이 덮어쓸 수 없음"""
+        stale = PatientState.objects.get(pk=self.state.pk)
+        self.assertTrue(self.state.compare_and_swap(current_state='IN_PROGRESS'))
+        seen_swap = PatientState.objects.get(pk=self.state.pk)
+
+        stale.is_logged_in = True
+        stale.save()
+
+        self.assertEqual(stale.version, seen_swap.version + 1)
+        self.assertFalse(seen_swap.compare_and_swap(current_state='PAYMENT'))
+
+    def test_queue_sync_uses_version_check(self):
+        """Queue post_save 동기화도 version 을 올려, 그 전에 읽은 요청의 swap 이 실패함"""
+        stale = PatientState.objects.get(pk=self.state.pk)
+        self.queue.state = 'in_progress'
+        self.queue.save()
+
+        self.state.refresh_from_db()
+        self.assertEqual((self.state.current_state, self.state.version), ('IN_PROGRESS', stale.version + 1))
+        self.assertFalse(stale.compare_and_swap(current_state='WAITING'))
+        self.assertEqual(StateTransition.objects.get(user=self.user).trigger_type, 'queue_sync')
+
+    def test_nfc_checkin_uses_version_check(self):
+        tag = NFCTag.objects.create(
+            tag_uid='cas-uid', code='CAS-TAG', building='본관', floor=1, room='101호', description='테스트'
+        )
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        stale = PatientState.objects.get(pk=self.state.pk)
+
+        response = client.post('/api/v1/queue/nfc/checkin/', {'tag_id': str(tag.tag_id)}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.state.refresh_from_db()
+        self.assertEqual(
+            (self.state.current_state, self.state.current_location_id, self.state.version),
+            ('CALLED', tag.tag_id, stale.version + 1)
+        )
+        self.assertFalse(stale.compare_and_swap(current_state='IN_PROGRESS'))
+
+    def test_plan_completion_runs_no_debug_counts(self):
+        """재시도마다 호출되는 완료 계획은 대기열/다음 예약 조회 2회만"""
+        with CaptureQueriesContext(connection) as queries:
+            self.service._plan_completion()
+
+        self.assertEqual(len(queries), 2)
@@ -0,0 +1,47 @@
+"""
+환자 상태 전환 히스토리 - 커서 페이지네이션
+"""
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from authentication.models import User
+from p_queue.models import StateTransition
+
+
+class PatientStateHistoryPaginationTestCase(TestCase):
+    """state-history 는 limit 단위 페이지와 pagination.next 커서 제공"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.url = '/api/v1/queue/patient/state-history/'
+        self.user = User.objects.create(
+            email='history@test.com', name='히스토리', role='patient',
+            phone_number='010-4444-4444', birth_date='1990-01-01'
+        )
+        self.client.force_authenticate(user=self.user)
+        StateTransition.objects.bulk_create([
+            StateTransition(user=self.user, from_state='WAITING', to_state='CALLED', trigger_type='system_auto')
+            for _ in range(7)
+        ])
+
+    def test_cursor_walks_all_transitions(self):
+        """next 커서를 따라가면 모든 전환을 한 번씩 조회"""
+        seen = []
+        params = {'limit': 3}
+        url = self.url
+        while url:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            data = response.json()['data']
+            seen.extend(t['created_at'] for t in data['transitions'])
+            self.assertEqual(data['pagination']['count'], 7)
+            url, params = data['pagination']['next'], None
+
+        self.assertEqual(len(seen), 7)
+        self.assertEqual(seen, sorted(seen, reverse=True))
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.url, {'cursor': 'broken'})
+        self.assertEqual(response.status_code, 400)
@@ -39,6 +39,7 @@ urlpatterns = [
     
     # 의료진용 API
     path('medical/call-patient/', views.call_patient, name='call-patient'),
+    path('medical/bulk-actions/', views.bulk_staff_actions, name='bulk-staff-actions'),
     path('medical/missing-patients/', views.missing_patients, name='missing-patients'),
 
     # 환자 상태 관리 API (추가)
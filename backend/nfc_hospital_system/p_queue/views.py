@@ -4,6 +4,7 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions, viewsets
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.exceptions import NotFound
 from django.shortcuts import get_object_or_404
 from django.db import transaction
 from django.db.models import F, Count, Avg, Max, Min, Q, Sum
@@ -11,19 +12,27 @@ from django.utils import timezone
 from datetime import datetime, timedelta
 from django.http import StreamingHttpResponse
 import json
+import random
 import time
 import logging
 from .models import Queue, QueueStatusLog, PatientState
 from .serializers import QueueSerializer, MyPositionSerializer, QueueStatusUpdateSerializer
-from .services import PatientJourneyService, InvalidActionError
+from .services import (
+    PatientJourneyService, InvalidActionError, StateConflictError,
+    MAX_STATE_UPDATE_RETRIES, STATE_UPDATE_RETRY_DELAY
+)
+from .position_engine import get_position
+from . import bulk_actions
 from common.state_definitions import *
 from appointments.models import Appointment, Exam
 from appointments.serializers import AppointmentSerializer
 from authentication.models import User
 from nfc_hospital_system.utils import APIResponse
+from nfc_hospital_system.pagination import KeysetPagination
+from nfc.signals import send_location_update
 
 # 수동 JWT 인증 사용
-from authentication.jwt_auth import ManualJWTAuthentication
+from authentication.jwt_auth import ClaimsJWTAuthentication
 
 logger = logging.getLogger(__name__)
 
@@ -46,19 +55,8 @@ class QueueJoinView(APIView):
             # priority는 기본값 'normal'로 설정, 필요에 따라 변경
             new_queue = Queue.create_from_appointment(appointment)
             
-            # 대기열 생성 후 앞선 대기자 수를 다시 계산
-            ahead_count = Queue.objects.filter(
-                exam=new_queue.exam,
-                state='waiting',
-                queue_number__lt=new_queue.queue_number
-            ).count()
-
-            # Exam 모델에서 평균 소요 시간과 버퍼 시간 로드
-            average_time_per_exam = new_queue.exam.average_duration
-            buffer_time = new_queue.exam.buffer_time
-
-            # 예상 대기 시간 계산 후 저장
-            new_queue.estimated_wait_time = (ahead_count * average_time_per_exam) + buffer_time
+            # 대기열 생성 후 앞선 대기자 수로 예상 대기 시간 계산 후 저장 (대기 순서 엔진)
+            new_queue.estimated_wait_time = get_position(new_queue)['estimated_wait_time']
             new_queue.save()
 
             serializer = QueueSerializer(new_queue)
@@ -75,63 +73,12 @@ class MyPositionView(APIView):
         
         try:
             # 현재 사용자의 대기열 정보 조회
-            queue_item = Queue.objects.get(user=user, state__in=['waiting', 'called'])
+            queue_item = Queue.objects.select_related('exam').get(user=user, state__in=['waiting', 'called'])
 
-            my_priority = queue_item.priority
-            ahead_count = 0
-            
-            # emergency => 즉시 처리
-            if my_priority == 'emergency':
-                ahead_count = 0
-            else:
-                # 내 앞에 있는 emergency 환자 수 더하기
-                ahead_emergency_count = Queue.objects.filter(
-                    exam=queue_item.exam,
-                    state='waiting',
-                    priority='emergency'
-                ).count()
-                ahead_count += ahead_emergency_count
-                
-                if my_priority == 'urgent':
-                    # 내 앞에 있는 urgent 환자 수 더하기
-                    ahead_urgent_count = Queue.objects.filter(
-                        exam=queue_item.exam,
-                        state='waiting',
-                        priority='urgent',
-                        queue_number__lt=queue_item.queue_number
-                    ).count()
-                    ahead_count += ahead_urgent_count
-                    
-                    # 1 urgent : 2 normal 규칙에 따라 내 앞에 있는 normal 환자 수 계산
-                    # 앞선 normal 환자 수의 절반을 더하는 방식으로 구현
-                    ahead_normal_count = Queue.objects.filter(
-                        exam=queue_item.exam,
-                        state='waiting',
-                        priority='normal'
-                    ).count()
-                    
-                    # urgent 환자 1명 당 normal 2명 처리 후 다시 urgent 1명 처리
-                    ahead_count += (ahead_normal_count // 2)
-
-                elif my_priority == 'normal':
-                    # 내 앞에 있는 urgent 환자 수 더하기
-                    ahead_urgent_count = Queue.objects.filter(
-                        exam=queue_item.exam,
-                        state='waiting',
-                        priority='urgent'
-                    ).count()
-                    
-                    # 내 앞에 있는 normal 환자 수 더하기
-                    ahead_normal_count = Queue.objects.filter(
-                        exam=queue_item.exam,
-                        state='waiting',
-                        priority='normal',
-                        queue_number__lt=queue_item.queue_number
-                    ).count()
-                    ahead_count += ahead_urgent_count + ahead_normal_count
-            
-            # 예상 대기 시간 계산
-            estimated_wait_time = (ahead_count * queue_item.exam.average_duration) + queue_item.exam.buffer_time
+            # 우선순위 규칙(응급 우선, 긴급 1 : 일반 2)에 따른 앞선 대기자 수 - 대기 순서 엔진 O(log n) 조회
+            position = get_position(queue_item)
+            ahead_count = position['ahead']
+            estimated_wait_time = position['estimated_wait_time']
 
             data = {
                 'queue_number': queue_item.queue_number,
@@ -153,13 +100,14 @@ class MyCurrentQueuesView(ListAPIView):
     현재 내 대기열 API
     GET /api/v1/queues/my-current/
     """
-    authentication_classes = [ManualJWTAuthentication]
+    # user_id 만 필요하므로 토큰 클레임으로 인증 (사용자 조회 없음)
+    authentication_classes = [ClaimsJWTAuthentication]
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = QueueSerializer
 
     def get_queryset(self):
         return Queue.objects.filter(
-            user=self.request.user
+            user_id=self.request.user.user_id
         ).exclude(
             state__in=['completed', 'cancelled', 'no_show']
         ).select_related('exam', 'appointment').order_by('created_at')
@@ -692,6 +640,84 @@ def call_patient(request):
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def bulk_staff_actions(request):
+    """
+    의료진 일괄 액션 - POST /medical/bulk-actions/
+    {"actions": [{"userId": ..., "actionType": "call_patient", "queueId": (선택)}]}
+    또는 {"callNext": {"examId": ..., "count": 3, "examRoom": (선택)}}
+    하나라도 전이가 불가능하면 아무것도 변경하지 않고 400 반환
+    """
+    admin_user = request.user
+    if admin_user.role not in ['super', 'dept', 'staff']:
+        return APIResponse.error(
+            message="의료진 권한이 필요합니다.",
+            code="FORBIDDEN",
+            status_code=status.HTTP_403_FORBIDDEN
+        )
+
+    try:
+        call_next_data = request.data.get('callNext')
+        if call_next_data:
+            exam_id = call_next_data.get('examId')
+            try:
+                count = int(call_next_data.get('count', 1))
+            except (TypeError, ValueError):
+                count = 0
+            if not exam_id:
+                return APIResponse.error(
+                    message="examId 가 필요합니다.",
+                    code="INVALID_REQUEST",
+                    status_code=status.HTTP_400_BAD_REQUEST
+                )
+            result = bulk_actions.call_next(exam_id, count, actor=admin_user, exam_room=call_next_data.get('examRoom'))
+            message = f"{result['applied']}명의 환자를 호출했습니다."
+        else:
+            actions = request.data.get('actions')
+            if not isinstance(actions, list) or not actions or any(
+                not isinstance(item, dict) or not item.get('userId') or not item.get('actionType') for item in actions
+            ):
+                return APIResponse.error(
+                    message="actions 는 userId, actionType 을 가진 항목 목록이어야 합니다.",
+                    code="INVALID_REQUEST",
+                    status_code=status.HTTP_400_BAD_REQUEST
+                )
+            items = [
+                {
+                    'user_id': item['userId'],
+                    'action_type': item['actionType'],
+                    'queue_id': item.get('queueId'),
+                    'payload': item.get('payload'),
+                }
+                for item in actions
+            ]
+            result = bulk_actions.perform_bulk_actions(items, actor=admin_user)
+            message = f"{result['applied']}건의 액션을 처리했습니다."
+
+        return APIResponse.success(data=result, message=message, status_code=status.HTTP_200_OK)
+
+    except bulk_actions.BulkActionError as e:
+        return APIResponse.error(
+            message=str(e),
+            code="INVALID_TRANSITIONS",
+            details=e.errors,
+            status_code=status.HTTP_400_BAD_REQUEST
+        )
+    except InvalidActionError as e:
+        return APIResponse.error(
+            message=str(e),
+            code="INVALID_REQUEST",
+            status_code=status.HTTP_400_BAD_REQUEST
+        )
+    except Exception as e:
+        logger.error(f"Bulk staff action error: {str(e)}", exc_info=True)
+        return APIResponse.error(
+            message="일괄 처리 중 오류가 발생했습니다.",
+            code="BULK_ACTION_ERROR",
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def missing_patients(request):
@@ -888,6 +914,13 @@ from .models import PatientState, StateTransition
 from integrations.models import EmrSyncStatus
 from appointments.models import Appointment
 
+
+class StateHistoryPagination(KeysetPagination):
+    """상태 전환 히스토리 - (created_at, transition_id) 커서"""
+    page_size = 50
+    ordering = ('-created_at', '-transition_id')
+    page_fallback_class = None
+
 # 환자 상태 관리 API 추가
 
 @api_view(['POST'])
@@ -981,6 +1014,11 @@ class PatientJourneyViewSet(viewsets.ViewSet):
         try:
             result = service.perform_action(action_type, payload)
             return Response(result)
+        except StateConflictError as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_409_CONFLICT
+            )
         except InvalidActionError as e:
             return Response(
                 {'error': str(e)},
@@ -1007,47 +1045,66 @@ def nfc_checkin(request):
                 status_code=status.HTTP_400_BAD_REQUEST
             )
         
-        # PatientState 조회 또는 생성
-        patient_state, created = PatientState.objects.get_or_create(
-            user=user,
-            defaults={
-                'current_state': 'ARRIVED',
-                'is_logged_in': True
-            }
-        )
-        
-        # exam_id가 제공된 경우 Exam 객체로 설정
+        exam = None
         if exam_id:
             try:
-                from appointments.models import Exam
                 exam = Exam.objects.get(exam_id=exam_id)
-                patient_state.current_exam = exam
             except Exam.DoesNotExist:
                 logger.warning(f"Exam {exam_id} not found for NFC checkin")
         
-        # 위치 업데이트
-        old_location = patient_state.current_location
-        old_state = patient_state.current_state
-        patient_state.current_location = tag_id
-        
-        # 태그 위치에 따른 상태 결정
-        new_state = determine_state_from_location(tag_id, patient_state)
-        
-        if new_state != old_state:
-            patient_state.current_state = new_state
+        # 읽은 뒤 다른 요청이 상태를 바꿨으면 다시 읽어 재시도 (PatientJourneyService.perform_action 과 같은 방식)
+        for attempt in range(MAX_STATE_UPDATE_RETRIES):
+            if attempt:
+                time.sleep(STATE_UPDATE_RETRY_DELAY * (2 ** (attempt - 1)) * (1 + random.random()))
             
-            # 상태 전환 로그 생성
-            StateTransition.objects.create(
+            # PatientState 조회 또는 생성
+            patient_state, created = PatientState.objects.get_or_create(
                 user=user,
-                from_state=old_state,
-                to_state=new_state,
-                trigger_type='nfc_tag',
-                trigger_source=tag_id,
-                location_at_transition=tag_id,
-                exam_id=patient_state.current_exam.exam_id if patient_state.current_exam else None
+                defaults={
+                    'current_state': 'ARRIVED',
+                    'is_logged_in': True
+                }
+            )
+            
+            # 위치 / 검사 업데이트
+            old_location = str(patient_state.current_location_id) if patient_state.current_location_id else None
+            old_state = patient_state.current_state
+            changes = {'current_location_id': tag_id}
+            if exam:
+                changes['current_exam'] = exam
+                patient_state.current_exam = exam
+            
+            # 태그 위치에 따른 상태 결정
+            new_state = determine_state_from_location(tag_id, patient_state)
+            if new_state != old_state:
+                changes['current_state'] = new_state
+            
+            with transaction.atomic():
+                if not patient_state.compare_and_swap(**changes):
+                    continue
+                
+                if new_state != old_state:
+                    # 상태 전환 로그 생성
+                    StateTransition.objects.create(
+                        user=user,
+                        from_state=old_state,
+                        to_state=new_state,
+                        trigger_type='nfc_tag',
+                        trigger_source=tag_id,
+                        location_at_transition=tag_id,
+                        exam_id=patient_state.current_exam.exam_id if patient_state.current_exam else None
+                    )
+                    # post_save 시그널이 하던 Queue 동기화
+                    PatientJourneyService(user).sync_from_patient_state(patient_state)
+            break
+        else:
+            return APIResponse.error(
+                message="다른 요청과 동시에 상태가 바뀌어 체크인을 처리하지 못했습니다. 다시 시도해주세요.",
+                code="STATE_CONFLICT",
+                status_code=status.HTTP_409_CONFLICT
             )
         
-        patient_state.save()
+        send_location_update(patient_state)
         
         return APIResponse.success(
             data={
@@ -1055,7 +1112,7 @@ def nfc_checkin(request):
                 'location_updated': old_location != tag_id,
                 'state_changed': old_state != new_state,
                 'current_state': patient_state.current_state,
-                'current_location': patient_state.current_location,
+                'current_location': str(patient_state.current_location_id),
                 'current_exam': {
                     'exam_id': patient_state.current_exam.exam_id,
                     'exam_name': patient_state.current_exam.title,
@@ -1405,18 +1462,22 @@ def patient_next_appointment(request):
 def patient_state_history(request):
     """
     환자 상태 전환 히스토리
-    GET /api/v1/queue/patient/state-history/
+    GET /api/v1/queue/patient/state-history/?days=7&limit=50&cursor=...
+    (created_at, transition_id) 커서 페이지네이션 - 다음 페이지는 pagination.next
     """
     try:
         user = request.user
         days = int(request.GET.get('days', 7))
         
-        start_date = timezone.now() - timedelta(days=days)
+        # 분 단위로 잘라 같은 기간 요청의 COUNT 캐시 키를 맞춤
+        start_date = (timezone.now() - timedelta(days=days)).replace(second=0, microsecond=0)
         
         transitions = StateTransition.objects.filter(
             user=user,
             created_at__gte=start_date
-        ).order_by('-created_at')
+        )
+        paginator = StateHistoryPagination()
+        page = paginator.paginate_queryset(transitions, request)
         
         return APIResponse.success(
             data={
@@ -1426,11 +1487,18 @@ def patient_state_history(request):
                     'trigger_type': t.trigger_type,
                     'location_at_transition': t.location_at_transition,
                     'created_at': t.created_at.isoformat()
-                } for t in transitions]
+                } for t in page],
+                'pagination': paginator.get_page_info()
             },
             message="상태 전환 히스토리를 조회했습니다."
         )
         
+    except NotFound as e:
+        return APIResponse.error(
+            message=str(e.detail),
+            code="INVALID_CURSOR",
+            status_code=status.HTTP_400_BAD_REQUEST
+        )
     except Exception as e:
         logger.error(f"State history error: {str(e)}")
         return APIResponse.error(
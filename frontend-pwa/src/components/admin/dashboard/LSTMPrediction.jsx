@@ -350,9 +350,12 @@ const LSTMPrediction = () => {
         name: deptName,
         '30분 전 AI 예측': predicted30minAgo,
         '현재 실제 대기시간': actualCurrent,
-        accuracy: actualCurrent > 0
-          ? Math.round((1 - Math.abs(predicted30minAgo - actualCurrent) / actualCurrent) * 100)
-          : 100,
+        // 정확도는 백엔드 집계(최근 24시간)를 사용, 집계 전이면 현재값과 비교
+        accuracy: deptData.accuracy
+          ? Math.round(deptData.accuracy.accuracy)
+          : actualCurrent > 0
+            ? Math.round((1 - Math.abs(predicted30minAgo - actualCurrent) / actualCurrent) * 100)
+            : 100,
         fill: DEPT_COLORS[deptName] || '#3b82f6',
         isRealData: pastPrediction !== null && pastPrediction !== undefined  // 실제 데이터 여부 표시
       });
@@ -8,6 +8,10 @@ class WebSocketService {
     this.maxReconnectAttempts = 5;
     this.reconnectInterval = 3000;
     this.eventHandlers = {};
+    this.queueId = null;
+    // 재연결 시 놓친 이벤트만 받기 위한 그룹별 마지막 seq, 다시 보낼 구독 메시지
+    this.lastSeq = {};
+    this.subscriptions = {};
   }
 
   // 이벤트 리스너 등록
@@ -39,8 +43,16 @@ class WebSocketService {
       return;
     }
 
-    // ✅ URL 수정: 올바른 WebSocket URL 생성
-    this.url = `ws://127.0.0.1:8000/ws/queue/${queueId}/`;
+    // 다른 대기열로 바꾸면 이전 seq / 구독은 버림
+    if (this.queueId !== queueId) {
+      this.lastSeq = {};
+      this.subscriptions = {};
+    }
+    this.queueId = queueId;
+
+    // ✅ URL 수정: 올바른 WebSocket URL 생성 (재연결이면 마지막 seq 이후만 요청)
+    const lastSeq = this.lastSeq[`queue_${queueId}`];
+    this.url = `ws://127.0.0.1:8000/ws/queue/${queueId}/` + (lastSeq != null ? `?last_seq=${lastSeq}` : '');
     console.log(`🔄 WebSocket 연결 시도: ${this.url}`);
 
     try {
@@ -63,6 +75,8 @@ class WebSocketService {
       });
       this.isConnected = true;
       this.reconnectAttempts = 0;
+      // 재연결: 구독했던 환자/검사 그룹을 마지막 seq 와 함께 다시 구독
+      Object.values(this.subscriptions).forEach(message => this.sendMessage(message));
       this.emit('connected', { event });
     };
 
@@ -86,6 +100,14 @@ class WebSocketService {
       try {
         const data = JSON.parse(event.data);
         console.log('📨 WebSocket 메시지 수신:', data);
+
+        // 재전송과 실시간 전송이 겹칠 수 있으므로 이미 받은 seq 이하는 버림
+        if (data.seq != null && data.group) {
+          if (data.type !== 'snapshot' && data.seq <= (this.lastSeq[data.group] ?? -1)) {
+            return;
+          }
+          this.lastSeq[data.group] = data.seq;
+        }
         
         this.emit('message', data);
         
@@ -94,6 +116,11 @@ class WebSocketService {
           case 'connection_established':
             console.log('🎉 WebSocket 연결 확인됨');
             break;
+          case 'snapshot':
+            // 재전송 버퍼를 벗어남 → 그룹의 현재 상태 전체
+            console.log('🗂️ 스냅샷 수신:', data.group);
+            this.emit('snapshot', data);
+            break;
           case 'queue_status_update':
             console.log('🔔 대기열 상태 업데이트:', data.data);
             this.emit('queueUpdate', data.data);
@@ -118,10 +145,13 @@ class WebSocketService {
       this.socket = null;
       this.isConnected = false;
     }
+    this.lastSeq = {};
+    this.subscriptions = {};
   }
 
   // 메시지 전송
   sendMessage(message) {
+    this.rememberSubscription(message);
     if (this.socket && this.socket.readyState === WebSocket.OPEN) {
       console.log('📤 메시지 전송:', message);
       this.socket.send(JSON.stringify(message));
@@ -130,6 +160,23 @@ class WebSocketService {
     }
   }
 
+  // 환자/검사 구독은 재연결 때 다시 보내도록 저장하고, 받은 seq 가 있으면 이어서 받기
+  rememberSubscription(message) {
+    let group = null;
+    if (message.type === 'subscribe_patient' && message.user_id) {
+      group = `patient_${message.user_id}`;
+    } else if (message.type === 'subscribe_exam' && message.exam_id) {
+      group = `exam_${message.exam_id}`;
+    }
+    if (!group) return;
+
+    const lastSeq = this.lastSeq[group];
+    if (lastSeq != null) {
+      message.last_seq = lastSeq;
+    }
+    this.subscriptions[group] = message;
+  }
+
   // Ping 전송
   sendPing() {
     this.sendMessage({
@@ -146,9 +193,8 @@ class WebSocketService {
       
       setTimeout(() => {
         if (!this.isConnected) {
-          const queueId = this.url?.split('/').slice(-2, -1)[0];
-          if (queueId) {
-            this.connect(queueId);
+          if (this.queueId) {
+            this.connect(this.queueId);
           }
         }
       }, this.reconnectInterval);